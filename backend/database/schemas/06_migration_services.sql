@@ -384,6 +384,15 @@ FROM (VALUES
     ('Project Closure', 'Complete project and handover', 10, ARRAY['Project completion report', 'Customer satisfaction survey'], ARRAY['All deliverables completed', 'Customer sign-off received'])
 ) AS milestones(milestone_name, description, sequence_order, deliverables, acceptance_criteria);
 
+-- Order numbers are platform-wide, drawn from the identifier counters
+INSERT INTO platform.identifier_kinds (kind, seed_query) VALUES
+    ('order_number', $seed$
+        SELECT MAX(CAST(SUBSTRING(order_number FROM '[0-9]+$') AS INTEGER))
+        FROM migration_services.care_package_orders
+        WHERE order_number LIKE 'CP-' || $2 || '-%'
+    $seed$)
+ON CONFLICT (kind) DO UPDATE SET seed_query = EXCLUDED.seed_query;
+
 -- Create function to generate order number
 CREATE OR REPLACE FUNCTION generate_order_number()
 RETURNS VARCHAR(20) AS $$
@@ -394,10 +403,9 @@ DECLARE
 BEGIN
     year_part := EXTRACT(YEAR FROM CURRENT_DATE)::VARCHAR;
     
-    SELECT COALESCE(MAX(CAST(SUBSTRING(order_number FROM 9 FOR 3) AS INTEGER)), 0) + 1
-    INTO next_sequence
-    FROM migration_services.care_package_orders
-    WHERE order_number LIKE 'CP-' || year_part || '-%';
+    next_sequence := platform.reserve_identifiers(
+        '00000000-0000-0000-0000-000000000000', 'order_number', year_part, 1
+    );
     
     sequence_part := LPAD(next_sequence::VARCHAR, 3, '0');
     
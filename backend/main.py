@@ -6,12 +6,20 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from datetime import datetime
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 from dotenv import load_dotenv
 
 # Import tenant middleware
 from shared.middleware.tenant_middleware import TenantMiddleware
+from shared.cache.tenant_cache import listen_for_tenant_invalidations
+from shared.cache.principal_cache import listen_for_principal_invalidations
+from shared.cache.redis_client import close_redis_client, listen_for_near_cache_invalidations
+from shared.db_pools import pool_registry
+from shared.services.audit_writer import audit_writer
+from services.finance.restrictions import listen_for_restriction_invalidations
 
 # Load environment variables
 load_dotenv()
@@ -32,6 +40,62 @@ ENABLE_EXPERIMENTAL_MIGRATION_SERVICES = _env_flag(
     "ONECLASS_ENABLE_EXPERIMENTAL_MIGRATION_SERVICES", default=False
 )
 
+# Application lifespan
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: keep the in-process tenant, principal, restriction and near caches coherent across workers
+    background_tasks = [
+        asyncio.create_task(listen_for_tenant_invalidations()),
+        asyncio.create_task(listen_for_principal_invalidations()),
+        asyncio.create_task(listen_for_restriction_invalidations()),
+        asyncio.create_task(listen_for_near_cache_invalidations()),
+    ]
+    # Audit rows are written in batches by a background consumer
+    await audit_writer.start()
+    # Email deliveries that failed transiently are retried from a shared queue
+    try:
+        from services.notifications.routes import email_service
+
+        background_tasks.append(asyncio.create_task(email_service.delivery.run_retry_worker()))
+    except ImportError:
+        email_service = None
+    # WebSocket heartbeat, stale-connection cleanup and cross-worker relay
+    try:
+        from services.realtime.routes import websocket_manager
+
+        websocket_manager.start()
+    except ImportError:
+        websocket_manager = None
+
+    yield
+
+    # Shutdown
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    try:
+        from services.monitoring.service import monitoring_service
+
+        # Write the last partial window of batched metrics before pools close
+        await monitoring_service.metric_pipeline.close()
+    except ImportError:
+        pass
+    if websocket_manager is not None:
+        await websocket_manager.shutdown()
+    try:
+        from services.realtime.routes import progress_tracker
+
+        # Persist progress updates still waiting out their coalescing interval
+        await progress_tracker.flush_pending()
+    except ImportError:
+        pass
+    if email_service is not None:
+        await email_service.close()
+    await audit_writer.close()
+    await close_redis_client()
+    await pool_registry.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="OneClass Platform API",
@@ -39,6 +103,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware (before tenant middleware)
@@ -0,0 +1,21 @@
+-- =====================================================
+-- OneClass Academic Management Module - Attendance Register
+-- Set-based attendance counters
+-- =====================================================
+
+-- Migration: 005_attendance_register
+-- Description: Drop the per-row attendance statistics trigger; session
+--              counters are recomputed once per register by
+--              services/academic/attendance.py
+-- Date: 2026-10-16
+-- Author: OneClass Development Team
+
+BEGIN;
+
+-- The trigger recounted the whole session four times for every record
+-- written, so marking a class of 40 ran 160 counting queries. It also left
+-- excused students out of every counter, breaking attendance_sum_check.
+DROP TRIGGER IF EXISTS trigger_update_attendance_stats ON academic.attendance_records;
+DROP FUNCTION IF EXISTS academic.update_attendance_stats();
+
+COMMIT;
@@ -0,0 +1,65 @@
+-- =====================================================
+-- OneClass Academic Management Module - Grade Statistics
+-- Incrementally maintained assessment statistics
+-- =====================================================
+
+-- Migration: 006_grade_statistics
+-- Description: Per-assessment running totals and score histogram kept up to
+--              date by services/academic/grading.py; drops the per-row grade
+--              calculation trigger now that grading is done in the upsert
+-- Date: 2026-10-16
+-- Author: OneClass Development Team
+
+BEGIN;
+
+-- Running totals per assessment
+CREATE TABLE IF NOT EXISTS academic.assessment_statistics (
+    assessment_id UUID PRIMARY KEY,
+    school_id UUID NOT NULL,
+    total_students INTEGER NOT NULL DEFAULT 0,
+    scored_students INTEGER NOT NULL DEFAULT 0,
+    score_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    passed_students INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    
+    CONSTRAINT non_negative_statistics CHECK (
+        total_students >= 0 AND scored_students >= 0 AND passed_students >= 0
+        AND scored_students <= total_students AND passed_students <= scored_students
+    ),
+    CONSTRAINT fk_assessment_statistics_assessment FOREIGN KEY (assessment_id) REFERENCES academic.assessments(id) ON DELETE CASCADE
+);
+
+-- Students per percentage score; median, extremes and the letter grade
+-- distribution are read from here without touching academic.grades
+CREATE TABLE IF NOT EXISTS academic.assessment_score_counts (
+    assessment_id UUID NOT NULL,
+    percentage_score DECIMAL(5,2) NOT NULL,
+    students INTEGER NOT NULL CHECK (students >= 0),
+    
+    PRIMARY KEY (assessment_id, percentage_score),
+    CONSTRAINT fk_assessment_score_counts_assessment FOREIGN KEY (assessment_id) REFERENCES academic.assessments(id) ON DELETE CASCADE
+);
+
+-- Backfill from existing grades
+INSERT INTO academic.assessment_statistics (
+    assessment_id, school_id, total_students, scored_students, score_sum, passed_students
+)
+SELECT assessment_id, MIN(school_id::text)::uuid, COUNT(*), COUNT(percentage_score),
+       COALESCE(SUM(percentage_score), 0), COUNT(*) FILTER (WHERE percentage_score >= 50)
+FROM academic.grades
+GROUP BY assessment_id
+ON CONFLICT (assessment_id) DO NOTHING;
+
+INSERT INTO academic.assessment_score_counts (assessment_id, percentage_score, students)
+SELECT assessment_id, percentage_score, COUNT(*)
+FROM academic.grades
+WHERE percentage_score IS NOT NULL
+GROUP BY assessment_id, percentage_score
+ON CONFLICT (assessment_id, percentage_score) DO NOTHING;
+
+-- Percentage, letter grade and points are computed for the whole batch in
+-- the grade upsert; the trigger looked up the assessment once per row
+DROP TRIGGER IF EXISTS trigger_auto_calculate_grade ON academic.grades;
+DROP FUNCTION IF EXISTS academic.auto_calculate_grade();
+
+COMMIT;
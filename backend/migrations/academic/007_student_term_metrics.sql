@@ -0,0 +1,209 @@
+-- =====================================================
+-- OneClass Academic Management Module - Student Term Metrics
+-- Precomputed per-student, per-term performance snapshots
+-- =====================================================
+
+-- Migration: 007_student_term_metrics
+-- Description: One row per student and term holding weighted averages, grade
+--              distribution, subject breakdown and attendance counts.
+--              Refreshed for the affected students by grade and attendance
+--              writes, rebuilt nightly by scripts/rebuild_student_term_metrics.py
+-- Date: 2026-10-16
+-- Author: OneClass Development Team
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS academic.student_term_metrics (
+    school_id UUID NOT NULL,
+    student_id UUID NOT NULL,
+    academic_year_id UUID NOT NULL,
+    term_number INTEGER NOT NULL,
+
+    -- Grades (absent and unscored grades excluded)
+    graded_assessments INTEGER NOT NULL DEFAULT 0,
+    score_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    weighted_score_sum DECIMAL(16,4) NOT NULL DEFAULT 0,
+    weight_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    overall_average DECIMAL(5,2) GENERATED ALWAYS AS (
+        CASE WHEN weight_sum > 0 THEN ROUND(weighted_score_sum / weight_sum, 2) ELSE 0 END
+    ) STORED,
+    grade_distribution JSONB NOT NULL DEFAULT '{}',
+    subject_grades JSONB NOT NULL DEFAULT '[]',
+    recent_assessments JSONB NOT NULL DEFAULT '[]',
+
+    -- Attendance
+    attendance_sessions INTEGER NOT NULL DEFAULT 0,
+    present_sessions INTEGER NOT NULL DEFAULT 0,
+    absent_sessions INTEGER NOT NULL DEFAULT 0,
+    late_sessions INTEGER NOT NULL DEFAULT 0,
+    attendance_rate DECIMAL(5,2) GENERATED ALWAYS AS (
+        CASE WHEN attendance_sessions > 0
+             THEN ROUND((present_sessions + late_sessions) * 100.0 / attendance_sessions, 2)
+             ELSE 0 END
+    ) STORED,
+
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (school_id, academic_year_id, term_number, student_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_student_term_metrics_student
+    ON academic.student_term_metrics(student_id, academic_year_id, term_number);
+
+ALTER TABLE academic.student_term_metrics ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY student_term_metrics_school_isolation ON academic.student_term_metrics
+    FOR ALL
+    USING (school_id = academic.current_user_school_id());
+
+-- Recompute one term's rows for the given students (all students when NULL).
+-- Rows for students with no grades or attendance left in the term are removed.
+CREATE OR REPLACE FUNCTION academic.refresh_student_term_metrics(
+    p_school_id UUID,
+    p_academic_year_id UUID,
+    p_term_number INTEGER,
+    p_student_ids UUID[] DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    DELETE FROM academic.student_term_metrics
+    WHERE school_id = p_school_id
+      AND academic_year_id = p_academic_year_id
+      AND term_number = p_term_number
+      AND (p_student_ids IS NULL OR student_id = ANY(p_student_ids));
+
+    WITH graded AS (
+        SELECT g.student_id, a.subject_id, s.name AS subject_name, a.name AS assessment_name,
+               a.assessment_type, a.assessment_date, a.weight_percentage, g.percentage_score,
+               g.letter_grade, g.feedback,
+               g.percentage_score IS NOT NULL AND NOT g.is_absent AS counted
+        FROM academic.grades g
+        JOIN academic.assessments a ON a.id = g.assessment_id
+        LEFT JOIN academic.subjects s ON s.id = a.subject_id
+        WHERE g.school_id = p_school_id
+          AND a.academic_year_id = p_academic_year_id
+          AND a.term_number = p_term_number
+          AND a.is_active = true
+          AND (p_student_ids IS NULL OR g.student_id = ANY(p_student_ids))
+    ),
+    grade_totals AS (
+        SELECT student_id,
+               COUNT(*) FILTER (WHERE counted) AS graded_assessments,
+               COALESCE(SUM(percentage_score) FILTER (WHERE counted), 0) AS score_sum,
+               COALESCE(SUM(percentage_score * weight_percentage) FILTER (WHERE counted), 0) AS weighted_score_sum,
+               COALESCE(SUM(weight_percentage) FILTER (WHERE counted), 0) AS weight_sum,
+               jsonb_build_object(
+                   'A', COUNT(*) FILTER (WHERE letter_grade = 'A'),
+                   'B', COUNT(*) FILTER (WHERE letter_grade = 'B'),
+                   'C', COUNT(*) FILTER (WHERE letter_grade = 'C'),
+                   'D', COUNT(*) FILTER (WHERE letter_grade = 'D'),
+                   'E', COUNT(*) FILTER (WHERE letter_grade = 'E'),
+                   'U', COUNT(*) FILTER (WHERE letter_grade = 'U')
+               ) AS grade_distribution
+        FROM graded
+        GROUP BY student_id
+    ),
+    subjects AS (
+        SELECT student_id,
+               jsonb_build_object(
+                   'subject_id', subject_id::text,
+                   'subject_name', COALESCE(MAX(subject_name), ''),
+                   'graded', COUNT(percentage_score),
+                   'score_sum', COALESCE(SUM(percentage_score), 0),
+                   'average', COALESCE(ROUND(AVG(percentage_score), 2), 0),
+                   'latest_grade', (jsonb_agg(
+                       jsonb_build_object('assessment_name', assessment_name, 'percentage_score', percentage_score,
+                                          'letter_grade', letter_grade, 'assessment_date', assessment_date)
+                       ORDER BY assessment_date DESC NULLS LAST
+                   ) FILTER (WHERE percentage_score IS NOT NULL)) -> 0,
+                   'grades', jsonb_agg(
+                       jsonb_build_object('assessment_name', assessment_name, 'assessment_type', assessment_type,
+                                          'percentage_score', percentage_score, 'letter_grade', letter_grade,
+                                          'assessment_date', assessment_date, 'feedback', feedback)
+                       ORDER BY assessment_date NULLS FIRST
+                   )
+               ) AS subject
+        FROM graded
+        GROUP BY student_id, subject_id
+    ),
+    subject_lists AS (
+        SELECT student_id, jsonb_agg(subject ORDER BY subject->>'subject_name') AS subject_grades
+        FROM subjects
+        GROUP BY student_id
+    ),
+    recent AS (
+        SELECT student_id,
+               jsonb_agg(
+                   jsonb_build_object('assessment_name', assessment_name, 'subject_name', COALESCE(subject_name, ''),
+                                      'assessment_type', assessment_type, 'percentage_score', percentage_score,
+                                      'letter_grade', letter_grade, 'assessment_date', assessment_date)
+                   ORDER BY assessment_date DESC NULLS LAST
+               ) AS recent_assessments
+        FROM (
+            SELECT graded.*,
+                   row_number() OVER (PARTITION BY student_id ORDER BY assessment_date DESC NULLS LAST) AS position
+            FROM graded
+            WHERE percentage_score IS NOT NULL
+        ) ranked
+        WHERE position <= 5
+        GROUP BY student_id
+    ),
+    attendance AS (
+        SELECT r.student_id,
+               COUNT(*) AS attendance_sessions,
+               COUNT(*) FILTER (WHERE r.attendance_status = 'present') AS present_sessions,
+               -- Excused absences count as absent, as on the attendance register
+               COUNT(*) FILTER (WHERE r.attendance_status IN ('absent', 'excused')) AS absent_sessions,
+               COUNT(*) FILTER (WHERE r.attendance_status = 'late') AS late_sessions
+        FROM academic.attendance_records r
+        JOIN academic.attendance_sessions s ON s.id = r.attendance_session_id
+        JOIN academic.timetables t ON t.id = s.timetable_id
+        WHERE r.school_id = p_school_id
+          AND t.academic_year_id = p_academic_year_id
+          AND t.term_number = p_term_number
+          AND (p_student_ids IS NULL OR r.student_id = ANY(p_student_ids))
+        GROUP BY r.student_id
+    ),
+    students AS (
+        SELECT student_id FROM grade_totals
+        UNION
+        SELECT student_id FROM attendance
+    )
+    INSERT INTO academic.student_term_metrics (
+        school_id, student_id, academic_year_id, term_number,
+        graded_assessments, score_sum, weighted_score_sum, weight_sum,
+        grade_distribution, subject_grades, recent_assessments,
+        attendance_sessions, present_sessions, absent_sessions, late_sessions
+    )
+    SELECT p_school_id, k.student_id, p_academic_year_id, p_term_number,
+           COALESCE(g.graded_assessments, 0), COALESCE(g.score_sum, 0),
+           COALESCE(g.weighted_score_sum, 0), COALESCE(g.weight_sum, 0),
+           COALESCE(g.grade_distribution, '{}'), COALESCE(l.subject_grades, '[]'),
+           COALESCE(r.recent_assessments, '[]'),
+           COALESCE(a.attendance_sessions, 0), COALESCE(a.present_sessions, 0),
+           COALESCE(a.absent_sessions, 0), COALESCE(a.late_sessions, 0)
+    FROM students k
+    LEFT JOIN grade_totals g ON g.student_id = k.student_id
+    LEFT JOIN subject_lists l ON l.student_id = k.student_id
+    LEFT JOIN recent r ON r.student_id = k.student_id
+    LEFT JOIN attendance a ON a.student_id = k.student_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE academic.student_term_metrics IS
+    'Per-student term snapshot read by class and student summaries; refreshed by grade and attendance writes';
+
+-- Backfill every term that has assessments or timetabled sessions
+SELECT academic.refresh_student_term_metrics(terms.school_id, terms.academic_year_id, terms.term_number)
+FROM (
+    SELECT school_id, academic_year_id, term_number FROM academic.assessments
+    UNION
+    SELECT school_id, academic_year_id, term_number FROM academic.timetables
+) terms;
+
+COMMIT;
@@ -59,6 +59,24 @@ class AcademicMigrationRunner:
                 "name": "RLS Security Policies",
                 "description": "Enable row-level security",
                 "required": False
+            },
+            {
+                "file": "005_attendance_register.sql",
+                "name": "Attendance Register",
+                "description": "Replace per-row attendance stats trigger with register counters",
+                "required": False
+            },
+            {
+                "file": "006_grade_statistics.sql",
+                "name": "Grade Statistics",
+                "description": "Add incrementally maintained assessment statistics",
+                "required": False
+            },
+            {
+                "file": "007_student_term_metrics.sql",
+                "name": "Student Term Metrics",
+                "description": "Add per-student term performance snapshots",
+                "required": False
             }
         ]
     
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+OneClass Platform Student Term Metrics Rebuild
+Nightly job that rebuilds academic.student_term_metrics from grades and
+attendance, repairing any drift from writes that bypassed the refresh
+
+Usage:
+    python scripts/rebuild_student_term_metrics.py [--school-id UUID]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from shared.database import get_database_connection
+from shared.db_pools import BACKGROUND
+from services.academic.term_metrics import rebuild_term_metrics
+
+
+async def rebuild(school_id=None) -> dict:
+    async with get_database_connection(BACKGROUND) as conn:
+        return await rebuild_term_metrics(conn, school_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild student term performance snapshots')
+    parser.add_argument('--school-id', help='Only rebuild this school')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    rebuilt = asyncio.run(rebuild(args.school_id))
+    print(f"Rebuilt {rebuilt['terms']} terms ({rebuilt['rows']} student rows)")
+
+
+if __name__ == "__main__":
+    main()
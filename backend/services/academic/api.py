@@ -88,6 +88,8 @@ from .exceptions import (
 
 # Import CRUD operations
 from . import crud
+from .attendance import mark_register
+from .grading import get_assessment_statistics
 
 from .schemas import (
     # Subject schemas
@@ -98,7 +100,7 @@ from .schemas import (
     GradeCreate, GradeUpdate, Grade, BulkGradeCreate,
     # Attendance schemas
     AttendanceSessionCreate, AttendanceSession,
-    AttendanceRecordCreate, BulkAttendanceCreate,
+    AttendanceRecordCreate, BulkAttendanceCreate, AttendanceRegisterCreate,
     # Enums
     TermNumber, AssessmentType, AttendanceStatus, GradingScale
 )
@@ -513,6 +515,38 @@ async def get_assessment_grades_endpoint(
         log_academic_error(academic_error, {"endpoint": "get_assessment_grades", "assessment_id": str(assessment_id)})
         raise academic_error.to_http_exception()
 
+@router.get("/grades/{assessment_id}/statistics", response_model=Dict[str, Any])
+async def get_assessment_statistics_endpoint(
+    assessment_id: UUID,
+    db: AsyncSession = Depends(get_async_session),
+    auth_context: AcademicAuthContext = Depends(get_academic_auth_context)
+):
+    """Get the maintained statistics for an assessment's grades"""
+    # Check permission
+    if not auth_context.has_permission(AcademicPermissions.GRADE_READ):
+        raise InsufficientPermissionError(
+            permission=AcademicPermissions.GRADE_READ,
+            user_role=auth_context.user_role,
+            action="read grades"
+        ).to_http_exception()
+    
+    try:
+        statistics = await get_assessment_statistics(
+            db=db,
+            assessment_id=assessment_id,
+            school_id=str(auth_context.school_id)
+        )
+        if statistics is None:
+            raise AssessmentNotFoundError(str(assessment_id))
+        return statistics
+    except AcademicBaseException as e:
+        log_academic_error(e, {"endpoint": "get_assessment_statistics", "assessment_id": str(assessment_id)})
+        raise e.to_http_exception()
+    except Exception as e:
+        academic_error = handle_database_error(e, "get_assessment_statistics")
+        log_academic_error(academic_error, {"endpoint": "get_assessment_statistics", "assessment_id": str(assessment_id)})
+        raise academic_error.to_http_exception()
+
 # =====================================================
 # ATTENDANCE MANAGEMENT ENDPOINTS
 # =====================================================
@@ -566,6 +600,35 @@ async def mark_bulk_attendance_endpoint(
         log_academic_error(academic_error, {"endpoint": "mark_bulk_attendance"})
         raise academic_error.to_http_exception()
 
+@router.post("/attendance/register")
+async def mark_attendance_register_endpoint(
+    register_data: AttendanceRegisterCreate,
+    db: AsyncSession = Depends(get_async_session),
+    auth_context: AcademicAuthContext = Depends(require_attendance_write)
+):
+    """Mark attendance for many sessions in one request (e.g. the morning register)"""
+    try:
+        result = await mark_register(
+            db=db,
+            registers=register_data.sessions,
+            school_id=str(auth_context.school_id),
+            marked_by=str(auth_context.user.id)
+        )
+        return {
+            "message": "Attendance marked successfully",
+            "records_processed": result.records_processed,
+            "records_changed": result.inserted + result.updated,
+            "records_removed": result.removed,
+            "sessions": result.sessions
+        }
+    except AcademicBaseException as e:
+        log_academic_error(e, {"endpoint": "mark_attendance_register", "user_id": str(auth_context.user.id)})
+        raise e.to_http_exception()
+    except Exception as e:
+        academic_error = handle_database_error(e, "mark_attendance_register")
+        log_academic_error(academic_error, {"endpoint": "mark_attendance_register"})
+        raise academic_error.to_http_exception()
+
 # =====================================================
 # UTILITY ENDPOINTS
 # =====================================================
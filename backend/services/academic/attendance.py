@@ -0,0 +1,302 @@
+"""
+Academic Management Module - Attendance Write Engine
+Set-based attendance marking: registers for many sessions in one request,
+upserts that only touch changed rows, and session counters computed in SQL
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .exceptions import AcademicValidationError, AttendanceSessionNotFoundError
+from .schemas import BulkAttendanceCreate
+from .term_metrics import refresh_term_metrics
+
+logger = logging.getLogger(__name__)
+
+# Locks the submitted sessions in a fixed order, so concurrent submissions
+# of the same register queue instead of racing on the counters
+SESSIONS_SQL = text("""
+    SELECT s.id, t.academic_year_id, t.term_number
+    FROM academic.attendance_sessions s
+    JOIN academic.timetables t ON t.id = s.timetable_id
+    WHERE s.id = ANY(CAST(:session_ids AS uuid[])) AND s.school_id = CAST(:school_id AS uuid)
+    ORDER BY s.id
+    FOR UPDATE OF s
+""")
+
+# Inserts new marks and rewrites existing ones only when something changed
+REGISTER_UPSERT_SQL = text("""
+    INSERT INTO academic.attendance_records (
+        school_id, attendance_session_id, student_id, attendance_status, arrival_time,
+        departure_time, excuse_reason, is_excused, notes, marked_by, marked_at,
+        created_by, updated_by
+    )
+    SELECT CAST(:school_id AS uuid), r.attendance_session_id, r.student_id, r.attendance_status,
+           r.arrival_time, r.departure_time, r.excuse_reason, r.is_excused, r.notes,
+           CAST(:marked_by AS uuid), NOW(), CAST(:marked_by AS uuid)::text, CAST(:marked_by AS uuid)::text
+    FROM unnest(
+        CAST(:session_ids AS uuid[]), CAST(:student_ids AS uuid[]), CAST(:statuses AS varchar[]),
+        CAST(:arrival_times AS time[]), CAST(:departure_times AS time[]),
+        CAST(:excuse_reasons AS text[]), CAST(:is_excused AS boolean[]), CAST(:notes AS text[])
+    ) AS r(attendance_session_id, student_id, attendance_status, arrival_time,
+           departure_time, excuse_reason, is_excused, notes)
+    ON CONFLICT ON CONSTRAINT unique_student_attendance_per_session DO UPDATE
+    SET attendance_status = EXCLUDED.attendance_status,
+        arrival_time = EXCLUDED.arrival_time,
+        departure_time = EXCLUDED.departure_time,
+        excuse_reason = EXCLUDED.excuse_reason,
+        is_excused = EXCLUDED.is_excused,
+        notes = EXCLUDED.notes,
+        marked_by = EXCLUDED.marked_by,
+        marked_at = EXCLUDED.marked_at,
+        updated_by = EXCLUDED.updated_by
+    WHERE (academic.attendance_records.attendance_status, academic.attendance_records.arrival_time,
+           academic.attendance_records.departure_time, academic.attendance_records.excuse_reason,
+           academic.attendance_records.is_excused, academic.attendance_records.notes)
+          IS DISTINCT FROM
+          (EXCLUDED.attendance_status, EXCLUDED.arrival_time, EXCLUDED.departure_time,
+           EXCLUDED.excuse_reason, EXCLUDED.is_excused, EXCLUDED.notes)
+    RETURNING attendance_session_id, student_id, (xmax = 0) AS inserted
+""")
+
+# A register replaces the session's marks: students left off are removed
+REGISTER_PRUNE_SQL = text("""
+    DELETE FROM academic.attendance_records a
+    WHERE a.attendance_session_id = ANY(CAST(:sessions AS uuid[]))
+      AND NOT EXISTS (
+          SELECT 1
+          FROM unnest(CAST(:session_ids AS uuid[]), CAST(:student_ids AS uuid[])) AS r(session_id, student_id)
+          WHERE r.session_id = a.attendance_session_id AND r.student_id = a.student_id
+      )
+    RETURNING a.attendance_session_id, a.student_id
+""")
+
+# Excused students count as absent so the counters add up to the total
+SESSION_COUNTERS_SQL = text("""
+    UPDATE academic.attendance_sessions s
+    SET total_students = c.total,
+        present_students = c.present,
+        absent_students = c.absent,
+        late_students = c.late,
+        attendance_marked = true,
+        marked_by = CAST(:marked_by AS uuid),
+        marked_at = NOW()
+    FROM (
+        SELECT k.session_id,
+               COUNT(a.id) AS total,
+               COUNT(a.id) FILTER (WHERE a.attendance_status = 'present') AS present,
+               COUNT(a.id) FILTER (WHERE a.attendance_status IN ('absent', 'excused')) AS absent,
+               COUNT(a.id) FILTER (WHERE a.attendance_status = 'late') AS late
+        FROM unnest(CAST(:sessions AS uuid[])) AS k(session_id)
+        LEFT JOIN academic.attendance_records a ON a.attendance_session_id = k.session_id
+        GROUP BY k.session_id
+    ) c
+    WHERE s.id = c.session_id
+    RETURNING s.id, s.total_students, s.present_students, s.absent_students, s.late_students
+""")
+
+# Daily (SIS) attendance: the same changed-rows-only upsert, returning every
+# submitted row whether it was written or already up to date
+DAILY_UPSERT_SQL = text("""
+    WITH submitted AS (
+        SELECT *
+        FROM unnest(
+            CAST(:student_ids AS uuid[]), CAST(:dates AS date[]), CAST(:periods AS varchar[]),
+            CAST(:statuses AS varchar[]), CAST(:arrival_times AS time[]),
+            CAST(:departure_times AS time[]), CAST(:absence_reasons AS varchar[]),
+            CAST(:excuses AS boolean[]), CAST(:notes AS text[])
+        ) AS r(student_id, attendance_date, period, status, arrival_time, departure_time,
+               absence_reason, excuse_provided, notes)
+    ),
+    upserted AS (
+        INSERT INTO sis.attendance_records (
+            student_id, attendance_date, period, status, arrival_time, departure_time,
+            absence_reason, excuse_provided, notes, marked_by
+        )
+        SELECT r.student_id, r.attendance_date, r.period, r.status, r.arrival_time,
+               r.departure_time, r.absence_reason, r.excuse_provided, r.notes,
+               CAST(:marked_by AS uuid)
+        FROM submitted r
+        ON CONFLICT (student_id, attendance_date, period) DO UPDATE
+        SET status = EXCLUDED.status,
+            arrival_time = EXCLUDED.arrival_time,
+            departure_time = EXCLUDED.departure_time,
+            absence_reason = EXCLUDED.absence_reason,
+            excuse_provided = EXCLUDED.excuse_provided,
+            notes = EXCLUDED.notes,
+            marked_by = EXCLUDED.marked_by
+        WHERE (sis.attendance_records.status, sis.attendance_records.arrival_time,
+               sis.attendance_records.departure_time, sis.attendance_records.absence_reason,
+               sis.attendance_records.excuse_provided, sis.attendance_records.notes)
+              IS DISTINCT FROM
+              (EXCLUDED.status, EXCLUDED.arrival_time, EXCLUDED.departure_time,
+               EXCLUDED.absence_reason, EXCLUDED.excuse_provided, EXCLUDED.notes)
+        RETURNING *
+    )
+    SELECT * FROM upserted
+    UNION ALL
+    SELECT a.*
+    FROM sis.attendance_records a
+    JOIN submitted r USING (student_id, attendance_date, period)
+    WHERE NOT EXISTS (SELECT 1 FROM upserted u WHERE u.id = a.id)
+""")
+
+
+@dataclass
+class AttendanceRegisterResult:
+    """Outcome of marking one or more attendance sessions"""
+    records_processed: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    # Session ID -> total/present/absent/late counters after marking
+    sessions: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+
+async def mark_register(
+    db: AsyncSession,
+    registers: Sequence[BulkAttendanceCreate],
+    school_id: Any,
+    marked_by: Any,
+) -> AttendanceRegisterResult:
+    """
+    Mark attendance for any number of sessions in one transaction
+
+    Each register replaces its session's marks. The whole request costs four
+    statements however many sessions and students it covers: lock the
+    sessions, upsert the marks, prune students left off, recount. Students
+    whose marks changed then get their term snapshot refreshed, one
+    statement per term (normally one).
+
+    Args:
+        db: Database session
+        registers: One entry per session with its students' marks
+        school_id: School the sessions belong to
+        marked_by: User marking the registers
+
+    Returns:
+        Write counts and each session's counters
+    """
+    session_ids = [register.attendance_session_id for register in registers]
+    if len(set(session_ids)) != len(session_ids):
+        raise AcademicValidationError("Each session can only appear once in a register", field="attendance_session_id")
+
+    # Sorted so concurrent registers lock records in the same order
+    marks = sorted(
+        (
+            (register.attendance_session_id, record)
+            for register in registers
+            for record in register.attendance_records
+        ),
+        key=lambda mark: (str(mark[0]), str(mark[1].student_id)),
+    )
+    for previous, current in zip(marks, marks[1:]):
+        if (previous[0], previous[1].student_id) == (current[0], current[1].student_id):
+            raise AcademicValidationError(
+                "Student marked twice in the same session", field="student_id", value=current[1].student_id
+            )
+
+    result = AttendanceRegisterResult(records_processed=len(marks))
+    try:
+        found = {row.id: (row.academic_year_id, row.term_number) for row in await db.execute(
+            SESSIONS_SQL, {"session_ids": session_ids, "school_id": str(school_id)}
+        )}
+        missing = [str(session_id) for session_id in session_ids if session_id not in found]
+        if missing:
+            raise AttendanceSessionNotFoundError(", ".join(missing))
+
+        columns = {
+            "session_ids": [session_id for session_id, _ in marks],
+            "student_ids": [record.student_id for _, record in marks],
+        }
+        changed = []
+        if marks:
+            written = list(await db.execute(REGISTER_UPSERT_SQL, {
+                **columns,
+                "school_id": str(school_id),
+                "marked_by": str(marked_by),
+                "statuses": [_status(record.attendance_status) for _, record in marks],
+                "arrival_times": [record.arrival_time for _, record in marks],
+                "departure_times": [record.departure_time for _, record in marks],
+                "excuse_reasons": [record.excuse_reason for _, record in marks],
+                "is_excused": [record.is_excused for _, record in marks],
+                "notes": [record.notes for _, record in marks],
+            }))
+            result.inserted = sum(1 for row in written if row.inserted)
+            result.updated = len(written) - result.inserted
+            result.unchanged = len(marks) - len(written)
+            changed.extend(written)
+
+        pruned = list(await db.execute(REGISTER_PRUNE_SQL, {**columns, "sessions": session_ids}))
+        result.removed = len(pruned)
+        changed.extend(pruned)
+
+        counters = await db.execute(SESSION_COUNTERS_SQL, {"sessions": session_ids, "marked_by": str(marked_by)})
+        result.sessions = {
+            str(row.id): {
+                "total_students": row.total_students,
+                "present_students": row.present_students,
+                "absent_students": row.absent_students,
+                "late_students": row.late_students,
+            }
+            for row in counters
+        }
+
+        # Refresh the term snapshots of students whose marks changed
+        terms: Dict[Any, set] = {}
+        for row in changed:
+            terms.setdefault(found[row.attendance_session_id], set()).add(row.student_id)
+        for (academic_year_id, term_number), student_ids in terms.items():
+            await refresh_term_metrics(db, school_id, academic_year_id, term_number, sorted(student_ids, key=str))
+
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    logger.info(
+        f"Marked attendance for {len(session_ids)} sessions: {result.inserted} new, "
+        f"{result.updated} changed, {result.unchanged} unchanged, {result.removed} removed"
+    )
+    return result
+
+
+async def upsert_daily_attendance(
+    db: AsyncSession,
+    records: Sequence[Any],
+    marked_by: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Write daily (SIS) attendance marks in one statement
+
+    Rows already holding the submitted values are left untouched. Does not
+    commit; the caller owns the transaction.
+
+    Returns:
+        Every submitted row as stored
+    """
+    if not records:
+        return []
+
+    rows = await db.execute(DAILY_UPSERT_SQL, {
+        "marked_by": str(marked_by),
+        "student_ids": [record.student_id for record in records],
+        "dates": [record.attendance_date for record in records],
+        "periods": [record.period for record in records],
+        "statuses": [_status(record.status) for record in records],
+        "arrival_times": [record.arrival_time for record in records],
+        "departure_times": [record.departure_time for record in records],
+        "absence_reasons": [record.absence_reason for record in records],
+        "excuses": [record.excuse_provided for record in records],
+        "notes": [record.notes for record in records],
+    })
+    return [dict(row._mapping) for row in rows]
+
+
+def _status(status: Any) -> str:
+    return getattr(status, "value", status)
@@ -7,15 +7,18 @@ from datetime import datetime, date, time
 from decimal import Decimal
 from typing import Optional, List, Dict, Any, Tuple
 from uuid import UUID, uuid4
-from sqlalchemy import and_, or_, func, text, select, update, delete, desc, asc
+from sqlalchemy import and_, or_, func, text, select, update, desc, asc
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy.exc import IntegrityError
 import logging
+from dataclasses import asdict
 
+from .attendance import mark_register
+from .grading import submit_grades
 from .models import (
     Subject, Curriculum, Period, Timetable, AttendanceSession, AttendanceRecord,
-    Assessment, Grade, LessonPlan, CalendarEvent
+    Assessment, LessonPlan, CalendarEvent
 )
 from .schemas import (
     SubjectCreate, SubjectUpdate, CurriculumCreate, CurriculumUpdate,
@@ -634,75 +637,10 @@ async def mark_bulk_attendance(
     attendance_data: BulkAttendanceCreate,
     school_id: UUID,
     marked_by: UUID
-) -> List[AttendanceRecord]:
+) -> Dict[str, Any]:
     """Mark attendance for multiple students"""
-    try:
-        # Validate attendance session exists
-        session = await db.execute(
-            select(AttendanceSession).where(
-                and_(
-                    AttendanceSession.id == attendance_data.attendance_session_id,
-                    AttendanceSession.school_id == school_id
-                )
-            )
-        )
-        attendance_session = session.scalar_one_or_none()
-        if not attendance_session:
-            raise NotFoundError("Attendance session not found")
-        
-        # Clear existing attendance records
-        await db.execute(
-            delete(AttendanceRecord).where(
-                AttendanceRecord.attendance_session_id == attendance_data.attendance_session_id
-            )
-        )
-        
-        # Create new attendance records
-        attendance_records = []
-        for record_data in attendance_data.attendance_records:
-            record = AttendanceRecord(
-                id=uuid4(),
-                school_id=school_id,
-                attendance_session_id=attendance_data.attendance_session_id,
-                student_id=record_data.student_id,
-                attendance_status=record_data.attendance_status,
-                arrival_time=record_data.arrival_time,
-                departure_time=record_data.departure_time,
-                excuse_reason=record_data.excuse_reason,
-                is_excused=record_data.is_excused,
-                notes=record_data.notes,
-                marked_by=marked_by,
-                marked_at=datetime.utcnow(),
-                created_by=marked_by,
-                updated_by=marked_by
-            )
-            attendance_records.append(record)
-        
-        db.add_all(attendance_records)
-        
-        # Update session statistics
-        total_students = len(attendance_records)
-        present_students = sum(1 for r in attendance_records if r.attendance_status == AttendanceStatus.PRESENT)
-        absent_students = sum(1 for r in attendance_records if r.attendance_status == AttendanceStatus.ABSENT)
-        late_students = sum(1 for r in attendance_records if r.attendance_status == AttendanceStatus.LATE)
-        
-        attendance_session.total_students = total_students
-        attendance_session.present_students = present_students
-        attendance_session.absent_students = absent_students
-        attendance_session.late_students = late_students
-        attendance_session.attendance_marked = True
-        attendance_session.marked_by = marked_by
-        attendance_session.marked_at = datetime.utcnow()
-        
-        await db.commit()
-        
-        logger.info(f"Marked bulk attendance for {total_students} students")
-        return attendance_records
-        
-    except IntegrityError as e:
-        await db.rollback()
-        logger.error(f"Failed to mark bulk attendance: {str(e)}")
-        raise ValidationError("Failed to mark attendance")
+    result = await mark_register(db, [attendance_data], school_id, marked_by)
+    return asdict(result)
 
 
 async def get_attendance_stats(
@@ -811,77 +749,13 @@ async def create_assessment(
 
 async def submit_bulk_grades(
     db: AsyncSession,
-    grades_data: BulkGradeCreate,
+    grade_data: BulkGradeCreate,
     school_id: UUID,
     graded_by: UUID
-) -> List[Grade]:
+) -> Dict[str, Any]:
     """Submit grades for multiple students"""
-    try:
-        # Validate assessment exists
-        assessment = await db.execute(
-            select(Assessment).where(
-                and_(
-                    Assessment.id == grades_data.assessment_id,
-                    Assessment.school_id == school_id
-                )
-            )
-        )
-        assessment_record = assessment.scalar_one_or_none()
-        if not assessment_record:
-            raise NotFoundError("Assessment not found")
-        
-        # Clear existing grades
-        await db.execute(
-            delete(Grade).where(
-                Grade.assessment_id == grades_data.assessment_id
-            )
-        )
-        
-        # Create new grades
-        grades = []
-        for grade_data in grades_data.grades:
-            # Calculate percentage and letter grade
-            percentage_score = None
-            letter_grade = None
-            grade_points = None
-            
-            if grade_data.raw_score is not None:
-                percentage_score = (grade_data.raw_score / assessment_record.total_marks) * 100
-                letter_grade = get_zimbabwe_grade(percentage_score)
-                grade_points = calculate_grade_points(letter_grade)
-            
-            grade = Grade(
-                id=uuid4(),
-                school_id=school_id,
-                assessment_id=grades_data.assessment_id,
-                student_id=grade_data.student_id,
-                raw_score=grade_data.raw_score,
-                percentage_score=percentage_score,
-                letter_grade=letter_grade,
-                grade_points=grade_points,
-                is_absent=grade_data.is_absent,
-                is_excused=grade_data.is_excused,
-                submission_date=grade_data.submission_date,
-                feedback=grade_data.feedback,
-                improvement_suggestions=grade_data.improvement_suggestions,
-                next_steps=grade_data.next_steps,
-                graded_by=graded_by,
-                graded_at=datetime.utcnow(),
-                created_by=graded_by,
-                updated_by=graded_by
-            )
-            grades.append(grade)
-        
-        db.add_all(grades)
-        await db.commit()
-        
-        logger.info(f"Submitted {len(grades)} grades for assessment {assessment_record.name}")
-        return grades
-        
-    except IntegrityError as e:
-        await db.rollback()
-        logger.error(f"Failed to submit grades: {str(e)}")
-        raise ValidationError("Failed to submit grades")
+    result = await submit_grades(db, grade_data, school_id, graded_by)
+    return asdict(result)
 
 
 # =====================================================
@@ -0,0 +1,314 @@
+"""
+Academic Management Module - Grade Write Engine
+Diff-based bulk grade upserts with grading computed for the whole batch in
+SQL, and assessment statistics maintained incrementally from the changes
+"""
+
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .exceptions import AcademicValidationError, AssessmentNotFoundError
+from .schemas import BulkGradeCreate
+from .term_metrics import refresh_term_metrics
+from .utils import categorize_assessment_performance, get_zimbabwe_grade
+
+logger = logging.getLogger(__name__)
+
+# Percentage at or above which a grade passes (D or better)
+PASS_PERCENTAGE = Decimal("50")
+
+# Locks the assessment so concurrent submissions apply their statistics
+# deltas one after the other
+ASSESSMENT_SQL = text("""
+    SELECT id, name, total_marks, academic_year_id, term_number FROM academic.assessments
+    WHERE id = CAST(:assessment_id AS uuid) AND school_id = CAST(:school_id AS uuid)
+    FOR UPDATE
+""")
+
+# Grades the batch with CASE expressions, writes only rows whose marks
+# changed, and returns each written row with its previous percentage
+GRADES_UPSERT_SQL = text("""
+    WITH submitted AS (
+        SELECT r.*,
+               ROUND(r.raw_score / CAST(:total_marks AS numeric) * 100, 2) AS percentage_score
+        FROM unnest(
+            CAST(:student_ids AS uuid[]), CAST(:raw_scores AS numeric[]),
+            CAST(:is_absent AS boolean[]), CAST(:is_excused AS boolean[]),
+            CAST(:submission_dates AS timestamptz[]), CAST(:feedback AS text[]),
+            CAST(:improvement_suggestions AS text[]), CAST(:next_steps AS text[])
+        ) AS r(student_id, raw_score, is_absent, is_excused, submission_date, feedback,
+               improvement_suggestions, next_steps)
+    ),
+    graded AS (
+        SELECT s.*,
+               CASE
+                   WHEN s.percentage_score >= 80 THEN 'A'
+                   WHEN s.percentage_score >= 70 THEN 'B'
+                   WHEN s.percentage_score >= 60 THEN 'C'
+                   WHEN s.percentage_score >= 50 THEN 'D'
+                   WHEN s.percentage_score >= 40 THEN 'E'
+                   WHEN s.percentage_score IS NOT NULL THEN 'U'
+               END AS letter_grade
+        FROM submitted s
+    ),
+    previous AS (
+        SELECT g.student_id, g.percentage_score
+        FROM academic.grades g
+        WHERE g.school_id = CAST(:school_id AS uuid)
+          AND g.assessment_id = CAST(:assessment_id AS uuid)
+          AND g.student_id = ANY(CAST(:student_ids AS uuid[]))
+    ),
+    upserted AS (
+        INSERT INTO academic.grades (
+            school_id, assessment_id, student_id, raw_score, percentage_score, letter_grade,
+            grade_points, is_absent, is_excused, submission_date, feedback,
+            improvement_suggestions, next_steps, graded_by, graded_at, created_by, updated_by
+        )
+        SELECT CAST(:school_id AS uuid), CAST(:assessment_id AS uuid), g.student_id, g.raw_score,
+               g.percentage_score, g.letter_grade,
+               CASE g.letter_grade
+                   WHEN 'A' THEN 4.00 WHEN 'B' THEN 3.00 WHEN 'C' THEN 2.00
+                   WHEN 'D' THEN 1.00 WHEN 'E' THEN 0.50 WHEN 'U' THEN 0.00
+               END,
+               g.is_absent, g.is_excused, g.submission_date, g.feedback,
+               g.improvement_suggestions, g.next_steps, CAST(:graded_by AS uuid), NOW(),
+               CAST(:graded_by AS uuid)::text, CAST(:graded_by AS uuid)::text
+        FROM graded g
+        ON CONFLICT ON CONSTRAINT unique_student_grade_per_assessment DO UPDATE
+        SET raw_score = EXCLUDED.raw_score,
+            percentage_score = EXCLUDED.percentage_score,
+            letter_grade = EXCLUDED.letter_grade,
+            grade_points = EXCLUDED.grade_points,
+            is_absent = EXCLUDED.is_absent,
+            is_excused = EXCLUDED.is_excused,
+            submission_date = EXCLUDED.submission_date,
+            feedback = EXCLUDED.feedback,
+            improvement_suggestions = EXCLUDED.improvement_suggestions,
+            next_steps = EXCLUDED.next_steps,
+            graded_by = EXCLUDED.graded_by,
+            graded_at = EXCLUDED.graded_at,
+            updated_by = EXCLUDED.updated_by
+        WHERE (academic.grades.raw_score, academic.grades.is_absent, academic.grades.is_excused,
+               academic.grades.submission_date, academic.grades.feedback,
+               academic.grades.improvement_suggestions, academic.grades.next_steps)
+              IS DISTINCT FROM
+              (EXCLUDED.raw_score, EXCLUDED.is_absent, EXCLUDED.is_excused,
+               EXCLUDED.submission_date, EXCLUDED.feedback,
+               EXCLUDED.improvement_suggestions, EXCLUDED.next_steps)
+        RETURNING student_id, percentage_score, (xmax = 0) AS inserted
+    )
+    SELECT u.student_id, u.inserted, u.percentage_score, p.percentage_score AS previous_score
+    FROM upserted u
+    LEFT JOIN previous p ON p.student_id = u.student_id
+""")
+
+STATISTICS_DELTA_SQL = text("""
+    INSERT INTO academic.assessment_statistics (
+        assessment_id, school_id, total_students, scored_students, score_sum, passed_students
+    )
+    VALUES (
+        CAST(:assessment_id AS uuid), CAST(:school_id AS uuid),
+        :total_students, :scored_students, :score_sum, :passed_students
+    )
+    ON CONFLICT (assessment_id) DO UPDATE
+    SET total_students = academic.assessment_statistics.total_students + EXCLUDED.total_students,
+        scored_students = academic.assessment_statistics.scored_students + EXCLUDED.scored_students,
+        score_sum = academic.assessment_statistics.score_sum + EXCLUDED.score_sum,
+        passed_students = academic.assessment_statistics.passed_students + EXCLUDED.passed_students,
+        updated_at = NOW()
+""")
+
+SCORE_COUNTS_DELTA_SQL = text("""
+    INSERT INTO academic.assessment_score_counts (assessment_id, percentage_score, students)
+    SELECT CAST(:assessment_id AS uuid), d.percentage_score, d.students
+    FROM unnest(CAST(:scores AS numeric[]), CAST(:deltas AS integer[])) AS d(percentage_score, students)
+    ON CONFLICT (assessment_id, percentage_score) DO UPDATE
+    SET students = academic.assessment_score_counts.students + EXCLUDED.students
+""")
+
+STATISTICS_SQL = text("""
+    SELECT s.total_students, s.scored_students, s.score_sum, s.passed_students
+    FROM academic.assessment_statistics s
+    WHERE s.assessment_id = CAST(:assessment_id AS uuid) AND s.school_id = CAST(:school_id AS uuid)
+""")
+
+SCORE_COUNTS_SQL = text("""
+    SELECT percentage_score, students
+    FROM academic.assessment_score_counts
+    WHERE assessment_id = CAST(:assessment_id AS uuid) AND students > 0
+    ORDER BY percentage_score
+""")
+
+
+@dataclass
+class GradeSubmissionResult:
+    """Outcome of a bulk grade submission"""
+    grades_processed: int = 0
+    grades_submitted: int = 0
+    grades_updated: int = 0
+    grades_unchanged: int = 0
+
+
+def _score_deltas(changes: List[Any]) -> Dict[str, Any]:
+    """Turn written rows (new and previous percentage) into statistics deltas"""
+    histogram: Counter = Counter()
+    totals = {"total_students": 0, "scored_students": 0, "score_sum": Decimal("0"), "passed_students": 0}
+
+    for change in changes:
+        if change.inserted:
+            totals["total_students"] += 1
+        for score, sign in ((change.percentage_score, 1), (None if change.inserted else change.previous_score, -1)):
+            if score is None:
+                continue
+            histogram[score] += sign
+            totals["scored_students"] += sign
+            totals["score_sum"] += sign * score
+            if score >= PASS_PERCENTAGE:
+                totals["passed_students"] += sign
+
+    histogram = {score: delta for score, delta in histogram.items() if delta}
+    return {**totals, "histogram": histogram}
+
+
+async def submit_grades(
+    db: AsyncSession,
+    grade_data: BulkGradeCreate,
+    school_id: Any,
+    graded_by: Any,
+) -> GradeSubmissionResult:
+    """
+    Upsert an assessment's grades, writing only rows whose marks changed
+
+    Re-saving a class with one corrected mark writes that one row, shifts
+    the assessment statistics by its difference and refreshes that
+    student's term snapshot.
+
+    Args:
+        db: Database session
+        grade_data: Assessment and its students' marks
+        school_id: School the assessment belongs to
+        graded_by: User entering the marks
+
+    Returns:
+        Counts of new, changed and unchanged grades
+    """
+    grades = grade_data.grades
+    student_ids = [grade.student_id for grade in grades]
+    if len(set(student_ids)) != len(student_ids):
+        raise AcademicValidationError("Student graded twice in the same submission", field="student_id")
+
+    result = GradeSubmissionResult(grades_processed=len(grades))
+    try:
+        assessment = (await db.execute(ASSESSMENT_SQL, {
+            "assessment_id": str(grade_data.assessment_id), "school_id": str(school_id),
+        })).one_or_none()
+        if assessment is None:
+            raise AssessmentNotFoundError(str(grade_data.assessment_id))
+
+        if grades:
+            changes = list(await db.execute(GRADES_UPSERT_SQL, {
+                "assessment_id": str(grade_data.assessment_id),
+                "school_id": str(school_id),
+                "graded_by": str(graded_by),
+                "total_marks": assessment.total_marks,
+                "student_ids": student_ids,
+                "raw_scores": [grade.raw_score for grade in grades],
+                "is_absent": [grade.is_absent for grade in grades],
+                "is_excused": [grade.is_excused for grade in grades],
+                "submission_dates": [grade.submission_date for grade in grades],
+                "feedback": [grade.feedback for grade in grades],
+                "improvement_suggestions": [grade.improvement_suggestions for grade in grades],
+                "next_steps": [grade.next_steps for grade in grades],
+            }))
+            result.grades_submitted = sum(1 for change in changes if change.inserted)
+            result.grades_updated = len(changes) - result.grades_submitted
+            result.grades_unchanged = len(grades) - len(changes)
+
+            deltas = _score_deltas(changes)
+            histogram = deltas.pop("histogram")
+            if any(deltas.values()):
+                await db.execute(STATISTICS_DELTA_SQL, {
+                    **deltas,
+                    "assessment_id": str(grade_data.assessment_id),
+                    "school_id": str(school_id),
+                })
+            if histogram:
+                await db.execute(SCORE_COUNTS_DELTA_SQL, {
+                    "assessment_id": str(grade_data.assessment_id),
+                    "scores": list(histogram),
+                    "deltas": list(histogram.values()),
+                })
+            if changes:
+                await refresh_term_metrics(
+                    db, school_id, assessment.academic_year_id, assessment.term_number,
+                    [change.student_id for change in changes],
+                )
+
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    logger.info(
+        f"Graded assessment {assessment.name}: {result.grades_submitted} new, "
+        f"{result.grades_updated} changed, {result.grades_unchanged} unchanged"
+    )
+    return result
+
+
+async def get_assessment_statistics(
+    db: AsyncSession,
+    assessment_id: Any,
+    school_id: Any,
+) -> Optional[Dict[str, Any]]:
+    """
+    Read an assessment's maintained statistics
+
+    Same shape as utils.calculate_assessment_statistics, built from the
+    running totals and score histogram instead of every grade.
+    """
+    params = {"assessment_id": str(assessment_id), "school_id": str(school_id)}
+    totals = (await db.execute(STATISTICS_SQL, params)).one_or_none()
+    if totals is None:
+        return None
+    counts = [(Decimal(row.percentage_score), row.students) for row in await db.execute(SCORE_COUNTS_SQL, params)]
+
+    grade_distribution = {letter: 0 for letter in ("A", "B", "C", "D", "E", "U")}
+    performance_categories = {
+        category: 0 for category in
+        ("Excellent", "Good", "Satisfactory", "Needs Improvement", "Below Average", "Poor")
+    }
+    for score, students in counts:
+        grade_distribution[get_zimbabwe_grade(float(score)).value] += students
+        performance_categories[categorize_assessment_performance(float(score))] += students
+
+    scored = totals.scored_students
+    return {
+        "total_students": totals.total_students,
+        "average_score": round(float(totals.score_sum) / scored, 2) if scored else 0.0,
+        "highest_score": float(counts[-1][0]) if counts else 0.0,
+        "lowest_score": float(counts[0][0]) if counts else 0.0,
+        "median_score": round(_median(counts, scored), 2) if scored else 0.0,
+        "pass_rate": round(totals.passed_students / totals.total_students * 100, 2) if totals.total_students else 0.0,
+        "grade_distribution": grade_distribution,
+        "performance_categories": performance_categories,
+    }
+
+
+def _median(counts: List[Any], scored: int) -> float:
+    """Median of a sorted (score, students) histogram holding `scored` scores"""
+    middle = [(scored - 1) // 2, scored // 2]
+    values = []
+    seen = 0
+    for score, students in counts:
+        while middle and middle[0] < seen + students:
+            values.append(float(score))
+            middle.pop(0)
+        seen += students
+    return sum(values) / len(values)
@@ -9,9 +9,10 @@ from fastapi import HTTPException, Depends, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from shared.auth import get_current_active_user, PlatformUser
+from shared.auth import get_current_active_user
+from shared.models.platform_user import PlatformUser
 from shared.middleware.tenant_middleware import get_tenant_context, TenantContext
-from shared.database import get_async_session
+from shared.database import get_async_session, set_session_rls_context
 
 import logging
 
@@ -337,19 +338,17 @@ async def _setup_academic_database_context(
     user_role: str
 ):
     """Set up database context for Academic module RLS policies"""
-    try:
-        # Set the RLS context variables that our policies use
-        await db.execute(text("SET app.current_school_id = :school_id"), {"school_id": str(school_id)})
-        await db.execute(text("SET app.current_user_id = :user_id"), {"user_id": user_id})
-        await db.execute(text("SET app.current_user_role = :user_role"), {"user_role": user_role})
-        
-        # Commit the context setup
+    # Applied by the session as the first statement of each transaction
+    set_session_rls_context(
+        db,
+        current_school_id=str(school_id),
+        current_user_id=user_id,
+        current_user_role=user_role
+    )
+
+    # An already-open transaction predates the context; end it so the next one binds it
+    if db.in_transaction():
         await db.commit()
-        
-    except Exception as e:
-        logger.warning(f"Failed to set up database context: {str(e)}")
-        # Don't fail the request if context setup fails
-        pass
 
 def require_academic_permission(permission: str):
     """Decorator to require specific academic permission"""
@@ -17,14 +17,21 @@ from ..exceptions import (
     create_error_response, log_academic_error
 )
 from shared.database import get_async_session
+from shared.pagination import CountMode, InvalidCursorError, SortKey, apply_keyset, count_query, split_page
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, extract
+from sqlalchemy import select, and_, or_, extract
 from ..models import CalendarEvent
 from pydantic import BaseModel, Field, validator
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Keyset sort order for calendar event lists
+CALENDAR_EVENT_SORT = (
+    SortKey(CalendarEvent.start_date, "start_date"),
+    SortKey(CalendarEvent.id, "id"),
+)
+
 router = APIRouter(
     prefix="/calendar",
     tags=["Academic Calendar"],
@@ -325,6 +332,8 @@ async def get_calendar_events(
     status: Optional[EventStatus] = Query(None, description="Filter by event status"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=500, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    count: CountMode = Query(CountMode.EXACT, description="Total count: none, estimated, exact or cached"),
     auth_context: AcademicAuthContext = Depends(get_academic_auth_context),
     db: AsyncSession = Depends(get_async_session)
 ):
@@ -369,16 +378,16 @@ async def get_calendar_events(
             pass
 
         # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total_count = total_result.scalar()
+        total_count = await count_query(db, count, query)
 
-        # Apply pagination and ordering
-        query = query.offset(skip).limit(limit).order_by(CalendarEvent.start_date)
+        # Apply ordering and pagination; a cursor takes precedence over skip
+        query = apply_keyset(query, CALENDAR_EVENT_SORT, cursor)
+        if not cursor:
+            query = query.offset(skip)
         
         # Execute query
-        result = await db.execute(query)
-        events = result.scalars().all()
+        result = await db.execute(query.limit(limit + 1))
+        events, next_cursor = split_page(result.scalars().all(), CALENDAR_EVENT_SORT, limit)
 
         # Convert to response format
         events_data = []
@@ -408,7 +417,8 @@ async def get_calendar_events(
                 "total": total_count,
                 "skip": skip,
                 "limit": limit,
-                "has_next": (skip + limit) < total_count
+                "has_next": next_cursor is not None,
+                "next_cursor": next_cursor
             },
             "filters": {
                 "start_date": start_date.isoformat() if start_date else None,
@@ -421,6 +431,9 @@ async def get_calendar_events(
             }
         }
 
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     except AcademicBaseException as e:
         log_academic_error(e, {
             "endpoint": "get_calendar_events",
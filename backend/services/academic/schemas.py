@@ -501,6 +501,11 @@ class BulkAttendanceCreate(BaseModel):
     attendance_records: List[AttendanceRecordCreate]
 
 
+class AttendanceRegisterCreate(BaseModel):
+    """Attendance for many sessions at once, e.g. a whole-school morning register"""
+    sessions: List[BulkAttendanceCreate] = Field(..., min_items=1)
+
+
 class AttendanceStats(BaseModel):
     """Attendance statistics schema"""
     total_students: int
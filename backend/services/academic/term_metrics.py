@@ -0,0 +1,232 @@
+"""
+Academic Management Module - Student Term Metrics
+Per-student, per-term performance snapshots in academic.student_term_metrics:
+refreshed for the affected students by grade and attendance writes, rebuilt
+nightly, and read one row per student by student summaries. Class summaries
+aggregate the class's own assessments and sessions.
+"""
+
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Recomputes the given students' rows for one term (all students when NULL)
+REFRESH_SQL = text("""
+    SELECT academic.refresh_student_term_metrics(
+        CAST(:school_id AS uuid), CAST(:academic_year_id AS uuid), :term_number,
+        CAST(:student_ids AS uuid[])
+    )
+""")
+
+# asyncpg form, used by the nightly rebuild
+REBUILD_SQL = "SELECT academic.refresh_student_term_metrics($1, $2, $3)"
+
+# Every term that has assessments or timetabled sessions ($1 limits to one school)
+TERMS_SQL = """
+    SELECT school_id, academic_year_id, term_number FROM academic.assessments
+    WHERE $1::uuid IS NULL OR school_id = $1::uuid
+    UNION
+    SELECT school_id, academic_year_id, term_number FROM academic.timetables
+    WHERE $1::uuid IS NULL OR school_id = $1::uuid
+    ORDER BY school_id, academic_year_id, term_number
+"""
+
+STUDENT_METRICS_SQL = text("""
+    SELECT term_number, graded_assessments, score_sum, weighted_score_sum, weight_sum,
+           overall_average, grade_distribution, subject_grades, recent_assessments,
+           attendance_sessions, present_sessions, absent_sessions, late_sessions, attendance_rate
+    FROM academic.student_term_metrics
+    WHERE school_id = CAST(:school_id AS uuid)
+      AND student_id = CAST(:student_id AS uuid)
+      AND academic_year_id = CAST(:academic_year_id AS uuid)
+      AND (CAST(:term_number AS integer) IS NULL OR term_number = :term_number)
+    ORDER BY term_number
+""")
+
+# Student snapshots cover a student's whole term across classes, so class
+# figures are aggregated from the class's own assessments and sessions:
+# enrolled students, grades on assessments set for the class, and
+# attendance taken in the class's sessions
+CLASS_METRICS_SQL = text("""
+    SELECT (SELECT COUNT(*)
+            FROM sis.enrollments e
+            WHERE e.class_id = CAST(:class_id AS uuid)
+              AND e.academic_year_id = CAST(:academic_year_id AS uuid)
+              AND e.enrollment_status = 'active') AS total_students,
+           g.total_grades, g.score_sum,
+           a.attendance_sessions, a.attended_sessions
+    FROM (
+        SELECT COUNT(*) AS total_grades, COALESCE(SUM(gr.percentage_score), 0) AS score_sum
+        FROM academic.grades gr
+        JOIN academic.assessments asm ON asm.id = gr.assessment_id
+        WHERE asm.class_id = CAST(:class_id AS uuid)
+          AND asm.school_id = CAST(:school_id AS uuid)
+          AND asm.academic_year_id = CAST(:academic_year_id AS uuid)
+          AND (CAST(:term_number AS integer) IS NULL OR asm.term_number = :term_number)
+          AND gr.percentage_score IS NOT NULL
+          AND NOT gr.is_absent
+    ) g, (
+        SELECT COUNT(*) AS attendance_sessions,
+               COUNT(*) FILTER (WHERE r.attendance_status IN ('present', 'late')) AS attended_sessions
+        FROM academic.attendance_records r
+        JOIN academic.attendance_sessions s ON s.id = r.attendance_session_id
+        JOIN academic.timetables t ON t.id = s.timetable_id
+        WHERE s.class_id = CAST(:class_id AS uuid)
+          AND r.school_id = CAST(:school_id AS uuid)
+          AND t.academic_year_id = CAST(:academic_year_id AS uuid)
+          AND (CAST(:term_number AS integer) IS NULL OR t.term_number = :term_number)
+    ) a
+""")
+
+
+
+async def refresh_term_metrics(
+    db: AsyncSession,
+    school_id: Any,
+    academic_year_id: Any,
+    term_number: int,
+    student_ids: Optional[Sequence[Any]] = None,
+) -> int:
+    """
+    Recompute one term's snapshot rows for the given students
+
+    Called by grade and attendance writes inside their transaction, so the
+    snapshot commits or rolls back with the marks. Does not commit.
+
+    Returns:
+        Number of rows written
+    """
+    result = await db.execute(REFRESH_SQL, {
+        "school_id": str(school_id),
+        "academic_year_id": str(academic_year_id),
+        "term_number": term_number,
+        "student_ids": None if student_ids is None else list(student_ids),
+    })
+    return result.scalar()
+
+
+async def rebuild_term_metrics(conn: Any, school_id: Optional[Any] = None) -> Dict[str, int]:
+    """
+    Rebuild every term's snapshot from grades and attendance
+
+    Each term is rebuilt in its own transaction so a long rebuild never holds
+    locks across the whole school year.
+
+    Args:
+        conn: asyncpg connection
+        school_id: Limit the rebuild to one school
+
+    Returns:
+        Terms rebuilt and rows written
+    """
+    terms = await conn.fetch(TERMS_SQL, None if school_id is None else str(school_id))
+    rebuilt = {"terms": 0, "rows": 0}
+    for term in terms:
+        async with conn.transaction():
+            rows = await conn.fetchval(REBUILD_SQL, term["school_id"], term["academic_year_id"], term["term_number"])
+        rebuilt["terms"] += 1
+        rebuilt["rows"] += rows
+
+    logger.info(f"Rebuilt student term metrics: {rebuilt['terms']} terms, {rebuilt['rows']} rows")
+    return rebuilt
+
+
+async def get_student_metrics(
+    db: AsyncSession,
+    student_id: Any,
+    school_id: Any,
+    academic_year_id: Any,
+    term_number: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Read a student's snapshot for a term, or the whole year when term_number is None
+
+    Year figures are combined from the term rows: sums and counts add up,
+    subject lists are merged and recent assessments re-ranked.
+    """
+    rows = list(await db.execute(STUDENT_METRICS_SQL, {
+        "school_id": str(school_id),
+        "student_id": str(student_id),
+        "academic_year_id": str(academic_year_id),
+        "term_number": term_number,
+    }))
+    if not rows:
+        return None
+    if len(rows) == 1:
+        return dict(rows[0]._mapping)
+    return _combine_terms([dict(row._mapping) for row in rows])
+
+
+async def get_class_metrics(
+    db: AsyncSession,
+    class_id: Any,
+    school_id: Any,
+    academic_year_id: Any,
+    term_number: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Class size, grade average and attendance rate for one class"""
+    row = (await db.execute(CLASS_METRICS_SQL, {
+        "class_id": str(class_id),
+        "school_id": str(school_id),
+        "academic_year_id": str(academic_year_id),
+        "term_number": term_number,
+    })).one()
+
+    return {
+        "total_students": row.total_students,
+        "total_grades": row.total_grades,
+        "class_average": _rate(row.score_sum, row.total_grades, 1),
+        "attendance_rate": _rate(row.attended_sessions, row.attendance_sessions, 100),
+    }
+
+
+def _combine_terms(terms: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge term snapshots into a year snapshot"""
+    combined: Dict[str, Any] = {"term_number": None}
+    for column in ("graded_assessments", "score_sum", "weighted_score_sum", "weight_sum",
+                   "attendance_sessions", "present_sessions", "absent_sessions", "late_sessions"):
+        combined[column] = sum(term[column] for term in terms)
+
+    combined["grade_distribution"] = {}
+    for term in terms:
+        for letter, count in term["grade_distribution"].items():
+            combined["grade_distribution"][letter] = combined["grade_distribution"].get(letter, 0) + count
+
+    subjects: Dict[str, Dict[str, Any]] = {}
+    for term in terms:
+        for subject in term["subject_grades"]:
+            merged = subjects.get(subject["subject_id"])
+            if merged is None:
+                subjects[subject["subject_id"]] = dict(subject, grades=list(subject["grades"]))
+                continue
+            merged["graded"] += subject["graded"]
+            merged["score_sum"] += subject["score_sum"]
+            merged["grades"].extend(subject["grades"])
+            latest = [grade for grade in (merged["latest_grade"], subject["latest_grade"]) if grade]
+            merged["latest_grade"] = max(latest, key=lambda grade: grade["assessment_date"] or "") if latest else None
+    for subject in subjects.values():
+        subject["average"] = _rate(subject["score_sum"], subject["graded"], 1)
+    combined["subject_grades"] = sorted(subjects.values(), key=lambda subject: subject["subject_name"])
+
+    combined["recent_assessments"] = sorted(
+        (assessment for term in terms for assessment in term["recent_assessments"]),
+        key=lambda assessment: assessment["assessment_date"] or "",
+        reverse=True,
+    )[:5]
+
+    combined["overall_average"] = _rate(combined["weighted_score_sum"], combined["weight_sum"], 1)
+    combined["attendance_rate"] = _rate(
+        combined["present_sessions"] + combined["late_sessions"], combined["attendance_sessions"], 100
+    )
+    return combined
+
+
+def _rate(numerator: Any, denominator: Any, scale: int) -> Decimal:
+    if not denominator:
+        return Decimal("0")
+    return round(Decimal(str(numerator)) * scale / Decimal(str(denominator)), 2)
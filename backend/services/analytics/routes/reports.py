@@ -14,6 +14,7 @@ from ..schemas import (
 )
 from shared.middleware.tenant_middleware import get_tenant_context, get_school_id, get_user_session
 from shared.auth import db_manager
+from shared.db_pools import BACKGROUND
 
 router = APIRouter(prefix="/api/v1/reports", tags=["Reports"])
 
@@ -562,7 +563,7 @@ async def _generate_report_data(
         await asyncio.sleep(2)  # Simulate processing time
         
         # Update execution status
-        async with db_manager.get_connection() as db:
+        async with db_manager.get_connection(BACKGROUND) as db:
             await db.execute(
                 """
                 UPDATE analytics.report_executions
@@ -576,7 +577,7 @@ async def _generate_report_data(
             )
     except Exception as e:
         # Update with error status
-        async with db_manager.get_connection() as db:
+        async with db_manager.get_connection(BACKGROUND) as db:
             await db.execute(
                 """
                 UPDATE analytics.report_executions
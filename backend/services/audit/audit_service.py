@@ -17,6 +17,7 @@ from shared.models.audit_log import (
 )
 from shared.models.platform_user import PlatformUser, SchoolMembership, SchoolRole
 from shared.database import get_async_session
+from shared.pagination import CountMode, SortKey, apply_keyset, count_query, split_page
 
 import logging
 import json
@@ -60,6 +61,10 @@ class AuditLogRequest(BaseModel):
     compliance_categories: List[ComplianceCategory] = Field(default_factory=list)
 
 
+# Sortable audit log columns; keyset cursors need every sort key to be NOT NULL
+AUDIT_LOG_SORT_PATTERN = r'^(timestamp|user_email|user_role|action_category|action_type|risk_level|success)$'
+
+
 class AuditLogFilter(BaseModel):
     """Filter model for audit log queries"""
     
@@ -82,12 +87,14 @@ class AuditLogFilter(BaseModel):
     success: Optional[str] = None
     archived: Optional[str] = "active"
     
-    # Pagination
+    # Pagination (cursor takes precedence over offset)
     limit: int = 50
     offset: int = 0
+    cursor: Optional[str] = None
+    count_mode: CountMode = CountMode.EXACT
     
     # Sorting
-    sort_by: str = "timestamp"
+    sort_by: str = Field(default="timestamp", pattern=AUDIT_LOG_SORT_PATTERN)
     sort_order: str = "desc"
 
 
@@ -306,33 +313,36 @@ class AuditService:
             if conditions:
                 query = query.where(and_(*conditions))
             
-            # Apply sorting
-            if filter_params.sort_order.lower() == "desc":
-                query = query.order_by(desc(getattr(AuditLog, filter_params.sort_by)))
-            else:
-                query = query.order_by(getattr(AuditLog, filter_params.sort_by))
-            
             # Get total count
-            count_query = select(func.count(AuditLog.id))
+            count_base = select(AuditLog.id)
             if conditions:
-                count_query = count_query.where(and_(*conditions))
-            
-            total_count_result = await self.session.execute(count_query)
-            total_count = total_count_result.scalar()
+                count_base = count_base.where(and_(*conditions))
+            total_count = await count_query(self.session, filter_params.count_mode, count_base)
+            
+            # Apply sorting; id breaks ties so a cursor has one position
+            descending = filter_params.sort_order.lower() == "desc"
+            sort_keys = (
+                SortKey(getattr(AuditLog, filter_params.sort_by), filter_params.sort_by, descending),
+                SortKey(AuditLog.id, "id", descending),
+            )
+            query = apply_keyset(query, sort_keys, filter_params.cursor)
             
             # Apply pagination
-            query = query.offset(filter_params.offset).limit(filter_params.limit)
+            if not filter_params.cursor:
+                query = query.offset(filter_params.offset)
+            query = query.limit(filter_params.limit + 1)
             
             # Execute query
             result = await self.session.execute(query)
-            audit_logs = result.scalars().all()
+            audit_logs, next_cursor = split_page(result.scalars().all(), sort_keys, filter_params.limit)
             
             return {
                 "audit_logs": [self._serialize_audit_log(log) for log in audit_logs],
                 "total_count": total_count,
                 "limit": filter_params.limit,
                 "offset": filter_params.offset,
-                "has_more": (filter_params.offset + filter_params.limit) < total_count
+                "has_more": next_cursor is not None,
+                "next_cursor": next_cursor
             }
             
         except Exception as e:
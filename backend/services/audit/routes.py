@@ -11,10 +11,13 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone, timedelta
 from pydantic import BaseModel, Field
 
-from .audit_service import AuditService, AuditLogRequest, AuditLogFilter, AuditReportRequest
+from .audit_service import (
+    AuditService, AuditLogRequest, AuditLogFilter, AuditReportRequest, AUDIT_LOG_SORT_PATTERN
+)
 from shared.models.audit_log import ActionCategory, ActionType, RiskLevel, ComplianceCategory
 from shared.auth import get_current_user, get_current_school_context
 from shared.database import get_async_session
+from shared.pagination import CountMode, InvalidCursorError
 from shared.models.platform_user import PlatformUser, SchoolRole
 
 import logging
@@ -64,10 +67,11 @@ class AuditLogsResponse(BaseModel):
     """API response for audit logs list"""
     
     audit_logs: List[Dict[str, Any]]
-    total_count: int
+    total_count: Optional[int]
     limit: int
     offset: int
     has_more: bool
+    next_cursor: Optional[str] = None
 
 
 class ActivitySummaryResponse(BaseModel):
@@ -153,9 +157,11 @@ async def get_audit_logs(
     # Pagination
     limit: int = Query(50, ge=1, le=1000, description="Number of results to return"),
     offset: int = Query(0, ge=0, description="Number of results to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    count: CountMode = Query(CountMode.EXACT, description="Total count: none, estimated, exact or cached"),
     
     # Sorting
-    sort_by: str = Query("timestamp", description="Field to sort by"),
+    sort_by: str = Query("timestamp", regex=AUDIT_LOG_SORT_PATTERN, description="Field to sort by"),
     sort_order: str = Query("desc", regex="^(asc|desc)$", description="Sort order"),
     
     # Dependencies
@@ -191,6 +197,8 @@ async def get_audit_logs(
             success=success,
             limit=limit,
             offset=offset,
+            cursor=cursor,
+            count_mode=count,
             sort_by=sort_by,
             sort_order=sort_order
         )
@@ -202,6 +210,8 @@ async def get_audit_logs(
         
     except HTTPException:
         raise
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get audit logs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get audit logs: {str(e)}")
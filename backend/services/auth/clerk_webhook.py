@@ -23,6 +23,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 
 from shared.database import get_async_session
+from shared.cache.principal_cache import invalidate_principal
 from shared.models.platform_user import (
     PlatformUser, GlobalRole, UserStatus
 )
@@ -94,19 +95,23 @@ async def handle_clerk_webhook(
 
     logger.info(f"Clerk webhook received: {event_type}")
 
+    archived_user_id = None
     try:
         if event_type == "user.created":
             await _handle_user_created(db, data)
         elif event_type == "user.updated":
             await _handle_user_updated(db, data)
         elif event_type == "user.deleted":
-            await _handle_user_deleted(db, data)
+            archived_user_id = await _handle_user_deleted(db, data)
         elif event_type == "session.created":
             await _handle_session_created(db, data)
         else:
             logger.debug(f"Unhandled webhook event: {event_type}")
 
         await db.commit()
+        # Principals are cached without a per-request status check
+        if archived_user_id is not None:
+            await invalidate_principal(archived_user_id)
         return {"status": "ok", "event": event_type}
 
     except Exception as e:
@@ -223,18 +228,21 @@ async def _handle_user_updated(db: AsyncSession, data: dict):
 
 
 async def _handle_user_deleted(db: AsyncSession, data: dict):
-    """Deactivate user when deleted from Clerk"""
+    """Deactivate user when deleted from Clerk, returning the archived user's ID"""
     clerk_user_id = data.get("id")
     if not clerk_user_id:
-        return
+        return None
 
     result = await db.execute(
         select(PlatformUser).where(PlatformUser.clerk_user_id == clerk_user_id)
     )
     user = result.scalar_one_or_none()
-    if user:
-        user.status = UserStatus.ARCHIVED.value
-        logger.info(f"Archived PlatformUser {user.email} (Clerk user deleted)")
+    if not user:
+        return None
+
+    user.status = UserStatus.ARCHIVED.value
+    logger.info(f"Archived PlatformUser {user.email} (Clerk user deleted)")
+    return user.id
 
 
 async def _handle_session_created(db: AsyncSession, data: dict):
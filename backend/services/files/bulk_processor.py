@@ -5,13 +5,15 @@
 # =====================================================
 
 import csv
+import os
 import pandas as pd
 import uuid
-import asyncio
-from typing import Dict, List, Any, Optional, Tuple, Generator
+from typing import Dict, List, Any, Iterator, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
 import logging
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from shared.models.platform_user import (
@@ -26,13 +28,48 @@ from .schemas import BulkImportProgress, BulkImportMapping, BulkImportTemplate
 
 logger = logging.getLogger(__name__)
 
+# Rows parsed, validated and written per transaction
+IMPORT_CHUNK_SIZE = 1000
+
+# Bytes read to guess a CSV file's encoding and delimiter
+SNIFF_SAMPLE_BYTES = 64 * 1024
+CSV_ENCODINGS = ("utf-8-sig", "cp1252", "latin-1")
+CSV_DELIMITERS = ",;\t"
+
+EMAIL_PATTERN = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
+PHONE_PATTERN = r"^\+\d{9,15}$"
+
+REQUIRED_USER_FIELDS = ["email", "first_name", "last_name"]
+OPTIONAL_USER_FIELDS = [
+    "phone",
+    "department",
+    "employee_id",
+    "student_id",
+    "grade",
+    "parent_email",
+    "parent_phone",
+    "address",
+    "date_of_birth",
+]
+PHONE_FIELDS = ["phone", "parent_phone"]
+
+EXISTING_USERS_SQL = text(
+    """
+    SELECT u.id, u.email, m.id IS NOT NULL AS is_member
+    FROM platform.users u
+    LEFT JOIN platform.school_memberships m
+        ON m.user_id = u.id AND m.school_id = :school_id
+    WHERE u.email = ANY(:emails)
+    """
+)
+
 
 class BulkImportProcessor:
     """Process bulk import files for user creation"""
 
     def __init__(self):
         self.supported_formats = ["csv", "xlsx", "xls"]
-        self.max_batch_size = 100
+        self.chunk_size = IMPORT_CHUNK_SIZE
         self.progress_cache = {}  # In production, use Redis or database
 
         # Field mappings for different import types
@@ -139,23 +176,68 @@ class BulkImportProcessor:
         file_ext = Path(file_path).suffix.lower()
 
         if file_ext == ".csv":
-            # Try different encodings and delimiters
-            for encoding in ["utf-8", "latin-1", "cp1252"]:
-                for delimiter in [",", ";", "\t"]:
-                    try:
-                        df = pd.read_csv(
-                            file_path, encoding=encoding, delimiter=delimiter
-                        )
-                        if len(df.columns) > 1:  # Successfully parsed
-                            return df
-                    except:
-                        continue
-
-            # Fallback to basic CSV read
-            return pd.read_csv(file_path)
+            encoding, delimiter = self._sniff_csv(file_path)
+            return pd.read_csv(file_path, encoding=encoding, sep=delimiter, dtype=str)
 
         elif file_ext in [".xlsx", ".xls"]:
-            return pd.read_excel(file_path)
+            return pd.read_excel(file_path, dtype=str)
+        else:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+
+    def _sniff_csv(self, file_path: str) -> Tuple[str, str]:
+        """Guess encoding and delimiter once, from a sample of the file"""
+        with open(file_path, "rb") as f:
+            sample = f.read(SNIFF_SAMPLE_BYTES)
+
+        # Don't let the sample end part-way through a multi-byte character
+        if len(sample) == SNIFF_SAMPLE_BYTES and b"\n" in sample:
+            sample = sample[: sample.rindex(b"\n")]
+
+        for encoding in CSV_ENCODINGS:
+            try:
+                sample_text = sample.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+
+        try:
+            delimiter = csv.Sniffer().sniff(sample_text, delimiters=CSV_DELIMITERS).delimiter
+        except csv.Error:
+            delimiter = ","
+
+        return encoding, delimiter
+
+    def _open_chunks(
+        self, file_path: str, chunk_size: int
+    ) -> Iterator[Tuple[pd.DataFrame, float]]:
+        """
+        Chunks of the file, all columns as strings, with the fraction read
+
+        Rows are counted as chunks arrive instead of in a separate pass over
+        the file, so CSV progress is measured by bytes read.
+        """
+        file_ext = Path(file_path).suffix.lower()
+
+        if file_ext == ".csv":
+            encoding, delimiter = self._sniff_csv(file_path)
+            size = os.path.getsize(file_path)
+            with open(file_path, "rb") as f:
+                chunks = pd.read_csv(
+                    f,
+                    encoding=encoding,
+                    sep=delimiter,
+                    dtype=str,
+                    chunksize=chunk_size,
+                )
+                for chunk in chunks:
+                    yield chunk, min(f.tell() / size, 1.0) if size else 1.0
+
+        elif file_ext in [".xlsx", ".xls"]:
+            # pandas cannot read workbooks in chunks; slice the parsed sheet
+            df = pd.read_excel(file_path, dtype=str)
+            for start in range(0, len(df), chunk_size):
+                end = min(start + chunk_size, len(df))
+                yield df.iloc[start:end], end / len(df)
         else:
             raise ValueError(f"Unsupported file format: {file_ext}")
 
@@ -238,8 +320,7 @@ class BulkImportProcessor:
                     warnings.append(f"{duplicates} duplicate email addresses found")
 
                 # Basic email format validation
-                email_pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-                invalid_emails = ~df[email_col].str.match(email_pattern, na=False)
+                invalid_emails = ~df[email_col].str.match(EMAIL_PATTERN, na=False)
                 invalid_count = invalid_emails.sum()
                 if invalid_count > 0:
                     errors.append(f"{invalid_count} invalid email formats found")
@@ -285,19 +366,36 @@ class BulkImportProcessor:
         uploaded_by: uuid.UUID,
         dry_run: bool = False,
     ) -> str:
-        """Process bulk import file"""
+        """
+        Process bulk import file
+
+        The file is read in chunks. Each chunk is validated and normalized
+        column-wise, checked against existing users with one query, and
+        written with multi-row inserts in its own transaction, so memory and
+        transaction size stay bounded by the chunk size. A failed chunk is
+        rolled back and reported without undoing earlier chunks.
+        """
 
         import_id = str(uuid.uuid4())
 
         try:
-            # Read file
-            df = await self._read_file(file_path)
+            school = (
+                await db.execute(
+                    select(School.id, School.name, School.subdomain).where(
+                        School.id == school_id
+                    )
+                )
+            ).one_or_none()
+            if school is None:
+                raise ValueError("School not found")
+
+            chunks = self._open_chunks(file_path, self.chunk_size)
 
             # Initialize progress tracking
             progress = BulkImportProgress(
                 import_id=import_id,
                 status="processing",
-                total_records=len(df),
+                total_records=0,
                 processed_records=0,
                 successful_records=0,
                 failed_records=0,
@@ -307,47 +405,44 @@ class BulkImportProcessor:
             )
             self.progress_cache[import_id] = progress
 
-            # Process in batches
-            batch_size = min(self.max_batch_size, len(df))
+            field_to_col = {v: k for k, v in column_mapping.items()}
+            seen_emails: Set[str] = set()
             successful_users = []
             failed_records = []
+            warnings = []
+            processed = 0
 
-            for start_idx in range(0, len(df), batch_size):
-                end_idx = min(start_idx + batch_size, len(df))
-                batch = df.iloc[start_idx:end_idx]
-
-                batch_results = await self._process_batch(
+            for chunk, fraction_read in chunks:
+                chunk_results = await self._process_chunk(
                     db,
-                    batch,
-                    school_id,
+                    chunk,
+                    school,
                     import_type,
-                    column_mapping,
-                    uploaded_by,
+                    field_to_col,
+                    seen_emails,
                     dry_run,
                 )
 
-                successful_users.extend(batch_results["successful"])
-                failed_records.extend(batch_results["failed"])
+                successful_users.extend(chunk_results["successful"])
+                failed_records.extend(chunk_results["failed"])
+                warnings.extend(chunk_results["warnings"])
 
                 # Update progress
-                progress.processed_records = end_idx
+                processed += len(chunk)
+                progress.total_records = processed
+                progress.processed_records = processed
                 progress.successful_records = len(successful_users)
                 progress.failed_records = len(failed_records)
-                progress.progress_percentage = (end_idx / len(df)) * 100
+                progress.progress_percentage = fraction_read * 100
                 progress.errors = [
                     {"row": r["row"], "error": r["error"]} for r in failed_records
                 ]
+                progress.warnings = warnings
 
                 self.progress_cache[import_id] = progress
 
-                # Small delay to prevent overwhelming the database
-                await asyncio.sleep(0.1)
-
-            # Finalize
-            if not dry_run:
-                await db.commit()
-
             progress.status = "completed"
+            progress.progress_percentage = 100.0
             progress.estimated_completion = datetime.utcnow()
             self.progress_cache[import_id] = progress
 
@@ -366,185 +461,246 @@ class BulkImportProcessor:
             await db.rollback()
             raise
 
-    async def _process_batch(
+    async def _process_chunk(
         self,
         db: AsyncSession,
-        batch: pd.DataFrame,
-        school_id: uuid.UUID,
+        chunk: pd.DataFrame,
+        school: Any,
         import_type: str,
-        column_mapping: Dict[str, str],
-        uploaded_by: uuid.UUID,
+        field_to_col: Dict[str, str],
+        seen_emails: Set[str],
         dry_run: bool,
     ) -> Dict[str, List]:
-        """Process a batch of records"""
+        """Validate and import one chunk of rows"""
 
-        successful = []
-        failed = []
+        frame, errors, warnings = self._normalize_chunk(
+            chunk, field_to_col, import_type, seen_emails
+        )
+        failed = self._failures(frame, errors)
+        warned = [
+            {"row": idx, "warning": warning}
+            for idx, warning in warnings.dropna().items()
+        ]
 
-        # Reverse mapping
-        field_to_col = {v: k for k, v in column_mapping.items()}
+        valid = frame[errors.isna()]
+        valid = valid.astype(object).where(valid.notna(), None)
 
-        for idx, row in batch.iterrows():
-            try:
-                # Extract user data
-                user_data = self._extract_user_data(row, field_to_col, import_type)
-
-                if not dry_run:
-                    # Create user
-                    user = await self._create_user_from_import(db, user_data, school_id)
-                    successful.append(
-                        {
-                            "row": idx,
-                            "email": user_data["email"],
-                            "user_id": str(user.id) if user else None,
-                        }
-                    )
-                else:
-                    # Just validate
-                    successful.append(
-                        {
-                            "row": idx,
-                            "email": user_data["email"],
-                            "validation": "passed",
-                        }
-                    )
+        try:
+            existing, members = await self._lookup_users(
+                db, valid["email"].tolist(), school.id
+            )
 
-            except Exception as e:
-                failed.append(
-                    {
-                        "row": idx,
-                        "email": row.get(field_to_col.get("email", ""), "unknown"),
-                        "error": str(e),
-                    }
-                )
+            is_member = valid["email"].isin(members)
+            failed.extend(
+                {"row": idx, "email": email, "error": "User is already a member of this school"}
+                for idx, email in valid.loc[is_member, "email"].items()
+            )
+            valid = valid[~is_member]
 
-        return {"successful": successful, "failed": failed}
+            if dry_run:
+                successful = [
+                    {"row": idx, "email": email, "validation": "passed"}
+                    for idx, email in valid["email"].items()
+                ]
+                return {"successful": successful, "failed": failed, "warnings": warned}
 
-    def _extract_user_data(
-        self, row: pd.Series, field_mapping: Dict[str, str], import_type: str
-    ) -> Dict[str, Any]:
-        """Extract user data from a row based on field mapping"""
+            user_ids = await self._insert_users(db, valid, existing, school.id)
+            await self._insert_memberships(db, valid, user_ids, school)
+            await db.commit()
 
-        user_data = {}
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Import chunk starting at row {chunk.index[0]} failed: {e}")
+            failed.extend(
+                {"row": idx, "email": email or "unknown", "error": str(e)}
+                for idx, email in valid["email"].items()
+            )
+            return {"successful": [], "failed": failed, "warnings": warned}
 
-        # Required fields
-        for field in ["email", "first_name", "last_name"]:
-            if field in field_mapping:
-                col_name = field_mapping[field]
-                value = row.get(col_name)
-                if pd.isna(value) or value == "":
-                    raise ValueError(f"Missing required field: {field}")
-                user_data[field] = str(value).strip()
-
-        # Optional fields
-        optional_fields = [
-            "phone",
-            "department",
-            "employee_id",
-            "student_id",
-            "grade",
-            "parent_email",
-            "parent_phone",
-            "address",
-            "date_of_birth",
+        successful = [
+            {"row": idx, "email": email, "user_id": str(user_ids[email])}
+            for idx, email in valid["email"].items()
         ]
+        return {"successful": successful, "failed": failed, "warnings": warned}
+
+    def _normalize_chunk(
+        self,
+        chunk: pd.DataFrame,
+        field_to_col: Dict[str, str],
+        import_type: str,
+        seen_emails: Set[str],
+    ) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
+        """
+        Map columns to fields and clean them column-wise
+
+        Returns the normalized frame with the first error and warning of each
+        row, all on the chunk's row index. Emails of accepted rows are added
+        to seen_emails so duplicates in later chunks are caught.
+        """
+        frame = pd.DataFrame(index=chunk.index)
+        for field in REQUIRED_USER_FIELDS + OPTIONAL_USER_FIELDS + ["role"]:
+            col_name = field_to_col.get(field)
+            if col_name in chunk.columns:
+                values = chunk[col_name].astype("string").str.strip()
+                frame[field] = values.mask(values == "")
+
+        errors = pd.Series(pd.NA, index=chunk.index, dtype="string")
+        warnings = pd.Series(pd.NA, index=chunk.index, dtype="string")
+
+        def flag(series: pd.Series, mask: pd.Series, message: str) -> None:
+            series[mask & series.isna()] = message
 
-        for field in optional_fields:
-            if field in field_mapping:
-                col_name = field_mapping[field]
-                value = row.get(col_name)
-                if not pd.isna(value) and value != "":
-                    user_data[field] = str(value).strip()
+        # Required fields
+        for field in REQUIRED_USER_FIELDS:
+            if field not in frame:
+                frame[field] = pd.Series(pd.NA, index=chunk.index, dtype="string")
+            flag(errors, frame[field].isna(), f"Missing required field: {field}")
+
+        # Emails: format, then duplicates within the file
+        frame["email"] = frame["email"].str.lower()
+        present = frame["email"].notna()
+        flag(errors, present & ~frame["email"].str.match(EMAIL_PATTERN, na=False), "Invalid email format")
+        flag(
+            errors,
+            present & (frame["email"].duplicated() | frame["email"].isin(seen_emails)),
+            "Duplicate email in file",
+        )
+        seen_emails.update(frame.loc[errors.isna(), "email"])
+
+        # Phone numbers to E.164; local Zimbabwe mobiles become +263
+        for field in PHONE_FIELDS:
+            if field in frame:
+                phones = (
+                    frame[field]
+                    .str.replace(r"[\s\-().]", "", regex=True)
+                    .str.replace(r"^00", "+", regex=True)
+                    .str.replace(r"^0(?=7\d{8}$)", "+263", regex=True)
+                    .str.replace(r"^(?=263\d{9}$)", "+", regex=True)
+                )
+                valid_phone = phones.str.match(PHONE_PATTERN, na=False)
+                frame[field] = phones.where(valid_phone, frame[field])
+                flag(warnings, frame[field].notna() & ~valid_phone, f"Unrecognized {field} format")
 
         # Handle roles
-        if "role" in field_mapping:
-            role_value = row.get(field_mapping["role"])
-            if not pd.isna(role_value):
-                user_data["school_role"] = str(role_value).strip()
+        if "role" in frame:
+            frame["school_role"] = frame.pop("role")
 
         # Set defaults based on import type
         defaults = self.field_mappings.get(import_type, {}).get("defaults", {})
         for key, value in defaults.items():
-            if key not in user_data:
-                user_data[key] = value
+            frame[key] = frame[key].fillna(value) if key in frame else value
 
-        return user_data
+        return frame, errors, warnings
 
-    async def _create_user_from_import(
-        self, db: AsyncSession, user_data: Dict[str, Any], school_id: uuid.UUID
-    ) -> Optional[PlatformUser]:
-        """Create user from import data"""
+    @staticmethod
+    def _failures(frame: pd.DataFrame, errors: pd.Series) -> List[Dict[str, Any]]:
+        failed = errors.notna()
+        return [
+            {"row": idx, "email": email if isinstance(email, str) else "unknown", "error": error}
+            for idx, email, error in zip(
+                frame.index[failed], frame.loc[failed, "email"], errors[failed]
+            )
+        ]
 
-        # Check if user already exists
-        from sqlalchemy import select
+    async def _lookup_users(
+        self, db: AsyncSession, emails: List[str], school_id: uuid.UUID
+    ) -> Tuple[Dict[str, uuid.UUID], Set[str]]:
+        """Existing user IDs by email, and the emails already in this school"""
+        if not emails:
+            return {}, set()
 
-        existing_query = select(PlatformUser).where(
-            PlatformUser.email == user_data["email"].lower()
+        result = await db.execute(
+            EXISTING_USERS_SQL, {"emails": emails, "school_id": school_id}
         )
-        result = await db.execute(existing_query)
-        existing_user = result.scalar_one_or_none()
-
-        if existing_user:
-            # Add school membership to existing user
-            membership = SchoolMembership(
-                id=uuid.uuid4(),
-                user_id=existing_user.id,
-                school_id=school_id,
-                school_name="",  # Will be filled by caller
-                school_subdomain="",  # Will be filled by caller
-                role=user_data.get("school_role", SchoolRole.STUDENT.value),
-                permissions=[],
-                status="active",
-                joined_date=datetime.utcnow(),
-                department=user_data.get("department"),
-                employee_id=user_data.get("employee_id"),
-                student_id=user_data.get("student_id"),
-                current_grade=user_data.get("grade"),
-            )
-            db.add(membership)
-            return existing_user
-
-        # Create new user
-        profile_data = {
-            "phone_number": user_data.get("phone"),
-            "address": user_data.get("address"),
-            "emergency_contact_name": user_data.get("parent_email"),
-            "emergency_contact_phone": user_data.get("parent_phone"),
-        }
-
-        user = PlatformUser(
-            id=uuid.uuid4(),
-            email=user_data["email"].lower(),
-            first_name=user_data["first_name"],
-            last_name=user_data["last_name"],
-            global_role=user_data.get("platform_role", "system_user"),
-            status="active",
-            primary_school_id=school_id,
-            personal_profile=profile_data if isinstance(profile_data, dict) else {},
+        existing = {}
+        members = set()
+        for row in result:
+            existing[row.email] = row.id
+            if row.is_member:
+                members.add(row.email)
+        return existing, members
+
+    async def _insert_users(
+        self,
+        db: AsyncSession,
+        rows: pd.DataFrame,
+        existing: Dict[str, uuid.UUID],
+        school_id: uuid.UUID,
+    ) -> Dict[str, uuid.UUID]:
+        """Insert users not found by email; returns user IDs for every row"""
+        user_ids = dict(existing)
+        new_users = [
+            {
+                "id": uuid.uuid4(),
+                "email": row["email"],
+                "first_name": row["first_name"],
+                "last_name": row["last_name"],
+                "global_role": row.get("platform_role") or "system_user",
+                "status": "active",
+                "primary_school_id": school_id,
+                "personal_profile": {
+                    "phone_number": row.get("phone"),
+                    "address": row.get("address"),
+                    "emergency_contact_name": row.get("parent_email"),
+                    "emergency_contact_phone": row.get("parent_phone"),
+                },
+            }
+            for row in rows.to_dict("records")
+            if row["email"] not in existing
+        ]
+        if not new_users:
+            return user_ids
+
+        result = await db.execute(
+            pg_insert(PlatformUser.__table__)
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(PlatformUser.__table__.c.id, PlatformUser.__table__.c.email),
+            new_users,
         )
+        user_ids.update({row.email: row.id for row in result})
 
-        db.add(user)
-        await db.flush()  # Get user ID
-
-        # Create school membership
-        membership = SchoolMembership(
-            id=uuid.uuid4(),
-            user_id=user.id,
-            school_id=school_id,
-            school_name="",  # Will be filled by caller
-            school_subdomain="",  # Will be filled by caller
-            role=user_data.get("school_role", SchoolRole.STUDENT.value),
-            permissions=[],
-            status="active",
-            joined_date=datetime.utcnow(),
-            department=user_data.get("department"),
-            employee_id=user_data.get("employee_id"),
-            student_id=user_data.get("student_id"),
-            current_grade=user_data.get("grade"),
-        )
+        # Created by a concurrent import between lookup and insert
+        raced = [user["email"] for user in new_users if user["email"] not in user_ids]
+        if raced:
+            found, _ = await self._lookup_users(db, raced, school_id)
+            user_ids.update(found)
 
-        db.add(membership)
-        return user
+        return user_ids
+
+    async def _insert_memberships(
+        self,
+        db: AsyncSession,
+        rows: pd.DataFrame,
+        user_ids: Dict[str, uuid.UUID],
+        school: Any,
+    ) -> None:
+        """Insert one school membership per row"""
+        joined = datetime.utcnow()
+        memberships = [
+            {
+                "id": uuid.uuid4(),
+                "user_id": user_ids[row["email"]],
+                "school_id": school.id,
+                "school_name": school.name,
+                "school_subdomain": school.subdomain,
+                "role": row.get("school_role") or SchoolRole.STUDENT.value,
+                "permissions": [],
+                "status": "active",
+                "joined_date": joined,
+                "department": row.get("department"),
+                "employee_id": row.get("employee_id"),
+                "student_id": row.get("student_id"),
+                "current_grade": row.get("grade"),
+            }
+            for row in rows.to_dict("records")
+        ]
+        if memberships:
+            await db.execute(
+                pg_insert(SchoolMembership.__table__).on_conflict_do_nothing(
+                    constraint="uq_user_school"
+                ),
+                memberships,
+            )
 
     def get_import_progress(self, import_id: str) -> Optional[BulkImportProgress]:
         """Get import progress by ID"""
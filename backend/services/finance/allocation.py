@@ -0,0 +1,212 @@
+# =====================================================
+# Finance Module - Payment Allocation Engine
+# Allocates completed payments to outstanding invoices, oldest first,
+# in one locking statement per batch of payments
+# File: backend/services/finance/allocation.py
+# =====================================================
+
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from shared.database import get_database_connection
+from shared.db_pools import BACKGROUND
+
+from .restrictions import invalidate_student_restrictions
+
+logger = logging.getLogger(__name__)
+
+# Payments allocated per statement (and per transaction for reconciliation runs)
+DEFAULT_BATCH_SIZE = 1000
+
+# Each payment's unallocated amount and each invoice's outstanding amount are
+# laid end to end per student (payments by payment date, invoices by due
+# date), and an allocation is the overlap of a payment's range with an
+# invoice's range. Rows that another transaction holds are skipped rather
+# than waited on; they are picked up by whichever transaction holds them.
+# Invoice paid/outstanding amounts and status are left to the
+# finance.update_invoice_after_payment trigger on payment_allocations.
+#
+# $1 payment IDs, $2 optional school ID, $3 optional invoice IDs
+ALLOCATE_SQL = """
+WITH locked_payments AS (
+    SELECT p.id, p.student_id, p.amount, p.payment_date, p.created_at
+    FROM finance.payments p
+    WHERE p.id = ANY($1::uuid[])
+      AND p.status = 'completed'
+      AND ($2::uuid IS NULL OR p.school_id = $2::uuid)
+    FOR UPDATE OF p SKIP LOCKED
+),
+available AS (
+    SELECT lp.id AS payment_id, lp.student_id, lp.payment_date, lp.created_at,
+           lp.amount - COALESCE(SUM(pa.allocated_amount), 0) AS amount
+    FROM locked_payments lp
+    LEFT JOIN finance.payment_allocations pa ON pa.payment_id = lp.id
+    GROUP BY lp.id, lp.student_id, lp.payment_date, lp.created_at, lp.amount
+),
+payment_ranges AS (
+    SELECT payment_id, student_id,
+           SUM(amount) OVER w - amount AS range_start,
+           SUM(amount) OVER w AS range_end
+    FROM available
+    WHERE amount > 0
+    WINDOW w AS (
+        PARTITION BY student_id ORDER BY payment_date, created_at, payment_id
+        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+    )
+),
+locked_invoices AS (
+    SELECT i.id, i.student_id, i.outstanding_amount, i.due_date, i.created_at
+    FROM finance.invoices i
+    WHERE i.student_id IN (SELECT student_id FROM payment_ranges)
+      AND i.outstanding_amount > 0
+      AND i.status <> 'cancelled'
+      AND ($2::uuid IS NULL OR i.school_id = $2::uuid)
+      AND ($3::uuid[] IS NULL OR i.id = ANY($3::uuid[]))
+    FOR UPDATE OF i SKIP LOCKED
+),
+invoice_ranges AS (
+    SELECT id AS invoice_id, student_id,
+           SUM(outstanding_amount) OVER w - outstanding_amount AS range_start,
+           SUM(outstanding_amount) OVER w AS range_end
+    FROM locked_invoices
+    WINDOW w AS (
+        PARTITION BY student_id ORDER BY due_date, created_at, id
+        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+    )
+),
+plan AS (
+    SELECT p.payment_id, i.invoice_id, p.student_id,
+           LEAST(p.range_end, i.range_end) - GREATEST(p.range_start, i.range_start) AS amount
+    FROM payment_ranges p
+    JOIN invoice_ranges i
+      ON i.student_id = p.student_id
+     AND i.range_start < p.range_end
+     AND p.range_start < i.range_end
+),
+allocated AS (
+    INSERT INTO finance.payment_allocations (payment_id, invoice_id, allocated_amount)
+    SELECT payment_id, invoice_id, amount FROM plan
+    ON CONFLICT (payment_id, invoice_id) DO UPDATE
+        SET allocated_amount = finance.payment_allocations.allocated_amount + EXCLUDED.allocated_amount
+    RETURNING *
+),
+student_totals AS (
+    SELECT student_id, SUM(amount) AS amount FROM plan GROUP BY student_id
+),
+updated_accounts AS (
+    UPDATE finance.student_accounts a
+    SET total_paid = a.total_paid + s.amount,
+        total_outstanding = GREATEST(a.total_outstanding - s.amount, 0),
+        current_balance = a.current_balance + s.amount,
+        last_payment_date = NOW(),
+        updated_at = NOW()
+    FROM student_totals s
+    WHERE a.student_id = s.student_id
+    RETURNING a.id
+)
+SELECT a.*, pl.amount AS applied_amount, pl.student_id
+FROM allocated a
+JOIN plan pl ON pl.payment_id = a.payment_id AND pl.invoice_id = a.invoice_id
+"""
+
+MARK_RECONCILED_SQL = """
+UPDATE finance.payments
+SET reconciled = TRUE, reconciled_at = NOW(), reconciled_by = $2, updated_at = NOW()
+WHERE id = ANY($1::uuid[]) AND NOT reconciled
+  AND ($3::uuid IS NULL OR school_id = $3::uuid)
+"""
+
+
+@dataclass
+class ReconciliationResult:
+    """Outcome of a batch reconciliation run"""
+    payments_reconciled: int = 0
+    allocations_created: int = 0
+    amount_allocated: Decimal = Decimal("0.00")
+    batches_failed: int = 0
+
+
+class PaymentAllocationEngine:
+    """
+    Allocates payments to outstanding invoices
+
+    Every batch of payments is allocated by a single statement that locks
+    the payments and their students' open invoices, plans the allocations
+    oldest invoice first, writes them, and moves the student account
+    running totals, so a batch costs one round trip however many invoices
+    it touches. Invoice balances follow from the allocation trigger.
+    Callers own the transaction.
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Initialize engine
+
+        Args:
+            batch_size: Payments allocated per statement
+        """
+        self.batch_size = batch_size
+
+    async def allocate(self, conn, payment_ids: List[UUID], school_id: Optional[UUID] = None,
+                       invoice_ids: Optional[List[UUID]] = None) -> List[Dict[str, Any]]:
+        """
+        Allocate payments on the caller's connection
+
+        Args:
+            conn: Database connection, normally inside a transaction
+            payment_ids: Payments to allocate; non-completed ones are ignored
+            school_id: Restrict payments and invoices to this school
+            invoice_ids: Restrict allocation to these invoices
+
+        Returns:
+            The payment_allocations rows written, each with the
+            applied_amount this call added to it and the student_id
+        """
+        allocations: List[Dict[str, Any]] = []
+        for index in range(0, len(payment_ids), self.batch_size):
+            batch = list(payment_ids[index:index + self.batch_size])
+            rows = await conn.fetch(ALLOCATE_SQL, batch, school_id, invoice_ids)
+            allocations.extend(dict(row) for row in rows)
+        return allocations
+
+    async def reconcile(self, payment_ids: List[UUID], reconciled_by: UUID,
+                        school_id: Optional[UUID] = None) -> ReconciliationResult:
+        """
+        Mark payments reconciled and allocate them, one transaction per batch
+
+        A failed batch is rolled back and logged without undoing earlier ones.
+        Students paid for have their restriction bitmaps dropped as each
+        batch commits.
+        """
+        result = ReconciliationResult()
+
+        async with get_database_connection(BACKGROUND) as conn:
+            for index in range(0, len(payment_ids), self.batch_size):
+                batch = list(payment_ids[index:index + self.batch_size])
+                try:
+                    async with conn.transaction():
+                        status = await conn.execute(MARK_RECONCILED_SQL, batch, reconciled_by, school_id)
+                        rows = await conn.fetch(ALLOCATE_SQL, batch, school_id, None)
+                except Exception as e:
+                    result.batches_failed += 1
+                    logger.error(f"Reconciliation batch of {len(batch)} payments failed: {e}")
+                    continue
+
+                await invalidate_student_restrictions(row["student_id"] for row in rows)
+                result.payments_reconciled += int(status.split()[-1])
+                result.allocations_created += len(rows)
+                result.amount_allocated += sum(
+                    (row["applied_amount"] for row in rows), Decimal("0.00")
+                )
+
+        logger.info(
+            f"Reconciled {result.payments_reconciled} payments, "
+            f"{result.allocations_created} allocations written"
+        )
+        return result
+
+
+payment_allocation_engine = PaymentAllocationEngine()
@@ -3,9 +3,9 @@
 # File: backend/services/finance/crud.py
 # =====================================================
 
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from uuid import UUID
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 import asyncpg
 from fastapi import HTTPException
@@ -13,6 +13,12 @@ import logging
 
 from shared.auth import EnhancedUser
 from shared.database import get_database_connection
+from shared.db_pools import REPORTING
+from shared.exports import MEDIA_TYPES, ExportFormatError, iter_export, stream_records
+from shared.pagination import (
+    CountMode, InvalidCursorError, SortKey,
+    count_rows, keyset_filter, order_clause, split_page
+)
 from .schemas import (
     FeeCategoryCreate, FeeCategoryUpdate, FeeCategoryResponse,
     FeeStructureCreate, FeeStructureUpdate, FeeStructureResponse,
@@ -26,9 +32,32 @@ from .schemas import (
     FinancialSummaryResponse, FinanceDashboardResponse,
     InvoiceSearchFilters, PaymentSearchFilters
 )
+from .allocation import payment_allocation_engine
+from .restrictions import invalidate_student_restrictions, restriction_cache
+from .invoice_generation import (
+    InvoiceGenerationEngine, FeeStructureNotFoundError, NoEligibleStudentsError
+)
 
 logger = logging.getLogger(__name__)
 
+# Keyset sort orders for the invoice and payment lists (newest first)
+INVOICE_SORT = (SortKey("i.created_at", "created_at", descending=True), SortKey("i.id", "id", descending=True))
+PAYMENT_SORT = (SortKey("p.created_at", "created_at", descending=True), SortKey("p.id", "id", descending=True))
+
+# Export columns, in file order
+COLLECTION_EXPORT_FIELDS = [
+    "payment_date", "payment_reference", "student_number", "student_name",
+    "payment_method", "amount", "currency", "transaction_id", "reconciled",
+]
+OUTSTANDING_EXPORT_FIELDS = [
+    "student_number", "student_name", "grade_level", "invoice_number", "due_date",
+    "total_amount", "paid_amount", "outstanding_amount", "days_overdue",
+]
+STATEMENT_EXPORT_FIELDS = [
+    "student_number", "student_name", "entry_date", "entry_type",
+    "reference", "debit", "credit", "balance",
+]
+
 # =====================================================
 # FEE CATEGORY CRUD
 # =====================================================
@@ -71,6 +100,7 @@ class FeeCategoryCRUD:
                     current_user.id
                 )
                 
+                restriction_cache.invalidate_categories(current_user.school_id)
                 logger.info(f"Created fee category {category_data.name} for school {current_user.school_id}")
                 return FeeCategoryResponse(**dict(row))
                 
@@ -151,6 +181,7 @@ class FeeCategoryCRUD:
                 if not row:
                     raise HTTPException(status_code=404, detail="Fee category not found")
                 
+                restriction_cache.invalidate_categories(school_id)
                 logger.info(f"Updated fee category {category_id} for school {school_id}")
                 return FeeCategoryResponse(**dict(row))
                 
@@ -188,6 +219,7 @@ class FeeCategoryCRUD:
                         raise HTTPException(status_code=404, detail="Fee category not found")
                     logger.info(f"Deleted fee category {category_id}")
                 
+                restriction_cache.invalidate_categories(school_id)
                 return True
                 
         except HTTPException:
@@ -813,48 +845,77 @@ class StudentFeeAssignmentCRUD:
             logger.error(f"Error cancelling student fee assignment: {e}")
             raise HTTPException(status_code=500, detail="Failed to cancel student fee assignment")
 
+    @staticmethod
+    async def _assign_students(conn, fee_structure_id: UUID, assigned_by: UUID,
+                               students_sql: str, *params) -> List[asyncpg.Record]:
+        """
+        Assign a fee structure to a set of students in one statement
+
+        `students_sql` selects the candidate student IDs as `student_id`; its
+        parameters start at $3. Students with an active assignment are
+        anti-joined out (cancelled ones are assigned again), a concurrent
+        insert is absorbed by the active-only unique index, and each
+        candidate comes back with whether it was assigned, so no per-student
+        round trips are needed.
+        """
+        return await conn.fetch(
+            f"""
+            WITH requested AS (
+                SELECT DISTINCT student_id FROM ({students_sql}) AS candidates
+            ),
+            inserted AS (
+                INSERT INTO finance.student_fee_assignments
+                (student_id, fee_structure_id, effective_from, status, assigned_by, assigned_date)
+                SELECT r.student_id, $1::uuid, CURRENT_DATE, 'active', $2::uuid, CURRENT_DATE
+                FROM requested r
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM finance.student_fee_assignments sfa
+                    WHERE sfa.student_id = r.student_id
+                      AND sfa.fee_structure_id = $1
+                      AND sfa.status = 'active'
+                )
+                ON CONFLICT DO NOTHING
+                RETURNING student_id
+            )
+            SELECT r.student_id, i.student_id IS NOT NULL AS assigned
+            FROM requested r
+            LEFT JOIN inserted i ON i.student_id = r.student_id
+            """,
+            fee_structure_id, assigned_by, *params
+        )
+
     @staticmethod
     async def bulk_assign(fee_structure_id: UUID, student_ids: List[UUID], current_user: EnhancedUser) -> Dict[str, Any]:
         """Bulk assign a fee structure to multiple students"""
         try:
             async with get_database_connection() as conn:
-                async with conn.transaction():
-                    assigned = []
-                    skipped = []
-
-                    for student_id in student_ids:
-                        # Check for existing active assignment
-                        existing = await conn.fetchval(
-                            """
-                            SELECT id FROM finance.student_fee_assignments
-                            WHERE student_id = $1 AND fee_structure_id = $2 AND status = 'active'
-                            """,
-                            student_id, fee_structure_id
-                        )
+                rows = await StudentFeeAssignmentCRUD._assign_students(
+                    conn, fee_structure_id, current_user.id,
+                    "SELECT unnest($3::uuid[]) AS student_id",
+                    student_ids
+                )
 
-                        if existing:
-                            skipped.append(str(student_id))
-                            continue
+            newly_assigned = {row['student_id'] for row in rows if row['assigned']}
 
-                        await conn.execute(
-                            """
-                            INSERT INTO finance.student_fee_assignments
-                            (student_id, fee_structure_id, effective_from, status, assigned_by, assigned_date)
-                            VALUES ($1, $2, CURRENT_DATE, 'active', $3, CURRENT_DATE)
-                            """,
-                            student_id, fee_structure_id, current_user.id
-                        )
-                        assigned.append(str(student_id))
+            # Report in request order; repeats of an ID count as skipped
+            assigned = []
+            skipped = []
+            for student_id in student_ids:
+                if student_id in newly_assigned:
+                    newly_assigned.discard(student_id)
+                    assigned.append(str(student_id))
+                else:
+                    skipped.append(str(student_id))
 
-                    logger.info(f"Bulk assigned fee structure {fee_structure_id}: {len(assigned)} assigned, {len(skipped)} skipped")
+            logger.info(f"Bulk assigned fee structure {fee_structure_id}: {len(assigned)} assigned, {len(skipped)} skipped")
 
-                    return {
-                        "total_requested": len(student_ids),
-                        "total_assigned": len(assigned),
-                        "total_skipped": len(skipped),
-                        "assigned_student_ids": assigned,
-                        "skipped_student_ids": skipped
-                    }
+            return {
+                "total_requested": len(student_ids),
+                "total_assigned": len(assigned),
+                "total_skipped": len(skipped),
+                "assigned_student_ids": assigned,
+                "skipped_student_ids": skipped
+            }
 
         except Exception as e:
             logger.error(f"Error in bulk fee assignment: {e}")
@@ -865,57 +926,32 @@ class StudentFeeAssignmentCRUD:
         """Bulk assign a fee structure to students by grade level"""
         try:
             async with get_database_connection() as conn:
-                async with conn.transaction():
-                    # Get students in the specified grade levels
-                    students = await conn.fetch(
-                        """
-                        SELECT id FROM sis.students
-                        WHERE school_id = $1 AND current_grade_level = ANY($2) AND is_active = TRUE
-                        """,
-                        current_user.school_id, grade_levels
-                    )
-
-                    if not students:
-                        raise HTTPException(status_code=400, detail="No students found in the specified grade levels")
-
-                    student_ids = [row['id'] for row in students]
-
-                    assigned = []
-                    skipped = []
-
-                    for student_id in student_ids:
-                        existing = await conn.fetchval(
-                            """
-                            SELECT id FROM finance.student_fee_assignments
-                            WHERE student_id = $1 AND fee_structure_id = $2 AND status = 'active'
-                            """,
-                            student_id, fee_structure_id
-                        )
+                # Students in the specified grade levels are selected in the same statement
+                rows = await StudentFeeAssignmentCRUD._assign_students(
+                    conn, fee_structure_id, current_user.id,
+                    """
+                    SELECT id AS student_id FROM sis.students
+                    WHERE school_id = $3 AND current_grade_level = ANY($4) AND is_active = TRUE
+                    """,
+                    current_user.school_id, grade_levels
+                )
 
-                        if existing:
-                            skipped.append(str(student_id))
-                            continue
+            if not rows:
+                raise HTTPException(status_code=400, detail="No students found in the specified grade levels")
 
-                        await conn.execute(
-                            """
-                            INSERT INTO finance.student_fee_assignments
-                            (student_id, fee_structure_id, effective_from, status, assigned_by, assigned_date)
-                            VALUES ($1, $2, CURRENT_DATE, 'active', $3, CURRENT_DATE)
-                            """,
-                            student_id, fee_structure_id, current_user.id
-                        )
-                        assigned.append(str(student_id))
+            assigned = [str(row['student_id']) for row in rows if row['assigned']]
+            skipped = [str(row['student_id']) for row in rows if not row['assigned']]
 
-                    logger.info(f"Bulk assigned by grade: {len(assigned)} assigned, {len(skipped)} skipped")
+            logger.info(f"Bulk assigned by grade: {len(assigned)} assigned, {len(skipped)} skipped")
 
-                    return {
-                        "total_students_found": len(student_ids),
-                        "total_assigned": len(assigned),
-                        "total_skipped": len(skipped),
-                        "grade_levels": grade_levels,
-                        "assigned_student_ids": assigned,
-                        "skipped_student_ids": skipped
-                    }
+            return {
+                "total_students_found": len(rows),
+                "total_assigned": len(assigned),
+                "total_skipped": len(skipped),
+                "grade_levels": grade_levels,
+                "assigned_student_ids": assigned,
+                "skipped_student_ids": skipped
+            }
 
         except HTTPException:
             raise
@@ -1026,7 +1062,8 @@ class InvoiceCRUD:
     
     @staticmethod
     async def get_invoices(school_id: UUID, filters: Optional[InvoiceSearchFilters] = None, 
-                          page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+                          page: int = 1, page_size: int = 20, cursor: Optional[str] = None,
+                          count_mode: CountMode = CountMode.EXACT) -> Dict[str, Any]:
         """Get invoices with filtering and pagination"""
         try:
             async with get_database_connection() as conn:
@@ -1066,21 +1103,21 @@ class InvoiceCRUD:
                         params.append(filters.due_date_to)
                         param_count += 1
                 
-                # Get total count
-                count_query = f"SELECT COUNT(*) {base_query}"
-                total_count = await conn.fetchval(count_query, *params)
-                
-                # Get paginated results
-                offset = (page - 1) * page_size
+                # A cursor continues after the last row seen; page numbers
+                # (OFFSET) remain for shallow pages and older clients
+                keyset, cursor_values = keyset_filter(INVOICE_SORT, cursor, param_count)
+                offset = 0 if cursor else (page - 1) * page_size
+                limit_param = param_count + len(cursor_values)
                 data_query = f"""
                     SELECT i.*, s.first_name, s.last_name, s.student_number
-                    {base_query}
-                    ORDER BY i.created_at DESC
-                    LIMIT ${param_count} OFFSET ${param_count + 1}
+                    {base_query}{keyset}
+                    ORDER BY {order_clause(INVOICE_SORT)}
+                    LIMIT ${limit_param} OFFSET ${limit_param + 1}
                 """
-                params.extend([page_size, offset])
                 
-                rows = await conn.fetch(data_query, *params)
+                rows = await conn.fetch(data_query, *params, *cursor_values, page_size + 1, offset)
+                rows, next_cursor = split_page(rows, INVOICE_SORT, page_size)
+                total_count = await count_rows(conn, count_mode, base_query, params)
                 invoices = [InvoiceResponse(**dict(row)) for row in rows]
                 
                 return {
@@ -1088,11 +1125,14 @@ class InvoiceCRUD:
                     "total_count": total_count,
                     "page": page,
                     "page_size": page_size,
-                    "total_pages": (total_count + page_size - 1) // page_size,
-                    "has_next": page * page_size < total_count,
-                    "has_previous": page > 1
+                    "total_pages": (total_count + page_size - 1) // page_size if total_count is not None else None,
+                    "has_next": next_cursor is not None,
+                    "has_previous": page > 1 or cursor is not None,
+                    "next_cursor": next_cursor
                 }
                 
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"Error fetching invoices: {e}")
             raise HTTPException(status_code=500, detail="Failed to fetch invoices")
@@ -1101,146 +1141,39 @@ class InvoiceCRUD:
     async def bulk_generate_invoices(request: BulkInvoiceGenerationRequest, current_user: EnhancedUser) -> BulkInvoiceGenerationResponse:
         """Generate invoices in bulk"""
         try:
-            async with get_database_connection() as conn:
-                async with conn.transaction():
-                    # Get fee structure
-                    structure_query = """
-                        SELECT fs.*, array_agg(
-                            json_build_object(
-                                'id', fi.id,
-                                'name', fi.name,
-                                'base_amount', fi.base_amount,
-                                'currency', fi.currency,
-                                'fee_category_id', fi.fee_category_id
-                            )
-                        ) as items
-                        FROM finance.fee_structures fs
-                        JOIN finance.fee_items fi ON fs.id = fi.fee_structure_id
-                        WHERE fs.id = $1 AND fs.school_id = $2
-                        GROUP BY fs.id
-                    """
-                    structure_row = await conn.fetchrow(structure_query, request.fee_structure_id, current_user.school_id)
-                    if not structure_row:
-                        raise HTTPException(status_code=404, detail="Fee structure not found")
-                    
-                    # Get eligible students
-                    students_query = """
-                        SELECT DISTINCT s.id, s.first_name, s.last_name, s.student_number
-                        FROM sis.students s
-                        JOIN finance.student_fee_assignments sfa ON s.id = sfa.student_id
-                        WHERE s.school_id = $1 AND sfa.fee_structure_id = $2 AND sfa.status = 'active'
-                    """
-                    params = [current_user.school_id, request.fee_structure_id]
-                    param_count = 3
-                    
-                    # Apply student selection criteria
-                    if request.student_ids:
-                        students_query += f" AND s.id = ANY(${param_count})"
-                        params.append(request.student_ids)
-                        param_count += 1
-                    
-                    if request.grade_levels:
-                        students_query += f" AND s.current_grade_level = ANY(${param_count})"
-                        params.append(request.grade_levels)
-                        param_count += 1
-                    
-                    if request.class_ids:
-                        students_query += f" AND s.current_class_id = ANY(${param_count})"
-                        params.append(request.class_ids)
-                    
-                    students = await conn.fetch(students_query, *params)
-                    
-                    if not students:
-                        raise HTTPException(status_code=400, detail="No eligible students found")
-                    
-                    # Generate invoices
-                    invoices_generated = []
-                    failed_students = []
-                    total_amount = Decimal('0.00')
-                    
-                    for student in students:
-                        try:
-                            # Check if invoice already exists
-                            existing_invoice = await conn.fetchrow(
-                                """
-                                SELECT id FROM finance.invoices 
-                                WHERE student_id = $1 AND academic_year_id = $2 
-                                AND term_id = $3 AND status != 'cancelled'
-                                """,
-                                student['id'], request.academic_year_id, request.term_id
-                            )
-                            
-                            if existing_invoice:
-                                failed_students.append({
-                                    "student_id": str(student['id']),
-                                    "student_name": f"{student['first_name']} {student['last_name']}",
-                                    "reason": "Invoice already exists"
-                                })
-                                continue
-                            
-                            # Calculate totals
-                            subtotal = sum(Decimal(str(item['base_amount'])) for item in structure_row['items'])
-                            invoice_total = subtotal
-                            total_amount += invoice_total
-                            
-                            # Create invoice
-                            invoice_row = await conn.fetchrow(
-                                """
-                                INSERT INTO finance.invoices 
-                                (school_id, student_id, due_date, academic_year_id, term_id, 
-                                 subtotal, total_amount, outstanding_amount, created_by)
-                                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                                RETURNING id
-                                """,
-                                current_user.school_id,
-                                student['id'],
-                                request.due_date,
-                                request.academic_year_id,
-                                request.term_id,
-                                subtotal,
-                                invoice_total,
-                                invoice_total,
-                                current_user.id
-                            )
-                            
-                            # Create line items
-                            for item in structure_row['items']:
-                                await conn.execute(
-                                    """
-                                    INSERT INTO finance.invoice_line_items 
-                                    (invoice_id, fee_item_id, description, quantity, unit_price, line_total)
-                                    VALUES ($1, $2, $3, $4, $5, $6)
-                                    """,
-                                    invoice_row['id'],
-                                    item['id'],
-                                    item['name'],
-                                    Decimal('1.00'),
-                                    Decimal(str(item['base_amount'])),
-                                    Decimal(str(item['base_amount']))
-                                )
-                            
-                            invoices_generated.append(invoice_row['id'])
-                            
-                        except Exception as e:
-                            logger.error(f"Error generating invoice for student {student['id']}: {e}")
-                            failed_students.append({
-                                "student_id": str(student['id']),
-                                "student_name": f"{student['first_name']} {student['last_name']}",
-                                "reason": str(e)
-                            })
-                    
-                    logger.info(f"Generated {len(invoices_generated)} invoices for school {current_user.school_id}")
-                    
-                    return BulkInvoiceGenerationResponse(
-                        total_invoices_generated=len(invoices_generated),
-                        total_students_processed=len(students),
-                        total_amount=total_amount,
-                        failed_students=failed_students,
-                        invoice_ids=invoices_generated
-                    )
-                    
-        except HTTPException:
-            raise
+            from services.realtime import progress_tracker
+        except ImportError:
+            progress_tracker = None
+
+        try:
+            engine = InvoiceGenerationEngine(progress_tracker=progress_tracker)
+            result = await engine.generate(
+                school_id=current_user.school_id,
+                fee_structure_id=request.fee_structure_id,
+                academic_year_id=request.academic_year_id,
+                due_date=request.due_date,
+                created_by=current_user.id,
+                term_id=request.term_id,
+                student_ids=request.student_ids,
+                grade_levels=request.grade_levels,
+                class_ids=request.class_ids,
+                resume_after=request.resume_after_student_id,
+            )
+
+            return BulkInvoiceGenerationResponse(
+                total_invoices_generated=len(result.invoice_ids),
+                total_students_processed=result.total_students,
+                total_amount=result.total_amount,
+                failed_students=result.failed_students,
+                invoice_ids=result.invoice_ids,
+                operation_id=result.operation_id,
+                checkpoint_student_id=result.checkpoint
+            )
+
+        except FeeStructureNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except NoEligibleStudentsError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"Error in bulk invoice generation: {e}")
             raise HTTPException(status_code=500, detail="Failed to generate invoices")
@@ -1292,7 +1225,8 @@ class PaymentCRUD:
     
     @staticmethod
     async def get_payments(school_id: UUID, filters: Optional[PaymentSearchFilters] = None,
-                          page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+                          page: int = 1, page_size: int = 20, cursor: Optional[str] = None,
+                          count_mode: CountMode = CountMode.EXACT) -> Dict[str, Any]:
         """Get payments with filtering and pagination"""
         try:
             async with get_database_connection() as conn:
@@ -1333,21 +1267,21 @@ class PaymentCRUD:
                         params.append(filters.payment_date_to)
                         param_count += 1
                 
-                # Get total count
-                count_query = f"SELECT COUNT(*) {base_query}"
-                total_count = await conn.fetchval(count_query, *params)
-                
-                # Get paginated results
-                offset = (page - 1) * page_size
+                # A cursor continues after the last row seen; page numbers
+                # (OFFSET) remain for shallow pages and older clients
+                keyset, cursor_values = keyset_filter(PAYMENT_SORT, cursor, param_count)
+                offset = 0 if cursor else (page - 1) * page_size
+                limit_param = param_count + len(cursor_values)
                 data_query = f"""
                     SELECT p.*, s.first_name, s.last_name, s.student_number, pm.name as payment_method_name
-                    {base_query}
-                    ORDER BY p.created_at DESC
-                    LIMIT ${param_count} OFFSET ${param_count + 1}
+                    {base_query}{keyset}
+                    ORDER BY {order_clause(PAYMENT_SORT)}
+                    LIMIT ${limit_param} OFFSET ${limit_param + 1}
                 """
-                params.extend([page_size, offset])
                 
-                rows = await conn.fetch(data_query, *params)
+                rows = await conn.fetch(data_query, *params, *cursor_values, page_size + 1, offset)
+                rows, next_cursor = split_page(rows, PAYMENT_SORT, page_size)
+                total_count = await count_rows(conn, count_mode, base_query, params)
                 payments = [PaymentResponse(**dict(row)) for row in rows]
                 
                 return {
@@ -1355,11 +1289,14 @@ class PaymentCRUD:
                     "total_count": total_count,
                     "page": page,
                     "page_size": page_size,
-                    "total_pages": (total_count + page_size - 1) // page_size,
-                    "has_next": page * page_size < total_count,
-                    "has_previous": page > 1
+                    "total_pages": (total_count + page_size - 1) // page_size if total_count is not None else None,
+                    "has_next": next_cursor is not None,
+                    "has_previous": page > 1 or cursor is not None,
+                    "next_cursor": next_cursor
                 }
                 
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"Error fetching payments: {e}")
             raise HTTPException(status_code=500, detail="Failed to fetch payments")
@@ -1371,68 +1308,91 @@ class PaymentCRUD:
         try:
             async with get_database_connection() as conn:
                 async with conn.transaction():
-                    # Get payment details
-                    payment = await conn.fetchrow(
-                        "SELECT * FROM finance.payments WHERE id = $1 AND school_id = $2 AND status = 'completed'",
-                        payment_id, current_user.school_id
-                    )
-                    if not payment:
-                        raise HTTPException(status_code=404, detail="Payment not found or not completed")
-                    
-                    # Get invoices
-                    invoices = await conn.fetch(
-                        """
-                        SELECT * FROM finance.invoices 
-                        WHERE id = ANY($1) AND school_id = $2 AND outstanding_amount > 0
-                        ORDER BY due_date ASC
-                        """,
-                        invoice_ids, current_user.school_id
-                    )
-                    
-                    if not invoices:
-                        raise HTTPException(status_code=404, detail="No eligible invoices found")
-                    
-                    # Check if payment is already allocated
-                    existing_allocations = await conn.fetchval(
-                        "SELECT COALESCE(SUM(allocated_amount), 0) FROM finance.payment_allocations WHERE payment_id = $1",
-                        payment_id
+                    rows = await payment_allocation_engine.allocate(
+                        conn, [payment_id], current_user.school_id, invoice_ids
                     )
                     
-                    available_amount = payment['amount'] - existing_allocations
-                    if available_amount <= 0:
-                        raise HTTPException(status_code=400, detail="Payment already fully allocated")
-                    
-                    # Allocate payment
-                    allocations = []
-                    remaining_amount = available_amount
-                    
-                    for invoice in invoices:
-                        if remaining_amount <= 0:
-                            break
-                        
-                        allocation_amount = min(remaining_amount, invoice['outstanding_amount'])
-                        
-                        # Create allocation
-                        allocation_row = await conn.fetchrow(
-                            """
-                            INSERT INTO finance.payment_allocations (payment_id, invoice_id, allocated_amount)
-                            VALUES ($1, $2, $3)
-                            RETURNING *
-                            """,
-                            payment_id, invoice['id'], allocation_amount
-                        )
-                        
-                        allocations.append(PaymentAllocationResponse(**dict(allocation_row)))
-                        remaining_amount -= allocation_amount
-                    
-                    logger.info(f"Allocated payment {payment_id} to {len(allocations)} invoices")
-                    return allocations
+                    if not rows:
+                        await PaymentCRUD._raise_unallocated(conn, payment_id, current_user.school_id)
+            
+            await invalidate_student_restrictions(row["student_id"] for row in rows)
+            logger.info(f"Allocated payment {payment_id} to {len(rows)} invoices")
+            return [PaymentAllocationResponse(**row) for row in rows]
                     
         except HTTPException:
             raise
         except Exception as e:
             logger.error(f"Error allocating payment: {e}")
             raise HTTPException(status_code=500, detail="Failed to allocate payment")
+    
+    @staticmethod
+    async def auto_allocate_payment_to_invoices(payment_id: UUID) -> List[PaymentAllocationResponse]:
+        """Allocate a completed payment to the student's outstanding invoices, oldest first"""
+        try:
+            async with get_database_connection() as conn:
+                async with conn.transaction():
+                    rows = await payment_allocation_engine.allocate(conn, [payment_id])
+            
+            await invalidate_student_restrictions(row["student_id"] for row in rows)
+            logger.info(f"Auto-allocated payment {payment_id} to {len(rows)} invoices")
+            return [PaymentAllocationResponse(**row) for row in rows]
+            
+        except Exception as e:
+            logger.error(f"Error auto-allocating payment: {e}")
+            raise HTTPException(status_code=500, detail="Failed to allocate payment")
+    
+    @staticmethod
+    async def reconcile_payment(payment_id: UUID, reconciled_by: UUID) -> None:
+        """Mark a payment reconciled and allocate it"""
+        result = await payment_allocation_engine.reconcile([payment_id], reconciled_by)
+        if result.batches_failed:
+            raise HTTPException(status_code=500, detail="Failed to reconcile payment")
+    
+    @staticmethod
+    async def bulk_reconcile_payments(payment_ids: List[UUID], reconciled_by: UUID) -> None:
+        """Mark payments reconciled and allocate them in batches (background task)"""
+        await payment_allocation_engine.reconcile(payment_ids, reconciled_by)
+    
+    @staticmethod
+    async def find_missing_payments(payment_ids: List[UUID], school_id: UUID) -> List[UUID]:
+        """Return the given payment IDs that do not exist in the school"""
+        try:
+            async with get_database_connection() as conn:
+                rows = await conn.fetch(
+                    """
+                    SELECT requested.id
+                    FROM unnest($1::uuid[]) AS requested(id)
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM finance.payments p
+                        WHERE p.id = requested.id AND p.school_id = $2
+                    )
+                    """,
+                    payment_ids, school_id
+                )
+                return [row['id'] for row in rows]
+                
+        except Exception as e:
+            logger.error(f"Error checking payments: {e}")
+            raise HTTPException(status_code=500, detail="Failed to check payments")
+    
+    @staticmethod
+    async def _raise_unallocated(conn, payment_id: UUID, school_id: UUID) -> None:
+        """Explain why nothing was allocated; only runs on the failure path"""
+        available = await conn.fetchval(
+            """
+            SELECT p.amount - COALESCE(
+                (SELECT SUM(allocated_amount) FROM finance.payment_allocations WHERE payment_id = p.id), 0
+            )
+            FROM finance.payments p
+            WHERE p.id = $1 AND p.school_id = $2 AND p.status = 'completed'
+            """,
+            payment_id, school_id
+        )
+        if available is None:
+            raise HTTPException(status_code=404, detail="Payment not found or not completed")
+        if available <= 0:
+            raise HTTPException(status_code=400, detail="Payment already fully allocated")
+        raise HTTPException(status_code=404, detail="No eligible invoices found")
 
 # =====================================================
 # FINANCIAL REPORTING
@@ -1441,23 +1401,32 @@ class PaymentCRUD:
 class FinancialReportingCRUD:
     """CRUD operations for financial reporting"""
     
+    # Dashboard and summary reads come from finance.invoice_daily_rollups and
+    # finance.payment_daily_rollups, which triggers keep current on every
+    # invoice and payment write; they scan days, not invoices. Each day is
+    # split over several bucket rows, so every read aggregates with SUM.
+    
     @staticmethod
     async def get_finance_dashboard(school_id: UUID, academic_year_id: UUID) -> FinanceDashboardResponse:
         """Get finance dashboard data"""
         try:
-            async with get_database_connection() as conn:
-                # Current academic year summary
-                year_summary = await conn.fetchrow(
+            async with get_database_connection(REPORTING) as conn:
+                # Academic year summary and counts in one pass over the rollups
+                summary = await conn.fetchrow(
                     """
                     SELECT 
-                        COALESCE(SUM(total_amount), 0) as year_invoiced,
+                        COALESCE(SUM(invoiced_amount), 0) as year_invoiced,
                         COALESCE(SUM(paid_amount), 0) as year_collected,
                         COALESCE(SUM(outstanding_amount), 0) as year_outstanding,
                         CASE 
-                            WHEN SUM(total_amount) > 0 THEN (SUM(paid_amount) / SUM(total_amount)) * 100
+                            WHEN SUM(invoiced_amount) > 0 THEN (SUM(paid_amount) / SUM(invoiced_amount)) * 100
                             ELSE 0
-                        END as year_collection_rate
-                    FROM finance.invoices 
+                        END as year_collection_rate,
+                        (SELECT COALESCE(SUM(overdue_count), 0) FROM finance.invoice_daily_rollups
+                         WHERE school_id = $1) as overdue_count,
+                        (SELECT COALESCE(SUM(payment_count), 0) FROM finance.payment_daily_rollups
+                         WHERE school_id = $1 AND status = 'pending') as pending_payments_count
+                    FROM finance.invoice_daily_rollups 
                     WHERE school_id = $1 AND academic_year_id = $2
                     """,
                     school_id, academic_year_id
@@ -1477,36 +1446,339 @@ class FinancialReportingCRUD:
                     school_id
                 )
                 
-                # Counts
-                overdue_count = await conn.fetchval(
-                    "SELECT COUNT(*) FROM finance.invoices WHERE school_id = $1 AND payment_status = 'overdue'",
-                    school_id
-                )
-                
-                pending_payments_count = await conn.fetchval(
-                    "SELECT COUNT(*) FROM finance.payments WHERE school_id = $1 AND status = 'pending'",
+                # Last 12 months of collections by month and by method
+                collections = await conn.fetch(
+                    """
+                    SELECT date_trunc('month', r.rollup_date)::date as month,
+                           r.payment_method_id, pm.name as payment_method_name,
+                           SUM(r.payment_count) as payment_count, SUM(r.amount) as amount
+                    FROM finance.payment_daily_rollups r
+                    JOIN finance.payment_methods pm ON r.payment_method_id = pm.id
+                    WHERE r.school_id = $1 AND r.status = 'completed'
+                      AND r.rollup_date >= date_trunc('month', CURRENT_DATE) - INTERVAL '11 months'
+                    GROUP BY 1, 2, 3
+                    ORDER BY 1
+                    """,
                     school_id
                 )
                 
                 return FinanceDashboardResponse(
                     school_id=school_id,
                     academic_year_id=academic_year_id,
-                    current_term_invoiced=year_summary['year_invoiced'],
-                    current_term_collected=year_summary['year_collected'],
-                    current_term_outstanding=year_summary['year_outstanding'],
-                    current_term_collection_rate=year_summary['year_collection_rate'],
-                    year_to_date_invoiced=year_summary['year_invoiced'],
-                    year_to_date_collected=year_summary['year_collected'],
-                    year_to_date_outstanding=year_summary['year_outstanding'],
-                    year_to_date_collection_rate=year_summary['year_collection_rate'],
+                    current_term_invoiced=summary['year_invoiced'],
+                    current_term_collected=summary['year_collected'],
+                    current_term_outstanding=summary['year_outstanding'],
+                    current_term_collection_rate=summary['year_collection_rate'],
+                    year_to_date_invoiced=summary['year_invoiced'],
+                    year_to_date_collected=summary['year_collected'],
+                    year_to_date_outstanding=summary['year_outstanding'],
+                    year_to_date_collection_rate=summary['year_collection_rate'],
                     recent_payments=[PaymentResponse(**dict(row)) for row in recent_payments],
-                    overdue_invoices_count=overdue_count,
-                    pending_payments_count=pending_payments_count,
-                    monthly_collection_trend=[],  # TODO: Implement trend data
-                    payment_method_breakdown=[],  # TODO: Implement breakdown
+                    overdue_invoices_count=summary['overdue_count'],
+                    pending_payments_count=summary['pending_payments_count'],
+                    monthly_collection_trend=FinancialReportingCRUD._monthly_trend(collections),
+                    payment_method_breakdown=FinancialReportingCRUD._method_breakdown(collections),
                     fee_category_breakdown=[]     # TODO: Implement breakdown
                 )
                 
         except Exception as e:
             logger.error(f"Error fetching finance dashboard: {e}")
-            raise HTTPException(status_code=500, detail="Failed to fetch finance dashboard")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail="Failed to fetch finance dashboard")
+    
+    @staticmethod
+    async def get_dashboard_summary(school_id: UUID) -> Dict[str, Any]:
+        """Get quick dashboard summary metrics across all academic years"""
+        try:
+            async with get_database_connection(REPORTING) as conn:
+                row = await conn.fetchrow(
+                    """
+                    SELECT 
+                        COALESCE(SUM(invoiced_amount), 0) as total_invoiced,
+                        COALESCE(SUM(paid_amount), 0) as total_collected,
+                        COALESCE(SUM(outstanding_amount), 0) as total_outstanding,
+                        COALESCE(SUM(overdue_count), 0) as overdue_invoices,
+                        (SELECT COALESCE(SUM(payment_count), 0) FROM finance.payment_daily_rollups
+                         WHERE school_id = $1 AND status = 'pending') as pending_payments
+                    FROM finance.invoice_daily_rollups
+                    WHERE school_id = $1
+                    """,
+                    school_id
+                )
+                
+                summary = dict(row)
+                summary['collection_rate'] = FinancialReportingCRUD._rate(
+                    summary['total_collected'], summary['total_invoiced']
+                )
+                return summary
+                
+        except Exception as e:
+            logger.error(f"Error fetching dashboard summary: {e}")
+            raise HTTPException(status_code=500, detail="Failed to fetch dashboard summary")
+    
+    @staticmethod
+    async def get_collection_summary(school_id: UUID, start_date: Optional[str] = None,
+                                     end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Get completed payment totals for a date range"""
+        start, end = FinancialReportingCRUD._parse_date_range(start_date, end_date)
+        try:
+            async with get_database_connection(REPORTING) as conn:
+                row = await conn.fetchrow(
+                    """
+                    SELECT COALESCE(SUM(amount), 0) as total_collected,
+                           COALESCE(SUM(payment_count), 0) as payment_count
+                    FROM finance.payment_daily_rollups
+                    WHERE school_id = $1 AND status = 'completed'
+                      AND rollup_date BETWEEN $2 AND $3
+                    """,
+                    school_id, start, end
+                )
+                
+                return {
+                    "start_date": start,
+                    "end_date": end,
+                    "total_collected": row['total_collected'],
+                    "payment_count": row['payment_count'],
+                    "average_payment": (
+                        row['total_collected'] / row['payment_count'] if row['payment_count'] else Decimal("0.00")
+                    ),
+                }
+                
+        except Exception as e:
+            logger.error(f"Error fetching collection summary: {e}")
+            raise HTTPException(status_code=500, detail="Failed to fetch collection summary")
+    
+    @staticmethod
+    async def get_outstanding_balances_summary(school_id: UUID) -> Dict[str, Any]:
+        """Get outstanding balance totals, overall and per academic year"""
+        try:
+            async with get_database_connection(REPORTING) as conn:
+                rows = await conn.fetch(
+                    """
+                    SELECT academic_year_id,
+                           SUM(outstanding_amount) as total_outstanding,
+                           SUM(invoice_count) as invoice_count,
+                           SUM(overdue_count) as overdue_invoices
+                    FROM finance.invoice_daily_rollups
+                    WHERE school_id = $1
+                    GROUP BY academic_year_id
+                    """,
+                    school_id
+                )
+                
+                return {
+                    "total_outstanding": sum((row['total_outstanding'] for row in rows), Decimal("0.00")),
+                    "invoice_count": sum(row['invoice_count'] for row in rows),
+                    "overdue_invoices": sum(row['overdue_invoices'] for row in rows),
+                    "by_academic_year": [dict(row) for row in rows],
+                }
+                
+        except Exception as e:
+            logger.error(f"Error fetching outstanding balances summary: {e}")
+            raise HTTPException(status_code=500, detail="Failed to fetch outstanding balances summary")
+    
+    @staticmethod
+    async def get_monthly_revenue_report(school_id: UUID,
+                                         academic_year_id: Optional[UUID] = None) -> Dict[str, Any]:
+        """Get invoiced and collected amounts by month"""
+        try:
+            async with get_database_connection(REPORTING) as conn:
+                rows = await conn.fetch(
+                    """
+                    WITH invoiced AS (
+                        SELECT date_trunc('month', rollup_date)::date as month,
+                               SUM(invoiced_amount) as invoiced
+                        FROM finance.invoice_daily_rollups
+                        WHERE school_id = $1 AND ($2::uuid IS NULL OR academic_year_id = $2)
+                        GROUP BY 1
+                    ),
+                    collected AS (
+                        SELECT date_trunc('month', r.rollup_date)::date as month,
+                               SUM(r.amount) as collected
+                        FROM finance.payment_daily_rollups r
+                        LEFT JOIN platform.academic_years ay ON ay.id = $2
+                        WHERE r.school_id = $1 AND r.status = 'completed'
+                          AND ($2::uuid IS NULL OR r.rollup_date BETWEEN ay.start_date AND ay.end_date)
+                        GROUP BY 1
+                    )
+                    SELECT month, COALESCE(i.invoiced, 0) as invoiced, COALESCE(c.collected, 0) as collected
+                    FROM invoiced i
+                    FULL JOIN collected c USING (month)
+                    ORDER BY month
+                    """,
+                    school_id, academic_year_id
+                )
+                
+                return {
+                    "academic_year_id": academic_year_id,
+                    "months": [dict(row) for row in rows],
+                }
+                
+        except Exception as e:
+            logger.error(f"Error fetching monthly revenue report: {e}")
+            raise HTTPException(status_code=500, detail="Failed to fetch monthly revenue report")
+    
+    @staticmethod
+    async def get_payment_method_usage(school_id: UUID, start_date: Optional[str] = None,
+                                       end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Get completed payment counts and amounts per payment method"""
+        start, end = FinancialReportingCRUD._parse_date_range(start_date, end_date)
+        try:
+            async with get_database_connection(REPORTING) as conn:
+                rows = await conn.fetch(
+                    """
+                    SELECT r.payment_method_id, pm.name as payment_method_name,
+                           SUM(r.payment_count) as payment_count, SUM(r.amount) as amount
+                    FROM finance.payment_daily_rollups r
+                    JOIN finance.payment_methods pm ON r.payment_method_id = pm.id
+                    WHERE r.school_id = $1 AND r.status = 'completed'
+                      AND r.rollup_date BETWEEN $2 AND $3
+                    GROUP BY r.payment_method_id, pm.name
+                    """,
+                    school_id, start, end
+                )
+                
+                return {
+                    "start_date": start,
+                    "end_date": end,
+                    "methods": FinancialReportingCRUD._method_breakdown(rows),
+                }
+                
+        except Exception as e:
+            logger.error(f"Error fetching payment method usage: {e}")
+            raise HTTPException(status_code=500, detail="Failed to fetch payment method usage")
+    
+    # Exports stream rows from a server-side cursor straight into the file
+    # writer; nothing is materialised beyond one chunk of rows.
+    
+    @staticmethod
+    def export_collection_report(school_id: UUID, start_date: str, end_date: str,
+                                 format: str) -> Tuple[AsyncIterator[bytes], str, str]:
+        """Stream completed payments in a date range as CSV or XLSX"""
+        start, end = FinancialReportingCRUD._parse_date_range(start_date, end_date)
+        rows = stream_records(
+            """
+            SELECT p.payment_date, p.payment_reference, s.student_number,
+                   s.first_name || ' ' || s.last_name as student_name,
+                   pm.name as payment_method, p.amount, p.currency,
+                   p.transaction_id, p.reconciled
+            FROM finance.payments p
+            JOIN sis.students s ON p.student_id = s.id
+            JOIN finance.payment_methods pm ON p.payment_method_id = pm.id
+            WHERE p.school_id = $1 AND p.status = 'completed'
+              AND p.payment_date BETWEEN $2 AND $3
+            ORDER BY p.payment_date, p.created_at, p.id
+            """,
+            school_id, start, end
+        )
+        chunks = FinancialReportingCRUD._export_chunks(format, rows, COLLECTION_EXPORT_FIELDS, "Collections")
+        return chunks, f"collection_report_{start}_{end}.{format}", MEDIA_TYPES[format]
+    
+    @staticmethod
+    def export_outstanding_balances(school_id: UUID, format: str,
+                                    grade_level: Optional[int] = None) -> Tuple[AsyncIterator[bytes], str, str]:
+        """Stream unpaid invoices, optionally for one grade level, as CSV or XLSX"""
+        rows = stream_records(
+            """
+            SELECT s.student_number, s.first_name || ' ' || s.last_name as student_name,
+                   s.current_grade_level as grade_level, i.invoice_number, i.due_date,
+                   i.total_amount, i.paid_amount, i.outstanding_amount,
+                   GREATEST(CURRENT_DATE - i.due_date, 0) as days_overdue
+            FROM finance.invoices i
+            JOIN sis.students s ON i.student_id = s.id
+            WHERE i.school_id = $1 AND i.outstanding_amount > 0 AND i.status != 'cancelled'
+              AND ($2::int IS NULL OR s.current_grade_level = $2)
+            ORDER BY s.last_name, s.first_name, s.id, i.due_date
+            """,
+            school_id, grade_level
+        )
+        chunks = FinancialReportingCRUD._export_chunks(format, rows, OUTSTANDING_EXPORT_FIELDS, "Outstanding")
+        return chunks, f"outstanding_balances.{format}", MEDIA_TYPES[format]
+    
+    @staticmethod
+    def export_student_statements(student_ids: List[UUID], school_id: UUID,
+                                  academic_year_id: Optional[UUID],
+                                  format: str) -> Tuple[AsyncIterator[bytes], str, str]:
+        """Stream invoice and payment lines per student with a running balance"""
+        rows = stream_records(
+            """
+            WITH lines AS (
+                SELECT i.student_id, i.invoice_date as entry_date, i.created_at, 'invoice' as entry_type,
+                       i.invoice_number as reference, i.total_amount as debit, 0::numeric as credit
+                FROM finance.invoices i
+                WHERE i.school_id = $1 AND i.student_id = ANY($2::uuid[]) AND i.status != 'cancelled'
+                  AND ($3::uuid IS NULL OR i.academic_year_id = $3)
+                UNION ALL
+                SELECT p.student_id, p.payment_date, p.created_at, 'payment',
+                       p.payment_reference, 0::numeric, p.amount
+                FROM finance.payments p
+                LEFT JOIN platform.academic_years ay ON ay.id = $3
+                WHERE p.school_id = $1 AND p.student_id = ANY($2::uuid[]) AND p.status = 'completed'
+                  AND ($3::uuid IS NULL OR p.payment_date BETWEEN ay.start_date AND ay.end_date)
+            )
+            SELECT s.student_number, s.first_name || ' ' || s.last_name as student_name,
+                   l.entry_date, l.entry_type, l.reference, l.debit, l.credit,
+                   SUM(l.debit - l.credit) OVER (
+                       PARTITION BY l.student_id ORDER BY l.entry_date, l.created_at, l.reference
+                       ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                   ) as balance
+            FROM lines l
+            JOIN sis.students s ON l.student_id = s.id
+            ORDER BY s.last_name, s.first_name, l.student_id, l.entry_date, l.created_at, l.reference
+            """,
+            school_id, student_ids, academic_year_id
+        )
+        chunks = FinancialReportingCRUD._export_chunks(format, rows, STATEMENT_EXPORT_FIELDS, "Statements")
+        return chunks, f"student_statements.{format}", MEDIA_TYPES[format]
+    
+    @staticmethod
+    def _export_chunks(format: str, rows, fieldnames: List[str], sheet_name: str) -> AsyncIterator[bytes]:
+        try:
+            return iter_export(format, rows, fieldnames, sheet_name)
+        except ExportFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    @staticmethod
+    def _parse_date_range(start_date: Optional[str], end_date: Optional[str]) -> Tuple[date, date]:
+        """Parse YYYY-MM-DD query dates; defaults to the last 30 days"""
+        try:
+            end = date.fromisoformat(end_date) if end_date else date.today()
+            start = date.fromisoformat(start_date) if start_date else end - timedelta(days=30)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+        if start > end:
+            raise HTTPException(status_code=400, detail="Start date must be before end date")
+        return start, end
+    
+    @staticmethod
+    def _rate(part: Decimal, whole: Decimal) -> Decimal:
+        return (part / whole) * 100 if whole else Decimal("0")
+    
+    @staticmethod
+    def _monthly_trend(rows) -> List[Dict[str, Any]]:
+        """Sum per-method monthly rows into one amount per month"""
+        months: Dict[date, Dict[str, Any]] = {}
+        for row in rows:
+            month = months.setdefault(row['month'], {"month": row['month'].isoformat(),
+                                                     "amount": Decimal("0.00"), "payment_count": 0})
+            month["amount"] += row['amount']
+            month["payment_count"] += row['payment_count']
+        return [months[key] for key in sorted(months)]
+    
+    @staticmethod
+    def _method_breakdown(rows) -> List[Dict[str, Any]]:
+        """Sum rows per payment method with each method's share of the amount"""
+        methods: Dict[UUID, Dict[str, Any]] = {}
+        for row in rows:
+            method = methods.setdefault(row['payment_method_id'], {
+                "payment_method_id": row['payment_method_id'],
+                "payment_method_name": row['payment_method_name'],
+                "amount": Decimal("0.00"),
+                "payment_count": 0,
+            })
+            method["amount"] += row['amount']
+            method["payment_count"] += row['payment_count']
+        
+        total = sum((method["amount"] for method in methods.values()), Decimal("0.00"))
+        for method in methods.values():
+            method["percentage"] = FinancialReportingCRUD._rate(method["amount"], total)
+        return sorted(methods.values(), key=lambda method: method["amount"], reverse=True)
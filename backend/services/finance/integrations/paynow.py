@@ -14,6 +14,7 @@ import aiohttp
 import logging
 from datetime import datetime
 
+from ..allocation import payment_allocation_engine
 from ..schemas import PaynowPaymentRequest, PaynowPaymentResponse, PaynowStatusResponse, PaymentStatus
 
 logger = logging.getLogger(__name__)
@@ -301,49 +302,8 @@ class PaynowIntegration:
     async def _auto_allocate_payment(self, payment_id: UUID, conn):
         """Automatically allocate completed payment to outstanding invoices"""
         try:
-            # Get payment details
-            payment = await conn.fetchrow(
-                "SELECT * FROM finance.payments WHERE id = $1",
-                payment_id
-            )
-            
-            if not payment:
-                return
-            
-            # Get outstanding invoices for the student
-            invoices = await conn.fetch(
-                """
-                SELECT * FROM finance.invoices 
-                WHERE student_id = $1 AND outstanding_amount > 0
-                ORDER BY due_date ASC
-                """,
-                payment['student_id']
-            )
-            
-            if not invoices:
-                return
-            
-            # Allocate payment to invoices
-            remaining_amount = payment['amount']
-            
-            for invoice in invoices:
-                if remaining_amount <= 0:
-                    break
-                
-                allocation_amount = min(remaining_amount, invoice['outstanding_amount'])
-                
-                # Create allocation
-                await conn.execute(
-                    """
-                    INSERT INTO finance.payment_allocations (payment_id, invoice_id, allocated_amount)
-                    VALUES ($1, $2, $3)
-                    """,
-                    payment_id, invoice['id'], allocation_amount
-                )
-                
-                remaining_amount -= allocation_amount
-            
-            logger.info(f"Auto-allocated payment {payment_id} to {len(invoices)} invoices")
+            allocations = await payment_allocation_engine.allocate(conn, [payment_id])
+            logger.info(f"Auto-allocated payment {payment_id} to {len(allocations)} invoices")
         
         except Exception as e:
             logger.error(f"Error auto-allocating payment: {e}")
@@ -0,0 +1,331 @@
+# =====================================================
+# Finance Module - Bulk Invoice Generation Engine
+# Chunked, set-based invoice generation with per-chunk commits
+# and resumable checkpoints
+# File: backend/services/finance/invoice_generation.py
+# =====================================================
+
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from shared.database import get_database_connection
+from shared.db_pools import BACKGROUND
+from shared.identifiers import INVOICE_NUMBER, reserve_identifiers_raw
+
+logger = logging.getLogger(__name__)
+
+# Students invoiced per transaction
+DEFAULT_CHUNK_SIZE = 500
+
+# services.realtime OperationType value; kept as a string so this module does
+# not import the realtime package (and its route singletons)
+OPERATION_TYPE = "invoice_generation"
+
+INVOICE_COLUMNS = [
+    "id", "school_id", "student_id", "due_date", "academic_year_id", "term_id",
+    "subtotal", "total_amount", "outstanding_amount", "created_by", "invoice_number",
+]
+LINE_ITEM_COLUMNS = [
+    "invoice_id", "fee_item_id", "description", "quantity", "unit_price", "line_total",
+]
+
+
+class FeeStructureNotFoundError(LookupError):
+    """The fee structure does not exist for the school or has no items"""
+
+
+class NoEligibleStudentsError(LookupError):
+    """No student matched the selection criteria"""
+
+
+@dataclass(frozen=True)
+class FeeTemplate:
+    """Line items and totals of a fee structure, computed once per run"""
+    fee_structure_id: UUID
+    items: Tuple[Tuple[UUID, str, Decimal], ...]  # (fee_item_id, name, amount)
+    subtotal: Decimal
+
+    @classmethod
+    def from_items(cls, fee_structure_id: UUID, items: List[Dict[str, Any]]) -> "FeeTemplate":
+        lines = tuple(
+            (item["id"], item["name"], Decimal(str(item["base_amount"])))
+            for item in items
+        )
+        return cls(fee_structure_id, lines, sum((amount for _, _, amount in lines), Decimal("0.00")))
+
+
+@dataclass
+class InvoiceGenerationResult:
+    """Outcome of a bulk generation run"""
+    total_students: int = 0
+    invoice_ids: List[UUID] = field(default_factory=list)
+    failed_students: List[Dict[str, str]] = field(default_factory=list)
+    total_amount: Decimal = Decimal("0.00")
+    chunks_committed: int = 0
+    chunks_failed: int = 0
+    # Last student before the first failed chunk; pass as resume_after to continue
+    checkpoint: Optional[UUID] = None
+    operation_id: Optional[str] = None
+
+
+class InvoiceGenerationEngine:
+    """
+    Generates term invoices for many students
+
+    The fee template is loaded and totalled once. Eligible students are
+    walked in student ID order in chunks; each chunk anti-joins students
+    that already have an invoice for the period, then COPYs the invoices and
+    their line items and commits. Invoice IDs are generated here so line
+    items need no RETURNING round trip. A failed chunk is rolled back and
+    reported without undoing earlier chunks, and the last student ID of the
+    unbroken run of committed chunks is kept as a checkpoint so an
+    interrupted run can resume after it (students invoiced by later chunks
+    are skipped by the anti-join, so re-running is always safe).
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, progress_tracker=None):
+        """
+        Initialize engine
+
+        Args:
+            chunk_size: Students invoiced per transaction
+            progress_tracker: Optional services.realtime ProgressTracker
+        """
+        self.chunk_size = chunk_size
+        self.progress_tracker = progress_tracker
+
+    async def generate(
+        self,
+        school_id: UUID,
+        fee_structure_id: UUID,
+        academic_year_id: UUID,
+        due_date: date,
+        created_by: UUID,
+        term_id: Optional[UUID] = None,
+        student_ids: Optional[List[UUID]] = None,
+        grade_levels: Optional[List[int]] = None,
+        class_ids: Optional[List[UUID]] = None,
+        resume_after: Optional[UUID] = None,
+    ) -> InvoiceGenerationResult:
+        """Generate invoices for the selected students"""
+        result = InvoiceGenerationResult(checkpoint=resume_after)
+
+        async with get_database_connection(BACKGROUND) as conn:
+            template = await self._load_template(conn, fee_structure_id, school_id)
+            if template is None:
+                raise FeeStructureNotFoundError("Fee structure not found")
+
+            students = await self._load_students(
+                conn, school_id, fee_structure_id,
+                student_ids, grade_levels, class_ids, resume_after
+            )
+            if not students:
+                raise NoEligibleStudentsError("No eligible students found")
+            result.total_students = len(students)
+
+            result.operation_id = await self._start_progress(
+                created_by, school_id, len(students), fee_structure_id
+            )
+
+            period = (school_id, academic_year_id, term_id, due_date, created_by)
+            processed = 0
+            for index in range(0, len(students), self.chunk_size):
+                chunk = students[index:index + self.chunk_size]
+                created, skipped, error = await self._generate_chunk(conn, template, chunk, period)
+
+                if error is None:
+                    result.invoice_ids.extend(created)
+                    result.total_amount += template.subtotal * len(created)
+                    result.chunks_committed += 1
+                    # Past a failed chunk the checkpoint stays put, so resuming retries it
+                    if not result.chunks_failed:
+                        result.checkpoint = chunk[-1]["id"]
+                    result.failed_students.extend(
+                        self._failure(student, "Invoice already exists") for student in skipped
+                    )
+                else:
+                    result.chunks_failed += 1
+                    logger.error(f"Invoice chunk after {result.checkpoint} failed: {error}")
+                    result.failed_students.extend(
+                        self._failure(student, str(error)) for student in chunk
+                    )
+
+                processed += len(chunk)
+                await self._report_progress(result, processed, index // self.chunk_size)
+
+        await self._finish_progress(result)
+        logger.info(
+            f"Generated {len(result.invoice_ids)} invoices for school {school_id} "
+            f"in {result.chunks_committed} chunks"
+        )
+        return result
+
+    # =====================================================
+    # QUERIES
+    # =====================================================
+
+    @staticmethod
+    async def _load_template(conn, fee_structure_id: UUID, school_id: UUID) -> Optional[FeeTemplate]:
+        rows = await conn.fetch(
+            """
+            SELECT fi.id, fi.name, fi.base_amount
+            FROM finance.fee_structures fs
+            JOIN finance.fee_items fi ON fs.id = fi.fee_structure_id
+            WHERE fs.id = $1 AND fs.school_id = $2
+            ORDER BY fi.name
+            """,
+            fee_structure_id, school_id
+        )
+        if not rows:
+            return None
+        return FeeTemplate.from_items(fee_structure_id, [dict(row) for row in rows])
+
+    @staticmethod
+    async def _load_students(conn, school_id: UUID, fee_structure_id: UUID,
+                             student_ids: Optional[List[UUID]], grade_levels: Optional[List[int]],
+                             class_ids: Optional[List[UUID]], resume_after: Optional[UUID]) -> List[Dict[str, Any]]:
+        query = """
+            SELECT DISTINCT s.id, s.first_name, s.last_name
+            FROM sis.students s
+            JOIN finance.student_fee_assignments sfa ON s.id = sfa.student_id
+            WHERE s.school_id = $1 AND sfa.fee_structure_id = $2 AND sfa.status = 'active'
+        """
+        params: List[Any] = [school_id, fee_structure_id]
+
+        for column, values in (
+            ("s.id", student_ids),
+            ("s.current_grade_level", grade_levels),
+            ("s.current_class_id", class_ids),
+        ):
+            if values:
+                params.append(values)
+                query += f" AND {column} = ANY(${len(params)})"
+
+        if resume_after:
+            params.append(resume_after)
+            query += f" AND s.id > ${len(params)}"
+
+        # Stable order so the checkpoint identifies exactly what is done
+        query += " ORDER BY s.id"
+        return [dict(row) for row in await conn.fetch(query, *params)]
+
+    async def _generate_chunk(self, conn, template: FeeTemplate, chunk: List[Dict[str, Any]],
+                              period: Tuple) -> Tuple[List[UUID], List[Dict[str, Any]], Optional[Exception]]:
+        """Invoice one chunk in its own transaction; returns (invoice IDs, skipped students, error)"""
+        school_id, academic_year_id, term_id, due_date, created_by = period
+
+        try:
+            async with conn.transaction():
+                invoiced = await conn.fetch(
+                    """
+                    SELECT DISTINCT student_id FROM finance.invoices
+                    WHERE student_id = ANY($1::uuid[]) AND academic_year_id = $2
+                      AND term_id IS NOT DISTINCT FROM $3 AND status != 'cancelled'
+                    """,
+                    [student["id"] for student in chunk], academic_year_id, term_id
+                )
+                invoiced_ids = {row["student_id"] for row in invoiced}
+
+                skipped = [student for student in chunk if student["id"] in invoiced_ids]
+                to_invoice = [student for student in chunk if student["id"] not in invoiced_ids]
+
+                # One block of invoice numbers per chunk instead of one per row
+                numbers = await reserve_identifiers_raw(
+                    conn, INVOICE_NUMBER, len(to_invoice), school_id, str(date.today().year)
+                ) if to_invoice else []
+
+                invoices = []
+                line_items = []
+                for student, invoice_number in zip(to_invoice, numbers):
+                    invoice_id = uuid.uuid4()
+                    invoices.append((
+                        invoice_id, school_id, student["id"], due_date, academic_year_id, term_id,
+                        template.subtotal, template.subtotal, template.subtotal, created_by,
+                        invoice_number,
+                    ))
+                    line_items.extend(
+                        (invoice_id, fee_item_id, name, Decimal("1.00"), amount, amount)
+                        for fee_item_id, name, amount in template.items
+                    )
+
+                if invoices:
+                    await conn.copy_records_to_table(
+                        "invoices", schema_name="finance",
+                        columns=INVOICE_COLUMNS, records=invoices
+                    )
+                    await conn.copy_records_to_table(
+                        "invoice_line_items", schema_name="finance",
+                        columns=LINE_ITEM_COLUMNS, records=line_items
+                    )
+        except Exception as e:
+            return [], [], e
+
+        return [invoice[0] for invoice in invoices], skipped, None
+
+    @staticmethod
+    def _failure(student: Dict[str, Any], reason: str) -> Dict[str, str]:
+        return {
+            "student_id": str(student["id"]),
+            "student_name": f"{student['first_name']} {student['last_name']}",
+            "reason": reason,
+        }
+
+    # =====================================================
+    # PROGRESS REPORTING
+    # =====================================================
+
+    async def _start_progress(self, user_id: UUID, school_id: UUID, total: int,
+                              fee_structure_id: UUID) -> Optional[str]:
+        if self.progress_tracker is None:
+            return None
+        try:
+            return await self.progress_tracker.create_bulk_operation(
+                OPERATION_TYPE, user_id, total,
+                batch_size=self.chunk_size, school_id=school_id,
+                metadata={"fee_structure_id": str(fee_structure_id)}
+            )
+        except Exception as e:
+            # Progress is informational; never fail the run over it
+            logger.warning(f"Could not start invoice generation progress: {e}")
+            return None
+
+    async def _report_progress(self, result: InvoiceGenerationResult, processed: int, batch: int) -> None:
+        if result.operation_id is None:
+            return
+        try:
+            await self.progress_tracker.update_bulk_progress(
+                result.operation_id,
+                completed_batches=batch + 1,
+                current_batch=batch,
+                processed_items=processed,
+                successful_items=len(result.invoice_ids),
+                failed_items=len(result.failed_students),
+            )
+            await self.progress_tracker.update_progress(
+                result.operation_id,
+                metadata={"checkpoint": str(result.checkpoint) if result.checkpoint else None}
+            )
+        except Exception as e:
+            logger.warning(f"Could not report invoice generation progress: {e}")
+
+    async def _finish_progress(self, result: InvoiceGenerationResult) -> None:
+        if result.operation_id is None:
+            return
+        try:
+            await self.progress_tracker.complete_operation(
+                result.operation_id,
+                success=result.chunks_failed == 0,
+                result_data={
+                    "invoices_generated": len(result.invoice_ids),
+                    "failed_students": len(result.failed_students),
+                    "total_amount": str(result.total_amount),
+                    "checkpoint": str(result.checkpoint) if result.checkpoint else None,
+                }
+            )
+        except Exception as e:
+            logger.warning(f"Could not complete invoice generation progress: {e}")
@@ -0,0 +1,402 @@
+# =====================================================
+# Finance Module - Payment Restriction Engine
+# Classifies fee categories into restriction classes once per school and
+# computes outstanding-fee restriction bitmaps for a whole class or school
+# in one grouped statement, with a per-student bitmap cache
+# File: backend/services/finance/restrictions.py
+# =====================================================
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.cache.local_cache import LocalCache
+from shared.cache.pubsub import listen_forever
+from shared.cache.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Restriction classes, one bit each
+ASSESSMENT_ACCESS = 1
+PRACTICAL_ACCESS = 2
+CLASS_ACCESS = 4
+
+RESTRICTION_NAMES = (
+    (ASSESSMENT_ACCESS, 'assessment_access'),
+    (PRACTICAL_ACCESS, 'practical_access'),
+    (CLASS_ACCESS, 'class_access'),
+)
+
+# Keywords in a fee category name that put it in a restriction class
+RESTRICTION_KEYWORDS = (
+    (ASSESSMENT_ACCESS, ('exam', 'assessment')),
+    (PRACTICAL_ACCESS, ('lab', 'practical')),
+    (CLASS_ACCESS, ('tuition',)),
+)
+
+# Students owing more than this are restricted; more than the high
+# threshold puts them at the high restriction level
+RESTRICTION_THRESHOLD = Decimal('100.00')
+HIGH_RESTRICTION_THRESHOLD = Decimal('500.00')
+
+# Pub/sub channel used to tell every worker to drop students' bitmaps
+RESTRICTION_INVALIDATION_CHANNEL = "oneclass:restriction_invalidation"
+
+# Invoices still owing money
+OPEN_INVOICE_FILTER = """
+    i.outstanding_amount > 0
+    AND i.payment_status IN ('pending', 'partial', 'overdue')
+    AND i.status NOT IN ('draft', 'cancelled', 'refunded')
+"""
+
+FEE_CATEGORIES_SQL = text("""
+    SELECT id, name, description, code
+    FROM finance.fee_categories
+    WHERE school_id = CAST(:school_id AS uuid) AND is_active = TRUE
+    ORDER BY display_order, name
+""")
+
+# One row per student with open invoices: the totals and the OR of the
+# restriction bits of every fee category they still owe on. Categories are
+# matched to bits through the classified list passed in, so no name
+# matching happens in the database. Filter by class, by students, or
+# neither for the whole school.
+RESTRICTIONS_SQL = text(f"""
+    WITH open_invoices AS (
+        SELECT i.id, i.student_id, i.outstanding_amount
+        FROM finance.invoices i
+        JOIN sis.students s ON s.id = i.student_id
+        WHERE i.school_id = CAST(:school_id AS uuid)
+          AND i.academic_year_id = CAST(:academic_year_id AS uuid)
+          AND {OPEN_INVOICE_FILTER}
+          AND (CAST(:class_id AS uuid) IS NULL OR s.current_class_id = CAST(:class_id AS uuid))
+          AND (CAST(:student_ids AS uuid[]) IS NULL OR i.student_id = ANY(CAST(:student_ids AS uuid[])))
+    ),
+    invoice_bits AS (
+        SELECT o.id, o.student_id, o.outstanding_amount, COALESCE(bit_or(c.bits), 0) AS bits
+        FROM open_invoices o
+        LEFT JOIN finance.invoice_line_items li ON li.invoice_id = o.id
+        LEFT JOIN finance.fee_items fi ON fi.id = li.fee_item_id
+        LEFT JOIN unnest(CAST(:category_ids AS uuid[]), CAST(:category_bits AS integer[])) AS c(id, bits)
+               ON c.id = fi.fee_category_id
+        GROUP BY o.id, o.student_id, o.outstanding_amount
+    )
+    SELECT student_id,
+           SUM(outstanding_amount) AS total_outstanding,
+           COUNT(*) AS outstanding_invoices,
+           bit_or(bits) AS restrictions
+    FROM invoice_bits
+    GROUP BY student_id
+""")
+
+# A student's open invoices with the fee categories on each
+STUDENT_OPEN_INVOICES_SQL = text(f"""
+    SELECT i.id, i.outstanding_amount, i.due_date,
+           COALESCE(array_agg(DISTINCT fi.fee_category_id) FILTER (WHERE fi.fee_category_id IS NOT NULL), '{{}}')
+               AS fee_category_ids
+    FROM finance.invoices i
+    LEFT JOIN finance.invoice_line_items li ON li.invoice_id = i.id
+    LEFT JOIN finance.fee_items fi ON fi.id = li.fee_item_id
+    WHERE i.student_id = CAST(:student_id AS uuid)
+      AND i.school_id = CAST(:school_id AS uuid)
+      AND i.academic_year_id = CAST(:academic_year_id AS uuid)
+      AND {OPEN_INVOICE_FILTER}
+    GROUP BY i.id, i.outstanding_amount, i.due_date
+    ORDER BY i.due_date, i.id
+""")
+
+
+@dataclass(frozen=True)
+class FeeCategoryClass:
+    """A fee category and the restriction classes it belongs to"""
+    id: str
+    name: str
+    description: Optional[str]
+    code: Optional[str]
+    restrictions: int
+
+
+@dataclass(frozen=True)
+class StudentRestriction:
+    """A student's outstanding fees and restriction bitmap for one academic year"""
+    student_id: str
+    total_outstanding: Decimal = Decimal('0.00')
+    outstanding_invoices: int = 0
+    restrictions: int = 0
+
+    @property
+    def is_restricted(self) -> bool:
+        return self.total_outstanding > RESTRICTION_THRESHOLD
+
+    @property
+    def restriction_level(self) -> str:
+        return 'high' if self.total_outstanding > HIGH_RESTRICTION_THRESHOLD else 'medium'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'student_id': self.student_id,
+            'total_outstanding': float(self.total_outstanding),
+            'outstanding_invoices': self.outstanding_invoices,
+            'restrictions': restriction_names(self.restrictions),
+            'restriction_level': self.restriction_level,
+        }
+
+
+def classify_fee_category(name: Optional[str]) -> int:
+    """Restriction bits for a fee category name"""
+    name = (name or '').lower()
+    bits = 0
+    for bit, keywords in RESTRICTION_KEYWORDS:
+        if any(keyword in name for keyword in keywords):
+            bits |= bit
+    return bits
+
+
+def restriction_names(bits: int) -> List[str]:
+    """Names of the restriction classes set in a bitmap"""
+    return [name for bit, name in RESTRICTION_NAMES if bits & bit]
+
+
+class RestrictionCache:
+    """
+    In-process LRU/TTL cache of classified fee categories and student bitmaps
+
+    Categories are held per school; bitmaps per (school, academic year,
+    student). Payment allocation drops the bitmaps of the students it paid
+    for; the TTL bounds staleness from new invoices and missed messages.
+    """
+
+    def __init__(self, max_entries: int = 50000, ttl: float = 60.0, category_ttl: float = 300.0):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of student bitmaps held before LRU eviction
+            ttl: Seconds a student bitmap stays valid
+            category_ttl: Seconds a school's classified categories stay valid
+        """
+        # Categories are one small entry per school, so their bound is the student one
+        self._students = LocalCache(max_entries, ttl)
+        self._categories = LocalCache(max_entries, category_ttl)
+
+    def get_categories(self, school_id: Any) -> Optional[List[FeeCategoryClass]]:
+        """Get a school's classified categories, or None on miss/expiry"""
+        return self._categories.get(str(school_id))
+
+    def set_categories(self, school_id: Any, categories: List[FeeCategoryClass]) -> None:
+        self._categories.set(str(school_id), categories)
+
+    def invalidate_categories(self, school_id: Any) -> None:
+        self._categories.invalidate(keys=[str(school_id)])
+
+    def get(self, school_id: Any, academic_year_id: Any, student_id: Any) -> Optional[StudentRestriction]:
+        """Get a student's cached bitmap, or None on miss/expiry"""
+        return self._students.get((str(school_id), str(academic_year_id), str(student_id)))
+
+    def set(self, school_id: Any, academic_year_id: Any, restriction: StudentRestriction) -> None:
+        """Cache a student's bitmap, evicting the oldest entries if full"""
+        key = (str(school_id), str(academic_year_id), restriction.student_id)
+        self._students.set(key, restriction, groups=[restriction.student_id])
+
+    def invalidate_students(self, student_ids: Iterable[Any]) -> int:
+        """Drop every cached bitmap for the given students"""
+        return self._students.invalidate(groups=student_ids)
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)"""
+        self._students.clear()
+        self._categories.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for monitoring"""
+        return {**self._students.stats(), "schools": len(self._categories)}
+
+
+restriction_cache = RestrictionCache(
+    max_entries=int(os.getenv("RESTRICTION_CACHE_MAX_ENTRIES", "50000")),
+    ttl=float(os.getenv("RESTRICTION_CACHE_TTL_SECONDS", "60")),
+    category_ttl=float(os.getenv("RESTRICTION_CATEGORY_TTL_SECONDS", "300")),
+)
+
+
+class PaymentRestrictionEngine:
+    """
+    Evaluates fee-based academic restrictions
+
+    Fee categories are classified into restriction bits once per school and
+    cached, so a class or a whole school is evaluated by one grouped
+    statement that ORs together the bits of every category a student still
+    owes on. Single-student checks read the per-student bitmap cache first.
+    """
+
+    def __init__(self, cache: RestrictionCache = restriction_cache):
+        self.cache = cache
+
+    async def get_fee_categories(self, db: AsyncSession, school_id: Any) -> List[FeeCategoryClass]:
+        """A school's active fee categories with their restriction bits"""
+        categories = self.cache.get_categories(school_id)
+        if categories is not None:
+            return categories
+
+        rows = await db.execute(FEE_CATEGORIES_SQL, {"school_id": str(school_id)})
+        categories = [
+            FeeCategoryClass(
+                id=str(row.id),
+                name=row.name,
+                description=row.description,
+                code=row.code,
+                restrictions=classify_fee_category(row.name),
+            )
+            for row in rows
+        ]
+        self.cache.set_categories(school_id, categories)
+        return categories
+
+    async def evaluate(
+        self,
+        db: AsyncSession,
+        school_id: Any,
+        academic_year_id: Any,
+        class_id: Optional[Any] = None,
+        student_ids: Optional[List[Any]] = None,
+    ) -> Dict[str, StudentRestriction]:
+        """
+        Compute restriction bitmaps in one statement and refresh the cache
+
+        Args:
+            db: Database session
+            school_id: School ID
+            academic_year_id: Academic year the invoices belong to
+            class_id: Limit to students currently in this class
+            student_ids: Limit to these students; those without open
+                invoices are cached as unrestricted
+
+        Returns:
+            Bitmaps of students with open invoices, keyed by student ID
+        """
+        categories = [category for category in await self.get_fee_categories(db, school_id)
+                      if category.restrictions]
+        rows = await db.execute(RESTRICTIONS_SQL, {
+            "school_id": str(school_id),
+            "academic_year_id": str(academic_year_id),
+            "class_id": None if class_id is None else str(class_id),
+            "student_ids": None if student_ids is None else [str(student_id) for student_id in student_ids],
+            "category_ids": [category.id for category in categories],
+            "category_bits": [category.restrictions for category in categories],
+        })
+
+        evaluated = {
+            str(row.student_id): StudentRestriction(
+                student_id=str(row.student_id),
+                total_outstanding=row.total_outstanding,
+                outstanding_invoices=row.outstanding_invoices,
+                restrictions=row.restrictions,
+            )
+            for row in rows
+        }
+        for student_id in student_ids or ():
+            evaluated.setdefault(str(student_id), StudentRestriction(student_id=str(student_id)))
+
+        for restriction in evaluated.values():
+            self.cache.set(school_id, academic_year_id, restriction)
+        return evaluated
+
+    async def get_student_restriction(
+        self,
+        db: AsyncSession,
+        student_id: Any,
+        school_id: Any,
+        academic_year_id: Any,
+    ) -> StudentRestriction:
+        """A student's bitmap, from the cache when fresh"""
+        cached = self.cache.get(school_id, academic_year_id, student_id)
+        if cached is not None:
+            return cached
+
+        evaluated = await self.evaluate(db, school_id, academic_year_id, student_ids=[student_id])
+        return evaluated[str(student_id)]
+
+    async def get_open_invoices(
+        self,
+        db: AsyncSession,
+        student_id: Any,
+        school_id: Any,
+        academic_year_id: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        A student's open invoices with their fee category IDs
+
+        Skips the query when the cached bitmap shows nothing outstanding.
+        """
+        restriction = await self.get_student_restriction(db, student_id, school_id, academic_year_id)
+        if not restriction.outstanding_invoices:
+            return []
+
+        rows = await db.execute(STUDENT_OPEN_INVOICES_SQL, {
+            "student_id": str(student_id),
+            "school_id": str(school_id),
+            "academic_year_id": str(academic_year_id),
+        })
+        return [
+            {
+                'invoice_id': str(row.id),
+                'amount': row.outstanding_amount,
+                'due_date': row.due_date,
+                'fee_category_ids': {str(category_id) for category_id in row.fee_category_ids},
+            }
+            for row in rows
+        ]
+
+
+payment_restriction_engine = PaymentRestrictionEngine()
+
+
+# =====================================================
+# INVALIDATION
+# =====================================================
+
+async def invalidate_student_restrictions(student_ids: Iterable[Any]) -> None:
+    """
+    Drop students' bitmaps everywhere after a payment is allocated
+
+    Drops local entries immediately and publishes on
+    RESTRICTION_INVALIDATION_CHANNEL so other workers drop theirs.
+    """
+    student_ids = sorted({str(student_id) for student_id in student_ids})
+    if not student_ids:
+        return
+    restriction_cache.invalidate_students(student_ids)
+
+    client = get_redis_client()
+    if client is None:
+        return
+
+    try:
+        await client.publish(RESTRICTION_INVALIDATION_CHANNEL, json.dumps({"student_ids": student_ids}))
+    except Exception as e:
+        logger.warning(f"Failed to publish restriction invalidation for {len(student_ids)} students: {e}")
+
+
+def handle_restriction_invalidation_message(data: Any) -> None:
+    """Apply a pub/sub invalidation payload to the local cache"""
+    try:
+        if isinstance(data, bytes):
+            data = data.decode()
+        student_ids = json.loads(data)["student_ids"]
+    except (ValueError, TypeError, KeyError) as e:
+        logger.warning(f"Ignoring malformed restriction invalidation message: {e}")
+        return
+
+    restriction_cache.invalidate_students(student_ids)
+
+
+async def listen_for_restriction_invalidations() -> None:
+    """Apply messages on RESTRICTION_INVALIDATION_CHANNEL until cancelled"""
+    # Missed messages would leave stale bitmaps, so each reconnect starts from empty
+    await listen_forever(RESTRICTION_INVALIDATION_CHANNEL, handle_restriction_invalidation_message, on_gap=restriction_cache.clear)
@@ -9,6 +9,7 @@ from uuid import UUID
 from datetime import datetime
 
 from shared.auth import get_current_active_user, EnhancedUser, require_permission, require_feature
+from shared.pagination import CountMode
 from ..schemas import (
     InvoiceCreate, InvoiceUpdate, InvoiceResponse,
     BulkInvoiceGenerationRequest, BulkInvoiceGenerationResponse,
@@ -28,6 +29,8 @@ router = APIRouter(prefix="/invoices", tags=["invoices"])
 async def get_invoices(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    count: CountMode = Query(CountMode.CACHED, description="Total count: none, estimated, exact or cached"),
     student_id: Optional[UUID] = Query(None, description="Filter by student ID"),
     grade_level: Optional[int] = Query(None, ge=1, le=13, description="Filter by grade level"),
     class_id: Optional[UUID] = Query(None, description="Filter by class ID"),
@@ -58,7 +61,9 @@ async def get_invoices(
         amount_max=amount_max
     )
     
-    result = await InvoiceCRUD.get_invoices(current_user.school_id, filters, page, page_size)
+    result = await InvoiceCRUD.get_invoices(
+        current_user.school_id, filters, page, page_size, cursor=cursor, count_mode=count
+    )
     
     # Track feature usage
     await track_feature_usage(current_user.school_id, "invoice_management", "list_invoices")
@@ -11,6 +11,7 @@ from datetime import datetime
 import logging
 
 from shared.auth import get_current_active_user, EnhancedUser, require_permission, require_feature
+from shared.pagination import CountMode
 from ..schemas import (
     PaymentCreate, PaymentUpdate, PaymentResponse,
     PaymentMethodCreate, PaymentMethodUpdate, PaymentMethodResponse,
@@ -90,6 +91,8 @@ async def update_payment_method(
 async def get_payments(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    count: CountMode = Query(CountMode.CACHED, description="Total count: none, estimated, exact or cached"),
     student_id: Optional[UUID] = Query(None, description="Filter by student ID"),
     payment_method_id: Optional[UUID] = Query(None, description="Filter by payment method"),
     status: Optional[str] = Query(None, description="Filter by status"),
@@ -116,7 +119,9 @@ async def get_payments(
         reconciled=reconciled
     )
     
-    result = await PaymentCRUD.get_payments(current_user.school_id, filters, page, page_size)
+    result = await PaymentCRUD.get_payments(
+        current_user.school_id, filters, page, page_size, cursor=cursor, count_mode=count
+    )
     
     # Track feature usage
     await track_feature_usage(current_user.school_id, "payment_processing", "list_payments")
@@ -517,10 +522,9 @@ async def bulk_reconcile_payments(
     Automatically validates school context.
     """
     # Verify all payments exist and belong to school
-    for payment_id in payment_ids:
-        payment = await PaymentCRUD.get_payment_by_id(payment_id, current_user.school_id)
-        if not payment:
-            raise HTTPException(status_code=404, detail=f"Payment {payment_id} not found")
+    missing = await PaymentCRUD.find_missing_payments(payment_ids, current_user.school_id)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Payment {missing[0]} not found")
     
     # Add to background task
     background_tasks.add_task(
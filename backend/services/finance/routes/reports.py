@@ -3,7 +3,7 @@
 # File: backend/services/finance/routes/reports.py
 # =====================================================
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional, Dict, Any
 from uuid import UUID
 from datetime import datetime, date
@@ -15,6 +15,7 @@ from ..schemas import (
     CollectionReportRequest, CollectionReportResponse
 )
 from ..crud import FinancialReportingCRUD
+from shared.exports import EXPORT_FORMATS, export_response
 
 router = APIRouter(prefix="/reports", tags=["financial-reports"])
 
@@ -374,18 +375,19 @@ async def get_collection_rate_forecast(
 async def export_collection_report(
     start_date: str = Query(..., description="Start date (YYYY-MM-DD)"),
     end_date: str = Query(..., description="End date (YYYY-MM-DD)"),
-    format: str = Query("csv", description="Export format (csv, xlsx, pdf)"),
+    format: str = Query("csv", description="Export format (csv, xlsx)"),
+    spool: bool = Query(False, description="Build the whole file before sending it (very large exports)"),
     current_user: EnhancedUser = Depends(get_current_active_user)
 ):
     """
     Export collection report in specified format.
     Automatically filtered by school context.
     """
-    if format not in ["csv", "xlsx", "pdf"]:
+    if format not in EXPORT_FORMATS:
         raise HTTPException(status_code=400, detail="Invalid export format")
     
-    # Generate export file
-    file_content, filename, media_type = await FinancialReportingCRUD.export_collection_report(
+    # Stream export file
+    chunks, filename, media_type = FinancialReportingCRUD.export_collection_report(
         current_user.school_id,
         start_date,
         end_date,
@@ -395,29 +397,26 @@ async def export_collection_report(
     # Track feature usage
     await track_feature_usage(current_user.school_id, "financial_reporting", f"export_{format}")
     
-    return Response(
-        content=file_content,
-        media_type=media_type,
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return await export_response(chunks, filename, media_type, spool_to_file=spool)
 
 @router.get("/export/outstanding-balances")
 @require_permission("finance.read")
 @require_feature("finance_module")
 async def export_outstanding_balances(
-    format: str = Query("csv", description="Export format (csv, xlsx, pdf)"),
+    format: str = Query("csv", description="Export format (csv, xlsx)"),
     grade_level: Optional[int] = Query(None, ge=1, le=13, description="Filter by grade level"),
+    spool: bool = Query(False, description="Build the whole file before sending it (very large exports)"),
     current_user: EnhancedUser = Depends(get_current_active_user)
 ):
     """
     Export outstanding balances report.
     Automatically filtered by school context.
     """
-    if format not in ["csv", "xlsx", "pdf"]:
+    if format not in EXPORT_FORMATS:
         raise HTTPException(status_code=400, detail="Invalid export format")
     
-    # Generate export file
-    file_content, filename, media_type = await FinancialReportingCRUD.export_outstanding_balances(
+    # Stream export file
+    chunks, filename, media_type = FinancialReportingCRUD.export_outstanding_balances(
         current_user.school_id,
         format,
         grade_level
@@ -426,11 +425,7 @@ async def export_outstanding_balances(
     # Track feature usage
     await track_feature_usage(current_user.school_id, "financial_reporting", f"export_outstanding_{format}")
     
-    return Response(
-        content=file_content,
-        media_type=media_type,
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return await export_response(chunks, filename, media_type, spool_to_file=spool)
 
 @router.get("/export/student-statements")
 @require_permission("finance.read")
@@ -438,14 +433,15 @@ async def export_outstanding_balances(
 async def export_student_statements(
     student_ids: List[UUID] = Query(..., description="Student IDs to generate statements for"),
     academic_year_id: Optional[UUID] = Query(None, description="Academic year filter"),
-    format: str = Query("pdf", description="Export format (pdf)"),
+    format: str = Query("csv", description="Export format (csv, xlsx)"),
+    spool: bool = Query(False, description="Build the whole file before sending it (very large exports)"),
     current_user: EnhancedUser = Depends(get_current_active_user)
 ):
     """
     Export student financial statements.
     Automatically validates school context.
     """
-    if format not in ["pdf"]:
+    if format not in EXPORT_FORMATS:
         raise HTTPException(status_code=400, detail="Invalid export format")
     
     # Verify all students belong to current school
@@ -455,8 +451,8 @@ async def export_student_statements(
         if not student:
             raise HTTPException(status_code=404, detail=f"Student {student_id} not found")
     
-    # Generate statements
-    file_content, filename, media_type = await FinancialReportingCRUD.export_student_statements(
+    # Stream statements
+    chunks, filename, media_type = FinancialReportingCRUD.export_student_statements(
         student_ids,
         current_user.school_id,
         academic_year_id,
@@ -466,11 +462,7 @@ async def export_student_statements(
     # Track feature usage
     await track_feature_usage(current_user.school_id, "financial_reporting", f"export_statements_{format}")
     
-    return Response(
-        content=file_content,
-        media_type=media_type,
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return await export_response(chunks, filename, media_type, spool_to_file=spool)
 
 # =====================================================
 # SCHEDULED REPORTS
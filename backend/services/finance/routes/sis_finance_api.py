@@ -13,7 +13,8 @@ import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from shared.database import get_async_session
-from shared.auth import get_current_active_user, PlatformUser
+from shared.auth import get_current_active_user
+from shared.models.platform_user import PlatformUser
 from shared.middleware.tenant_middleware import get_tenant_context, TenantContext
 
 from ..integrations.sis_integration import FinanceSISIntegration
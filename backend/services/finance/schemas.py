@@ -423,6 +423,7 @@ class BulkInvoiceGenerationRequest(BaseModel):
     due_date: date = Field(..., description="Invoice due date")
     academic_year_id: UUID = Field(..., description="Academic year ID")
     term_id: Optional[UUID] = Field(None, description="Term ID")
+    resume_after_student_id: Optional[UUID] = Field(None, description="Checkpoint of an interrupted run to resume after (optional)")
     
     @validator('due_date')
     def validate_due_date(cls, v):
@@ -448,6 +449,8 @@ class BulkInvoiceGenerationResponse(BaseModel):
     total_amount: Decimal
     failed_students: List[Dict[str, str]] = []
     invoice_ids: List[UUID] = []
+    operation_id: Optional[str] = None
+    checkpoint_student_id: Optional[UUID] = None
 
 # =====================================================
 # PAYMENT SCHEMAS
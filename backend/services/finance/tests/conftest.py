@@ -108,7 +108,9 @@ async def cleanup_test_data(db_session: AsyncSession):
         "finance.fee_structures",
         "finance.fee_categories",
         "finance.payment_methods",
-        "finance.financial_summaries"
+        "finance.financial_summaries",
+        "finance.invoice_daily_rollups",
+        "finance.payment_daily_rollups"
     ]
     
     for table in tables:
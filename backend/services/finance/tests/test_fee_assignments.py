@@ -0,0 +1,123 @@
+"""
+Integration tests for bulk fee structure assignment
+Tests the set-based assignment statement against the active-only unique index
+"""
+
+import pytest
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import patch
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from backend.services.finance.crud import StudentFeeAssignmentCRUD
+
+
+@pytest.fixture
+async def assignment_session(db_session: AsyncSession):
+    """Session that skips foreign key checks, so students need no SIS rows"""
+    # Unique indexes are still enforced; only the foreign key triggers are skipped
+    await db_session.execute(text("SET LOCAL session_replication_role = replica"))
+    return db_session
+
+
+@asynccontextmanager
+async def session_connection(session):
+    """Serve CRUD calls from the test transaction's asyncpg connection"""
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    yield raw.driver_connection
+
+
+@pytest.fixture
+def crud(assignment_session):
+    with patch(
+        "backend.services.finance.crud.get_database_connection",
+        lambda *args: session_connection(assignment_session),
+    ):
+        yield StudentFeeAssignmentCRUD
+
+
+@pytest.fixture
+def fee_structure_id():
+    return uuid4()
+
+
+@pytest.fixture
+def current_user():
+    return SimpleNamespace(id=uuid4(), school_id=uuid4())
+
+
+async def insert_assignment(session, student_id, fee_structure_id, assigned_by, status):
+    await session.execute(
+        text("""
+            INSERT INTO finance.student_fee_assignments
+            (student_id, fee_structure_id, effective_from, status, assigned_by)
+            VALUES (:student_id, :fee_structure_id, CURRENT_DATE, :status, :assigned_by)
+        """),
+        {"student_id": student_id, "fee_structure_id": fee_structure_id,
+         "status": status, "assigned_by": assigned_by},
+    )
+
+
+async def assignment_statuses(session, student_id, fee_structure_id):
+    result = await session.execute(
+        text("""
+            SELECT status FROM finance.student_fee_assignments
+            WHERE student_id = :student_id AND fee_structure_id = :fee_structure_id
+            ORDER BY status
+        """),
+        {"student_id": student_id, "fee_structure_id": fee_structure_id},
+    )
+    return list(result.scalars())
+
+
+class TestBulkAssign:
+    """Test StudentFeeAssignmentCRUD.bulk_assign"""
+
+    @pytest.mark.asyncio
+    async def test_new_students_assigned(self, crud, assignment_session, fee_structure_id, current_user):
+        """Test students without an assignment are all assigned in one call"""
+        students = [uuid4(), uuid4()]
+
+        result = await crud.bulk_assign(fee_structure_id, students, current_user)
+
+        assert result["assigned_student_ids"] == [str(s) for s in students]
+        assert result["total_skipped"] == 0
+        for student_id in students:
+            assert await assignment_statuses(assignment_session, student_id, fee_structure_id) == ["active"]
+
+    @pytest.mark.asyncio
+    async def test_active_assignment_skipped(self, crud, assignment_session, fee_structure_id, current_user):
+        """Test an already active student, and repeats of an ID, are skipped"""
+        active, new = uuid4(), uuid4()
+        await insert_assignment(assignment_session, active, fee_structure_id, current_user.id, "active")
+
+        result = await crud.bulk_assign(fee_structure_id, [active, new, new], current_user)
+
+        assert result["assigned_student_ids"] == [str(new)]
+        assert result["skipped_student_ids"] == [str(active), str(new)]
+        assert await assignment_statuses(assignment_session, active, fee_structure_id) == ["active"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_assignment_reassigned(self, crud, assignment_session, fee_structure_id, current_user):
+        """Test a student whose earlier assignment was cancelled gets a new active one"""
+        student_id = uuid4()
+        await insert_assignment(assignment_session, student_id, fee_structure_id, current_user.id, "cancelled")
+
+        result = await crud.bulk_assign(fee_structure_id, [student_id], current_user)
+
+        assert result["assigned_student_ids"] == [str(student_id)]
+        assert result["total_skipped"] == 0
+        assert await assignment_statuses(assignment_session, student_id, fee_structure_id) == ["active", "cancelled"]
+
+    @pytest.mark.asyncio
+    async def test_second_active_assignment_rejected(self, assignment_session, fee_structure_id, current_user):
+        """Test the partial index still allows only one active assignment"""
+        student_id = uuid4()
+        await insert_assignment(assignment_session, student_id, fee_structure_id, current_user.id, "active")
+
+        with pytest.raises(Exception, match="idx_student_assignments_active_unique"):
+            async with assignment_session.begin_nested():
+                await insert_assignment(assignment_session, student_id, fee_structure_id, current_user.id, "active")
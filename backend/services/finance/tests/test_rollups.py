@@ -0,0 +1,303 @@
+"""
+Integration tests for the finance daily rollups
+Tests the statement triggers on invoices and payments and the reports that
+read the rollup tables
+"""
+
+import pytest
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from backend.services.finance.crud import FinancialReportingCRUD
+
+ROLLUP_TRIGGERS = {
+    "finance.invoices": ("invoice_rollups_insert", "invoice_rollups_update", "invoice_rollups_delete"),
+    "finance.payments": ("payment_rollups_insert", "payment_rollups_update", "payment_rollups_delete"),
+}
+
+TODAY = date.today()
+
+
+@pytest.fixture
+async def rollup_session(db_session: AsyncSession):
+    """Session that skips foreign key checks but still fires the rollup triggers"""
+    # The test transaction is rolled back, so these settings never outlive the test
+    await db_session.execute(text("SET LOCAL session_replication_role = replica"))
+    for table, triggers in ROLLUP_TRIGGERS.items():
+        for trigger in triggers:
+            await db_session.execute(text(f"ALTER TABLE {table} ENABLE ALWAYS TRIGGER {trigger}"))
+    return db_session
+
+
+@pytest.fixture
+def refs():
+    return {
+        "school_id": uuid4(),
+        "academic_year_id": uuid4(),
+        "student_id": uuid4(),
+        "user_id": uuid4(),
+        "payment_method_id": uuid4(),
+    }
+
+
+async def insert_invoices(session, refs, amounts, invoice_date=TODAY, status="pending"):
+    await session.execute(
+        text("""
+            INSERT INTO finance.invoices (
+                school_id, student_id, invoice_number, invoice_date, due_date, academic_year_id,
+                subtotal, total_amount, outstanding_amount, payment_status, created_by
+            )
+            SELECT :school_id, :student_id, 'INV-' || gen_random_uuid(), :invoice_date, :invoice_date,
+                   :academic_year_id, a, a, a, :status, :user_id
+            FROM unnest(CAST(:amounts AS numeric[])) AS a
+        """),
+        {**refs, "invoice_date": invoice_date, "status": status, "amounts": amounts},
+    )
+
+
+async def insert_payments(session, refs, amounts, status="completed", payment_date=TODAY):
+    await session.execute(
+        text("""
+            INSERT INTO finance.payments (
+                school_id, student_id, payment_reference, payment_date, payment_method_id, amount, status
+            )
+            SELECT :school_id, :student_id, 'PAY-' || gen_random_uuid(), :payment_date,
+                   :payment_method_id, a, :status
+            FROM unnest(CAST(:amounts AS numeric[])) AS a
+        """),
+        {**refs, "payment_date": payment_date, "status": status, "amounts": amounts},
+    )
+
+
+async def invoice_totals(session, refs):
+    result = await session.execute(
+        text("""
+            SELECT rollup_date, SUM(invoice_count) AS invoice_count,
+                   SUM(invoiced_amount) AS invoiced_amount, SUM(paid_amount) AS paid_amount,
+                   SUM(outstanding_amount) AS outstanding_amount, SUM(overdue_count) AS overdue_count
+            FROM finance.invoice_daily_rollups
+            WHERE school_id = :school_id
+            GROUP BY rollup_date
+            ORDER BY rollup_date
+        """),
+        refs,
+    )
+    return [dict(row._mapping) for row in result]
+
+
+async def payment_totals(session, refs):
+    result = await session.execute(
+        text("""
+            SELECT status, SUM(payment_count) AS payment_count, SUM(amount) AS amount
+            FROM finance.payment_daily_rollups
+            WHERE school_id = :school_id
+            GROUP BY status
+            HAVING SUM(payment_count) <> 0
+            ORDER BY status
+        """),
+        refs,
+    )
+    return [tuple(row) for row in result]
+
+
+@asynccontextmanager
+async def session_connection(session):
+    """Serve reports from the test transaction's asyncpg connection"""
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    yield raw.driver_connection
+
+
+class TestInvoiceRollups:
+    """Test finance.invoices writes keep invoice_daily_rollups current"""
+
+    @pytest.mark.asyncio
+    async def test_multi_row_insert_folds_into_one_day(self, rollup_session, refs):
+        """Test one statement inserting several invoices adds their totals"""
+        await insert_invoices(rollup_session, refs, [100, 250])
+
+        totals, = await invoice_totals(rollup_session, refs)
+        assert totals["invoice_count"] == 2
+        assert totals["invoiced_amount"] == Decimal("350.00")
+        assert totals["outstanding_amount"] == Decimal("350.00")
+
+    @pytest.mark.asyncio
+    async def test_update_applies_net_change(self, rollup_session, refs):
+        """Test a payment moving paid/outstanding amounts leaves the count alone"""
+        await insert_invoices(rollup_session, refs, [100, 100])
+        await rollup_session.execute(
+            text("""
+                UPDATE finance.invoices
+                SET paid_amount = 40, outstanding_amount = 60, payment_status = 'partial'
+                WHERE school_id = :school_id
+            """),
+            refs,
+        )
+
+        totals, = await invoice_totals(rollup_session, refs)
+        assert totals["invoice_count"] == 2
+        assert totals["paid_amount"] == Decimal("80.00")
+        assert totals["outstanding_amount"] == Decimal("120.00")
+
+    @pytest.mark.asyncio
+    async def test_overdue_and_delete(self, rollup_session, refs):
+        """Test overdue counts follow status changes and deletes subtract"""
+        await insert_invoices(rollup_session, refs, [100])
+        await insert_invoices(rollup_session, refs, [50], invoice_date=TODAY - timedelta(days=1), status="overdue")
+        await rollup_session.execute(
+            text("DELETE FROM finance.invoices WHERE school_id = :school_id AND invoice_date = CURRENT_DATE"),
+            refs,
+        )
+
+        yesterday, today = await invoice_totals(rollup_session, refs)
+        assert (yesterday["invoice_count"], yesterday["overdue_count"]) == (1, 1)
+        assert (today["invoice_count"], today["invoiced_amount"]) == (0, Decimal("0.00"))
+
+    @pytest.mark.asyncio
+    async def test_rows_written_in_session_bucket(self, rollup_session, refs):
+        """Test trigger upserts land in this session's bucket"""
+        await insert_invoices(rollup_session, refs, [100])
+
+        buckets = (await rollup_session.execute(
+            text("SELECT DISTINCT bucket FROM finance.invoice_daily_rollups WHERE school_id = :school_id"),
+            refs,
+        )).scalars().all()
+        expected = (await rollup_session.execute(text("SELECT finance.rollup_bucket()"))).scalar()
+        assert buckets == [expected]
+
+    @pytest.mark.asyncio
+    async def test_rebuild_matches_triggers(self, rollup_session, refs):
+        """Test rebuild_daily_rollups reproduces the trigger-maintained totals"""
+        await insert_invoices(rollup_session, refs, [100, 20])
+        await insert_invoices(rollup_session, refs, [70], invoice_date=TODAY - timedelta(days=3))
+        await insert_payments(rollup_session, refs, [30, 45])
+        maintained = (await invoice_totals(rollup_session, refs), await payment_totals(rollup_session, refs))
+
+        await rollup_session.execute(text("SELECT finance.rebuild_daily_rollups(:school_id)"), refs)
+
+        assert (await invoice_totals(rollup_session, refs), await payment_totals(rollup_session, refs)) == maintained
+
+
+class TestPaymentRollups:
+    """Test finance.payments writes keep payment_daily_rollups current"""
+
+    @pytest.mark.asyncio
+    async def test_status_change_moves_totals(self, rollup_session, refs):
+        """Test completing pending payments moves them between status rows"""
+        await insert_payments(rollup_session, refs, [10, 20, 30], status="pending")
+        await rollup_session.execute(
+            text("UPDATE finance.payments SET status = 'completed' WHERE school_id = :school_id AND amount < 30"),
+            refs,
+        )
+
+        assert await payment_totals(rollup_session, refs) == [
+            ("completed", 2, Decimal("30.00")),
+            ("pending", 1, Decimal("30.00")),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_unrelated_update_writes_nothing(self, rollup_session, refs):
+        """Test an update touching no rolled-up column leaves the rollups alone"""
+        await insert_payments(rollup_session, refs, [10])
+        # A rewritten row gets a new tuple location, even within one transaction
+        before = (await rollup_session.execute(
+            text("SELECT ctid::text FROM finance.payment_daily_rollups WHERE school_id = :school_id"), refs
+        )).scalar()
+
+        await rollup_session.execute(
+            text("UPDATE finance.payments SET notes = 'checked' WHERE school_id = :school_id"), refs
+        )
+
+        after = (await rollup_session.execute(
+            text("SELECT ctid::text FROM finance.payment_daily_rollups WHERE school_id = :school_id"), refs
+        )).scalar()
+        assert after == before
+
+
+class TestRollupReports:
+    """Test the reports read rollups summed across buckets"""
+
+    @pytest.fixture
+    def reports(self, rollup_session):
+        with patch(
+            "backend.services.finance.crud.get_database_connection",
+            lambda workload: session_connection(rollup_session),
+        ):
+            yield FinancialReportingCRUD
+
+    @pytest.fixture
+    async def spread_rollups(self, rollup_session, refs):
+        """Trigger-maintained rows plus rows another session left in other buckets"""
+        await insert_invoices(rollup_session, refs, [100, 50])
+        await insert_payments(rollup_session, refs, [40])
+        await insert_payments(rollup_session, refs, [15], status="pending")
+        await rollup_session.execute(
+            text("""
+                INSERT INTO finance.invoice_daily_rollups (
+                    school_id, academic_year_id, rollup_date, bucket,
+                    invoice_count, invoiced_amount, paid_amount, outstanding_amount, overdue_count
+                ) VALUES (:school_id, :academic_year_id, CURRENT_DATE, 99, 1, 200, 60, 140, 1)
+            """),
+            refs,
+        )
+        await rollup_session.execute(
+            text("""
+                INSERT INTO finance.payment_daily_rollups (
+                    school_id, rollup_date, payment_method_id, status, bucket, payment_count, amount
+                ) VALUES (:school_id, CURRENT_DATE, :payment_method_id, 'completed', 99, 1, 60)
+            """),
+            refs,
+        )
+
+    @pytest.mark.asyncio
+    async def test_dashboard_summary(self, reports, refs, spread_rollups):
+        """Test totals, counts and collection rate combine every bucket"""
+        summary = await reports.get_dashboard_summary(refs["school_id"])
+
+        assert summary["total_invoiced"] == Decimal("350.00")
+        assert summary["total_collected"] == Decimal("60.00")
+        assert summary["total_outstanding"] == Decimal("290.00")
+        assert summary["overdue_invoices"] == 1
+        assert summary["pending_payments"] == 1
+        assert summary["collection_rate"] == Decimal("60.00") / Decimal("350.00") * 100
+
+    @pytest.mark.asyncio
+    async def test_collection_summary(self, reports, refs, spread_rollups):
+        """Test completed payments in the range are totalled with their average"""
+        summary = await reports.get_collection_summary(refs["school_id"])
+
+        assert summary["total_collected"] == Decimal("100.00")
+        assert summary["payment_count"] == 2
+        assert summary["average_payment"] == Decimal("50.00")
+
+    @pytest.mark.asyncio
+    async def test_outstanding_by_academic_year(self, reports, refs, spread_rollups):
+        """Test outstanding balances are grouped per academic year"""
+        summary = await reports.get_outstanding_balances_summary(refs["school_id"])
+
+        assert summary["total_outstanding"] == Decimal("290.00")
+        assert summary["invoice_count"] == 3
+        year, = summary["by_academic_year"]
+        assert year["academic_year_id"] == refs["academic_year_id"]
+
+    @pytest.mark.asyncio
+    async def test_payment_method_usage(self, reports, refs, spread_rollups, rollup_session):
+        """Test completed payments are broken down per method"""
+        await rollup_session.execute(
+            text("""
+                INSERT INTO finance.payment_methods (id, school_id, name, code, type)
+                VALUES (:payment_method_id, :school_id, 'Cash', 'CASH', 'cash')
+            """),
+            refs,
+        )
+
+        usage = await reports.get_payment_method_usage(refs["school_id"])
+
+        method, = usage["methods"]
+        assert (method["payment_method_name"], method["payment_count"], method["amount"]) == ("Cash", 2, Decimal("100.00"))
+        assert method["percentage"] == Decimal("100")
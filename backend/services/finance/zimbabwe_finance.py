@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func, text
 from sqlalchemy.orm import selectinload
 
+from shared.identifiers import PAYMENT_REFERENCE, TERM_INVOICE_NUMBER, next_identifier
 from .models import (
     FeeStructure, FeeStructureItem, Invoice, InvoiceItem, Payment, 
     PaymentMethodConfig, StudentAccount, FinancialPeriod
@@ -356,21 +357,10 @@ class ZimbabweFinanceManager:
     async def _generate_invoice_number(self, academic_year: str, term_number: int) -> str:
         """Generate unique invoice number for Zimbabwe format"""
         
-        # Get count of invoices for this term
-        count_result = await self.db.execute(
-            select(func.count(Invoice.id))
-            .where(
-                and_(
-                    Invoice.school_id == self.school_id,
-                    Invoice.academic_year == academic_year,
-                    Invoice.term_number == term_number
-                )
-            )
-        )
-        count = count_result.scalar() + 1
-        
         # Format: ZW-2024-T1-0001
-        return f"ZW-{academic_year}-T{term_number}-{count:04d}"
+        return await next_identifier(
+            self.db, TERM_INVOICE_NUMBER, self.school_id, f"{academic_year}-T{term_number}"
+        )
     
     # =====================================================
     # ZIMBABWE PAYMENT PROCESSING
@@ -487,21 +477,10 @@ class ZimbabweFinanceManager:
     async def _generate_payment_reference(self) -> str:
         """Generate unique payment reference"""
         
-        # Get today's payment count
-        today = date.today()
-        count_result = await self.db.execute(
-            select(func.count(Payment.id))
-            .where(
-                and_(
-                    Payment.school_id == self.school_id,
-                    func.date(Payment.payment_date) == today
-                )
-            )
-        )
-        count = count_result.scalar() + 1
-        
         # Format: PAY-YYYYMMDD-0001
-        return f"PAY-{today.strftime('%Y%m%d')}-{count:04d}"
+        return await next_identifier(
+            self.db, PAYMENT_REFERENCE, self.school_id, date.today().strftime('%Y%m%d')
+        )
     
     async def _get_payment_method_config(self, payment_method: str) -> Dict[str, Any]:
         """Get payment method configuration"""
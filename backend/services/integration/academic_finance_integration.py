@@ -15,6 +15,9 @@ import logging
 from ..academic.models import Subject, Assessment, AttendanceSession
 from ..finance.models import FeeCategory, Invoice, Payment, StudentAccount
 from ..finance.schemas import PaymentStatus, InvoiceStatus
+from ..finance.restrictions import (
+    ASSESSMENT_ACCESS, CLASS_ACCESS, PRACTICAL_ACCESS, payment_restriction_engine
+)
 from shared.exceptions import NotFoundError, ValidationError, InsufficientFundsError
 
 logger = logging.getLogger(__name__)
@@ -71,114 +74,71 @@ class AcademicFinanceIntegration:
                     'required_fees': []
                 }
             
-            # Check for subject-specific fees
-            subject_fees_query = select(FeeCategory).where(
-                and_(
-                    FeeCategory.school_id == school_id,
-                    FeeCategory.academic_year_id == academic_year_id,
-                    FeeCategory.is_active == True,
-                    or_(
-                        FeeCategory.name.ilike(f'%{subject.name}%'),
-                        FeeCategory.description.ilike(f'%{subject.name}%'),
-                        and_(
-                            subject.is_practical == True,
-                            or_(
-                                FeeCategory.name.ilike('%practical%'),
-                                FeeCategory.name.ilike('%lab%')
-                            )
-                        )
-                    )
-                )
+            # Fee categories are classified once per school and cached;
+            # the subject's own categories are matched by name
+            categories = await payment_restriction_engine.get_fee_categories(self.db, school_id)
+            subject_name = subject.name.lower()
+            subject_fees = [
+                category for category in categories
+                if subject_name in category.name.lower()
+                or subject_name in (category.description or '').lower()
+                or (subject.is_practical and category.restrictions & PRACTICAL_ACCESS)
+            ]
+            category_names = {category.id: category.name for category in categories}
+            subject_fee_ids = {category.id for category in subject_fees}
+            tuition_ids = {category.id for category in categories if category.restrictions & CLASS_ACCESS}
+            lab_ids = {category.id for category in categories if category.restrictions & PRACTICAL_ACCESS}
+            
+            # The student's open invoices in one query, skipped when the
+            # cached restriction bitmap shows nothing outstanding
+            open_invoices = await payment_restriction_engine.get_open_invoices(
+                self.db, student_id, school_id, academic_year_id
             )
-            subject_fees_result = await self.db.execute(subject_fees_query)
-            subject_fees = subject_fees_result.scalars().all()
             
-            # Check payment status for subject-specific fees
+            # Outstanding subject-specific and tuition fees
             outstanding_fees = []
             total_outstanding = Decimal('0.00')
-            
-            for fee in subject_fees:
-                # Check if there's an unpaid invoice for this fee
-                invoice_query = select(Invoice).where(
-                    and_(
-                        Invoice.student_id == student_id,
-                        Invoice.school_id == school_id,
-                        Invoice.fee_category_id == fee.id,
-                        Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.OVERDUE]),
-                        Invoice.is_active == True
-                    )
-                )
-                invoice_result = await self.db.execute(invoice_query)
-                unpaid_invoice = invoice_result.scalar_one_or_none()
+            subject_specific_outstanding = False
+            lab_fees_outstanding = False
+            
+            for invoice in open_invoices:
+                subject_matches = invoice['fee_category_ids'] & subject_fee_ids
+                matches = subject_matches or invoice['fee_category_ids'] & tuition_ids
+                if not matches:
+                    continue
                 
-                if unpaid_invoice:
-                    outstanding_fees.append({
-                        'fee_category_id': str(fee.id),
-                        'fee_name': fee.name,
-                        'amount': float(unpaid_invoice.amount),
-                        'due_date': unpaid_invoice.due_date.isoformat() if unpaid_invoice.due_date else None,
-                        'invoice_id': str(unpaid_invoice.id)
-                    })
-                    total_outstanding += unpaid_invoice.amount
-            
-            # Check general tuition status
-            tuition_query = select(Invoice).where(
-                and_(
-                    Invoice.student_id == student_id,
-                    Invoice.school_id == school_id,
-                    Invoice.academic_year_id == academic_year_id,
-                    Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.OVERDUE]),
-                    Invoice.is_active == True
-                )
-            ).join(FeeCategory).where(
-                FeeCategory.name.ilike('%tuition%')
-            )
-            tuition_result = await self.db.execute(tuition_query)
-            tuition_invoices = tuition_result.scalars().all()
-            
-            # Add tuition fees to outstanding
-            for invoice in tuition_invoices:
-                if invoice.fee_category_id not in [fee['fee_category_id'] for fee in outstanding_fees]:
-                    fee_category_query = select(FeeCategory).where(FeeCategory.id == invoice.fee_category_id)
-                    fee_category_result = await self.db.execute(fee_category_query)
-                    fee_category = fee_category_result.scalar_one_or_none()
-                    
-                    outstanding_fees.append({
-                        'fee_category_id': str(invoice.fee_category_id),
-                        'fee_name': fee_category.name if fee_category else 'Tuition',
-                        'amount': float(invoice.amount),
-                        'due_date': invoice.due_date.isoformat() if invoice.due_date else None,
-                        'invoice_id': str(invoice.id)
-                    })
-                    total_outstanding += invoice.amount
+                fee_category_id = min(matches, key=lambda category_id: category_names[category_id])
+                outstanding_fees.append({
+                    'fee_category_id': fee_category_id,
+                    'fee_name': category_names[fee_category_id],
+                    'amount': float(invoice['amount']),
+                    'due_date': invoice['due_date'].isoformat() if invoice['due_date'] else None,
+                    'invoice_id': invoice['invoice_id']
+                })
+                total_outstanding += invoice['amount']
+                subject_specific_outstanding = subject_specific_outstanding or bool(subject_matches)
+                lab_fees_outstanding = lab_fees_outstanding or bool(invoice['fee_category_ids'] & lab_ids)
             
             # Determine access based on school policy
             # For now, we'll allow access if no subject-specific fees are outstanding
-            subject_specific_outstanding = [fee for fee in outstanding_fees if fee['fee_category_id'] in [str(f.id) for f in subject_fees]]
-            has_access = len(subject_specific_outstanding) == 0
+            has_access = not subject_specific_outstanding
             
             # If subject requires lab/practical and there are outstanding lab fees, deny access
-            if subject.requires_lab or subject.is_practical:
-                lab_fees_outstanding = any(
-                    'lab' in fee['fee_name'].lower() or 'practical' in fee['fee_name'].lower()
-                    for fee in outstanding_fees
-                )
-                if lab_fees_outstanding:
-                    has_access = False
+            if (subject.requires_lab or subject.is_practical) and lab_fees_outstanding:
+                has_access = False
             
             return {
                 'has_access': has_access,
-                'reason': 'Outstanding subject-specific fees' if not has_access and subject_specific_outstanding else '',
+                'reason': 'Outstanding subject-specific fees' if subject_specific_outstanding else '',
                 'outstanding_balance': float(total_outstanding),
                 'required_fees': outstanding_fees,
                 'subject_fees': [
                     {
-                        'fee_category_id': str(fee.id),
-                        'fee_name': fee.name,
-                        'amount': float(fee.amount),
-                        'description': fee.description
+                        'fee_category_id': category.id,
+                        'fee_name': category.name,
+                        'description': category.description
                     }
-                    for fee in subject_fees
+                    for category in subject_fees
                 ]
             }
             
@@ -220,46 +180,28 @@ class AcademicFinanceIntegration:
             )
             
             # Additional check for examination fees
-            exam_fees_query = select(FeeCategory).where(
-                and_(
-                    FeeCategory.school_id == school_id,
-                    FeeCategory.academic_year_id == assessment.academic_year_id,
-                    FeeCategory.is_active == True,
-                    or_(
-                        FeeCategory.name.ilike('%exam%'),
-                        FeeCategory.name.ilike('%assessment%'),
-                        and_(
-                            assessment.assessment_type == 'exam',
-                            FeeCategory.name.ilike('%examination%')
-                        )
-                    )
-                )
-            )
-            exam_fees_result = await self.db.execute(exam_fees_query)
-            exam_fees = exam_fees_result.scalars().all()
+            categories = await payment_restriction_engine.get_fee_categories(self.db, school_id)
+            exam_fees = {
+                category.id: category.name for category in categories
+                if category.restrictions & ASSESSMENT_ACCESS
+            }
             
             # Check for unpaid exam fees
             exam_fees_outstanding = []
-            for fee in exam_fees:
-                invoice_query = select(Invoice).where(
-                    and_(
-                        Invoice.student_id == student_id,
-                        Invoice.school_id == school_id,
-                        Invoice.fee_category_id == fee.id,
-                        Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.OVERDUE]),
-                        Invoice.is_active == True
-                    )
+            if exam_fees:
+                open_invoices = await payment_restriction_engine.get_open_invoices(
+                    self.db, student_id, school_id, assessment.academic_year_id
                 )
-                invoice_result = await self.db.execute(invoice_query)
-                unpaid_invoice = invoice_result.scalar_one_or_none()
-                
-                if unpaid_invoice:
-                    exam_fees_outstanding.append({
-                        'fee_category_id': str(fee.id),
-                        'fee_name': fee.name,
-                        'amount': float(unpaid_invoice.amount),
-                        'invoice_id': str(unpaid_invoice.id)
-                    })
+                for invoice in open_invoices:
+                    matches = invoice['fee_category_ids'] & exam_fees.keys()
+                    if matches:
+                        fee_category_id = min(matches, key=lambda category_id: exam_fees[category_id])
+                        exam_fees_outstanding.append({
+                            'fee_category_id': fee_category_id,
+                            'fee_name': exam_fees[fee_category_id],
+                            'amount': float(invoice['amount']),
+                            'invoice_id': invoice['invoice_id']
+                        })
             
             # Determine access
             has_access = subject_access['has_access'] and len(exam_fees_outstanding) == 0
@@ -614,91 +556,26 @@ class AcademicFinanceIntegration:
     
     async def get_students_with_payment_restrictions(
         self,
-        class_id: UUID,
+        class_id: Optional[UUID],
         school_id: UUID,
         academic_year_id: UUID
     ) -> List[Dict[str, Any]]:
-        """Get students who have academic restrictions due to unpaid fees"""
+        """
+        Get students who have academic restrictions due to unpaid fees
+        
+        The whole class is evaluated by one grouped query; pass class_id=None
+        for the whole school.
+        """
         try:
-            # Get students with outstanding invoices
-            students_query = select(
-                Invoice.student_id,
-                func.sum(Invoice.amount).label('total_outstanding'),
-                func.count(Invoice.id).label('outstanding_invoices')
-            ).select_from(
-                Invoice.join(StudentAccount, StudentAccount.student_id == Invoice.student_id)
-            ).where(
-                and_(
-                    Invoice.school_id == school_id,
-                    Invoice.academic_year_id == academic_year_id,
-                    Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.OVERDUE]),
-                    Invoice.is_active == True,
-                    StudentAccount.class_id == class_id
-                )
-            ).group_by(Invoice.student_id)
-            
-            students_result = await self.db.execute(students_query)
-            students_data = students_result.all()
-            
-            restricted_students = []
-            for student_data in students_data:
-                # Check if restrictions apply (e.g., outstanding amount > threshold)
-                if student_data.total_outstanding > Decimal('100.00'):  # Configurable threshold
-                    
-                    # Get specific restriction details
-                    restrictions = []
-                    
-                    # Check for exam fee restrictions
-                    exam_fees_query = select(Invoice).join(FeeCategory).where(
-                        and_(
-                            Invoice.student_id == student_data.student_id,
-                            Invoice.school_id == school_id,
-                            Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.OVERDUE]),
-                            FeeCategory.name.ilike('%exam%')
-                        )
-                    )
-                    exam_fees_result = await self.db.execute(exam_fees_query)
-                    if exam_fees_result.scalar_one_or_none():
-                        restrictions.append('assessment_access')
-                    
-                    # Check for lab fee restrictions
-                    lab_fees_query = select(Invoice).join(FeeCategory).where(
-                        and_(
-                            Invoice.student_id == student_data.student_id,
-                            Invoice.school_id == school_id,
-                            Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.OVERDUE]),
-                            or_(
-                                FeeCategory.name.ilike('%lab%'),
-                                FeeCategory.name.ilike('%practical%')
-                            )
-                        )
-                    )
-                    lab_fees_result = await self.db.execute(lab_fees_query)
-                    if lab_fees_result.scalar_one_or_none():
-                        restrictions.append('practical_access')
-                    
-                    # Check for general tuition restrictions
-                    tuition_fees_query = select(Invoice).join(FeeCategory).where(
-                        and_(
-                            Invoice.student_id == student_data.student_id,
-                            Invoice.school_id == school_id,
-                            Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.OVERDUE]),
-                            FeeCategory.name.ilike('%tuition%')
-                        )
-                    )
-                    tuition_fees_result = await self.db.execute(tuition_fees_query)
-                    if tuition_fees_result.scalar_one_or_none():
-                        restrictions.append('class_access')
-                    
-                    restricted_students.append({
-                        'student_id': str(student_data.student_id),
-                        'total_outstanding': float(student_data.total_outstanding),
-                        'outstanding_invoices': student_data.outstanding_invoices,
-                        'restrictions': restrictions,
-                        'restriction_level': 'high' if student_data.total_outstanding > Decimal('500.00') else 'medium'
-                    })
-            
-            return restricted_students
+            evaluated = await payment_restriction_engine.evaluate(
+                self.db, school_id, academic_year_id, class_id=class_id
+            )
+            
+            return [
+                restriction.to_dict()
+                for restriction in sorted(evaluated.values(), key=lambda r: r.total_outstanding, reverse=True)
+                if restriction.is_restricted
+            ]
             
         except Exception as e:
             logger.error(f"Failed to get students with payment restrictions: {str(e)}")
@@ -11,8 +11,9 @@ from sqlalchemy import select, and_, func
 from sqlalchemy.orm import selectinload, joinedload
 import logging
 
-from ..academic.models import Subject, Assessment, Grade, AttendanceSession, AttendanceRecord
+from ..academic.models import Subject, Assessment
 from ..academic.schemas import StudentPerformance, AttendanceStats
+from ..academic.term_metrics import get_class_metrics, get_student_metrics
 from ..sis.models import Student, Class, Enrollment, Guardian
 from ..sis.schemas import StudentWithDetails, ClassWithStudents
 from shared.exceptions import NotFoundError, ValidationError
@@ -156,87 +157,22 @@ class AcademicSISIntegration:
             class_result = await self.db.execute(class_query)
             class_obj = class_result.scalar_one_or_none()
             
-            # Get student grades
-            grades_query = select(Grade).join(
-                Assessment,
-                Assessment.id == Grade.assessment_id
-            ).where(
-                and_(
-                    Grade.student_id == student_id,
-                    Grade.school_id == school_id,
-                    Assessment.academic_year_id == academic_year_id,
-                    Assessment.is_active == True,
-                    *([Assessment.term_number == term_number] if term_number else [])
-                )
-            ).options(joinedload(Grade.assessment))
-            
-            grades_result = await self.db.execute(grades_query)
-            grades = grades_result.scalars().all()
-            
-            # Calculate overall average
-            valid_grades = [g for g in grades if g.percentage_score is not None and not g.is_absent]
-            overall_average = 0
-            if valid_grades:
-                total_weighted_score = sum(
-                    g.percentage_score * g.assessment.weight_percentage 
-                    for g in valid_grades
-                )
-                total_weight = sum(g.assessment.weight_percentage for g in valid_grades)
-                overall_average = total_weighted_score / total_weight if total_weight > 0 else 0
-            
-            # Get attendance rate
-            attendance_stats = await self.get_student_attendance_stats(
-                student_id, school_id, academic_year_id, term_number
+            # Read the student's term snapshot (the whole year when no term is given)
+            metrics = await get_student_metrics(
+                self.db, student_id, school_id, academic_year_id, term_number
             )
-            
-            # Group grades by subject
-            subject_grades = {}
-            for grade in grades:
-                subject_id = grade.assessment.subject_id
-                if subject_id not in subject_grades:
-                    subject_grades[subject_id] = {
-                        'subject_id': str(subject_id),
-                        'subject_name': '',  # Will be populated from subject data
-                        'grades': [],
-                        'average': 0,
-                        'latest_grade': None
-                    }
-                
-                subject_grades[subject_id]['grades'].append({
-                    'assessment_name': grade.assessment.name,
-                    'assessment_type': grade.assessment.assessment_type,
-                    'percentage_score': grade.percentage_score,
-                    'letter_grade': grade.letter_grade,
-                    'assessment_date': grade.assessment.assessment_date.isoformat() if grade.assessment.assessment_date else None,
-                    'feedback': grade.feedback
-                })
-            
-            # Calculate subject averages
-            for subject_data in subject_grades.values():
-                valid_subject_grades = [g for g in subject_data['grades'] if g['percentage_score'] is not None]
-                if valid_subject_grades:
-                    subject_data['average'] = sum(g['percentage_score'] for g in valid_subject_grades) / len(valid_subject_grades)
-                    subject_data['latest_grade'] = max(valid_subject_grades, key=lambda x: x['assessment_date'] or '1900-01-01')
-            
-            # Recent assessments
-            recent_assessments = [
-                {
-                    'assessment_name': grade.assessment.name,
-                    'subject_name': '',  # Will be populated
-                    'assessment_type': grade.assessment.assessment_type,
-                    'percentage_score': grade.percentage_score,
-                    'letter_grade': grade.letter_grade,
-                    'assessment_date': grade.assessment.assessment_date.isoformat() if grade.assessment.assessment_date else None
+            if metrics is None:
+                metrics = {
+                    'overall_average': 0, 'attendance_rate': 0,
+                    'subject_grades': [], 'recent_assessments': []
                 }
-                for grade in sorted(grades, key=lambda x: x.assessment.assessment_date or date.min, reverse=True)[:5]
-                if grade.percentage_score is not None
-            ]
+            subject_grades = metrics['subject_grades']
             
             # Identify strengths and areas for improvement
             strengths = []
             areas_for_improvement = []
             
-            for subject_data in subject_grades.values():
+            for subject_data in subject_grades:
                 if subject_data['average'] >= 80:
                     strengths.append(f"Excellent performance in {subject_data['subject_name']}")
                 elif subject_data['average'] >= 70:
@@ -244,9 +180,9 @@ class AcademicSISIntegration:
                 elif subject_data['average'] < 50:
                     areas_for_improvement.append(f"Needs improvement in {subject_data['subject_name']}")
             
-            if attendance_stats.attendance_rate >= 95:
+            if metrics['attendance_rate'] >= 95:
                 strengths.append("Excellent attendance record")
-            elif attendance_stats.attendance_rate < 80:
+            elif metrics['attendance_rate'] < 80:
                 areas_for_improvement.append("Poor attendance affecting academic performance")
             
             return StudentPerformance(
@@ -254,10 +190,10 @@ class AcademicSISIntegration:
                 student_name=f"{student.first_name} {student.last_name}",
                 grade_level=current_enrollment.grade_level,
                 class_name=class_obj.name if class_obj else '',
-                overall_average=round(overall_average, 2),
-                attendance_rate=attendance_stats.attendance_rate,
-                subject_grades=list(subject_grades.values()),
-                recent_assessments=recent_assessments,
+                overall_average=metrics['overall_average'],
+                attendance_rate=metrics['attendance_rate'],
+                subject_grades=subject_grades,
+                recent_assessments=metrics['recent_assessments'],
                 strengths=strengths,
                 areas_for_improvement=areas_for_improvement
             )
@@ -275,40 +211,18 @@ class AcademicSISIntegration:
     ) -> AttendanceStats:
         """Get attendance statistics for a student"""
         try:
-            # Base query for attendance records
-            query = select(
-                func.count(AttendanceRecord.id).label('total_sessions'),
-                func.sum(func.case([(AttendanceRecord.attendance_status == 'present', 1)], else_=0)).label('present'),
-                func.sum(func.case([(AttendanceRecord.attendance_status == 'absent', 1)], else_=0)).label('absent'),
-                func.sum(func.case([(AttendanceRecord.attendance_status == 'late', 1)], else_=0)).label('late')
-            ).select_from(
-                AttendanceRecord.join(AttendanceSession)
-            ).where(
-                and_(
-                    AttendanceRecord.student_id == student_id,
-                    AttendanceRecord.school_id == school_id,
-                    *([AttendanceSession.term_number == term_number] if term_number else [])
-                )
+            metrics = await get_student_metrics(
+                self.db, student_id, school_id, academic_year_id, term_number
             )
-            
-            result = await self.db.execute(query)
-            stats = result.first()
-            
-            total_sessions = stats.total_sessions or 0
-            present_sessions = stats.present or 0
-            absent_sessions = stats.absent or 0
-            late_sessions = stats.late or 0
-            
-            attendance_rate = 0
-            if total_sessions > 0:
-                attendance_rate = ((present_sessions + late_sessions) / total_sessions) * 100
+            if metrics is None:
+                metrics = {'present_sessions': 0, 'absent_sessions': 0, 'late_sessions': 0, 'attendance_rate': 0}
             
             return AttendanceStats(
                 total_students=1,  # Single student
-                present_students=present_sessions,
-                absent_students=absent_sessions,
-                late_students=late_sessions,
-                attendance_rate=round(attendance_rate, 2)
+                present_students=metrics['present_sessions'],
+                absent_students=metrics['absent_sessions'],
+                late_students=metrics['late_sessions'],
+                attendance_rate=metrics['attendance_rate']
             )
             
         except Exception as e:
@@ -348,17 +262,6 @@ class AcademicSISIntegration:
             if not class_obj:
                 raise NotFoundError("Class not found")
             
-            # Get enrolled students count
-            students_query = select(func.count(Enrollment.id)).where(
-                and_(
-                    Enrollment.class_id == class_id,
-                    Enrollment.academic_year_id == academic_year_id,
-                    Enrollment.status == 'active'
-                )
-            )
-            students_result = await self.db.execute(students_query)
-            total_students = students_result.scalar() or 0
-            
             # Get assessments for this class
             assessments_query = select(
                 func.count(Assessment.id).label('total_assessments'),
@@ -375,56 +278,21 @@ class AcademicSISIntegration:
             assessments_result = await self.db.execute(assessments_query)
             assessments_stats = assessments_result.first()
             
-            # Get average performance
-            grades_query = select(
-                func.avg(Grade.percentage_score).label('class_average'),
-                func.count(Grade.id).label('total_grades')
-            ).select_from(
-                Grade.join(Assessment)
-            ).where(
-                and_(
-                    Assessment.class_id == class_id,
-                    Assessment.school_id == school_id,
-                    Assessment.academic_year_id == academic_year_id,
-                    Grade.percentage_score.isnot(None),
-                    Grade.is_absent == False,
-                    *([Assessment.term_number == term_number] if term_number else [])
-                )
+            # Class size, average and attendance for this class's assessments and sessions
+            class_metrics = await get_class_metrics(
+                self.db, class_id, school_id, academic_year_id, term_number
             )
-            grades_result = await self.db.execute(grades_query)
-            grades_stats = grades_result.first()
-            
-            # Get attendance statistics
-            attendance_query = select(
-                func.count(AttendanceRecord.id).label('total_attendance_records'),
-                func.sum(func.case([(AttendanceRecord.attendance_status.in_(['present', 'late']), 1)], else_=0)).label('present_records')
-            ).select_from(
-                AttendanceRecord.join(AttendanceSession)
-            ).where(
-                and_(
-                    AttendanceSession.class_id == class_id,
-                    AttendanceRecord.school_id == school_id,
-                    *([AttendanceSession.term_number == term_number] if term_number else [])
-                )
-            )
-            attendance_result = await self.db.execute(attendance_query)
-            attendance_stats = attendance_result.first()
-            
-            # Calculate attendance rate
-            attendance_rate = 0
-            if attendance_stats.total_attendance_records and attendance_stats.total_attendance_records > 0:
-                attendance_rate = (attendance_stats.present_records / attendance_stats.total_attendance_records) * 100
             
             return {
                 'class_id': str(class_id),
                 'class_name': class_obj.name,
                 'grade_level': class_obj.grade_level,
-                'total_students': total_students,
+                'total_students': class_metrics['total_students'],
                 'total_assessments': assessments_stats.total_assessments or 0,
                 'completed_assessments': assessments_stats.completed_assessments or 0,
-                'class_average': round(grades_stats.class_average or 0, 2),
-                'total_grades': grades_stats.total_grades or 0,
-                'attendance_rate': round(attendance_rate, 2),
+                'class_average': class_metrics['class_average'],
+                'total_grades': class_metrics['total_grades'],
+                'attendance_rate': class_metrics['attendance_rate'],
                 'teacher_id': class_obj.teacher_id,
                 'academic_year_id': str(academic_year_id),
                 'term_number': term_number
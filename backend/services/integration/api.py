@@ -396,6 +396,23 @@ async def get_students_with_payment_restrictions(
         )
 
 
+
+@router.get("/finance/school/payment-restrictions")
+async def get_school_students_with_payment_restrictions(
+    academic_year_id: UUID = Query(...),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+) -> List[Dict[str, Any]]:
+    """Get every student in the school with academic restrictions due to unpaid fees"""
+    await require_permissions(current_user, ["finance.payment.read", "academic.class.read"])
+    
+    integration = await get_academic_finance_integration(db)
+    return await integration.get_students_with_payment_restrictions(
+        class_id=None,
+        school_id=_get_effective_school_id(current_user),
+        academic_year_id=academic_year_id
+    )
+
 # =====================================================
 # CROSS-MODULE VALIDATION ENDPOINTS
 # =====================================================
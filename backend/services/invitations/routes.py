@@ -16,6 +16,7 @@ from shared.database import get_async_session
 from shared.models.platform_user import PlatformUser, UserInvitation, SchoolMembership
 from shared.models.platform import School
 from shared.auth import get_current_active_user
+from shared.cache.principal_cache import invalidate_principal
 from .schemas import (
     CreateInvitationRequest,
     InvitationResponse,
@@ -377,6 +378,8 @@ async def accept_invitation(
             invitation.accepted_by = current_user.id
 
             await db.commit()
+            # The new or reactivated membership must not wait out the principal cache TTL
+            await invalidate_principal(current_user.id)
 
             return {
                 "message": "Invitation accepted successfully",
@@ -9,10 +9,11 @@ from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
 
-from sqlalchemy import and_, desc, func, select, text
+from sqlalchemy import and_, desc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
+from shared.identifiers import ORDER_NUMBER, next_identifier
 from shared.models.migration_services import (
     CarePackageCreate,
     CarePackageUpdate,
@@ -468,8 +469,7 @@ class MigrationServicesService:
     async def _generate_order_number(self) -> str:
         """Generate a unique order number"""
         try:
-            result = await self.db.execute(text("SELECT generate_order_number()"))
-            return result.scalar()
+            return await next_identifier(self.db, ORDER_NUMBER, period=str(date.today().year))
         except Exception as e:
             logger.error(f"Error generating order number: {str(e)}")
             raise
@@ -14,9 +14,10 @@ from starlette.types import Message
 import json
 
 from .service import monitoring_service
+from .pipeline import UNMATCHED_ROUTE
 from .schemas import (
-    MetricCreate, ErrorLogCreate, TraceSpanCreate, AuditLogCreate,
-    SecurityEventCreate, Severity, MetricType
+    ErrorLogCreate, TraceSpanCreate, AuditLogCreate,
+    SecurityEventCreate, Severity
 )
 
 logger = logging.getLogger(__name__)
@@ -91,7 +92,7 @@ class MonitoringMiddleware(BaseHTTPMiddleware):
         
         # Record metrics
         if self.enable_metrics:
-            await self._record_metrics(request, response, response_time, error)
+            self._record_metrics(request, response, response_time, error)
         
         # Finish tracing
         if self.enable_tracing:
@@ -143,53 +144,22 @@ class MonitoringMiddleware(BaseHTTPMiddleware):
         except Exception as e:
             logger.error(f"Failed to finish trace: {str(e)}")
     
-    async def _record_metrics(self, request: Request, response: Response, response_time: float, error: Optional[Exception]) -> None:
-        """Record performance metrics"""
+    def _record_metrics(self, request: Request, response: Response, response_time: float, error: Optional[Exception]) -> None:
+        """Fold request metrics into the batched pipeline (no I/O on the request path)"""
         try:
-            # Request count metric
-            await monitoring_service.record_metric(MetricCreate(
-                metric_name="http.requests.total",
-                metric_type=MetricType.COUNTER,
-                value=1,
-                unit="count",
-                tags={
-                    "method": request.method,
-                    "endpoint": request.url.path,
-                    "status": str(response.status_code),
-                    "error": str(error.__class__.__name__) if error else "none"
-                },
-                source="api"
-            ))
-            
-            # Response time metric
-            await monitoring_service.record_metric(MetricCreate(
-                metric_name="http.request.duration",
-                metric_type=MetricType.HISTOGRAM,
-                value=response_time,
-                unit="ms",
-                tags={
-                    "method": request.method,
-                    "endpoint": request.url.path,
-                    "status": str(response.status_code)
-                },
-                source="api"
-            ))
+            error_type = None
+            if error:
+                error_type = error.__class__.__name__
+            elif response.status_code >= 400:
+                error_type = "http_error"
             
-            # Error rate metric
-            if error or response.status_code >= 400:
-                await monitoring_service.record_metric(MetricCreate(
-                    metric_name="http.errors.total",
-                    metric_type=MetricType.COUNTER,
-                    value=1,
-                    unit="count",
-                    tags={
-                        "method": request.method,
-                        "endpoint": request.url.path,
-                        "status": str(response.status_code),
-                        "error_type": str(error.__class__.__name__) if error else "http_error"
-                    },
-                    source="api"
-                ))
+            monitoring_service.metric_pipeline.record_request(
+                endpoint=self._get_route_template(request),
+                method=request.method,
+                status=response.status_code,
+                duration_ms=response_time,
+                error_type=error_type
+            )
             
         except Exception as e:
             logger.error(f"Failed to record metrics: {str(e)}")
@@ -329,6 +299,11 @@ class MonitoringMiddleware(BaseHTTPMiddleware):
         except Exception as e:
             logger.error(f"Failed to check security events: {str(e)}")
     
+    def _get_route_template(self, request: Request) -> str:
+        """Get the matched route template (e.g. /students/{id}) to bound metric cardinality"""
+        route = request.scope.get("route")
+        return getattr(route, "path", None) or UNMATCHED_ROUTE
+    
     def _get_client_ip(self, request: Request) -> str:
         """Get client IP address"""
         # Check for forwarded headers
@@ -0,0 +1,286 @@
+"""
+Metric Pipeline
+In-memory pre-aggregation of request metrics, flushed to the database in
+batches by a background task instead of one INSERT per sample
+"""
+
+import asyncio
+import logging
+import uuid
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from shared.database import get_workload_session
+from shared.db_pools import BACKGROUND
+from .models import PerformanceMetric
+from .schemas import MetricCreate, MetricType
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the request duration histogram buckets
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Endpoint label for requests that matched no route, so 404 scans cannot
+# create one series per probed path
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Rows per INSERT statement; keeps bind parameters well under the driver limit
+INSERT_CHUNK_SIZE = 1000
+
+# (endpoint template, method, status)
+SeriesKey = Tuple[str, str, str]
+
+
+class RequestSeries:
+    """Counters and duration histogram of one series within a window"""
+
+    __slots__ = ("count", "errors", "error_types", "duration_sum",
+                 "duration_min", "duration_max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.error_types: Dict[str, int] = {}
+        self.duration_sum = 0.0
+        self.duration_min = float("inf")
+        self.duration_max = 0.0
+        self.buckets = [0] * (len(DURATION_BUCKETS_MS) + 1)
+
+    def observe(self, duration_ms: float, error_type: Optional[str]) -> None:
+        self.count += 1
+        self.duration_sum += duration_ms
+        self.duration_min = min(self.duration_min, duration_ms)
+        self.duration_max = max(self.duration_max, duration_ms)
+        self.buckets[bisect_left(DURATION_BUCKETS_MS, duration_ms)] += 1
+
+        if error_type:
+            self.errors += 1
+            self.error_types[error_type] = self.error_types.get(error_type, 0) + 1
+
+    def histogram(self) -> Dict[str, int]:
+        """Cumulative bucket counts keyed by upper bound"""
+        cumulative = {}
+        running = 0
+        for bound, count in zip(DURATION_BUCKETS_MS + (float("inf"),), self.buckets):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return cumulative
+
+
+class MetricPipeline:
+    """
+    Aggregates metrics in memory and writes them in batches
+
+    Request samples are folded into per-(endpoint template, method, status)
+    counters and histograms, so memory and rows written grow with the number
+    of series rather than the number of requests. Other metrics are buffered
+    as-is. A background task flushes both every `flush_interval` seconds with
+    multi-row INSERTs on the BACKGROUND pool. When the series table or sample
+    buffer is full, new samples are dropped and counted instead of blocking
+    the request.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 10.0,
+        max_series: int = 2000,
+        max_samples: int = 1000,
+        on_flush: Optional[Callable[[List[PerformanceMetric]], Awaitable[None]]] = None,
+    ):
+        """
+        Initialize pipeline
+
+        Args:
+            flush_interval: Seconds between flushes (the aggregation window)
+            max_series: Maximum distinct request series held per window
+            max_samples: Maximum raw metrics buffered per window
+            on_flush: Coroutine called with the flushed metrics, e.g. alert rules
+        """
+        self.flush_interval = flush_interval
+        self.max_series = max_series
+        self.max_samples = max_samples
+        self.on_flush = on_flush
+
+        self._series: Dict[SeriesKey, RequestSeries] = {}
+        self._samples: List[Dict[str, Any]] = []
+        self._window_start = datetime.utcnow()
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.rows_written = 0
+
+    # =====================================================
+    # RECORDING (request path, never awaits)
+    # =====================================================
+
+    def record_request(
+        self,
+        endpoint: str,
+        method: str,
+        status: int,
+        duration_ms: float,
+        error_type: Optional[str] = None,
+    ) -> bool:
+        """Fold one request into its series; returns False if the sample was dropped"""
+        key = (endpoint, method, str(status))
+        series = self._series.get(key)
+
+        if series is None:
+            if len(self._series) >= self.max_series:
+                self.dropped += 1
+                return False
+            series = self._series[key] = RequestSeries()
+
+        series.observe(duration_ms, error_type)
+        self.recorded += 1
+        self._ensure_flusher()
+        return True
+
+    def enqueue(self, metric_data: MetricCreate) -> bool:
+        """Buffer a metric for the next flush; returns False if the buffer is full"""
+        if len(self._samples) >= self.max_samples:
+            self.dropped += 1
+            return False
+
+        self._samples.append({
+            "metric_name": metric_data.metric_name,
+            "metric_type": MetricType(metric_data.metric_type).value,
+            "value": metric_data.value,
+            "unit": metric_data.unit,
+            "tags": metric_data.tags,
+            "source": metric_data.source,
+            "timestamp": datetime.utcnow(),
+        })
+        self.recorded += 1
+        self._ensure_flusher()
+        return True
+
+    # =====================================================
+    # FLUSHING
+    # =====================================================
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Swap out the current window and return its rows"""
+        series, samples = self._series, self._samples
+        window_start, window_end = self._window_start, datetime.utcnow()
+
+        self._series = {}
+        self._samples = []
+        self._window_start = window_end
+
+        rows = []
+        window = {
+            "window_start": window_start.isoformat(),
+            "window_seconds": round((window_end - window_start).total_seconds(), 3),
+        }
+
+        for (endpoint, method, status), s in series.items():
+            tags = {"method": method, "endpoint": endpoint, "status": status, **window}
+
+            rows.append(self._row("http.requests.total", MetricType.COUNTER, s.count,
+                                  "count", tags, window_end))
+            rows.append(self._row("http.request.duration", MetricType.HISTOGRAM,
+                                  s.duration_sum / s.count, "ms", {
+                                      **tags,
+                                      "count": s.count,
+                                      "sum": round(s.duration_sum, 3),
+                                      "min": round(s.duration_min, 3),
+                                      "max": round(s.duration_max, 3),
+                                      "buckets": s.histogram(),
+                                  }, window_end))
+            if s.errors:
+                rows.append(self._row("http.errors.total", MetricType.COUNTER, s.errors,
+                                      "count", {**tags, "error_types": s.error_types}, window_end))
+
+        for sample in samples:
+            rows.append({"id": uuid.uuid4(), **sample})
+
+        return rows
+
+    async def flush(self) -> int:
+        """Write the current window in multi-row INSERTs; returns rows written"""
+        rows = self.drain()
+        if not rows:
+            return 0
+
+        try:
+            async with get_workload_session(BACKGROUND) as session:
+                for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+                    await session.execute(
+                        insert(PerformanceMetric).values(rows[i:i + INSERT_CHUNK_SIZE])
+                    )
+                await session.commit()
+        except Exception as e:
+            # Metrics are best effort: count the loss rather than re-queue
+            self.flush_failures += 1
+            self.dropped += len(rows)
+            logger.error(f"Failed to flush {len(rows)} metrics: {e}")
+            return 0
+
+        self.flushes += 1
+        self.rows_written += len(rows)
+
+        if self.on_flush:
+            try:
+                await self.on_flush([PerformanceMetric(**row) for row in rows])
+            except Exception as e:
+                logger.error(f"Metric flush callback failed: {e}")
+
+        return len(rows)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _ensure_flusher(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            # No running loop (sync caller); the next async record starts it
+            pass
+
+    async def close(self) -> None:
+        """Stop the background task and flush what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pipeline counters for monitoring"""
+        return {
+            "flush_interval_seconds": self.flush_interval,
+            "pending_series": len(self._series),
+            "pending_samples": len(self._samples),
+            "max_series": self.max_series,
+            "max_samples": self.max_samples,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "rows_written": self.rows_written,
+        }
+
+    @staticmethod
+    def _row(name: str, metric_type: MetricType, value: float, unit: str,
+             tags: Dict[str, Any], timestamp: datetime) -> Dict[str, Any]:
+        return {
+            "id": uuid.uuid4(),
+            "metric_name": name,
+            "metric_type": metric_type.value,
+            "value": value,
+            "unit": unit,
+            "tags": tags,
+            "source": "api",
+            "timestamp": timestamp,
+        }
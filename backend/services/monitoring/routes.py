@@ -336,6 +336,62 @@ async def get_database_metrics(
         raise HTTPException(status_code=500, detail="Failed to retrieve database metrics")
 
 
+@router.get("/pools", response_model=Dict[str, Any])
+async def get_pool_metrics(
+    current_user: Dict[str, Any] = Depends(require_admin)
+):
+    """
+    Get connection pool metrics
+    
+    Retrieve per-workload pool budgets, saturation gauges and
+    acquire-wait histograms for this worker.
+    """
+    return monitoring_service.get_pool_metrics()
+
+
+@router.get("/pipeline", response_model=Dict[str, Any])
+async def get_metric_pipeline_stats(
+    current_user: Dict[str, Any] = Depends(require_admin)
+):
+    """
+    Get metric pipeline statistics
+    
+    Retrieve buffered rows, dropped samples and flush counters of the
+    batched metric and audit writers for this worker.
+    """
+    from shared.services.audit_writer import audit_writer
+
+    return {
+        "metrics": monitoring_service.metric_pipeline.stats(),
+        "audit": audit_writer.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/caches", response_model=Dict[str, Any])
+async def get_cache_metrics(
+    current_user: Dict[str, Any] = Depends(require_admin)
+):
+    """
+    Get in-process cache statistics
+    
+    Retrieve hit/miss counters for the caches that sit in front of the
+    database on the request path.
+    """
+    from shared.cache.tenant_cache import tenant_cache
+    from shared.cache.principal_cache import principal_cache
+    from shared.cache.redis_client import get_user_context_cache
+
+    user_context_cache = get_user_context_cache()
+
+    return {
+        "tenant_cache": tenant_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "user_context_cache": user_context_cache.stats() if user_context_cache else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
 @router.get("/dashboard", response_model=MonitoringDashboardResponse)
 async def get_monitoring_dashboard(
     current_user: Dict[str, Any] = Depends(get_current_user)
@@ -519,23 +575,42 @@ async def export_prometheus_metrics(
         prometheus_metrics = []
         
         # System metrics
-        prometheus_metrics.append(f"# HELP system_cpu_usage CPU usage percentage")
-        prometheus_metrics.append(f"# TYPE system_cpu_usage gauge")
+        prometheus_metrics.append("# HELP system_cpu_usage CPU usage percentage")
+        prometheus_metrics.append("# TYPE system_cpu_usage gauge")
         prometheus_metrics.append(f"system_cpu_usage {system_metrics['cpu_usage']}")
         
-        prometheus_metrics.append(f"# HELP system_memory_usage Memory usage percentage")
-        prometheus_metrics.append(f"# TYPE system_memory_usage gauge")
+        prometheus_metrics.append("# HELP system_memory_usage Memory usage percentage")
+        prometheus_metrics.append("# TYPE system_memory_usage gauge")
         prometheus_metrics.append(f"system_memory_usage {system_metrics['memory_usage']}")
         
         # HTTP metrics
-        prometheus_metrics.append(f"# HELP http_requests_total Total HTTP requests")
-        prometheus_metrics.append(f"# TYPE http_requests_total counter")
+        prometheus_metrics.append("# HELP http_requests_total Total HTTP requests")
+        prometheus_metrics.append("# TYPE http_requests_total counter")
         prometheus_metrics.append(f"http_requests_total {middleware_metrics['request_count']}")
         
-        prometheus_metrics.append(f"# HELP http_request_duration_seconds HTTP request duration")
-        prometheus_metrics.append(f"# TYPE http_request_duration_seconds histogram")
+        prometheus_metrics.append("# HELP http_request_duration_seconds HTTP request duration")
+        prometheus_metrics.append("# TYPE http_request_duration_seconds histogram")
         prometheus_metrics.append(f"http_request_duration_seconds {middleware_metrics['avg_response_time'] / 1000}")
         
+        # Connection pool metrics
+        prometheus_metrics.append("# HELP db_pool_saturation Checked-out connections over pool capacity")
+        prometheus_metrics.append("# TYPE db_pool_saturation gauge")
+        pool_snapshots = monitoring_service.get_pool_metrics()['pools']
+        for pool in pool_snapshots:
+            prometheus_metrics.append(f'db_pool_saturation{{pool="{pool["pool"]}"}} {pool["saturation"]}')
+        
+        prometheus_metrics.append("# HELP db_pool_acquire_wait_seconds Time spent waiting for a pooled connection")
+        prometheus_metrics.append("# TYPE db_pool_acquire_wait_seconds histogram")
+        for pool in pool_snapshots:
+            wait = pool["acquire_wait"]
+            for bucket in wait["buckets"]:
+                le = "+Inf" if bucket["le_ms"] == "+Inf" else bucket["le_ms"] / 1000
+                prometheus_metrics.append(
+                    f'db_pool_acquire_wait_seconds_bucket{{pool="{pool["pool"]}",le="{le}"}} {bucket["count"]}'
+                )
+            prometheus_metrics.append(f'db_pool_acquire_wait_seconds_sum{{pool="{pool["pool"]}"}} {wait["sum_ms"] / 1000}')
+            prometheus_metrics.append(f'db_pool_acquire_wait_seconds_count{{pool="{pool["pool"]}"}} {wait["count"]}')
+        
         return JSONResponse(
             content={"metrics": "\n".join(prometheus_metrics)},
             headers={"Content-Type": "text/plain"}
@@ -388,6 +388,9 @@ class MonitoringConfiguration(BaseModel):
     alert_retention_days: int = Field(365, description="Alert retention period")
     health_check_interval: int = Field(60, description="Health check interval in seconds")
     metric_collection_interval: int = Field(15, description="Metric collection interval")
+    metric_flush_interval: float = Field(10.0, description="Seconds between batched metric flushes")
+    metric_max_series: int = Field(2000, description="Request series aggregated per flush window before dropping")
+    metric_buffer_size: int = Field(1000, description="Raw metrics buffered per flush window before dropping")
     enable_tracing: bool = Field(True, description="Enable distributed tracing")
     enable_profiling: bool = Field(False, description="Enable performance profiling")
     sample_rate: float = Field(0.1, description="Trace sampling rate")
@@ -15,12 +15,14 @@ from sqlalchemy import select, func, and_, or_
 from sqlalchemy.orm import selectinload
 
 from shared.database import get_db_session
+from shared.db_pools import DRIVER_SHARES, pool_registry
 from shared.exceptions import ValidationError, NotFoundError
 from .models import (
     PerformanceMetric, SystemHealth, ErrorLog, RequestTrace, Alert,
     AuditLog, DatabaseMetrics, CacheMetrics, QueueMetrics, SecurityEvent,
     BusinessMetrics
 )
+from .pipeline import MetricPipeline
 from .schemas import (
     MetricCreate, HealthCheckCreate, ErrorLogCreate, TraceSpanCreate,
     AlertCreate, AuditLogCreate, SecurityEventCreate, MetricQuery,
@@ -37,11 +39,19 @@ class MonitoringService:
         self.config = MonitoringConfiguration()
         self.alert_rules = []
         self.active_traces = {}
-        self.metric_buffer = []
-        self.buffer_size = 100
+        self.metric_pipeline = MetricPipeline(
+            flush_interval=self.config.metric_flush_interval,
+            max_series=self.config.metric_max_series,
+            max_samples=self.config.metric_buffer_size,
+            on_flush=self._check_flushed_metrics
+        )
         
+    def enqueue_metric(self, metric_data: MetricCreate) -> bool:
+        """Buffer a metric for the next batched flush (returns False if dropped)"""
+        return self.metric_pipeline.enqueue(metric_data)
+    
     async def record_metric(self, metric_data: MetricCreate) -> str:
-        """Record a performance metric"""
+        """Record a performance metric immediately (use enqueue_metric on hot paths)"""
         try:
             async with get_db_session() as session:
                 metric = PerformanceMetric(
@@ -349,8 +359,8 @@ class MonitoringService:
                 'timestamp': datetime.utcnow()
             }
             
-            # Record metrics in database
-            await self.record_metric(MetricCreate(
+            # Buffer metrics for the next batched write
+            self.enqueue_metric(MetricCreate(
                 metric_name="system.cpu_usage",
                 metric_type="gauge",
                 value=cpu_usage,
@@ -358,7 +368,7 @@ class MonitoringService:
                 source="system"
             ))
             
-            await self.record_metric(MetricCreate(
+            self.enqueue_metric(MetricCreate(
                 metric_name="system.memory_usage",
                 metric_type="gauge",
                 value=memory_usage,
@@ -366,7 +376,7 @@ class MonitoringService:
                 source="system"
             ))
             
-            await self.record_metric(MetricCreate(
+            self.enqueue_metric(MetricCreate(
                 metric_name="system.disk_usage",
                 metric_type="gauge",
                 value=disk_usage,
@@ -435,6 +445,30 @@ class MonitoringService:
             logger.error(f"Failed to get database metrics: {str(e)}")
             raise
     
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """Get connection pool budgets, saturation and acquire-wait histograms"""
+        return {
+            'budgets': {
+                workload: {
+                    'pool_size': budget.pool_size,
+                    'max_overflow': budget.max_overflow,
+                    'timeout': budget.timeout,
+                    'read_only': budget.read_only,
+                    'drivers': {
+                        driver: {
+                            'pool_size': budget.for_driver(driver).pool_size,
+                            'max_overflow': budget.for_driver(driver).max_overflow
+                        }
+                        for driver in DRIVER_SHARES
+                    }
+                }
+                for workload, budget in pool_registry.budgets.items()
+            },
+            'max_connections_per_worker': pool_registry.max_connections(),
+            'pools': pool_registry.snapshot(),
+            'timestamp': datetime.utcnow()
+        }
+    
     async def query_metrics(self, query: MetricQuery) -> List[Dict[str, Any]]:
         """Query performance metrics"""
         try:
@@ -597,6 +631,11 @@ class MonitoringService:
         except Exception as e:
             logger.error(f"Failed to check alert rules: {str(e)}")
     
+    async def _check_flushed_metrics(self, metrics: List[PerformanceMetric]) -> None:
+        """Evaluate alert rules against a flushed batch"""
+        for metric in metrics:
+            await self._check_alert_rules(metric)
+    
     async def _create_health_alert(self, health: SystemHealth) -> None:
         """Create alert for unhealthy service"""
         try:
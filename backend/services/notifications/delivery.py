@@ -0,0 +1,437 @@
+# =====================================================
+# SMTP Delivery Engine
+# Pooled authenticated SMTP sessions driven from a thread pool, per-provider
+# rate limits and a persistent retry queue
+# File: backend/services/notifications/delivery.py
+# =====================================================
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import smtplib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from shared.cache.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of retry jobs scored by when they are due; shared by every worker
+RETRY_QUEUE_KEY = "oneclass:email:retry"
+
+DEFAULT_RETRY_DELAYS = [60, 300, 900]  # 1min, 5min, 15min
+
+DELIVERY_SENT = "sent"
+DELIVERY_QUEUED = "queued"
+DELIVERY_FAILED = "failed"
+
+
+@dataclass
+class SMTPConfig:
+    """Connection settings for one SMTP provider"""
+
+    host: str
+    port: int = 587
+    username: str = ""
+    password: str = ""
+    use_tls: bool = True
+    timeout: float = 30.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    @property
+    def has_credentials(self) -> bool:
+        return bool(self.username and self.password)
+
+    @classmethod
+    def from_env(cls) -> "SMTPConfig":
+        return cls(
+            host=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            username=os.getenv("SMTP_USERNAME", ""),
+            password=os.getenv("SMTP_PASSWORD", ""),
+            use_tls=os.getenv("SMTP_USE_TLS", "true").strip().lower() in {"1", "true", "yes", "on"},
+            timeout=float(os.getenv("SMTP_TIMEOUT_SECONDS", "30")),
+        )
+
+
+@dataclass
+class DeliveryResult:
+    status: str
+    error: Optional[str] = None
+    attempt: int = 0
+
+    @property
+    def sent(self) -> bool:
+        return self.status == DELIVERY_SENT
+
+
+class ProviderRateLimiter:
+    """
+    Token bucket plus a daily cap for one SMTP provider
+
+    acquire() waits for a token instead of failing, so bursts are spread out
+    at the provider's sustained rate; only the daily cap refuses a send. The
+    cap counts recipients: acquire() reserves them and release() returns
+    them when the send fails, so only delivered messages use up quota.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, daily_limit: int):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.daily_limit = daily_limit
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        self.daily_sent = 0
+        self.last_reset = datetime.utcnow().date()
+        self.throttled = 0
+
+    def _reset_if_new_day(self) -> None:
+        today = datetime.utcnow().date()
+        if self.last_reset != today:
+            self.daily_sent = 0
+            self.last_reset = today
+
+    async def acquire(self, count: int = 1) -> bool:
+        """Reserve `count` recipients of one send; False when the daily cap would be exceeded"""
+        async with self._lock:
+            self._reset_if_new_day()
+            if self.daily_sent + count > self.daily_limit:
+                return False
+
+            if self.rate_per_second > 0:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+                self._updated = now
+                if self._tokens < 1:
+                    self.throttled += 1
+                    await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+                    self._tokens = 1.0
+                    self._updated = time.monotonic()
+                self._tokens -= 1
+
+            self.daily_sent += count
+            return True
+
+    def release(self, count: int = 1) -> None:
+        """Return a reservation whose send failed"""
+        self.daily_sent = max(0, self.daily_sent - count)
+
+    def stats(self) -> Dict[str, Any]:
+        self._reset_if_new_day()
+        return {
+            'daily_sent': self.daily_sent,
+            'daily_limit': self.daily_limit,
+            'remaining_today': max(0, self.daily_limit - self.daily_sent),
+            'rate_per_second': self.rate_per_second,
+            'throttled': self.throttled,
+            'last_reset': self.last_reset.isoformat(),
+        }
+
+
+# One limiter per provider, shared by every engine in the process
+_rate_limiters: Dict[str, ProviderRateLimiter] = {}
+
+
+def get_rate_limiter(provider: str) -> ProviderRateLimiter:
+    """Get the limiter for a provider, configured from SMTP_RATE_PER_SECOND / SMTP_BURST / SMTP_DAILY_LIMIT"""
+    limiter = _rate_limiters.get(provider)
+    if limiter is None:
+        limiter = ProviderRateLimiter(
+            rate_per_second=float(os.getenv("SMTP_RATE_PER_SECOND", "10")),
+            burst=int(os.getenv("SMTP_BURST", "20")),
+            daily_limit=int(os.getenv("SMTP_DAILY_LIMIT", "1000")),
+        )
+        _rate_limiters[provider] = limiter
+    return limiter
+
+
+class SMTPSessionPool:
+    """
+    Persistent authenticated SMTP sessions
+
+    smtplib is blocking, so each send runs on a worker thread; the event
+    loop only waits for the result. Sessions are opened (STARTTLS + login)
+    once and reused; a session idle longer than `idle_timeout` is checked
+    with NOOP before use, and a dropped connection is reopened once.
+    """
+
+    def __init__(self, config: SMTPConfig, size: int = 5, idle_timeout: float = 60.0):
+        self.config = config
+        self.size = size
+        self.idle_timeout = idle_timeout
+
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+
+        self.opened = 0
+        self.reused = 0
+
+    def _open(self) -> smtplib.SMTP:
+        session = smtplib.SMTP(self.config.host, self.config.port, timeout=self.config.timeout)
+        try:
+            if self.config.use_tls:
+                session.starttls()
+            if self.config.has_credentials:
+                session.login(self.config.username, self.config.password)
+        except Exception:
+            session.close()
+            raise
+        self.opened += 1
+        return session
+
+    def _send_blocking(
+        self,
+        session: Optional[smtplib.SMTP],
+        idle_since: float,
+        from_addr: str,
+        recipients: Sequence[str],
+        message: bytes,
+    ) -> smtplib.SMTP:
+        if session is not None and time.monotonic() - idle_since > self.idle_timeout:
+            try:
+                if session.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP failed")
+            except smtplib.SMTPException:
+                session.close()
+                session = None
+
+        if session is None:
+            session = self._open()
+        else:
+            self.reused += 1
+
+        try:
+            try:
+                session.sendmail(from_addr, list(recipients), message)
+            except smtplib.SMTPServerDisconnected:
+                session.close()
+                session = self._open()
+                session.sendmail(from_addr, list(recipients), message)
+        except Exception:
+            session.close()
+            raise
+        return session
+
+    async def send(self, from_addr: str, recipients: Sequence[str], message: bytes) -> None:
+        """Send a message on a pooled session; raises smtplib/OS errors"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+
+        async with self._slots:
+            session, idle_since = self._idle.pop() if self._idle else (None, 0.0)
+            # A session that fails is closed on its worker thread and not returned
+            session = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._send_blocking, session, idle_since, from_addr, recipients, message
+            )
+            self._idle.append((session, time.monotonic()))
+
+    async def close(self) -> None:
+        """QUIT every idle session and stop the worker threads"""
+        loop = asyncio.get_running_loop()
+        idle, self._idle = self._idle, []
+        for session, _ in idle:
+            try:
+                await loop.run_in_executor(self._executor, session.quit)
+            except Exception:
+                session.close()
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pool_size': self.size,
+            'idle_sessions': len(self._idle),
+            'sessions_opened': self.opened,
+            'sessions_reused': self.reused,
+        }
+
+
+class RetryQueue:
+    """
+    Deliveries waiting for their next attempt
+
+    Jobs are kept in a Redis sorted set scored by due time, so they survive
+    restarts and any worker can pick them up; ZREM decides which worker
+    claimed a job. Without Redis they are kept in process.
+    """
+
+    def __init__(self, key: str = RETRY_QUEUE_KEY):
+        self.key = key
+        self._local: List[Tuple[float, str]] = []
+
+    async def push(self, job: Dict[str, Any], due: float) -> None:
+        payload = json.dumps(job)
+        client = get_redis_client()
+        if client is not None:
+            try:
+                await client.zadd(self.key, {payload: due})
+                return
+            except Exception as e:
+                logger.warning(f"Failed to queue email retry in Redis, keeping it in memory: {e}")
+        self._local.append((due, payload))
+
+    async def pop_due(self, now: float, limit: int = 100) -> List[Dict[str, Any]]:
+        """Claim up to `limit` jobs that are due"""
+        due_payloads = []
+
+        client = get_redis_client()
+        if client is not None:
+            try:
+                for payload in await client.zrangebyscore(self.key, "-inf", now, start=0, num=limit):
+                    if await client.zrem(self.key, payload):
+                        due_payloads.append(payload)
+            except Exception as e:
+                logger.warning(f"Failed to read email retries from Redis: {e}")
+
+        self._local.sort()
+        while self._local and self._local[0][0] <= now and len(due_payloads) < limit:
+            due_payloads.append(self._local.pop(0)[1])
+
+        return [json.loads(payload) for payload in due_payloads]
+
+    async def size(self) -> int:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                return await client.zcard(self.key) + len(self._local)
+            except Exception:
+                pass
+        return len(self._local)
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed send is worth retrying (4xx replies, dropped or refused connections)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPConnectError):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, OSError))
+
+
+class SMTPDeliveryEngine:
+    """
+    Asynchronous SMTP delivery for EmailService
+
+    Concurrency is bounded by the session pool, throughput by the provider's
+    rate limiter. A send that fails transiently is queued for another
+    attempt after the next delay in `retry_delays`; once those are used up,
+    or when the failure is permanent, the delivery fails. Retry jobs carry
+    the caller's email_id, and the result of every retry attempt is passed
+    to `on_retry_result` so the caller's delivery tracking follows it.
+    """
+
+    def __init__(
+        self,
+        config: SMTPConfig,
+        pool_size: int = 5,
+        retry_delays: Optional[List[int]] = None,
+        retry_queue: Optional[RetryQueue] = None,
+        rate_limiter: Optional[ProviderRateLimiter] = None,
+        on_retry_result: Optional[Callable[[Optional[str], DeliveryResult], Any]] = None,
+    ):
+        self.config = config
+        self.pool = SMTPSessionPool(config, size=pool_size)
+        self.limiter = rate_limiter or get_rate_limiter(config.name)
+        self.retry_delays = list(retry_delays if retry_delays is not None else DEFAULT_RETRY_DELAYS)
+        self.retry_queue = retry_queue or RetryQueue()
+        self.on_retry_result = on_retry_result
+
+        self.sent = 0
+        self.failed = 0
+        self.retries_queued = 0
+
+    async def deliver(
+        self,
+        from_addr: str,
+        recipients: Sequence[str],
+        message: bytes,
+        attempt: int = 0,
+        email_id: Optional[str] = None,
+    ) -> DeliveryResult:
+        """Send one message to its recipients"""
+        if not await self.limiter.acquire(len(recipients)):
+            self.failed += 1
+            return DeliveryResult(DELIVERY_FAILED, "Daily send limit exceeded", attempt)
+
+        try:
+            await self.pool.send(from_addr, recipients, message)
+        except Exception as e:
+            self.limiter.release(len(recipients))
+            if is_transient(e) and attempt < len(self.retry_delays):
+                await self.retry_queue.push({
+                    'id': str(uuid.uuid4()),
+                    'email_id': email_id,
+                    'attempt': attempt + 1,
+                    'provider': self.config.name,
+                    'from_addr': from_addr,
+                    'recipients': list(recipients),
+                    'message': base64.b64encode(message).decode(),
+                }, time.time() + self.retry_delays[attempt])
+                self.retries_queued += 1
+                logger.warning(f"SMTP send to {len(recipients)} recipients failed, retry {attempt + 1} queued: {e}")
+                return DeliveryResult(DELIVERY_QUEUED, str(e), attempt)
+
+            self.failed += 1
+            logger.error(f"SMTP error: {str(e)}")
+            return DeliveryResult(DELIVERY_FAILED, str(e), attempt)
+
+        self.sent += 1
+        return DeliveryResult(DELIVERY_SENT, attempt=attempt)
+
+    async def process_retries(self, limit: int = 100) -> int:
+        """Attempt every due retry; returns how many were attempted"""
+        jobs = await self.retry_queue.pop_due(time.time(), limit)
+        results = await asyncio.gather(*(
+            self.deliver(
+                job['from_addr'], job['recipients'], base64.b64decode(job['message']),
+                job['attempt'], job.get('email_id'),
+            )
+            for job in jobs
+        ))
+
+        if self.on_retry_result is not None:
+            for job, result in zip(jobs, results):
+                try:
+                    self.on_retry_result(job.get('email_id'), result)
+                except Exception as e:
+                    logger.error(f"Failed to record retry result for email {job.get('email_id')}: {e}")
+        return len(jobs)
+
+    async def run_retry_worker(self, poll_interval: float = 10.0) -> None:
+        """Process due retries until cancelled"""
+        while True:
+            try:
+                if not await self.process_retries():
+                    await asyncio.sleep(poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email retry worker error: {e}")
+                await asyncio.sleep(poll_interval)
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'provider': self.config.name,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries_queued': self.retries_queued,
+            **self.pool.stats(),
+            **self.limiter.stats(),
+        }
@@ -10,7 +10,6 @@ import asyncio
 import uuid
 from typing import Dict, List, Any, Optional, Union
 from datetime import datetime, timedelta
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -19,38 +18,52 @@ import hashlib
 import hmac
 import base64
 
+from .delivery import DELIVERY_QUEUED, DeliveryResult, SMTPConfig, SMTPDeliveryEngine
 from .templates import EmailTemplateService
 from .schemas import EmailRequest, EmailStatusResponse, NotificationStatus
 
 logger = logging.getLogger(__name__)
 
 class EmailService:
-    """Enhanced email service with template support and delivery tracking"""
+    """
+    Enhanced email service with template support and delivery tracking
+
+    Messages are handed to an SMTPDeliveryEngine: pooled authenticated
+    sessions on worker threads, the provider's rate limit and daily cap, and
+    retries on the `retry_delays` schedule for transient failures.
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        smtp_config: Optional[SMTPConfig] = None,
+        pool_size: Optional[int] = None,
+        retry_delays: Optional[List[int]] = None
+    ):
         # SMTP Configuration
-        self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        self.smtp_username = os.getenv("SMTP_USERNAME", "")
-        self.smtp_password = os.getenv("SMTP_PASSWORD", "")
+        self.smtp_config = smtp_config or SMTPConfig.from_env()
+        self.smtp_server = self.smtp_config.host
+        self.smtp_port = self.smtp_config.port
+        self.smtp_username = self.smtp_config.username
+        self.smtp_password = self.smtp_config.password
         self.from_email = os.getenv("FROM_EMAIL", "noreply@oneclass.ac.zw")
         self.from_name = os.getenv("FROM_NAME", "OneClass Platform")
         
         # Service configuration
         self.max_recipients_per_email = 50
-        self.daily_send_limit = 1000
-        self.retry_attempts = 3
-        self.retry_delay = 60  # seconds
+        
+        # Delivery engine (rate limits and daily cap are per provider)
+        self.delivery = SMTPDeliveryEngine(
+            self.smtp_config,
+            pool_size=pool_size or int(os.getenv("SMTP_POOL_SIZE", "5")),
+            retry_delays=retry_delays,
+            on_retry_result=self._track_retry_result
+        )
         
         # Initialize template service
         self.template_service = EmailTemplateService()
         
         # Tracking and analytics
         self.delivery_tracking = {}  # In production, use database
-        self.send_statistics = {
-            'daily_sent': 0,
-            'last_reset': datetime.utcnow().date()
-        }
         
         # Webhook secret for tracking
         self.webhook_secret = os.getenv("EMAIL_WEBHOOK_SECRET", "change-this-secret")
@@ -61,10 +74,6 @@ class EmailService:
         email_id = str(uuid.uuid4())
         
         try:
-            # Check daily send limit
-            if not await self._check_send_limit():
-                raise Exception("Daily send limit exceeded")
-            
             # Normalize recipients
             recipients = email_request.to if isinstance(email_request.to, list) else [email_request.to]
             
@@ -72,8 +81,8 @@ class EmailService:
             if len(recipients) > self.max_recipients_per_email:
                 raise Exception(f"Too many recipients. Maximum {self.max_recipients_per_email} allowed")
             
-            # Prepare email content
-            if email_request.template_name:
+            # Prepare email content (bulk sends arrive already rendered)
+            if email_request.template_name and email_request.html_content is None:
                 # Use template
                 rendered = await self.template_service.render_template(
                     email_request.template_name,
@@ -95,7 +104,7 @@ class EmailService:
                 )
             
             # Send email
-            success = await self._send_smtp_email(
+            delivery = await self._send_smtp_email(
                 recipients=recipients,
                 subject=subject,
                 html_content=html_content,
@@ -103,20 +112,29 @@ class EmailService:
                 cc=email_request.cc,
                 bcc=email_request.bcc,
                 reply_to=email_request.reply_to,
-                attachments=email_request.attachments
+                attachments=email_request.attachments,
+                email_id=email_id
             )
+            success = delivery.sent
             
             # Track delivery
-            await self._track_email_delivery(email_id, email_request, success)
+            await self._track_email_delivery(
+                email_id, email_request, success, delivery.error,
+                queued=delivery.status == DELIVERY_QUEUED
+            )
             
-            # Update statistics
             if success:
-                self._update_send_statistics(len(recipients))
+                message = 'Email sent successfully'
+            elif delivery.status == DELIVERY_QUEUED:
+                message = f'Email delivery delayed, retry queued: {delivery.error}'
+            else:
+                message = f'Email sending failed: {delivery.error}' if delivery.error else 'Email sending failed'
             
             return {
                 'success': success,
                 'email_id': email_id,
-                'message': 'Email sent successfully' if success else 'Email sending failed',
+                'message': message,
+                'queued_for_retry': delivery.status == DELIVERY_QUEUED,
                 'recipients_count': len(recipients),
                 'tracking_enabled': email_request.track_opens or email_request.track_clicks
             }
@@ -138,10 +156,10 @@ class EmailService:
     async def send_bulk_emails(
         self,
         emails: List[EmailRequest],
-        batch_size: int = 10,
-        delay_between_batches: int = 60
+        batch_size: int = 100,
+        delay_between_batches: int = 0
     ) -> Dict[str, Any]:
-        """Send multiple emails in batches"""
+        """Send multiple emails in batches (the delivery engine paces sends to the provider's rate)"""
         
         bulk_id = str(uuid.uuid4())
         results = {
@@ -266,9 +284,10 @@ class EmailService:
         cc: Optional[List[str]] = None,
         bcc: Optional[List[str]] = None,
         reply_to: Optional[str] = None,
-        attachments: Optional[List[Dict[str, Any]]] = None
-    ) -> bool:
-        """Send email via SMTP"""
+        attachments: Optional[List[Dict[str, Any]]] = None,
+        email_id: Optional[str] = None
+    ) -> DeliveryResult:
+        """Send email via the pooled SMTP delivery engine"""
         
         try:
             # Create message
@@ -307,7 +326,7 @@ class EmailService:
                 logger.info(f"EMAIL TO: {recipients}")
                 logger.info(f"EMAIL SUBJECT: {subject}")
                 logger.info(f"EMAIL CONTENT: {text_content[:200] if text_content else 'HTML only'}...")
-                return True
+                return DeliveryResult('sent')
             
             # Prepare all recipients
             all_recipients = recipients.copy()
@@ -316,16 +335,11 @@ class EmailService:
             if bcc:
                 all_recipients.extend(bcc)
             
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg, to_addrs=all_recipients)
-            
-            return True
+            return await self.delivery.deliver(self.from_email, all_recipients, msg.as_bytes(), email_id=email_id)
             
         except Exception as e:
             logger.error(f"SMTP error: {str(e)}")
-            return False
+            return DeliveryResult('failed', str(e))
     
     async def _add_attachment(self, msg: MIMEMultipart, attachment: Dict[str, Any]):
         """Add attachment to email message"""
@@ -390,7 +404,8 @@ class EmailService:
         email_id: str,
         email_request: EmailRequest,
         success: bool,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        queued: bool = False
     ):
         """Track email delivery for analytics"""
         
@@ -402,9 +417,11 @@ class EmailService:
                 'recipient': recipient,
                 'subject': email_request.subject,
                 'template_name': email_request.template_name,
-                'status': NotificationStatus.SENT if success else NotificationStatus.FAILED,
+                'status': NotificationStatus.SENT if success else (
+                    NotificationStatus.QUEUED if queued else NotificationStatus.FAILED
+                ),
                 'sent_at': datetime.utcnow().isoformat() if success else None,
-                'failed_at': datetime.utcnow().isoformat() if not success else None,
+                'failed_at': datetime.utcnow().isoformat() if not success and not queued else None,
                 'failure_reason': error_message,
                 'school_id': str(email_request.school_id) if email_request.school_id else None,
                 'sender_id': str(email_request.sender_id) if email_request.sender_id else None,
@@ -415,21 +432,27 @@ class EmailService:
             
             self.delivery_tracking[f"{email_id}_{recipient}"] = tracking_data
     
-    async def _check_send_limit(self) -> bool:
-        """Check if daily send limit is exceeded"""
-        
-        current_date = datetime.utcnow().date()
+    def _track_retry_result(self, email_id: Optional[str], result: DeliveryResult):
+        """Update tracking of an email queued for retry with the outcome of the retry"""
         
-        # Reset counter if new day
-        if self.send_statistics['last_reset'] != current_date:
-            self.send_statistics['daily_sent'] = 0
-            self.send_statistics['last_reset'] = current_date
-        
-        return self.send_statistics['daily_sent'] < self.daily_send_limit
+        for tracking_data in self.delivery_tracking.values():
+            if tracking_data['email_id'] != email_id:
+                continue
+            
+            if result.sent:
+                tracking_data['status'] = NotificationStatus.SENT
+                tracking_data['sent_at'] = datetime.utcnow().isoformat()
+                tracking_data['failure_reason'] = None
+            elif result.status == DELIVERY_QUEUED:
+                tracking_data['failure_reason'] = result.error
+            else:
+                tracking_data['status'] = NotificationStatus.FAILED
+                tracking_data['failed_at'] = datetime.utcnow().isoformat()
+                tracking_data['failure_reason'] = result.error
     
-    def _update_send_statistics(self, sent_count: int):
-        """Update email send statistics"""
-        self.send_statistics['daily_sent'] += sent_count
+    async def close(self):
+        """Close pooled SMTP sessions"""
+        await self.delivery.close()
     
     def _verify_webhook_signature(self, event_data: Dict[str, Any]) -> bool:
         """Verify webhook signature for security"""
@@ -441,13 +464,16 @@ class EmailService:
     def get_service_statistics(self) -> Dict[str, Any]:
         """Get email service statistics"""
         
+        delivery_stats = self.delivery.stats()
+        
         return {
-            'daily_sent': self.send_statistics['daily_sent'],
-            'daily_limit': self.daily_send_limit,
-            'remaining_today': max(0, self.daily_send_limit - self.send_statistics['daily_sent']),
+            'daily_sent': delivery_stats['daily_sent'],
+            'daily_limit': delivery_stats['daily_limit'],
+            'remaining_today': delivery_stats['remaining_today'],
             'tracked_emails': len(self.delivery_tracking),
-            'smtp_configured': bool(self.smtp_username and self.smtp_password),
-            'last_reset': self.send_statistics['last_reset'].isoformat()
+            'smtp_configured': self.smtp_config.has_credentials,
+            'last_reset': delivery_stats['last_reset'],
+            'delivery': delivery_stats
         }
     
     async def get_delivery_report(
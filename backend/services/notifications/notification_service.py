@@ -25,17 +25,17 @@ logger = logging.getLogger(__name__)
 class NotificationService:
     """Comprehensive notification service with multi-channel support"""
     
-    def __init__(self):
-        self.email_service = EmailService()
-        self.template_service = EmailTemplateService()
-        self.notification_queue = {}  # In production, use Redis/RabbitMQ
-        self.delivery_tracking = {}   # In production, use database
-        
+    def __init__(self, email_service: Optional[EmailService] = None):
         # Service configurations
         self.max_retries = 3
         self.retry_delays = [60, 300, 900]  # 1min, 5min, 15min
         self.batch_size = 100
         
+        self.email_service = email_service or EmailService(retry_delays=self.retry_delays)
+        self.template_service = EmailTemplateService()
+        self.notification_queue = {}  # In production, use Redis/RabbitMQ
+        self.delivery_tracking = {}   # In production, use database
+        
     async def send_notification(
         self,
         notification: NotificationRequest,
@@ -384,22 +384,25 @@ class NotificationService:
         bulk_request: BulkEmailRequest,
         db: AsyncSession
     ) -> Dict[str, int]:
-        """Process a batch of emails"""
+        """Process a batch of emails concurrently (bounded by the email service's SMTP pool)"""
         
-        sent = 0
-        failed = 0
+        # Render the whole batch from the compiled template: global data plus each recipient's overlay
+        rendered_batch = await self.template_service.render_batch(
+            bulk_request.template_name, bulk_request.global_template_data, batch
+        )
         
-        for recipient_data in batch:
+        async def send_one(recipient_data: Dict[str, Any], rendered: Dict[str, Any]) -> bool:
             try:
-                # Merge global and recipient-specific data
-                template_data = {**bulk_request.global_template_data, **recipient_data}
+                if 'error' in rendered:
+                    raise ValueError(rendered['error'])
                 
-                # Prepare email
+                # Prepare email with the pre-rendered content
                 email_request = EmailRequest(
                     to=[recipient_data['email']],
-                    subject=template_data.get('subject', template['subject_template']),
+                    subject=rendered['subject'],
                     template_name=bulk_request.template_name,
-                    template_data=template_data,
+                    html_content=rendered['html_content'],
+                    text_content=rendered['text_content'],
                     school_id=bulk_request.school_id,
                     sender_id=bulk_request.sender_id,
                     track_opens=bulk_request.track_opens,
@@ -409,17 +412,20 @@ class NotificationService:
                 # Send email
                 result = await self.email_service.send_email(email_request)
                 
-                if result['success']:
-                    sent += 1
-                else:
-                    failed += 1
+                if not result['success']:
                     logger.error(f"Failed to send email to {recipient_data['email']}: {result['message']}")
+                return result['success']
                     
             except Exception as e:
-                failed += 1
                 logger.error(f"Error processing email for {recipient_data.get('email', 'unknown')}: {str(e)}")
+                return False
+        
+        results = await asyncio.gather(*(
+            send_one(recipient_data, rendered) for recipient_data, rendered in zip(batch, rendered_batch)
+        ))
+        sent = sum(1 for success in results if success)
         
-        return {'sent': sent, 'failed': failed}
+        return {'sent': sent, 'failed': len(results) - sent}
     
     async def _track_notification(
         self,
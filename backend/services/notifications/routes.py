@@ -27,8 +27,8 @@ router = APIRouter(prefix="/api/v1/notifications", tags=["notifications"])
 logger = logging.getLogger(__name__)
 
 # Initialize services
-notification_service = NotificationService()
 email_service = EmailService()
+notification_service = NotificationService(email_service)
 template_service = EmailTemplateService()
 
 @router.post("/send", response_model=NotificationResponse)
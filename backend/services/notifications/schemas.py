@@ -222,7 +222,7 @@ class BulkEmailRequest(BaseModel):
     # Scheduling
     send_at: Optional[datetime] = None
     batch_size: int = Field(default=100, ge=1, le=1000)
-    delay_between_batches: int = Field(default=60, ge=0)  # seconds
+    delay_between_batches: int = Field(default=0, ge=0)  # seconds; sends are already paced by the provider rate limit
     
     # Tracking
     track_opens: bool = True
@@ -6,22 +6,100 @@
 
 import os
 import json
-from typing import Dict, List, Any, Optional
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Recipients rendered between yields to the event loop in render_batch
+RENDER_YIELD_EVERY = 100
+
+
+def _create_jinja_env(template_dir: Optional[str] = None) -> Environment:
+    return Environment(
+        loader=FileSystemLoader(template_dir) if template_dir else None,
+        autoescape=select_autoescape(['html', 'xml'])
+    )
+
+
+@dataclass
+class CompiledTemplate:
+    """Subject, HTML and text templates of one template version, compiled once"""
+    
+    name: str
+    version: int
+    subject: Template
+    html: Template
+    text: Optional[Template]
+    required_variables: Tuple[str, ...]
+    
+    @classmethod
+    def compile(cls, env: Environment, template: Dict[str, Any]) -> "CompiledTemplate":
+        return cls(
+            name=template['name'],
+            version=template.get('version', 1),
+            subject=env.from_string(template['subject_template']),
+            html=env.from_string(template['html_template']),
+            text=env.from_string(template['text_template']) if template.get('text_template') else None,
+            required_variables=tuple(template['required_variables'])
+        )
+    
+    def render(self, template_data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        return {
+            'subject': self.subject.render(template_data),
+            'html_content': self.html.render(template_data),
+            'text_content': self.text.render(template_data) if self.text is not None else None
+        }
+
+
+def _render_recipient(
+    compiled: CompiledTemplate,
+    global_data: Dict[str, Any],
+    recipient_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Render one recipient's overlay on the shared data; failures are reported, not raised"""
+    
+    template_data = {**global_data, **recipient_data}
+    missing_vars = [var for var in compiled.required_variables if var not in template_data]
+    if missing_vars:
+        return {'error': f"Missing required template variables: {missing_vars}"}
+    
+    try:
+        return compiled.render(template_data)
+    except Exception as e:
+        return {'error': f"Template rendering failed: {str(e)}"}
+
+
 class EmailTemplateService:
-    """Service for managing email templates"""
+    """
+    Service for managing email templates
+    
+    Templates are compiled once per (name, version) and kept in an LRU cache,
+    so repeated and bulk renders only pay for rendering. render_batch renders
+    one template for many recipients from shared data plus per-recipient
+    overlays.
+    """
     
-    def __init__(self):
+    def __init__(self, max_compiled_templates: int = 256):
+        """
+        Initialize template service
+        
+        Args:
+            max_compiled_templates: Compiled template versions kept in memory
+        """
         self.template_dir = os.path.join(os.path.dirname(__file__), 'templates')
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(self.template_dir),
-            autoescape=select_autoescape(['html', 'xml'])
-        )
+        self.jinja_env = _create_jinja_env(self.template_dir)
+        
+        # Compiled templates by (name, version)
+        self.max_compiled_templates = max_compiled_templates
+        self._compiled: "OrderedDict[Tuple[str, int], CompiledTemplate]" = OrderedDict()
+        self.compile_hits = 0
+        self.compile_misses = 0
         
         # Create template directory if it doesn't exist
         os.makedirs(self.template_dir, exist_ok=True)
@@ -35,6 +113,7 @@ class EmailTemplateService:
         templates = {
             'welcome': {
                 'name': 'welcome',
+                'version': 1,
                 'display_name': 'Welcome Email',
                 'description': 'Welcome new users to OneClass platform',
                 'subject_template': 'Welcome to {{school_name}} on OneClass! 🎓',
@@ -45,6 +124,7 @@ class EmailTemplateService:
             },
             'invitation': {
                 'name': 'invitation',
+                'version': 1,
                 'display_name': 'School Invitation',
                 'description': 'Invite users to join a school',
                 'subject_template': 'You\'re invited to join {{school_name}} on OneClass',
@@ -55,6 +135,7 @@ class EmailTemplateService:
             },
             'password_reset': {
                 'name': 'password_reset',
+                'version': 1,
                 'display_name': 'Password Reset',
                 'description': 'Password reset instructions',
                 'subject_template': 'Reset your OneClass password',
@@ -65,6 +146,7 @@ class EmailTemplateService:
             },
             'bulk_import_complete': {
                 'name': 'bulk_import_complete',
+                'version': 1,
                 'display_name': 'Bulk Import Complete',
                 'description': 'Notification when bulk import is completed',
                 'subject_template': 'Bulk import completed for {{school_name}}',
@@ -75,6 +157,7 @@ class EmailTemplateService:
             },
             'system_alert': {
                 'name': 'system_alert',
+                'version': 1,
                 'display_name': 'System Alert',
                 'description': 'System maintenance and alert notifications',
                 'subject_template': '{{alert_type}}: {{alert_title}}',
@@ -904,30 +987,73 @@ https://oneclass.ac.zw
             raise ValueError(f"Missing required template variables: {missing_vars}")
         
         try:
-            # Render subject
-            subject_template = self.jinja_env.from_string(template['subject_template'])
-            subject = subject_template.render(**template_data)
-            
-            # Render HTML content
-            html_template = self.jinja_env.from_string(template['html_template'])
-            html_content = html_template.render(**template_data)
-            
-            # Render text content
-            text_content = None
-            if template.get('text_template'):
-                text_template = self.jinja_env.from_string(template['text_template'])
-                text_content = text_template.render(**template_data)
-            
-            return {
-                'subject': subject,
-                'html_content': html_content,
-                'text_content': text_content
-            }
+            return self.get_compiled(template).render(template_data)
             
         except Exception as e:
             logger.error(f"Error rendering template '{template_name}': {str(e)}")
             raise ValueError(f"Template rendering failed: {str(e)}")
     
+    async def render_batch(
+        self,
+        template_name: str,
+        global_data: Dict[str, Any],
+        recipients: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Render a template for many recipients
+        
+        Each recipient's data is overlaid on global_data. Results are in
+        recipient order; a recipient that cannot be rendered gets
+        {'error': ...} instead of failing the batch.
+        """
+        
+        template = await self.get_template(template_name)
+        if not template:
+            raise ValueError(f"Template '{template_name}' not found")
+        
+        compiled = self.get_compiled(template)
+        rendered = []
+        for index, recipient_data in enumerate(recipients, 1):
+            rendered.append(_render_recipient(compiled, global_data, recipient_data))
+            # Large batches should not hold the event loop for their whole duration
+            if index % RENDER_YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+        
+        return rendered
+    
+    def get_compiled(self, template: Dict[str, Any]) -> CompiledTemplate:
+        """Get the compiled form of a template, compiling it on first use"""
+        
+        key = (template['name'], template.get('version', 1))
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            self._compiled.move_to_end(key)
+            self.compile_hits += 1
+            return compiled
+        
+        self.compile_misses += 1
+        compiled = CompiledTemplate.compile(self.jinja_env, template)
+        self._compiled[key] = compiled
+        while len(self._compiled) > self.max_compiled_templates:
+            self._compiled.popitem(last=False)
+        return compiled
+    
+    def invalidate_template(self, template_name: str):
+        """Drop every compiled version of a template"""
+        for key in [key for key in self._compiled if key[0] == template_name]:
+            del self._compiled[key]
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get compiled template cache counters"""
+        lookups = self.compile_hits + self.compile_misses
+        return {
+            'size': len(self._compiled),
+            'max_size': self.max_compiled_templates,
+            'hits': self.compile_hits,
+            'misses': self.compile_misses,
+            'hit_rate': self.compile_hits / lookups if lookups else 0.0
+        }
+    
     def list_templates(self) -> List[Dict[str, Any]]:
         """List all available templates"""
         return [
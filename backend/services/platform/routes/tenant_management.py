@@ -11,6 +11,7 @@ from uuid import UUID
 import logging
 
 from shared.database import get_async_session
+from shared.pagination import CountMode, InvalidCursorError
 from shared.auth import verify_platform_admin_access
 from shared.models.platform_user import PlatformUser
 from ..tenant_management_service import (
@@ -41,6 +42,8 @@ async def get_all_tenants(
     search_query: Optional[str] = Query(None, description="Search by name or subdomain"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    count: CountMode = Query(CountMode.CACHED, description="Total count: none, estimated, exact or cached"),
     current_user: PlatformUser = Depends(verify_platform_admin_access),
     db: AsyncSession = Depends(get_async_session)
 ):
@@ -51,13 +54,15 @@ async def get_all_tenants(
     try:
         service = TenantManagementService(db)
         
-        tenants, total = await service.get_all_tenants(
+        tenants, total, next_cursor = await service.get_all_tenants(
             status_filter=status_filter,
             tier_filter=tier_filter,
             health_filter=health_filter,
             search_query=search_query,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
+            count_mode=count
         )
         
         # Convert to dict format for response
@@ -68,9 +73,12 @@ async def get_all_tenants(
             "total": total,
             "limit": limit,
             "offset": offset,
-            "has_more": offset + limit < total
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor
         }
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting tenants: {str(e)}")
         raise HTTPException(
@@ -16,6 +16,10 @@ from sqlalchemy.orm import selectinload, joinedload
 from pydantic import BaseModel, Field, EmailStr, validator
 
 from shared.database import get_async_session
+from shared.cache.tenant_cache import publish_tenant_invalidation
+from shared.pagination import (
+    CountMode, SortKey, count_query, decode_cursor, keyset_condition, order_clause, split_page
+)
 from shared.models.platform import School, SchoolSubscription
 from shared.models.platform_user import (
     PlatformUser, SchoolMembership, UserSession,
@@ -24,6 +28,12 @@ from shared.models.platform_user import (
 
 logger = logging.getLogger(__name__)
 
+# Keyset sort order for the tenant list (newest first)
+TENANT_SORT = (
+    SortKey("s.created_at", "created_at", descending=True),
+    SortKey("s.id", "school_id", descending=True),
+)
+
 # =====================================================
 # ENUMS FOR TENANT MANAGEMENT
 # =====================================================
@@ -196,9 +206,15 @@ class TenantManagementService:
         health_filter: Optional[TenantHealth] = None,
         search_query: Optional[str] = None,
         limit: int = 50,
-        offset: int = 0
-    ) -> Tuple[List[TenantSummary], int]:
-        """Get all tenants with filtering and pagination"""
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        count_mode: CountMode = CountMode.EXACT
+    ) -> Tuple[List[TenantSummary], Optional[int], Optional[str]]:
+        """
+        Get all tenants with filtering and pagination
+        
+        Returns (tenants, total, next_cursor); a cursor takes precedence over offset.
+        """
         
         try:
             # Build base query
@@ -266,16 +282,25 @@ class TenantManagementService:
                 where_conditions.append("(s.name ILIKE :search OR s.subdomain ILIKE :search)")
                 params["search"] = f"%{search_query}%"
             
-            if where_conditions:
-                query = text(str(query) + " AND " + " AND ".join(where_conditions))
-            
-            # Add ordering and pagination
-            query = text(str(query) + " ORDER BY s.created_at DESC LIMIT :limit OFFSET :offset")
-            params["limit"] = limit
+            count_params = dict(params)
+            page_conditions = list(where_conditions)
+            if cursor:
+                values = decode_cursor(TENANT_SORT, cursor)
+                placeholders = [f":cursor_{index}" for index in range(len(values))]
+                page_conditions.append(keyset_condition(TENANT_SORT, placeholders))
+                params.update(zip((p[1:] for p in placeholders), values))
+                offset = 0
+            
+            if page_conditions:
+                query = text(str(query) + " AND " + " AND ".join(page_conditions))
+            
+            # Add ordering and pagination (one extra row tells whether there is a next page)
+            query = text(str(query) + f" ORDER BY {order_clause(TENANT_SORT)} LIMIT :limit OFFSET :offset")
+            params["limit"] = limit + 1
             params["offset"] = offset
             
             result = await self.db.execute(query, params)
-            rows = result.fetchall()
+            rows, next_cursor = split_page(result.fetchall(), TENANT_SORT, limit)
             
             # Build tenant summaries
             tenants = []
@@ -308,20 +333,19 @@ class TenantManagementService:
                 tenants.append(tenant)
             
             # Get total count
-            count_query = text("""
-                SELECT COUNT(*) 
+            rows_query = text("""
+                SELECT s.id
                 FROM platform.schools s
                 LEFT JOIN platform.school_subscriptions sub ON s.id = sub.school_id
                 WHERE 1=1
             """)
             
             if where_conditions:
-                count_query = text(str(count_query) + " AND " + " AND ".join(where_conditions))
+                rows_query = text(str(rows_query) + " AND " + " AND ".join(where_conditions))
             
-            count_result = await self.db.execute(count_query, {k: v for k, v in params.items() if k not in ["limit", "offset"]})
-            total = count_result.scalar()
+            total = await count_query(self.db, count_mode, rows_query, count_params)
             
-            return tenants, total
+            return tenants, total, next_cursor
             
         except Exception as e:
             logger.error(f"Error getting all tenants: {e}")
@@ -483,6 +507,7 @@ class TenantManagementService:
                 subscription.activated_at = datetime.now(timezone.utc)
             
             await self.db.commit()
+            await publish_tenant_invalidation(school_id, school.subdomain)
             
             # Log action
             await self._log_admin_action(
@@ -553,6 +578,7 @@ class TenantManagementService:
                 subscription.suspended_at = datetime.now(timezone.utc)
             
             await self.db.commit()
+            await publish_tenant_invalidation(school_id, school.subdomain)
             
             # Log action
             await self._log_admin_action(
@@ -650,6 +676,7 @@ class TenantManagementService:
             subscription.metadata["change_history"] = subscription_history
             
             await self.db.commit()
+            await publish_tenant_invalidation(school_id)
             
             # Log action
             await self._log_admin_action(
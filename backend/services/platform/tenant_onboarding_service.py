@@ -18,6 +18,7 @@ from sqlalchemy.orm import selectinload, joinedload
 from pydantic import BaseModel, Field, EmailStr, validator, root_validator
 
 from shared.database import get_async_session
+from shared.cache.tenant_cache import publish_tenant_invalidation
 from shared.models.platform import School, SchoolSubscription
 from shared.models.platform_user import (
     PlatformUser, SchoolMembership, UserInvitation as SchoolInvitation,
@@ -764,6 +765,7 @@ class TenantOnboardingService:
             school.onboarding_data = onboarding_data
             
             await self.db.commit()
+            await publish_tenant_invalidation(school.id, school.subdomain)
             
             logger.info(f"Modules configured for school {school.name}")
             
@@ -0,0 +1,231 @@
+# =====================================================
+# Real-time Fan-out
+# Topic-indexed subscriber sets, bounded per-connection send queues and a
+# Redis pub/sub relay that carries events between workers
+# File: backend/services/realtime/fanout.py
+# =====================================================
+
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket
+
+from shared.cache.pubsub import listen_forever
+from shared.cache.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel every worker publishes its events on and relays from
+REALTIME_EVENT_CHANNEL = "oneclass:realtime_events"
+
+# Payloads a connection may have waiting before it counts as a slow consumer
+DEFAULT_SEND_QUEUE_SIZE = 256
+
+# Every connection subscribes to this topic; global broadcasts go to it
+BROADCAST_TOPIC = "broadcast"
+
+
+def user_topic(user_id: Any) -> str:
+    return f"user:{user_id}"
+
+
+def school_topic(school_id: Any) -> str:
+    return f"school:{school_id}"
+
+
+def operation_topic(operation_id: Any) -> str:
+    return f"operation:{operation_id}"
+
+
+class TopicIndex:
+    """
+    Subscriber sets per topic, with the reverse index per connection
+
+    Resolving an event's recipients is a union of a few sets, and removing a
+    connection touches only the topics it was subscribed to.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[str]] = {}
+        self._topics: Dict[str, Set[str]] = {}
+
+    def subscribe(self, connection_id: str, topic: str) -> None:
+        self._subscribers.setdefault(topic, set()).add(connection_id)
+        self._topics.setdefault(connection_id, set()).add(topic)
+
+    def unsubscribe(self, connection_id: str, topic: str) -> None:
+        subscribers = self._subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(connection_id)
+            if not subscribers:
+                del self._subscribers[topic]
+
+        topics = self._topics.get(connection_id)
+        if topics is not None:
+            topics.discard(topic)
+
+    def remove(self, connection_id: str) -> None:
+        """Drop a connection from every topic it is subscribed to"""
+        for topic in self._topics.pop(connection_id, set()):
+            subscribers = self._subscribers.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(connection_id)
+            if not subscribers:
+                del self._subscribers[topic]
+
+    def subscribers(self, topics: Iterable[str]) -> Set[str]:
+        """Connections subscribed to any of the topics"""
+        recipients: Set[str] = set()
+        for topic in topics:
+            recipients.update(self._subscribers.get(topic, ()))
+        return recipients
+
+    def topics_of(self, connection_id: str) -> Set[str]:
+        return self._topics.get(connection_id, set())
+
+    def counts(self, prefix: str) -> Dict[str, int]:
+        """Subscriber counts of the topics starting with prefix, keyed by the rest of the name"""
+        return {
+            topic[len(prefix):]: len(subscribers)
+            for topic, subscribers in self._subscribers.items()
+            if topic.startswith(prefix)
+        }
+
+
+class ConnectionSender:
+    """
+    Bounded send queue for one WebSocket, drained by its own task
+
+    Publishing never awaits a socket: payloads are queued, and a full queue
+    means the client is not keeping up, so the caller evicts it instead of
+    letting it hold memory or stall everyone else's delivery.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_error: Callable[[Exception], Any],
+        max_queue: int = DEFAULT_SEND_QUEUE_SIZE,
+    ):
+        """
+        Initialize sender
+
+        Args:
+            websocket: Accepted WebSocket
+            on_error: Called once when a send fails
+            max_queue: Payloads held before offer() refuses more
+        """
+        self.websocket = websocket
+        self.on_error = on_error
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.sent = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def offer(self, payload: str) -> bool:
+        """Queue a payload; False when the queue is full"""
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def close(self) -> None:
+        """Stop draining; queued payloads are dropped"""
+        task, self._task = self._task, None
+        if task is None or task is asyncio.current_task():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            payload = await self.queue.get()
+            try:
+                await self.websocket.send_text(payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._task = None
+                self.on_error(e)
+                return
+            self.sent += 1
+
+
+class RedisEventRelay:
+    """
+    Carries serialized events between workers over Redis pub/sub
+
+    Each worker delivers its own events locally and publishes them once;
+    the listener delivers events published by other workers and ignores
+    its own. Without Redis, publish() is a no-op and delivery stays local.
+    """
+
+    def __init__(self, deliver: Callable[[List[str], str, str], Any], channel: str = REALTIME_EVENT_CHANNEL):
+        """
+        Initialize relay
+
+        Args:
+            deliver: Called with (topics, event_type, payload) for remote events
+            channel: Pub/sub channel shared by all workers
+        """
+        self.deliver = deliver
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self.published = 0
+        self.received = 0
+
+    @property
+    def enabled(self) -> bool:
+        return get_redis_client() is not None
+
+    async def publish(self, topics: List[str], event_type: str, payload: str) -> bool:
+        """Publish a serialized event for the other workers"""
+        client = get_redis_client()
+        if client is None:
+            return False
+
+        message = json.dumps({
+            "origin": self.origin,
+            "topics": topics,
+            "event_type": event_type,
+            "payload": payload,
+        })
+        try:
+            await client.publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"Failed to relay real-time event: {e}")
+            return False
+
+        self.published += 1
+        return True
+
+    def handle_message(self, data: Any) -> None:
+        """Deliver a relayed event unless this worker published it"""
+        try:
+            if isinstance(data, bytes):
+                data = data.decode()
+            message = json.loads(data)
+            origin = message["origin"]
+            topics, event_type, payload = message["topics"], message["event_type"], message["payload"]
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Ignoring malformed real-time relay message: {e}")
+            return
+
+        if origin == self.origin:
+            return
+        self.received += 1
+        self.deliver(topics, event_type, payload)
+
+    async def listen(self) -> None:
+        """Deliver messages from the channel until cancelled, resubscribing after errors"""
+        await listen_forever(self.channel, self.handle_message)
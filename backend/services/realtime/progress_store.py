@@ -0,0 +1,461 @@
+# =====================================================
+# Progress Store
+# Storage backends for operation progress: in-process dicts for a single
+# worker, Redis hashes and streams for state shared by every replica
+# File: backend/services/realtime/progress_store.py
+# =====================================================
+
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional
+
+from shared.cache.redis_client import get_redis_client
+
+from .schemas import (
+    BulkOperationProgress, ErrorDetail, OperationLog, ProgressSnapshot, ProgressStatus, ProgressUpdate
+)
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "oneclass:progress:"
+
+# How long an operation nobody has updated stays readable (crashed jobs age out)
+ACTIVE_TTL_SECONDS = int(os.getenv("PROGRESS_ACTIVE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# How long a finished operation, its logs and snapshots stay readable
+COMPLETED_TTL_SECONDS = int(os.getenv("PROGRESS_COMPLETED_TTL_SECONDS", str(24 * 3600)))
+
+MAX_COMPLETED_OPERATIONS = 1000
+MAX_LOGS_PER_OPERATION = 500
+MAX_SNAPSHOTS_PER_OPERATION = 100
+
+TERMINAL_STATUSES = (ProgressStatus.COMPLETED, ProgressStatus.FAILED, ProgressStatus.CANCELLED)
+
+# Writes an operation's state unless it already reached a terminal status,
+# so a worker holding a stale copy cannot resurrect an operation another
+# replica finished. Returns 1 when written, 0 when refused.
+_TERMINAL_GUARD = """
+local stored = redis.call('HGET', KEYS[1], 'status')
+if stored == '{}' or stored == '{}' or stored == '{}' then
+    return 0
+end
+""".format(*(status.value for status in TERMINAL_STATUSES))
+
+# KEYS: operation hash, active index, active bulk index
+# ARGV: operation id, start time, TTL, status, progress JSON, bulk JSON or ''
+SAVE_SCRIPT = _TERMINAL_GUARD + """
+redis.call('HSET', KEYS[1], 'status', ARGV[4], 'progress', ARGV[5])
+if ARGV[6] ~= '' then
+    redis.call('HSET', KEYS[1], 'bulk', ARGV[6])
+    redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+return 1
+"""
+
+# KEYS: operation hash, active index, active bulk index, completed index
+# ARGV: operation id, finish time, TTL, status, progress JSON, bulk JSON or ''
+FINISH_SCRIPT = _TERMINAL_GUARD + """
+redis.call('HSET', KEYS[1], 'status', ARGV[4], 'progress', ARGV[5])
+if ARGV[6] ~= '' then
+    redis.call('HSET', KEYS[1], 'bulk', ARGV[6])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('ZADD', KEYS[4], ARGV[2], ARGV[1])
+return 1
+"""
+
+
+class ProgressStore(ABC):
+    """
+    Where the progress tracker persists operations
+
+    save() records the latest state of a running operation and finish() its
+    terminal state. Once an operation is finished both refuse further
+    writes and return False, so the first replica to finish it wins; logs,
+    snapshots and errors are append-only and bounded per operation.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def save(self, progress: ProgressUpdate, bulk: Optional[BulkOperationProgress] = None) -> bool:
+        """Persist the current state of a running operation; False if it is already finished"""
+        pass
+
+    @abstractmethod
+    async def finish(self, progress: ProgressUpdate, bulk: Optional[BulkOperationProgress] = None) -> bool:
+        """Persist the terminal state of an operation and retire it from the active set; False if already finished"""
+        pass
+
+    @abstractmethod
+    async def get(self, operation_id: str) -> Optional[ProgressUpdate]:
+        pass
+
+    @abstractmethod
+    async def get_bulk(self, operation_id: str) -> Optional[BulkOperationProgress]:
+        pass
+
+    @abstractmethod
+    async def list_operations(
+        self,
+        user_id: Optional[Any] = None,
+        school_id: Optional[Any] = None,
+    ) -> List[ProgressUpdate]:
+        """Active and retained finished operations, optionally for one user or school"""
+        pass
+
+    @abstractmethod
+    async def append_log(self, log: OperationLog) -> None:
+        pass
+
+    @abstractmethod
+    async def get_logs(self, operation_id: str, limit: int = 100) -> List[OperationLog]:
+        """Most recent log entries of an operation, oldest first"""
+        pass
+
+    @abstractmethod
+    async def append_snapshot(self, snapshot: ProgressSnapshot) -> None:
+        pass
+
+    @abstractmethod
+    async def get_snapshots(self, operation_id: str) -> List[ProgressSnapshot]:
+        pass
+
+    @abstractmethod
+    async def append_error(self, error: ErrorDetail) -> None:
+        pass
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """Counts of active, bulk and finished operations and recorded errors"""
+        pass
+
+
+class MemoryProgressStore(ProgressStore):
+    """
+    Process-local store
+
+    Progress is lost on restart and invisible to other workers; used when
+    Redis is not configured and in tests.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_completed_operations: int = MAX_COMPLETED_OPERATIONS,
+        max_logs_per_operation: int = MAX_LOGS_PER_OPERATION,
+        max_snapshots_per_operation: int = MAX_SNAPSHOTS_PER_OPERATION,
+    ):
+        self.max_completed_operations = max_completed_operations
+        self.max_logs_per_operation = max_logs_per_operation
+        self.max_snapshots_per_operation = max_snapshots_per_operation
+
+        self.active_operations: Dict[str, ProgressUpdate] = {}
+        self.bulk_operations: Dict[str, BulkOperationProgress] = {}
+        # Finished operations in completion order, oldest first
+        self.completed_operations: "OrderedDict[str, ProgressUpdate]" = OrderedDict()
+        self.completed_bulk: Dict[str, BulkOperationProgress] = {}
+
+        self.operation_logs: Dict[str, List[OperationLog]] = defaultdict(list)
+        self.snapshots: Dict[str, List[ProgressSnapshot]] = defaultdict(list)
+        self.operation_errors: Dict[str, List[ErrorDetail]] = defaultdict(list)
+
+    async def save(self, progress: ProgressUpdate, bulk: Optional[BulkOperationProgress] = None) -> bool:
+        if progress.operation_id in self.completed_operations:
+            return False
+
+        self.active_operations[progress.operation_id] = progress.copy(deep=True)
+        if bulk is not None:
+            self.bulk_operations[progress.operation_id] = bulk.copy(deep=True)
+        return True
+
+    async def finish(self, progress: ProgressUpdate, bulk: Optional[BulkOperationProgress] = None) -> bool:
+        operation_id = progress.operation_id
+        if operation_id in self.completed_operations:
+            return False
+
+        self.active_operations.pop(operation_id, None)
+        self.bulk_operations.pop(operation_id, None)
+
+        self.completed_operations[operation_id] = progress.copy(deep=True)
+        self.completed_operations.move_to_end(operation_id)
+        if bulk is not None:
+            self.completed_bulk[operation_id] = bulk.copy(deep=True)
+
+        while len(self.completed_operations) > self.max_completed_operations:
+            evicted, _ = self.completed_operations.popitem(last=False)
+            self.completed_bulk.pop(evicted, None)
+            self.operation_logs.pop(evicted, None)
+            self.snapshots.pop(evicted, None)
+            self.operation_errors.pop(evicted, None)
+        return True
+
+    async def get(self, operation_id: str) -> Optional[ProgressUpdate]:
+        progress = self.active_operations.get(operation_id) or self.completed_operations.get(operation_id)
+        return progress.copy(deep=True) if progress is not None else None
+
+    async def get_bulk(self, operation_id: str) -> Optional[BulkOperationProgress]:
+        bulk = self.bulk_operations.get(operation_id) or self.completed_bulk.get(operation_id)
+        return bulk.copy(deep=True) if bulk is not None else None
+
+    async def list_operations(
+        self,
+        user_id: Optional[Any] = None,
+        school_id: Optional[Any] = None,
+    ) -> List[ProgressUpdate]:
+        operations = []
+        for progress in list(self.active_operations.values()) + list(self.completed_operations.values()):
+            if user_id is not None and str(progress.user_id) != str(user_id):
+                continue
+            if school_id is not None and str(progress.school_id) != str(school_id):
+                continue
+            operations.append(progress.copy(deep=True))
+        return operations
+
+    async def append_log(self, log: OperationLog) -> None:
+        logs = self.operation_logs[log.operation_id]
+        logs.append(log)
+        if len(logs) > self.max_logs_per_operation:
+            del logs[:-self.max_logs_per_operation]
+
+    async def get_logs(self, operation_id: str, limit: int = 100) -> List[OperationLog]:
+        return list(self.operation_logs.get(operation_id, [])[-limit:])
+
+    async def append_snapshot(self, snapshot: ProgressSnapshot) -> None:
+        snapshots = self.snapshots[snapshot.operation_id]
+        snapshots.append(snapshot)
+        if len(snapshots) > self.max_snapshots_per_operation:
+            del snapshots[:-self.max_snapshots_per_operation]
+
+    async def get_snapshots(self, operation_id: str) -> List[ProgressSnapshot]:
+        return list(self.snapshots.get(operation_id, []))
+
+    async def append_error(self, error: ErrorDetail) -> None:
+        self.operation_errors[error.operation_id].append(error)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "active_operations": len(self.active_operations),
+            "completed_operations": len(self.completed_operations),
+            "bulk_operations": len(self.bulk_operations),
+            "error_count": sum(len(errors) for errors in self.operation_errors.values()),
+        }
+
+
+class RedisProgressStore(ProgressStore):
+    """
+    Redis-backed store shared by every replica
+
+    Each operation is a hash holding its progress and bulk progress as JSON.
+    Sorted sets index active and finished operations and each user's and
+    school's operations by start time; logs, snapshots and errors are
+    capped streams. The hash and the active/finished indexes are written by
+    Lua scripts that refuse to touch an operation already in a terminal
+    status. Running operations expire ACTIVE_TTL_SECONDS after their
+    last save, finished ones COMPLETED_TTL_SECONDS after they finish, and
+    index entries whose hash has expired are dropped when next read.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        redis_client,
+        active_ttl: int = ACTIVE_TTL_SECONDS,
+        completed_ttl: int = COMPLETED_TTL_SECONDS,
+        max_completed_operations: int = MAX_COMPLETED_OPERATIONS,
+        max_logs_per_operation: int = MAX_LOGS_PER_OPERATION,
+        max_snapshots_per_operation: int = MAX_SNAPSHOTS_PER_OPERATION,
+    ):
+        self.redis = redis_client
+        self.active_ttl = active_ttl
+        self.completed_ttl = completed_ttl
+        self.max_completed_operations = max_completed_operations
+        self.max_logs_per_operation = max_logs_per_operation
+        self.max_snapshots_per_operation = max_snapshots_per_operation
+
+        self._save_script = redis_client.register_script(SAVE_SCRIPT)
+        self._finish_script = redis_client.register_script(FINISH_SCRIPT)
+
+    # Keys
+
+    @staticmethod
+    def _operation_key(operation_id: str) -> str:
+        return f"{KEY_PREFIX}op:{operation_id}"
+
+    @staticmethod
+    def _stream_key(kind: str, operation_id: str) -> str:
+        return f"{KEY_PREFIX}{kind}:{operation_id}"
+
+    @staticmethod
+    def _index_key(kind: str, owner_id: Any = None) -> str:
+        return f"{KEY_PREFIX}{kind}:{owner_id}" if owner_id is not None else f"{KEY_PREFIX}{kind}"
+
+    def _stream_keys(self, operation_id: str) -> List[str]:
+        return [self._stream_key(kind, operation_id) for kind in ("log", "snapshots", "errors")]
+
+    # State
+
+    async def save(self, progress: ProgressUpdate, bulk: Optional[BulkOperationProgress] = None) -> bool:
+        operation_id = progress.operation_id
+        started = progress.started_at.timestamp()
+        index_ttl = self.active_ttl + self.completed_ttl
+
+        saved = await self._save_script(
+            keys=[self._operation_key(operation_id), self._index_key("active"), self._index_key("active_bulk")],
+            args=[operation_id, started, self.active_ttl, progress.status.value,
+                  progress.json(), bulk.json() if bulk is not None else ""],
+        )
+        if not saved:
+            return False
+
+        pipe = self.redis.pipeline(transaction=False)
+        for kind, owner_id in (("user", progress.user_id), ("school", progress.school_id)):
+            if owner_id is None:
+                continue
+            pipe.zadd(self._index_key(kind, owner_id), {operation_id: started})
+            pipe.expire(self._index_key(kind, owner_id), index_ttl)
+        for stream_key in self._stream_keys(operation_id):
+            pipe.expire(stream_key, self.active_ttl)
+        await pipe.execute()
+        return True
+
+    async def finish(self, progress: ProgressUpdate, bulk: Optional[BulkOperationProgress] = None) -> bool:
+        operation_id = progress.operation_id
+        now = time.time()
+
+        finished = await self._finish_script(
+            keys=[self._operation_key(operation_id), self._index_key("active"),
+                  self._index_key("active_bulk"), self._index_key("completed")],
+            args=[operation_id, now, self.completed_ttl, progress.status.value,
+                  progress.json(), bulk.json() if bulk is not None else ""],
+        )
+        if not finished:
+            return False
+
+        pipe = self.redis.pipeline(transaction=False)
+        for stream_key in self._stream_keys(operation_id):
+            pipe.expire(stream_key, self.completed_ttl)
+        pipe.zremrangebyscore(self._index_key("completed"), "-inf", now - self.completed_ttl)
+        pipe.zremrangebyrank(self._index_key("completed"), 0, -self.max_completed_operations - 1)
+        await pipe.execute()
+        return True
+
+    async def get(self, operation_id: str) -> Optional[ProgressUpdate]:
+        raw = await self.redis.hget(self._operation_key(operation_id), "progress")
+        return ProgressUpdate.parse_raw(raw) if raw else None
+
+    async def get_bulk(self, operation_id: str) -> Optional[BulkOperationProgress]:
+        raw = await self.redis.hget(self._operation_key(operation_id), "bulk")
+        return BulkOperationProgress.parse_raw(raw) if raw else None
+
+    async def list_operations(
+        self,
+        user_id: Optional[Any] = None,
+        school_id: Optional[Any] = None,
+    ) -> List[ProgressUpdate]:
+        if user_id is not None:
+            index_keys = [self._index_key("user", user_id)]
+        elif school_id is not None:
+            index_keys = [self._index_key("school", school_id)]
+        else:
+            index_keys = [self._index_key("active"), self._index_key("completed")]
+
+        operations = []
+        for index_key in index_keys:
+            operation_ids = [_decode(member) for member in await self.redis.zrange(index_key, 0, -1)]
+            if not operation_ids:
+                continue
+
+            pipe = self.redis.pipeline(transaction=False)
+            for operation_id in operation_ids:
+                pipe.hget(self._operation_key(operation_id), "progress")
+            raws = await pipe.execute()
+
+            expired = []
+            for operation_id, raw in zip(operation_ids, raws):
+                if not raw:
+                    expired.append(operation_id)
+                    continue
+                progress = ProgressUpdate.parse_raw(raw)
+                if school_id is not None and str(progress.school_id) != str(school_id):
+                    continue
+                operations.append(progress)
+            if expired:
+                await self.redis.zrem(index_key, *expired)
+        return operations
+
+    # Streams
+
+    async def _append(self, kind: str, operation_id: str, data: str, max_entries: int) -> None:
+        stream_key = self._stream_key(kind, operation_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xadd(stream_key, {"data": data}, maxlen=max_entries, approximate=True)
+        pipe.expire(stream_key, self.active_ttl)
+        await pipe.execute()
+
+    async def _read(self, kind: str, operation_id: str, limit: Optional[int] = None) -> List[bytes]:
+        entries = await self.redis.xrevrange(self._stream_key(kind, operation_id), count=limit)
+        return [fields.get(b"data", fields.get("data")) for _, fields in reversed(entries)]
+
+    async def append_log(self, log: OperationLog) -> None:
+        await self._append("log", log.operation_id, log.json(), self.max_logs_per_operation)
+
+    async def get_logs(self, operation_id: str, limit: int = 100) -> List[OperationLog]:
+        return [OperationLog.parse_raw(raw) for raw in await self._read("log", operation_id, limit)]
+
+    async def append_snapshot(self, snapshot: ProgressSnapshot) -> None:
+        await self._append("snapshots", snapshot.operation_id, snapshot.json(), self.max_snapshots_per_operation)
+
+    async def get_snapshots(self, operation_id: str) -> List[ProgressSnapshot]:
+        return [ProgressSnapshot.parse_raw(raw) for raw in await self._read("snapshots", operation_id)]
+
+    async def append_error(self, error: ErrorDetail) -> None:
+        await self._append("errors", error.operation_id, error.json(), self.max_logs_per_operation)
+        await self.redis.incr(self._index_key("error_count"))
+
+    async def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zcard(self._index_key("active"))
+        pipe.zcount(self._index_key("completed"), now - self.completed_ttl, "+inf")
+        pipe.zcard(self._index_key("active_bulk"))
+        pipe.get(self._index_key("error_count"))
+        active, completed, bulk, errors = await pipe.execute()
+        return {
+            "backend": self.name,
+            "active_operations": active,
+            "completed_operations": completed,
+            "bulk_operations": bulk,
+            "error_count": int(errors or 0),
+        }
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def create_progress_store() -> ProgressStore:
+    """
+    Pick the store from PROGRESS_STORE ("redis" or "memory")
+
+    Defaults to Redis when REDIS_URL is configured, so progress survives
+    restarts and can be polled from any replica, and to memory otherwise.
+    """
+    backend = os.getenv("PROGRESS_STORE", "").strip().lower()
+    if backend != "memory":
+        client = get_redis_client()
+        if client is not None:
+            return RedisProgressStore(client)
+        if backend == "redis":
+            logger.warning("PROGRESS_STORE=redis but Redis is not configured; progress is kept in memory")
+    return MemoryProgressStore()
@@ -5,73 +5,67 @@
 # =====================================================
 
 import asyncio
+import os
 import uuid
 import time
 import logging
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Set
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from collections import defaultdict
 
 from .schemas import (
     ProgressUpdate, BulkOperationProgress, ProgressStatus, OperationType,
     OperationLog, PerformanceMetrics, ProgressSnapshot, ErrorDetail
 )
-
-# Fix missing UUID import in schemas
-import uuid as uuid_module
+from .progress_store import TERMINAL_STATUSES, ProgressStore, create_progress_store
 
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between persisted/fanned-out updates of one operation
+PUBLISH_INTERVAL_SECONDS = float(os.getenv("PROGRESS_PUBLISH_INTERVAL_SECONDS", "1"))
+
 class ProgressTracker:
-    """Service for tracking and managing operation progress"""
-    
-    def __init__(self):
-        # Core tracking data
-        self.active_operations: Dict[str, ProgressUpdate] = {}
+    """
+    Service for tracking and managing operation progress
+
+    Operations live in a ProgressStore (Redis when configured), so progress
+    survives restarts and can be read from any replica. The worker running
+    an operation keeps a working copy of it; updates change the copy and are
+    coalesced per operation, so at most one save and one notification go out
+    every publish_interval seconds. Status changes, completion and
+    cancellation are written immediately. The store refuses to write over
+    an operation another replica already finished; the working copy is then
+    dropped and further updates of it return False.
+    """
+
+    def __init__(self, store: Optional[ProgressStore] = None, publish_interval: float = PUBLISH_INTERVAL_SECONDS):
+        self.store = store or create_progress_store()
+        self.publish_interval = publish_interval
+
+        # Working copies of operations updated through this worker
+        self.operations: Dict[str, ProgressUpdate] = {}
         self.bulk_operations: Dict[str, BulkOperationProgress] = {}
-        self.completed_operations: Dict[str, ProgressUpdate] = {}
-        
-        # Performance tracking
-        self.operation_logs: Dict[str, List[OperationLog]] = defaultdict(list)
+
+        # Coalescing state
+        self._last_flush: Dict[str, float] = {}
+        self._last_snapshot: Dict[str, float] = {}
+        self._pending_flushes: Dict[str, asyncio.TimerHandle] = {}
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self.coalesced_updates = 0
+
+        # Performance metrics, computed on demand from finished operations
         self.performance_metrics: Dict[OperationType, PerformanceMetrics] = {}
-        self.snapshots: Dict[str, List[ProgressSnapshot]] = defaultdict(list)
-        
-        # Error tracking
-        self.operation_errors: Dict[str, List[ErrorDetail]] = defaultdict(list)
-        
+        self._metrics_computed_at = 0.0
+
         # Event subscribers
         self.progress_subscribers: Dict[str, List[Callable]] = defaultdict(list)
         self.global_subscribers: List[Callable] = []
-        
+
         # Configuration
-        self.max_completed_operations = 1000
-        self.max_logs_per_operation = 500
         self.snapshot_interval = 30  # seconds
-        self.cleanup_interval = 3600  # 1 hour
-        
-        # Background tasks
-        self.background_tasks: List[asyncio.Task] = []
-        self._start_background_tasks()
-    
-    def _start_background_tasks(self):
-        """Start background maintenance tasks"""
-        loop = asyncio.get_event_loop()
-        
-        # Snapshot task
-        self.background_tasks.append(
-            loop.create_task(self._periodic_snapshots())
-        )
-        
-        # Cleanup task
-        self.background_tasks.append(
-            loop.create_task(self._periodic_cleanup())
-        )
-        
-        # Performance calculation task
-        self.background_tasks.append(
-            loop.create_task(self._calculate_performance_metrics())
-        )
-    
+        self.metrics_interval = 300  # seconds
+        self.working_copy_idle_seconds = 900
+
     async def create_operation(
         self,
         operation_type: OperationType,
@@ -81,9 +75,9 @@ class ProgressTracker:
         metadata: Optional[Dict[str, Any]] = None
     ) -> str:
         """Create a new operation for tracking"""
-        
+
         operation_id = str(uuid.uuid4())
-        
+
         progress = ProgressUpdate(
             operation_id=operation_id,
             operation_type=operation_type,
@@ -97,18 +91,18 @@ class ProgressTracker:
             school_id=school_id,
             metadata=metadata or {}
         )
-        
-        self.active_operations[operation_id] = progress
-        
+
+        self.operations[operation_id] = progress
+
         # Log operation creation
         await self._log_operation(operation_id, "info", f"Operation created: {operation_type}")
-        
-        # Notify subscribers
-        await self._notify_progress_update(progress)
-        
+
+        # Persist and notify subscribers
+        await self._publish(operation_id, immediate=True)
+
         logger.info(f"Created operation {operation_id}: {operation_type} for user {user_id}")
         return operation_id
-    
+
     async def create_bulk_operation(
         self,
         operation_type: OperationType,
@@ -119,10 +113,10 @@ class ProgressTracker:
         metadata: Optional[Dict[str, Any]] = None
     ) -> str:
         """Create a new bulk operation for tracking"""
-        
+
         operation_id = str(uuid.uuid4())
         total_batches = (total_items + batch_size - 1) // batch_size  # Ceiling division
-        
+
         bulk_progress = BulkOperationProgress(
             operation_id=operation_id,
             operation_type=operation_type,
@@ -138,9 +132,9 @@ class ProgressTracker:
             progress_percentage=0.0,
             started_at=datetime.utcnow()
         )
-        
+
         self.bulk_operations[operation_id] = bulk_progress
-        
+
         # Also create regular progress entry
         progress = ProgressUpdate(
             operation_id=operation_id,
@@ -155,17 +149,17 @@ class ProgressTracker:
             school_id=school_id,
             metadata=metadata or {}
         )
-        
-        self.active_operations[operation_id] = progress
-        
-        await self._log_operation(operation_id, "info", 
+
+        self.operations[operation_id] = progress
+
+        await self._log_operation(operation_id, "info",
                                  f"Bulk operation created: {operation_type}, {total_items} items, {total_batches} batches")
-        
-        await self._notify_progress_update(progress)
-        
+
+        await self._publish(operation_id, immediate=True)
+
         logger.info(f"Created bulk operation {operation_id}: {operation_type} for user {user_id}")
         return operation_id
-    
+
     async def update_progress(
         self,
         operation_id: str,
@@ -175,13 +169,12 @@ class ProgressTracker:
         metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
         """Update operation progress"""
-        
-        if operation_id not in self.active_operations:
+
+        progress = await self._working_copy(operation_id)
+        if progress is None:
             logger.warning(f"Operation {operation_id} not found for progress update")
             return False
-        
-        progress = self.active_operations[operation_id]
-        
+
         # Update fields
         if progress_percentage is not None:
             progress.progress_percentage = min(100.0, max(0.0, progress_percentage))
@@ -194,26 +187,24 @@ class ProgressTracker:
             progress.current_task = current_task
         if metadata:
             progress.metadata.update(metadata)
-        
+
         # Update timing
         elapsed = (datetime.utcnow() - progress.started_at).total_seconds()
         progress.elapsed_time = elapsed
-        
+
         # Estimate completion time
         if progress.progress_percentage > 0:
             total_estimated = elapsed / (progress.progress_percentage / 100)
             remaining_time = total_estimated - elapsed
             progress.estimated_completion = datetime.utcnow() + timedelta(seconds=remaining_time)
-        
-        # Change status if starting
-        if progress.status == ProgressStatus.PENDING:
+
+        # Change status if starting; status changes are never coalesced
+        started = progress.status == ProgressStatus.PENDING
+        if started:
             progress.status = ProgressStatus.IN_PROGRESS
-        
-        # Notify subscribers
-        await self._notify_progress_update(progress)
-        
-        return True
-    
+
+        return await self._publish(operation_id, immediate=started)
+
     async def update_bulk_progress(
         self,
         operation_id: str,
@@ -225,13 +216,13 @@ class ProgressTracker:
         errors: Optional[List[Dict[str, Any]]] = None
     ) -> bool:
         """Update bulk operation progress"""
-        
-        if operation_id not in self.bulk_operations:
+
+        progress = await self._working_copy(operation_id)
+        bulk_progress = self.bulk_operations.get(operation_id)
+        if bulk_progress is None:
             logger.warning(f"Bulk operation {operation_id} not found for progress update")
             return False
-        
-        bulk_progress = self.bulk_operations[operation_id]
-        
+
         # Update fields
         if completed_batches is not None:
             bulk_progress.completed_batches = completed_batches
@@ -245,35 +236,35 @@ class ProgressTracker:
             bulk_progress.current_batch = current_batch
         if errors:
             bulk_progress.errors.extend(errors)
-        
+
         # Calculate progress percentage
         if bulk_progress.total_items > 0:
             bulk_progress.progress_percentage = (bulk_progress.processed_items / bulk_progress.total_items) * 100
-        
+
         # Calculate processing rate
         elapsed = (datetime.utcnow() - bulk_progress.started_at).total_seconds()
         if elapsed > 0:
             bulk_progress.items_per_second = bulk_progress.processed_items / elapsed
-            
+
             # Estimate completion
             if bulk_progress.items_per_second > 0:
                 remaining_items = bulk_progress.total_items - bulk_progress.processed_items
                 remaining_seconds = remaining_items / bulk_progress.items_per_second
                 bulk_progress.estimated_completion = datetime.utcnow() + timedelta(seconds=remaining_seconds)
-        
+
         bulk_progress.last_updated = datetime.utcnow()
-        
+
         # Update corresponding regular progress entry
-        if operation_id in self.active_operations:
-            await self.update_progress(
+        if progress is not None:
+            return await self.update_progress(
                 operation_id,
                 progress_percentage=bulk_progress.progress_percentage,
                 current_step=bulk_progress.processed_items,
                 current_task=f"Processing batch {bulk_progress.current_batch + 1}/{bulk_progress.total_batches}"
             )
-        
+
         return True
-    
+
     async def complete_operation(
         self,
         operation_id: str,
@@ -282,79 +273,64 @@ class ProgressTracker:
         error_message: Optional[str] = None
     ) -> bool:
         """Mark operation as completed"""
-        
-        if operation_id not in self.active_operations:
+
+        progress = await self._working_copy(operation_id)
+        if progress is None:
             logger.warning(f"Operation {operation_id} not found for completion")
             return False
-        
-        progress = self.active_operations[operation_id]
-        
+
         # Update status
         progress.status = ProgressStatus.COMPLETED if success else ProgressStatus.FAILED
         progress.progress_percentage = 100.0 if success else progress.progress_percentage
-        
+
         # Update timing
         progress.elapsed_time = (datetime.utcnow() - progress.started_at).total_seconds()
-        
+
         # Add result data
         if result_data:
             progress.metadata.update(result_data)
-        
+
         # Log completion
         log_level = "info" if success else "error"
         log_message = f"Operation completed: {success}"
         if error_message:
             log_message += f" - {error_message}"
-        
+
         await self._log_operation(operation_id, log_level, log_message)
-        
+
         # Update bulk operation if applicable
         if operation_id in self.bulk_operations:
             bulk_progress = self.bulk_operations[operation_id]
             bulk_progress.status = progress.status
             bulk_progress.progress_percentage = 100.0 if success else bulk_progress.progress_percentage
-            
+
             if result_data:
                 bulk_progress.results_summary = result_data
-        
-        # Notify subscribers
-        await self._notify_progress_update(progress)
-        
-        # Move to completed operations
-        self.completed_operations[operation_id] = progress
-        del self.active_operations[operation_id]
-        
-        if operation_id in self.bulk_operations:
-            del self.bulk_operations[operation_id]
-        
-        # Clean up old completed operations
-        await self._cleanup_completed_operations()
-        
+
+        if not await self._finish(operation_id):
+            return False
+
         logger.info(f"Operation {operation_id} completed: {success}")
         return True
-    
+
     async def cancel_operation(self, operation_id: str) -> bool:
         """Cancel an active operation"""
-        
-        if operation_id not in self.active_operations:
+
+        progress = await self._working_copy(operation_id)
+        if progress is None:
             return False
-        
-        progress = self.active_operations[operation_id]
+
         progress.status = ProgressStatus.CANCELLED
-        
-        await self._log_operation(operation_id, "warning", "Operation cancelled")
-        await self._notify_progress_update(progress)
-        
-        # Move to completed
-        self.completed_operations[operation_id] = progress
-        del self.active_operations[operation_id]
-        
         if operation_id in self.bulk_operations:
-            del self.bulk_operations[operation_id]
-        
+            self.bulk_operations[operation_id].status = ProgressStatus.CANCELLED
+
+        await self._log_operation(operation_id, "warning", "Operation cancelled")
+        if not await self._finish(operation_id):
+            return False
+
         logger.info(f"Operation {operation_id} cancelled")
         return True
-    
+
     async def add_error(
         self,
         operation_id: str,
@@ -364,7 +340,7 @@ class ProgressTracker:
         item_index: Optional[int] = None
     ):
         """Add error to operation"""
-        
+
         error = ErrorDetail(
             operation_id=operation_id,
             error_type=error_type,
@@ -372,15 +348,14 @@ class ProgressTracker:
             error_details=error_details or {},
             item_index=item_index
         )
-        
-        self.operation_errors[operation_id].append(error)
-        
-        # Update operation progress with error count
-        if operation_id in self.active_operations:
-            progress = self.active_operations[operation_id]
-            progress.failed_items += 1
-            await self._notify_progress_update(progress)
-        
+
+        try:
+            await self.store.append_error(error)
+        except Exception as e:
+            logger.error(f"Failed to store error for operation {operation_id}: {str(e)}")
+
+        progress = await self._working_copy(operation_id)
+
         # Update bulk operation
         if operation_id in self.bulk_operations:
             bulk_progress = self.bulk_operations[operation_id]
@@ -391,70 +366,75 @@ class ProgressTracker:
                 "item_index": item_index,
                 "timestamp": datetime.utcnow().isoformat()
             })
-        
+
+        # Update operation progress with error count
+        if progress is not None:
+            progress.failed_items += 1
+            await self._publish(operation_id)
+
         await self._log_operation(operation_id, "error", f"{error_type}: {error_message}")
-    
-    def get_operation_progress(self, operation_id: str) -> Optional[ProgressUpdate]:
+
+    async def get_operation_progress(self, operation_id: str) -> Optional[ProgressUpdate]:
         """Get current progress for an operation"""
-        
-        # Check active operations first
-        if operation_id in self.active_operations:
-            return self.active_operations[operation_id]
-        
-        # Check completed operations
-        if operation_id in self.completed_operations:
-            return self.completed_operations[operation_id]
-        
-        return None
-    
-    def get_bulk_operation_progress(self, operation_id: str) -> Optional[BulkOperationProgress]:
+
+        # Our working copy may hold updates still waiting to be flushed
+        if operation_id in self.operations:
+            return self.operations[operation_id]
+
+        return await self.store.get(operation_id)
+
+    async def get_bulk_operation_progress(self, operation_id: str) -> Optional[BulkOperationProgress]:
         """Get bulk operation progress"""
-        return self.bulk_operations.get(operation_id)
-    
-    def get_user_operations(self, user_id: uuid.UUID) -> List[ProgressUpdate]:
+
+        if operation_id in self.bulk_operations:
+            return self.bulk_operations[operation_id]
+
+        return await self.store.get_bulk(operation_id)
+
+    async def get_operation_logs(self, operation_id: str, limit: int = 100) -> List[OperationLog]:
+        """Get the most recent log entries for an operation"""
+        return await self.store.get_logs(operation_id, limit)
+
+    async def get_user_operations(self, user_id: uuid.UUID) -> List[ProgressUpdate]:
         """Get all operations for a user"""
-        
-        user_operations = []
-        
-        # Active operations
-        for progress in self.active_operations.values():
-            if progress.user_id == user_id:
-                user_operations.append(progress)
-        
-        # Recent completed operations (last 24 hours)
-        cutoff = datetime.utcnow() - timedelta(hours=24)
-        for progress in self.completed_operations.values():
-            if progress.user_id == user_id and progress.started_at > cutoff:
-                user_operations.append(progress)
-        
-        return sorted(user_operations, key=lambda x: x.started_at, reverse=True)
-    
-    def get_school_operations(self, school_id: uuid.UUID) -> List[ProgressUpdate]:
+
+        operations = await self.store.list_operations(user_id=user_id)
+        return self._recent(operations, lambda progress: progress.user_id == user_id)
+
+    async def get_school_operations(self, school_id: uuid.UUID) -> List[ProgressUpdate]:
         """Get all operations for a school"""
-        
-        school_operations = []
-        
-        # Active operations
-        for progress in self.active_operations.values():
-            if progress.school_id == school_id:
-                school_operations.append(progress)
-        
-        # Recent completed operations
+
+        operations = await self.store.list_operations(school_id=school_id)
+        return self._recent(operations, lambda progress: progress.school_id == school_id)
+
+    def _recent(self, stored: List[ProgressUpdate], belongs: Callable[[ProgressUpdate], bool]) -> List[ProgressUpdate]:
+        """Overlay local working copies; keep active and last-24h finished operations, newest first"""
+
+        operations = {progress.operation_id: progress for progress in stored}
+        for operation_id, progress in self.operations.items():
+            if belongs(progress):
+                operations[operation_id] = progress
+
         cutoff = datetime.utcnow() - timedelta(hours=24)
-        for progress in self.completed_operations.values():
-            if progress.school_id == school_id and progress.started_at > cutoff:
-                school_operations.append(progress)
-        
-        return sorted(school_operations, key=lambda x: x.started_at, reverse=True)
-    
+        recent = [
+            progress for progress in operations.values()
+            if progress.status not in TERMINAL_STATUSES or progress.started_at > cutoff
+        ]
+        return sorted(recent, key=lambda x: x.started_at, reverse=True)
+
     def subscribe_to_operation(self, operation_id: str, callback: Callable):
         """Subscribe to updates for a specific operation"""
         self.progress_subscribers[operation_id].append(callback)
-    
+
     def subscribe_to_all(self, callback: Callable):
         """Subscribe to all progress updates"""
         self.global_subscribers.append(callback)
-    
+
+    def unsubscribe_from_all(self, callback: Callable):
+        """Unsubscribe from all progress updates"""
+        if callback in self.global_subscribers:
+            self.global_subscribers.remove(callback)
+
     def unsubscribe(self, operation_id: str, callback: Callable):
         """Unsubscribe from operation updates"""
         if operation_id in self.progress_subscribers:
@@ -462,27 +442,165 @@ class ProgressTracker:
                 self.progress_subscribers[operation_id].remove(callback)
             except ValueError:
                 pass
-    
+
+    async def flush_pending(self):
+        """Write out every coalesced update still waiting for its interval"""
+
+        for operation_id in list(self._pending_flushes):
+            self._pending_flushes.pop(operation_id).cancel()
+            await self._flush(operation_id)
+
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+    async def _working_copy(self, operation_id: str) -> Optional[ProgressUpdate]:
+        """
+        The running operation this worker updates, loaded from the store if
+        another worker (or a previous process) started it
+        """
+
+        progress = self.operations.get(operation_id)
+        if progress is not None:
+            return progress
+
+        self._drop_idle_working_copies()
+
+        progress = await self.store.get(operation_id)
+        if progress is None or progress.status in TERMINAL_STATUSES:
+            return None
+
+        self.operations[operation_id] = progress
+        bulk_progress = await self.store.get_bulk(operation_id)
+        if bulk_progress is not None:
+            self.bulk_operations[operation_id] = bulk_progress
+        self._last_flush[operation_id] = time.monotonic()
+        return progress
+
+    def _drop_idle_working_copies(self):
+        """Forget operations this worker adopted but no longer updates"""
+
+        cutoff = time.monotonic() - self.working_copy_idle_seconds
+        for operation_id, flushed_at in list(self._last_flush.items()):
+            if flushed_at < cutoff and operation_id not in self._pending_flushes:
+                self._forget(operation_id)
+
+    def _forget(self, operation_id: str):
+        self.operations.pop(operation_id, None)
+        self.bulk_operations.pop(operation_id, None)
+        self._last_flush.pop(operation_id, None)
+        self._last_snapshot.pop(operation_id, None)
+        handle = self._pending_flushes.pop(operation_id, None)
+        if handle is not None:
+            handle.cancel()
+
+    async def _publish(self, operation_id: str, immediate: bool = False) -> bool:
+        """
+        Flush an operation now, or once its publish interval has passed
+
+        Returns False when the flush found the operation finished elsewhere.
+        """
+
+        if not immediate:
+            last_flush = self._last_flush.get(operation_id)
+            if last_flush is not None:
+                wait = self.publish_interval - (time.monotonic() - last_flush)
+                if wait > 0:
+                    self.coalesced_updates += 1
+                    if operation_id not in self._pending_flushes:
+                        self._pending_flushes[operation_id] = asyncio.get_event_loop().call_later(
+                            wait, self._schedule_flush, operation_id
+                        )
+                    return True
+
+        handle = self._pending_flushes.pop(operation_id, None)
+        if handle is not None:
+            handle.cancel()
+        return await self._flush(operation_id)
+
+    def _schedule_flush(self, operation_id: str):
+        self._pending_flushes.pop(operation_id, None)
+        task = asyncio.get_event_loop().create_task(self._flush(operation_id))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, operation_id: str) -> bool:
+        """Persist the working copy, snapshot it when due and notify subscribers"""
+
+        progress = self.operations.get(operation_id)
+        if progress is None:
+            return False
+
+        now = time.monotonic()
+        self._last_flush[operation_id] = now
+
+        try:
+            if not await self.store.save(progress, self.bulk_operations.get(operation_id)):
+                logger.info(f"Operation {operation_id} was finished elsewhere; dropping local progress")
+                self._forget(operation_id)
+                return False
+            if now - self._last_snapshot.get(operation_id, 0.0) >= self.snapshot_interval:
+                self._last_snapshot[operation_id] = now
+                await self.store.append_snapshot(self._snapshot(progress))
+        except Exception as e:
+            logger.error(f"Failed to persist progress for operation {operation_id}: {str(e)}")
+
+        await self._notify_progress_update(progress)
+        return True
+
+    async def _finish(self, operation_id: str) -> bool:
+        """Persist a terminal state, notify subscribers and drop the working copy"""
+
+        progress = self.operations[operation_id]
+        handle = self._pending_flushes.pop(operation_id, None)
+        if handle is not None:
+            handle.cancel()
+
+        finished = True
+        try:
+            finished = await self.store.finish(progress, self.bulk_operations.get(operation_id))
+        except Exception as e:
+            logger.error(f"Failed to persist completion of operation {operation_id}: {str(e)}")
+
+        if finished:
+            await self._notify_progress_update(progress)
+        else:
+            logger.info(f"Operation {operation_id} was already finished elsewhere")
+        self._forget(operation_id)
+        return finished
+
+    @staticmethod
+    def _snapshot(progress: ProgressUpdate) -> ProgressSnapshot:
+        return ProgressSnapshot(
+            operation_id=progress.operation_id,
+            snapshot_time=datetime.utcnow(),
+            status=progress.status,
+            progress_percentage=progress.progress_percentage,
+            items_processed=progress.processed_items,
+            items_remaining=max(0, progress.total_items - progress.processed_items),
+            current_rate=progress.processed_items / progress.elapsed_time if progress.elapsed_time > 0 else 0,
+            estimated_completion=progress.estimated_completion
+        )
+
     async def _notify_progress_update(self, progress: ProgressUpdate):
         """Notify all subscribers of progress update"""
-        
+
         # Notify operation-specific subscribers
         for callback in self.progress_subscribers.get(progress.operation_id, []):
             try:
                 await callback(progress)
             except Exception as e:
                 logger.error(f"Error in progress callback: {str(e)}")
-        
+
         # Notify global subscribers
         for callback in self.global_subscribers:
             try:
                 await callback(progress)
             except Exception as e:
                 logger.error(f"Error in global progress callback: {str(e)}")
-    
+
     async def _log_operation(self, operation_id: str, level: str, message: str, details: Optional[Dict[str, Any]] = None):
         """Log operation event"""
-        
+
         log_entry = OperationLog(
             operation_id=operation_id,
             timestamp=datetime.utcnow(),
@@ -490,161 +608,47 @@ class ProgressTracker:
             message=message,
             details=details or {}
         )
-        
-        self.operation_logs[operation_id].append(log_entry)
-        
-        # Limit log entries per operation
-        if len(self.operation_logs[operation_id]) > self.max_logs_per_operation:
-            self.operation_logs[operation_id] = self.operation_logs[operation_id][-self.max_logs_per_operation:]
-    
-    async def _periodic_snapshots(self):
-        """Take periodic snapshots of active operations"""
-        
-        while True:
-            try:
-                await asyncio.sleep(self.snapshot_interval)
-                
-                for operation_id, progress in self.active_operations.items():
-                    snapshot = ProgressSnapshot(
-                        operation_id=operation_id,
-                        snapshot_time=datetime.utcnow(),
-                        status=progress.status,
-                        progress_percentage=progress.progress_percentage,
-                        items_processed=progress.processed_items,
-                        items_remaining=max(0, progress.total_items - progress.processed_items),
-                        current_rate=progress.processed_items / progress.elapsed_time if progress.elapsed_time > 0 else 0,
-                        estimated_completion=progress.estimated_completion
-                    )
-                    
-                    self.snapshots[operation_id].append(snapshot)
-                    
-                    # Limit snapshots per operation
-                    if len(self.snapshots[operation_id]) > 100:
-                        self.snapshots[operation_id] = self.snapshots[operation_id][-100:]
-                
-            except Exception as e:
-                logger.error(f"Error in periodic snapshots: {str(e)}")
-    
-    async def _periodic_cleanup(self):
-        """Clean up old data periodically"""
-        
-        while True:
-            try:
-                await asyncio.sleep(self.cleanup_interval)
-                
-                await self._cleanup_completed_operations()
-                await self._cleanup_logs()
-                await self._cleanup_snapshots()
-                
-            except Exception as e:
-                logger.error(f"Error in periodic cleanup: {str(e)}")
-    
-    async def _cleanup_completed_operations(self):
-        """Clean up old completed operations"""
-        
-        if len(self.completed_operations) <= self.max_completed_operations:
-            return
-        
-        # Sort by completion time and keep only the most recent
-        sorted_operations = sorted(
-            self.completed_operations.items(),
-            key=lambda x: x[1].started_at,
-            reverse=True
-        )
-        
-        # Keep only the most recent operations
-        operations_to_keep = dict(sorted_operations[:self.max_completed_operations])
-        operations_to_remove = set(self.completed_operations.keys()) - set(operations_to_keep.keys())
-        
-        for operation_id in operations_to_remove:
-            del self.completed_operations[operation_id]
-            if operation_id in self.operation_logs:
-                del self.operation_logs[operation_id]
-            if operation_id in self.snapshots:
-                del self.snapshots[operation_id]
-            if operation_id in self.operation_errors:
-                del self.operation_errors[operation_id]
-        
-        logger.info(f"Cleaned up {len(operations_to_remove)} old completed operations")
-    
-    async def _cleanup_logs(self):
-        """Clean up old log entries"""
-        
-        cutoff_time = datetime.utcnow() - timedelta(days=7)
-        
-        for operation_id in list(self.operation_logs.keys()):
-            original_count = len(self.operation_logs[operation_id])
-            self.operation_logs[operation_id] = [
-                log for log in self.operation_logs[operation_id]
-                if log.timestamp > cutoff_time
-            ]
-            
-            # Remove empty log lists
-            if not self.operation_logs[operation_id]:
-                del self.operation_logs[operation_id]
-    
-    async def _cleanup_snapshots(self):
-        """Clean up old snapshots"""
-        
-        cutoff_time = datetime.utcnow() - timedelta(hours=24)
-        
-        for operation_id in list(self.snapshots.keys()):
-            self.snapshots[operation_id] = [
-                snapshot for snapshot in self.snapshots[operation_id]
-                if snapshot.snapshot_time > cutoff_time
-            ]
-            
-            # Remove empty snapshot lists
-            if not self.snapshots[operation_id]:
-                del self.snapshots[operation_id]
-    
-    async def _calculate_performance_metrics(self):
-        """Calculate performance metrics for different operation types"""
-        
-        while True:
-            try:
-                await asyncio.sleep(300)  # Every 5 minutes
-                
-                # Calculate metrics for each operation type
-                for operation_type in OperationType:
-                    await self._calculate_operation_type_metrics(operation_type)
-                
-            except Exception as e:
-                logger.error(f"Error calculating performance metrics: {str(e)}")
-    
-    async def _calculate_operation_type_metrics(self, operation_type: OperationType):
+
+        try:
+            await self.store.append_log(log_entry)
+        except Exception as e:
+            logger.error(f"Failed to store log for operation {operation_id}: {str(e)}")
+
+    def _calculate_operation_type_metrics(
+        self, operation_type: OperationType, operations: List[ProgressUpdate]
+    ) -> Optional[PerformanceMetrics]:
         """Calculate metrics for a specific operation type"""
-        
+
         # Get completed operations of this type from last 24 hours
         cutoff_time = datetime.utcnow() - timedelta(hours=24)
-        
+
         relevant_operations = [
-            op for op in self.completed_operations.values()
-            if op.operation_type == operation_type and op.started_at > cutoff_time
+            op for op in operations
+            if op.operation_type == operation_type and op.status in TERMINAL_STATUSES and op.started_at > cutoff_time
         ]
-        
+
         if not relevant_operations:
-            return
-        
+            return None
+
         # Calculate metrics
         durations = [op.elapsed_time for op in relevant_operations if op.elapsed_time > 0]
         success_count = len([op for op in relevant_operations if op.status == ProgressStatus.COMPLETED])
-        
+
         if durations:
             avg_duration = sum(durations) / len(durations)
             min_duration = min(durations)
             max_duration = max(durations)
         else:
             avg_duration = min_duration = max_duration = 0
-        
+
         success_rate = success_count / len(relevant_operations) if relevant_operations else 0
-        
+
         # Calculate throughput (items per second)
         total_items = sum(op.total_items for op in relevant_operations)
         total_time = sum(durations)
         throughput = total_items / total_time if total_time > 0 else 0
-        
-        metrics = PerformanceMetrics(
+
+        return PerformanceMetrics(
             operation_type=operation_type,
             avg_duration=avg_duration,
             min_duration=min_duration,
@@ -654,53 +658,53 @@ class ProgressTracker:
             last_24h_count=len(relevant_operations),
             last_24h_success_rate=success_rate
         )
-        
-        self.performance_metrics[operation_type] = metrics
-    
-    def get_performance_metrics(self, operation_type: Optional[OperationType] = None) -> Dict[OperationType, PerformanceMetrics]:
-        """Get performance metrics"""
-        
+
+    async def get_performance_metrics(self, operation_type: Optional[OperationType] = None) -> Dict[OperationType, PerformanceMetrics]:
+        """Get performance metrics, recalculated at most every metrics_interval seconds"""
+
+        if time.monotonic() - self._metrics_computed_at >= self.metrics_interval:
+            operations = await self.store.list_operations()
+            metrics = {}
+            for op_type in OperationType:
+                op_metrics = self._calculate_operation_type_metrics(op_type, operations)
+                if op_metrics is not None:
+                    metrics[op_type] = op_metrics
+            self.performance_metrics = metrics
+            self._metrics_computed_at = time.monotonic()
+
         if operation_type:
             return {operation_type: self.performance_metrics.get(operation_type)}
-        
+
         return self.performance_metrics.copy()
-    
-    def get_system_stats(self) -> Dict[str, Any]:
+
+    async def get_system_stats(self) -> Dict[str, Any]:
         """Get system-wide statistics"""
-        
+
+        store_stats = await self.store.stats()
+        operations = await self.store.list_operations()
+
         return {
-            "active_operations": len(self.active_operations),
-            "completed_operations": len(self.completed_operations),
-            "bulk_operations": len(self.bulk_operations),
+            "store": store_stats["backend"],
+            "active_operations": store_stats["active_operations"],
+            "completed_operations": store_stats["completed_operations"],
+            "bulk_operations": store_stats["bulk_operations"],
             "total_subscribers": sum(len(subs) for subs in self.progress_subscribers.values()),
             "global_subscribers": len(self.global_subscribers),
-            "operations_by_type": self._count_operations_by_type(),
-            "operations_by_status": self._count_operations_by_status(),
-            "error_count": sum(len(errors) for errors in self.operation_errors.values())
+            "operations_by_type": self._count_operations(operations, lambda op: op.operation_type.value),
+            "operations_by_status": self._count_operations(operations, lambda op: op.status.value),
+            "error_count": store_stats["error_count"],
+            "local_operations": len(self.operations),
+            "pending_flushes": len(self._pending_flushes),
+            "coalesced_updates": self.coalesced_updates
         }
-    
-    def _count_operations_by_type(self) -> Dict[str, int]:
-        """Count operations by type"""
-        
+
+    @staticmethod
+    def _count_operations(operations: List[ProgressUpdate], key: Callable[[ProgressUpdate], str]) -> Dict[str, int]:
+        """Count operations by a key such as type or status"""
+
         counts = defaultdict(int)
-        
-        for op in self.active_operations.values():
-            counts[op.operation_type.value] += 1
-        
-        for op in self.completed_operations.values():
-            counts[op.operation_type.value] += 1
-        
+
+        for op in operations:
+            counts[key(op)] += 1
+
         return dict(counts)
-    
-    def _count_operations_by_status(self) -> Dict[str, int]:
-        """Count operations by status"""
-        
-        counts = defaultdict(int)
-        
-        for op in self.active_operations.values():
-            counts[op.status.value] += 1
-        
-        for op in self.completed_operations.values():
-            counts[op.status.value] += 1
-        
-        return dict(counts)
\ No newline at end of file
@@ -187,10 +187,10 @@ async def get_operation_progress(
     
     try:
         # Get regular progress
-        progress = progress_tracker.get_operation_progress(operation_id)
+        progress = await progress_tracker.get_operation_progress(operation_id)
         
         # Get bulk progress if available
-        bulk_progress = progress_tracker.get_bulk_operation_progress(operation_id)
+        bulk_progress = await progress_tracker.get_bulk_operation_progress(operation_id)
         
         if not progress:
             raise HTTPException(
@@ -238,7 +238,7 @@ async def update_operation_progress(
     
     try:
         # Check if operation exists and user has permission
-        progress = progress_tracker.get_operation_progress(operation_id)
+        progress = await progress_tracker.get_operation_progress(operation_id)
         
         if not progress:
             raise HTTPException(
@@ -291,7 +291,7 @@ async def complete_operation(
     
     try:
         # Check if operation exists and user has permission
-        progress = progress_tracker.get_operation_progress(operation_id)
+        progress = await progress_tracker.get_operation_progress(operation_id)
         
         if not progress:
             raise HTTPException(
@@ -343,7 +343,7 @@ async def cancel_operation(
     
     try:
         # Check if operation exists and user has permission
-        progress = progress_tracker.get_operation_progress(operation_id)
+        progress = await progress_tracker.get_operation_progress(operation_id)
         
         if not progress:
             raise HTTPException(
@@ -392,12 +392,12 @@ async def list_operations(
         operations = []
         
         # Get user operations
-        user_operations = progress_tracker.get_user_operations(current_user.id)
+        user_operations = await progress_tracker.get_user_operations(current_user.id)
         operations.extend(user_operations)
         
         # Add school operations if user has permission
         if (school_id and current_user.platform_role in ['super_admin', 'school_admin']):
-            school_operations = progress_tracker.get_school_operations(school_id)
+            school_operations = await progress_tracker.get_school_operations(school_id)
             operations.extend(school_operations)
         
         # Apply filters
@@ -416,7 +416,7 @@ async def list_operations(
             op_dict = op.dict()
             
             # Add bulk progress if available
-            bulk_progress = progress_tracker.get_bulk_operation_progress(op.operation_id)
+            bulk_progress = await progress_tracker.get_bulk_operation_progress(op.operation_id)
             if bulk_progress:
                 op_dict["bulk_progress"] = bulk_progress.dict()
             
@@ -439,7 +439,7 @@ async def get_progress_summary(
     
     try:
         # Get user operations
-        user_operations = progress_tracker.get_user_operations(current_user.id)
+        user_operations = await progress_tracker.get_user_operations(current_user.id)
         
         # Separate by status
         active_operations = [op for op in user_operations if op.status.value in ['pending', 'in_progress']]
@@ -491,7 +491,7 @@ async def get_performance_metrics(
                 detail="Insufficient permissions for metrics"
             )
         
-        metrics = progress_tracker.get_performance_metrics(operation_type)
+        metrics = await progress_tracker.get_performance_metrics(operation_type)
         
         # Convert to serializable format
         result = {}
@@ -525,7 +525,7 @@ async def get_system_stats(
             )
         
         # Get progress tracker stats
-        progress_stats = progress_tracker.get_system_stats()
+        progress_stats = await progress_tracker.get_system_stats()
         
         # Get WebSocket stats
         websocket_stats = websocket_manager.get_connection_stats()
@@ -605,7 +605,7 @@ async def get_service_health():
     
     try:
         # Get basic health metrics
-        progress_stats = progress_tracker.get_system_stats()
+        progress_stats = await progress_tracker.get_system_stats()
         websocket_stats = websocket_manager.get_connection_stats()
         
         # Determine health status
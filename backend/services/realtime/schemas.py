@@ -31,6 +31,7 @@ class OperationType(str, Enum):
     BACKUP_CREATION = "backup_creation"
     SYSTEM_UPDATE = "system_update"
     MIGRATION = "migration"
+    INVOICE_GENERATION = "invoice_generation"
 
 class EventType(str, Enum):
     """WebSocket event types"""
@@ -1,6 +1,6 @@
 # =====================================================
 # WebSocket Manager for Real-time Progress Tracking
-# Manages WebSocket connections and real-time events
+# Manages WebSocket connections and fans real-time events out to them
 # File: backend/services/realtime/websocket_manager.py
 # =====================================================
 
@@ -8,50 +8,69 @@ import asyncio
 import json
 import uuid
 import logging
-from typing import Dict, List, Set, Optional, Any, Callable
+from typing import Dict, List, Set, Optional, Any
 from datetime import datetime, timedelta
-from collections import defaultdict
 
-from fastapi import WebSocket, WebSocketDisconnect
+from fastapi import WebSocket, status
+from .fanout import (
+    BROADCAST_TOPIC, DEFAULT_SEND_QUEUE_SIZE, ConnectionSender, RedisEventRelay, TopicIndex,
+    operation_topic, school_topic, user_topic
+)
 from .schemas import (
-    RealTimeEvent, ConnectionInfo, EventType, ProgressUpdate,
-    SubscriptionRequest, ProgressSummary
+    RealTimeEvent, ConnectionInfo, EventType, ProgressUpdate, ProgressSummary
 )
 from .progress_tracker import ProgressTracker
 
 logger = logging.getLogger(__name__)
 
 class WebSocketManager:
-    """Manages WebSocket connections for real-time progress tracking"""
+    """
+    Manages WebSocket connections for real-time progress tracking
+
+    Connections subscribe to topics (their user, their school, the
+    operations they ask for, and the global broadcast topic). An event is
+    serialized once, its recipients are the union of its topics'
+    subscriber sets, and the payload is queued on each recipient's bounded
+    send queue; connections whose queue is full are evicted. Events are
+    also relayed over Redis so sockets held by other workers receive them.
+    """
     
-    def __init__(self, progress_tracker: ProgressTracker):
+    def __init__(self, progress_tracker: ProgressTracker, send_queue_size: int = DEFAULT_SEND_QUEUE_SIZE):
         # Connection management
         self.active_connections: Dict[str, WebSocket] = {}
         self.connection_info: Dict[str, ConnectionInfo] = {}
+        self.senders: Dict[str, ConnectionSender] = {}
         
-        # User and school mappings
-        self.user_connections: Dict[str, Set[str]] = defaultdict(set)  # user_id -> connection_ids
-        self.school_connections: Dict[str, Set[str]] = defaultdict(set)  # school_id -> connection_ids
+        # Topic subscriptions, and the event types each connection asked for
+        # (no entry means all)
+        self.topics = TopicIndex()
+        self.event_filters: Dict[str, Set[str]] = {}
         
-        # Subscription management
-        self.operation_subscribers: Dict[str, Set[str]] = defaultdict(set)  # operation_id -> connection_ids
-        self.event_subscribers: Dict[EventType, Set[str]] = defaultdict(set)  # event_type -> connection_ids
+        # Cross-worker delivery
+        self.relay = RedisEventRelay(self._deliver)
         
-        # Progress tracker integration
+        # Progress tracker integration: one subscription for the whole manager
         self.progress_tracker = progress_tracker
+        self.progress_tracker.subscribe_to_all(self._handle_progress_update)
         
         # Configuration
         self.heartbeat_interval = 30  # seconds
         self.connection_timeout = 300  # 5 minutes
         self.max_connections_per_user = 5
+        self.send_queue_size = send_queue_size
+        
+        # Counters
+        self.events_published = 0
+        self.slow_consumer_evictions = 0
         
-        # Background tasks
+        # Background tasks, started on the running loop by start()
         self.background_tasks: List[asyncio.Task] = []
-        self._start_background_tasks()
     
-    def _start_background_tasks(self):
-        """Start background maintenance tasks"""
-        loop = asyncio.get_event_loop()
+    def start(self):
+        """Start background maintenance tasks if they are not running"""
+        if self.background_tasks:
+            return
+        loop = asyncio.get_running_loop()
         
         # Heartbeat task
         self.background_tasks.append(
@@ -62,6 +81,11 @@ class WebSocketManager:
         self.background_tasks.append(
             loop.create_task(self._cleanup_stale_connections())
         )
+        
+        # Events published by other workers
+        self.background_tasks.append(
+            loop.create_task(self.relay.listen())
+        )
     
     async def connect_user(
         self,
@@ -73,6 +97,8 @@ class WebSocketManager:
     ) -> str:
         """Connect a user WebSocket"""
         
+        self.start()
+        
         # Accept connection
         await websocket.accept()
         
@@ -80,16 +106,24 @@ class WebSocketManager:
         connection_id = str(uuid.uuid4())
         
         # Check connection limits
-        if len(self.user_connections[user_id]) >= self.max_connections_per_user:
+        user_connections = self.topics.subscribers([user_topic(user_id)])
+        if len(user_connections) >= self.max_connections_per_user:
             # Disconnect oldest connection
             oldest_connection = min(
-                self.user_connections[user_id],
+                user_connections,
                 key=lambda cid: self.connection_info[cid].connected_at
             )
             await self.disconnect(oldest_connection)
         
-        # Store connection
+        # Store connection and start its sender
         self.active_connections[connection_id] = websocket
+        sender = ConnectionSender(
+            websocket,
+            on_error=lambda error: self._schedule_disconnect(connection_id),
+            max_queue=self.send_queue_size
+        )
+        self.senders[connection_id] = sender
+        sender.start()
         
         # Create connection info
         connection_info = ConnectionInfo(
@@ -102,15 +136,11 @@ class WebSocketManager:
         
         self.connection_info[connection_id] = connection_info
         
-        # Update mappings
-        self.user_connections[user_id].add(connection_id)
+        # Subscribe to the connection's own topics
+        self.topics.subscribe(connection_id, BROADCAST_TOPIC)
+        self.topics.subscribe(connection_id, user_topic(user_id))
         if school_id:
-            self.school_connections[school_id].add(connection_id)
-        
-        # Subscribe to progress tracker
-        self.progress_tracker.subscribe_to_all(
-            lambda progress: asyncio.create_task(self._handle_progress_update(progress))
-        )
+            self.topics.subscribe(connection_id, school_topic(school_id))
         
         # Send connection established event
         await self._send_to_connection(connection_id, RealTimeEvent(
@@ -129,37 +159,41 @@ class WebSocketManager:
         logger.info(f"WebSocket connected: {connection_id} for user {user_id}")
         return connection_id
     
-    async def disconnect(self, connection_id: str):
+    async def disconnect(self, connection_id: str, code: int = status.WS_1000_NORMAL_CLOSURE):
         """Disconnect a WebSocket connection"""
         
-        if connection_id not in self.active_connections:
-            return
+        detached = self._detach(connection_id)
+        if detached is not None:
+            await self._close(connection_id, *detached, code)
+    
+    def _schedule_disconnect(self, connection_id: str, code: int = status.WS_1011_INTERNAL_ERROR):
+        """Disconnect from a non-async context (send failure or eviction)"""
+        
+        detached = self._detach(connection_id)
+        if detached is not None:
+            asyncio.get_event_loop().create_task(self._close(connection_id, *detached, code))
+    
+    def _detach(self, connection_id: str):
+        """Stop delivering to a connection; returns its socket and sender"""
+        
+        websocket = self.active_connections.pop(connection_id, None)
+        if websocket is None:
+            return None
         
+        self.topics.remove(connection_id)
+        self.event_filters.pop(connection_id, None)
+        self.connection_info.pop(connection_id, None)
+        return websocket, self.senders.pop(connection_id, None)
+    
+    async def _close(self, connection_id: str, websocket: WebSocket, sender: Optional[ConnectionSender], code: int):
         try:
-            # Get connection info
-            conn_info = self.connection_info[connection_id]
-            
-            # Close WebSocket
-            websocket = self.active_connections[connection_id]
-            await websocket.close()
-            
-            # Remove from mappings
-            self.user_connections[conn_info.user_id].discard(connection_id)
-            if conn_info.school_id:
-                self.school_connections[conn_info.school_id].discard(connection_id)
-            
-            # Remove from subscriptions
-            for operation_id in conn_info.subscriptions:
-                self.operation_subscribers[operation_id].discard(connection_id)
-            
-            # Clean up
-            del self.active_connections[connection_id]
-            del self.connection_info[connection_id]
-            
-            logger.info(f"WebSocket disconnected: {connection_id}")
-            
+            if sender is not None:
+                await sender.close()
+            await websocket.close(code=code)
         except Exception as e:
-            logger.error(f"Error disconnecting WebSocket {connection_id}: {str(e)}")
+            logger.debug(f"Error closing WebSocket {connection_id}: {str(e)}")
+        
+        logger.info(f"WebSocket disconnected: {connection_id}")
     
     async def handle_message(self, connection_id: str, message: str):
         """Handle incoming WebSocket message"""
@@ -189,20 +223,21 @@ class WebSocketManager:
         
         try:
             operation_ids = data.get("operation_ids", [])
-            event_types = data.get("event_types", list(EventType))
+            event_types = [EventType(event_type) for event_type in data.get("event_types", list(EventType))]
             
             conn_info = self.connection_info[connection_id]
             
             # Subscribe to operations
             for operation_id in operation_ids:
-                self.operation_subscribers[operation_id].add(connection_id)
-                conn_info.subscriptions.append(operation_id)
+                self.topics.subscribe(connection_id, operation_topic(operation_id))
+                if operation_id not in conn_info.subscriptions:
+                    conn_info.subscriptions.append(operation_id)
             
-            # Subscribe to event types
-            for event_type in event_types:
-                if isinstance(event_type, str):
-                    event_type = EventType(event_type)
-                self.event_subscribers[event_type].add(connection_id)
+            # Only deliver the requested event types from now on
+            if set(event_types) == set(EventType):
+                self.event_filters.pop(connection_id, None)
+            else:
+                self.event_filters[connection_id] = {event_type.value for event_type in event_types}
             
             # Send confirmation
             await self._send_to_connection(connection_id, RealTimeEvent(
@@ -227,7 +262,7 @@ class WebSocketManager:
             
             # Unsubscribe from operations
             for operation_id in operation_ids:
-                self.operation_subscribers[operation_id].discard(connection_id)
+                self.topics.unsubscribe(connection_id, operation_topic(operation_id))
                 if operation_id in conn_info.subscriptions:
                     conn_info.subscriptions.remove(operation_id)
             
@@ -264,8 +299,8 @@ class WebSocketManager:
             
             if operation_id:
                 # Get specific operation progress
-                progress = self.progress_tracker.get_operation_progress(operation_id)
-                bulk_progress = self.progress_tracker.get_bulk_operation_progress(operation_id)
+                progress = await self.progress_tracker.get_operation_progress(operation_id)
+                bulk_progress = await self.progress_tracker.get_bulk_operation_progress(operation_id)
                 
                 await self._send_to_connection(connection_id, RealTimeEvent(
                     event_type=EventType.PROGRESS_UPDATE,
@@ -295,19 +330,14 @@ class WebSocketManager:
             data=progress.dict()
         )
         
-        # Send to operation subscribers
-        connection_ids = self.operation_subscribers.get(progress.operation_id, set())
-        
-        # Also send to user's connections
+        # Operation subscribers, the user's connections and the school's connections
+        topics = [operation_topic(progress.operation_id)]
         if progress.user_id:
-            connection_ids.update(self.user_connections.get(str(progress.user_id), set()))
-        
-        # Send to school connections if applicable
+            topics.append(user_topic(progress.user_id))
         if progress.school_id:
-            connection_ids.update(self.school_connections.get(str(progress.school_id), set()))
+            topics.append(school_topic(progress.school_id))
         
-        # Send to all relevant connections
-        await self._broadcast_to_connections(list(connection_ids), event)
+        await self.publish(topics, event)
     
     async def broadcast_event(
         self,
@@ -318,34 +348,51 @@ class WebSocketManager:
     ):
         """Broadcast event to specific targets"""
         
-        connection_ids = set()
+        topics = [user_topic(user_id) for user_id in target_users or []]
+        topics.extend(school_topic(school_id) for school_id in target_schools or [])
+        if operation_id:
+            topics.append(operation_topic(operation_id))
         
-        # Target specific users
-        if target_users:
-            for user_id in target_users:
-                connection_ids.update(self.user_connections.get(user_id, set()))
+        # Broadcast globally if no specific targets
+        if event.broadcast and not topics:
+            topics.append(BROADCAST_TOPIC)
         
-        # Target specific schools
-        if target_schools:
-            for school_id in target_schools:
-                connection_ids.update(self.school_connections.get(school_id, set()))
+        await self.publish(topics, event)
+    
+    async def publish(self, topics: List[str], event: RealTimeEvent):
+        """
+        Deliver an event to the topics' subscribers on every worker
         
-        # Target operation subscribers
-        if operation_id:
-            connection_ids.update(self.operation_subscribers.get(operation_id, set()))
+        The event is serialized once; the same payload is queued for every
+        local recipient and relayed once to the other workers.
+        """
         
-        # Broadcast globally if no specific targets
-        if event.broadcast and not (target_users or target_schools or operation_id):
-            connection_ids.update(self.active_connections.keys())
+        if not topics:
+            return
         
-        await self._broadcast_to_connections(list(connection_ids), event)
+        payload = event.json()
+        self.events_published += 1
+        self._deliver(topics, event.event_type.value, payload)
+        await self.relay.publish(topics, event.event_type.value, payload)
+    
+    def _deliver(self, topics: List[str], event_type: str, payload: str) -> int:
+        """Queue a serialized event for local subscribers, evicting slow consumers"""
+        
+        delivered = 0
+        for connection_id in self.topics.subscribers(topics):
+            event_filter = self.event_filters.get(connection_id)
+            if event_filter is not None and event_type not in event_filter:
+                continue
+            if self._enqueue(connection_id, payload):
+                delivered += 1
+        return delivered
     
     async def _send_progress_summary(self, connection_id: str, user_id: str):
         """Send progress summary to connection"""
         
         try:
             # Get user operations
-            user_operations = self.progress_tracker.get_user_operations(uuid.UUID(user_id))
+            user_operations = await self.progress_tracker.get_user_operations(uuid.UUID(user_id))
             
             # Separate active and completed
             active_operations = [op for op in user_operations if op.status.value in ['pending', 'in_progress']]
@@ -371,34 +418,23 @@ class WebSocketManager:
     async def _send_to_connection(self, connection_id: str, event: RealTimeEvent):
         """Send event to specific connection"""
         
-        if connection_id not in self.active_connections:
-            return
-        
-        try:
-            websocket = self.active_connections[connection_id]
-            await websocket.send_text(event.json())
-            
-        except WebSocketDisconnect:
-            await self.disconnect(connection_id)
-        except Exception as e:
-            logger.error(f"Error sending to connection {connection_id}: {str(e)}")
-            await self.disconnect(connection_id)
+        self._enqueue(connection_id, event.json())
     
-    async def _broadcast_to_connections(self, connection_ids: List[str], event: RealTimeEvent):
-        """Broadcast event to multiple connections"""
+    def _enqueue(self, connection_id: str, payload: str) -> bool:
+        """Queue a payload on a connection; a full queue evicts the connection"""
         
-        if not connection_ids:
-            return
+        sender = self.senders.get(connection_id)
+        if sender is None:
+            return False
         
-        # Send to all connections concurrently
-        tasks = [
-            self._send_to_connection(connection_id, event)
-            for connection_id in connection_ids
-            if connection_id in self.active_connections
-        ]
+        if sender.offer(payload):
+            return True
         
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        # The client is not reading fast enough; let it reconnect and resync
+        self.slow_consumer_evictions += 1
+        logger.warning(f"Evicting slow WebSocket consumer {connection_id} ({sender.queue.qsize()} queued)")
+        self._schedule_disconnect(connection_id, status.WS_1013_TRY_AGAIN_LATER)
+        return False
     
     async def _heartbeat_loop(self):
         """Send periodic heartbeat to all connections"""
@@ -419,9 +455,8 @@ class WebSocketManager:
                     }
                 )
                 
-                # Send to all connections
-                connection_ids = list(self.active_connections.keys())
-                await self._broadcast_to_connections(connection_ids, heartbeat_event)
+                # Local connections only; every worker sends its own heartbeat
+                self._deliver([BROADCAST_TOPIC], heartbeat_event.event_type.value, heartbeat_event.json())
                 
             except Exception as e:
                 logger.error(f"Error in heartbeat loop: {str(e)}")
@@ -436,7 +471,7 @@ class WebSocketManager:
                 cutoff_time = datetime.utcnow() - timedelta(seconds=self.connection_timeout)
                 stale_connections = []
                 
-                for connection_id, conn_info in self.connection_info.items():
+                for connection_id, conn_info in list(self.connection_info.items()):
                     if conn_info.last_seen < cutoff_time:
                         stale_connections.append(connection_id)
                 
@@ -453,18 +488,22 @@ class WebSocketManager:
     def get_connection_stats(self) -> Dict[str, Any]:
         """Get WebSocket connection statistics"""
         
-        active_users = len(self.user_connections)
-        active_schools = len(self.school_connections)
-        total_subscriptions = sum(len(subs) for subs in self.operation_subscribers.values())
+        connections_by_user = self.topics.counts(user_topic(""))
+        operation_subscriptions = self.topics.counts(operation_topic(""))
         
         return {
             "total_connections": len(self.active_connections),
-            "active_users": active_users,
-            "active_schools": active_schools,
-            "total_subscriptions": total_subscriptions,
-            "connections_by_user": {
-                user_id: len(connections) 
-                for user_id, connections in self.user_connections.items()
+            "active_users": len(connections_by_user),
+            "active_schools": len(self.topics.counts(school_topic(""))),
+            "total_subscriptions": sum(operation_subscriptions.values()),
+            "connections_by_user": connections_by_user,
+            "queued_payloads": sum(sender.queue.qsize() for sender in self.senders.values()),
+            "events_published": self.events_published,
+            "slow_consumer_evictions": self.slow_consumer_evictions,
+            "relay": {
+                "enabled": self.relay.enabled,
+                "published": self.relay.published,
+                "received": self.relay.received
             },
             "uptime": (datetime.utcnow() - min(
                 conn.connected_at for conn in self.connection_info.values()
@@ -476,13 +515,16 @@ class WebSocketManager:
         
         logger.info("Shutting down WebSocket manager...")
         
-        # Cancel background tasks
+        # Stop receiving progress updates and cancel background tasks
+        self.progress_tracker.unsubscribe_from_all(self._handle_progress_update)
         for task in self.background_tasks:
             task.cancel()
+        await asyncio.gather(*self.background_tasks, return_exceptions=True)
+        self.background_tasks = []
         
         # Disconnect all connections
         connection_ids = list(self.active_connections.keys())
         for connection_id in connection_ids:
-            await self.disconnect(connection_id)
+            await self.disconnect(connection_id, status.WS_1001_GOING_AWAY)
         
         logger.info("WebSocket manager shutdown complete")
\ No newline at end of file
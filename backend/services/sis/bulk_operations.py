@@ -7,7 +7,7 @@ import csv
 import json
 import io
 import pandas as pd
-from typing import List, Dict, Any, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from datetime import date, datetime
 from uuid import UUID
 import logging
@@ -24,9 +24,10 @@ from .schemas import (
     MedicalCondition,
     Allergy
 )
-from .crud import StudentCRUD
+from .student_import import StudentImportEngine
 from .zimbabwe_validators import ZimbabweValidator
 from shared.models.sis import Student
+from shared.exports import CSV, XLSX, collect, iter_export, stream_orm
 
 logger = logging.getLogger(__name__)
 
@@ -60,10 +61,14 @@ class BulkImportService:
         file_content: bytes,
         school_id: UUID,
         created_by_user_id: UUID,
-        validate_only: bool = False
+        validate_only: bool = False,
+        resume_after_row: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Import students from CSV file
+        Rows are validated here, then inserted by the StudentImportEngine in
+        committed chunks; pass the returned checkpoint as resume_after_row to
+        continue an interrupted import.
         Returns: Dict with results including successful imports, errors, and warnings
         """
         try:
@@ -77,8 +82,10 @@ class BulkImportService:
                 'failed': 0,
                 'errors': [],
                 'warnings': [],
-                'imported_students': []
+                'imported_students': [],
+                'checkpoint': resume_after_row
             }
+            valid_rows = []
             
             for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
                 results['total_rows'] += 1
@@ -96,17 +103,7 @@ class BulkImportService:
                             'student': f"{row.get('first_name')} {row.get('last_name')}"
                         })
                     else:
-                        # Create student
-                        student = await StudentCRUD.create_student_full_workflow(
-                            db, student_data, school_id, created_by_user_id
-                        )
-                        
-                        results['successful'] += 1
-                        results['imported_students'].append({
-                            'id': str(student.id),
-                            'student_number': student.student_number,
-                            'name': f"{student.first_name} {student.last_name}"
-                        })
+                        valid_rows.append((row_num, student_data))
                         
                 except Exception as e:
                     results['failed'] += 1
@@ -115,13 +112,18 @@ class BulkImportService:
                         'error': str(e),
                         'student': f"{row.get('first_name', 'Unknown')} {row.get('last_name', 'Unknown')}"
                     })
-                    
-                    if not validate_only:
-                        # Continue with next row on error
-                        continue
             
-            if not validate_only:
-                await db.commit()
+            if not validate_only and valid_rows:
+                import_result = await StudentImportEngine().ingest(
+                    school_id, valid_rows, created_by_user_id, resume_after=resume_after_row
+                )
+                
+                results['successful'] = len(import_result.imported)
+                results['failed'] += len(import_result.failed)
+                results['errors'].extend(import_result.failed)
+                results['errors'].sort(key=lambda error: error['row'])
+                results['imported_students'] = import_result.imported
+                results['checkpoint'] = import_result.checkpoint
                 logger.info(f"Bulk import completed: {results['successful']} students imported")
             
             return results
@@ -367,16 +369,23 @@ class BulkImportService:
 class BulkExportService:
     """Service for bulk exporting student data"""
     
+    EXPORT_FIELDS = [
+        'student_number', 'first_name', 'last_name',
+        'gender', 'grade_level', 'status', 'enrollment_date'
+    ]
+    
+    SENSITIVE_EXPORT_FIELDS = [
+        'student_number', 'first_name', 'middle_name', 'last_name',
+        'date_of_birth', 'gender', 'nationality', 'home_language',
+        'grade_level', 'status', 'enrollment_date',
+        'mobile_number', 'email', 'blood_type',
+        'medical_aid_provider', 'medical_aid_number',
+        'residential_address', 'transport_needs'
+    ]
+    
     @staticmethod
-    async def export_to_csv(
-        db: Session,
-        school_id: UUID,
-        filters: Optional[Dict[str, Any]] = None,
-        include_sensitive: bool = False
-    ) -> bytes:
-        """Export students to CSV format"""
-        
-        # Build query
+    def _export_query(school_id: UUID, filters: Optional[Dict[str, Any]] = None):
+        """Build the student export query"""
         query = select(Student).where(Student.school_id == school_id)
         
         # Apply filters
@@ -388,62 +397,77 @@ class BulkExportService:
             if filters.get('class_id'):
                 query = query.where(Student.current_class_id == filters['class_id'])
         
-        # Execute query
-        result = await db.execute(query.order_by(Student.last_name, Student.first_name))
-        students = result.scalars().all()
-        
-        # Prepare CSV
-        output = io.StringIO()
+        return query.order_by(Student.last_name, Student.first_name, Student.id)
+    
+    @staticmethod
+    def _export_row(student: Student, include_sensitive: bool) -> Dict[str, Any]:
+        """Flatten a student into an export row"""
+        row = {
+            'student_number': student.student_number,
+            'first_name': student.first_name,
+            'last_name': student.last_name,
+            'gender': student.gender,
+            'grade_level': student.current_grade_level,
+            'status': student.status,
+            'enrollment_date': student.enrollment_date
+        }
         
-        # Define columns based on sensitivity
         if include_sensitive:
-            fieldnames = [
-                'student_number', 'first_name', 'middle_name', 'last_name',
-                'date_of_birth', 'gender', 'nationality', 'home_language',
-                'grade_level', 'status', 'enrollment_date',
-                'mobile_number', 'email', 'blood_type',
-                'medical_aid_provider', 'medical_aid_number',
-                'residential_address', 'transport_needs'
-            ]
-        else:
-            fieldnames = [
-                'student_number', 'first_name', 'last_name',
-                'gender', 'grade_level', 'status', 'enrollment_date'
-            ]
-        
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        # Write student data
-        for student in students:
-            row = {
-                'student_number': student.student_number,
-                'first_name': student.first_name,
-                'last_name': student.last_name,
-                'gender': student.gender,
-                'grade_level': student.current_grade_level,
-                'status': student.status,
-                'enrollment_date': student.enrollment_date.strftime('%Y-%m-%d')
-            }
-            
-            if include_sensitive:
-                row.update({
-                    'middle_name': student.middle_name or '',
-                    'date_of_birth': student.date_of_birth.strftime('%Y-%m-%d'),
-                    'nationality': student.nationality or 'Zimbabwean',
-                    'home_language': student.home_language or '',
-                    'mobile_number': student.mobile_number or '',
-                    'email': student.email or '',
-                    'blood_type': student.blood_type or '',
-                    'medical_aid_provider': student.medical_aid_provider or '',
-                    'medical_aid_number': student.medical_aid_number or '',
-                    'residential_address': json.dumps(student.residential_address) if student.residential_address else '',
-                    'transport_needs': student.transport_needs or ''
-                })
-            
-            writer.writerow(row)
-        
-        return output.getvalue().encode('utf-8')
+            row.update({
+                'middle_name': student.middle_name or '',
+                'date_of_birth': student.date_of_birth,
+                'nationality': student.nationality or 'Zimbabwean',
+                'home_language': student.home_language or '',
+                'mobile_number': student.mobile_number or '',
+                'email': student.email or '',
+                'blood_type': student.blood_type or '',
+                'medical_aid_provider': student.medical_aid_provider or '',
+                'medical_aid_number': student.medical_aid_number or '',
+                'residential_address': json.dumps(student.residential_address) if student.residential_address else '',
+                'transport_needs': student.transport_needs or ''
+            })
+        
+        return row
+    
+    @staticmethod
+    async def stream_students(
+        db: Session,
+        school_id: UUID,
+        filters: Optional[Dict[str, Any]] = None,
+        include_sensitive: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield export rows, reading students from a server-side cursor in chunks"""
+        query = BulkExportService._export_query(school_id, filters)
+        async for student in stream_orm(db, query):
+            yield BulkExportService._export_row(student, include_sensitive)
+    
+    @staticmethod
+    def stream_export(
+        db: Session,
+        school_id: UUID,
+        export_format: str = CSV,
+        filters: Optional[Dict[str, Any]] = None,
+        include_sensitive: bool = False
+    ) -> AsyncIterator[bytes]:
+        """Stream students as CSV or XLSX chunks without loading the whole school"""
+        fieldnames = (
+            BulkExportService.SENSITIVE_EXPORT_FIELDS if include_sensitive
+            else BulkExportService.EXPORT_FIELDS
+        )
+        rows = BulkExportService.stream_students(db, school_id, filters, include_sensitive)
+        return iter_export(export_format, rows, fieldnames, sheet_name='Students')
+    
+    @staticmethod
+    async def export_to_csv(
+        db: Session,
+        school_id: UUID,
+        filters: Optional[Dict[str, Any]] = None,
+        include_sensitive: bool = False
+    ) -> bytes:
+        """Export students to CSV format"""
+        return await collect(BulkExportService.stream_export(
+            db, school_id, CSV, filters, include_sensitive
+        ))
     
     @staticmethod
     async def export_to_excel(
@@ -453,30 +477,9 @@ class BulkExportService:
         include_sensitive: bool = False
     ) -> bytes:
         """Export students to Excel format"""
-        
-        # Get CSV data first
-        csv_data = await BulkExportService.export_to_csv(
-            db, school_id, filters, include_sensitive
-        )
-        
-        # Convert CSV to DataFrame
-        csv_file = io.StringIO(csv_data.decode('utf-8'))
-        df = pd.read_csv(csv_file)
-        
-        # Write to Excel
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Students', index=False)
-            
-            # Auto-adjust column widths
-            worksheet = writer.sheets['Students']
-            for column in df:
-                column_width = max(df[column].astype(str).map(len).max(), len(column))
-                col_idx = df.columns.get_loc(column)
-                worksheet.column_dimensions[chr(65 + col_idx)].width = min(column_width + 2, 50)
-        
-        output.seek(0)
-        return output.read()
+        return await collect(BulkExportService.stream_export(
+            db, school_id, XLSX, filters, include_sensitive
+        ))
     
     @staticmethod
     async def export_class_list(
@@ -19,6 +19,9 @@ from shared.models.sis import (
     MedicalRecord as HealthRecord,
 )
 from shared.models.platform_user import PlatformUser as User
+from services.academic.attendance import upsert_daily_attendance
+from shared.identifiers import STUDENT_NUMBER, reserve_identifiers
+from shared.pagination import CountMode, SortKey, apply_keyset, count_query
 from .models import StudentGuardian, StudentAcademicHistory, StudentDocument
 from .schemas import (
     StudentCreate,
@@ -81,6 +84,13 @@ class InvalidDataError(SISException):
 # STUDENT CRUD OPERATIONS
 # =====================================================
 
+# Keyset sort order for student lists
+STUDENT_SORT = (
+    SortKey(Student.last_name, "last_name"),
+    SortKey(Student.first_name, "first_name"),
+    SortKey(Student.id, "id"),
+)
+
 
 class StudentCRUD:
 
@@ -244,9 +254,56 @@ class StudentCRUD:
         search_query: Optional[str] = None,
         skip: int = 0,
         limit: int = 100,
+        cursor: Optional[str] = None,
     ) -> List[Student]:
         """
         Get students with filtering and role-based access control.
+        A cursor (see shared.pagination) continues after the last student
+        of the previous page and takes precedence over skip.
+        """
+        query = StudentCRUD._students_query(user, class_id, status, search_query)
+        if query is None:
+            return []
+
+        # Order by last name, first name; id makes the order total for cursors
+        query = apply_keyset(query, STUDENT_SORT, cursor)
+
+        # Apply pagination
+        if not cursor:
+            query = query.offset(skip)
+        query = query.limit(limit)
+
+        result = await db.execute(query)
+        students = result.scalars().all()
+
+        return list(students)
+
+    @staticmethod
+    async def count_students(
+        db: AsyncSession,
+        user: User,
+        class_id: Optional[UUID] = None,
+        status: Optional[str] = None,
+        search_query: Optional[str] = None,
+        count_mode: CountMode = CountMode.EXACT,
+    ) -> Optional[int]:
+        """
+        Count the students get_students would page through.
+        """
+        query = StudentCRUD._students_query(user, class_id, status, search_query)
+        if query is None:
+            return 0
+        return await count_query(db, count_mode, query.with_only_columns(Student.id))
+
+    @staticmethod
+    def _students_query(
+        user: User,
+        class_id: Optional[UUID],
+        status: Optional[str],
+        search_query: Optional[str],
+    ):
+        """
+        Filtered student query for the user's role; None if the role sees no list.
         """
         query = select(Student)
 
@@ -264,7 +321,7 @@ class StudentCRUD:
             )
         elif user.role == "student":
             # Students see empty list (should use /me endpoint)
-            return []
+            return None
 
         # Apply filters
         if class_id:
@@ -284,16 +341,7 @@ class StudentCRUD:
                 )
             )
 
-        # Apply pagination
-        query = query.offset(skip).limit(limit)
-
-        # Order by last name, first name
-        query = query.order_by(Student.last_name, Student.first_name)
-
-        result = await db.execute(query)
-        students = result.scalars().all()
-
-        return list(students)
+        return query
 
     @staticmethod
     async def update_student(
@@ -471,25 +519,17 @@ class StudentCRUD:
     @staticmethod
     async def _generate_student_number(db: AsyncSession, school_id: UUID) -> str:
         """Generate unique student number for the school."""
-        current_year = datetime.now().year
-
-        # Get the next sequence number for this year and school
-        query = text(
-            """
-            SELECT COALESCE(MAX(CAST(SUBSTRING(student_number FROM '[0-9]+) AS INTEGER)), 0) + 1
-            FROM sis.students 
-            WHERE school_id = :school_id 
-            AND student_number LIKE :year_prefix
-        """
-        )
-
-        result = await db.execute(
-            query, {"school_id": school_id, "year_prefix": f"{current_year}-%"}
-        )
-        next_sequence = result.scalar()
+        return (await StudentCRUD._reserve_student_numbers(db, school_id, 1))[0]
 
+    @staticmethod
+    async def _reserve_student_numbers(
+        db: AsyncSession, school_id: UUID, count: int
+    ) -> List[str]:
+        """Reserve a block of consecutive student numbers from the school's counter."""
         # Format: YYYY-NNNN (e.g., 2024-0001)
-        return f"{current_year}-{next_sequence:04d}"
+        return await reserve_identifiers(
+            db, STUDENT_NUMBER, count, school_id, str(datetime.now().year)
+        )
 
     @staticmethod
     async def _encrypt_medical_data(
@@ -506,7 +546,7 @@ class StudentCRUD:
                 for allergy in allergies
             ],
         }
-        return encrypt_sensitive_data(medical_data)
+        return encrypt_sensitive_data(json.dumps(medical_data, default=str))
 
     @staticmethod
     async def _encrypt_emergency_contacts(emergency_contacts: List[Any]) -> str:
@@ -515,16 +555,16 @@ class StudentCRUD:
             contact.dict() if hasattr(contact, "dict") else contact
             for contact in emergency_contacts
         ]
-        return encrypt_sensitive_data(contacts_data)
+        return encrypt_sensitive_data(json.dumps(contacts_data, default=str))
 
     @staticmethod
     async def _decrypt_student_sensitive_data(student: Student):
         """Decrypt sensitive data for authorized users."""
         if student.medical_conditions_encrypted:
             try:
-                medical_data = decrypt_sensitive_data(
+                medical_data = json.loads(decrypt_sensitive_data(
                     student.medical_conditions_encrypted
-                )
+                ))
                 student.decrypted_medical_conditions = medical_data.get(
                     "conditions", []
                 )
@@ -536,9 +576,9 @@ class StudentCRUD:
 
         if student.emergency_contacts_encrypted:
             try:
-                student.decrypted_emergency_contacts = decrypt_sensitive_data(
+                student.decrypted_emergency_contacts = json.loads(decrypt_sensitive_data(
                     student.emergency_contacts_encrypted
-                )
+                ))
             except Exception as e:
                 logger.warning(
                     f"Failed to decrypt emergency contacts for student {student.id}: {str(e)}"
@@ -770,53 +810,14 @@ class AttendanceCRUD:
     @staticmethod
     async def mark_attendance(
         db: AsyncSession, attendance_data: AttendanceRecordCreate, marked_by_user_id: UUID
-    ) -> AttendanceRecord:
-        """Mark student attendance."""
+    ) -> Dict[str, Any]:
+        """Mark student attendance, updating the date/period's mark if it changed."""
         try:
-            # Check if attendance already marked for this date/period
-            existing_query = select(AttendanceRecord).where(
-                and_(
-                    AttendanceRecord.student_id == attendance_data.student_id,
-                    AttendanceRecord.attendance_date == attendance_data.attendance_date,
-                    AttendanceRecord.period == attendance_data.period,
-                )
-            )
-            result = await db.execute(existing_query)
-            existing = result.scalar_one_or_none()
-
-            if existing:
-                # Update existing record
-                for field, value in attendance_data.dict(exclude_unset=True).items():
-                    setattr(existing, field, value)
-                existing.marked_by = marked_by_user_id
-                existing.updated_at = datetime.utcnow()
-
-                await db.commit()
-                await db.refresh(existing)
-                return existing
-            else:
-                # Create new record
-                attendance = AttendanceRecord(
-                    student_id=attendance_data.student_id,
-                    attendance_date=attendance_data.attendance_date,
-                    period=attendance_data.period,
-                    status=attendance_data.status.value,
-                    arrival_time=attendance_data.arrival_time,
-                    departure_time=attendance_data.departure_time,
-                    absence_reason=attendance_data.absence_reason,
-                    excuse_provided=attendance_data.excuse_provided,
-                    notes=attendance_data.notes,
-                    marked_by=marked_by_user_id,
-                )
-
-                db.add(attendance)
-                await db.commit()
-                await db.refresh(attendance)
+            rows = await upsert_daily_attendance(db, [attendance_data], marked_by_user_id)
+            await db.commit()
 
-                logger.info(
-                    f"Attendance marked for student {attendance_data.student_id}"
-                )
-                return attendance
+            logger.info(f"Attendance marked for student {attendance_data.student_id}")
+            return rows[0]
 
         except Exception as e:
             await db.rollback()
@@ -4,7 +4,7 @@
 # =====================================================
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete, and_, or_, func, text
+from sqlalchemy import select, update, delete, and_, or_, func
 from sqlalchemy.orm import selectinload, joinedload
 from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
@@ -22,6 +22,7 @@ from .family_models import (
     FinancialResponsibilityType
 )
 from shared.models.platform_user import PlatformUser as User
+from shared.identifiers import FAMILY_CODE, next_identifier
 from shared.models.sis import Student
 from .schemas import GuardianRelationshipCreate, GuardianRelationshipUpdate
 
@@ -192,20 +193,10 @@ class FamilyCRUD:
     
     @staticmethod
     async def _generate_family_code(db: Session, school_id: UUID) -> str:
-        """Generate unique family code for the school"""
-        # Get the next sequence number for this school
-        query = text("""
-            SELECT COALESCE(MAX(CAST(SUBSTRING(family_code FROM '[0-9]+$') AS INTEGER)), 0) + 1
-            FROM sis.family_groups 
-            WHERE school_id = :school_id 
-            AND family_code ~ '^FAM[0-9]+$'
-        """)
-        
-        result = await db.execute(query, {"school_id": school_id})
-        next_sequence = result.scalar()
-        
+        """Generate unique family code"""
+        # Family codes are unique across schools, so they share one counter
         # Format: FAM + 4-digit number (e.g., FAM0001)
-        return f"FAM{next_sequence:04d}"
+        return await next_identifier(db, FAMILY_CODE)
     
     @staticmethod
     async def _update_family_student_count(db: Session, family_group_id: UUID):
@@ -14,11 +14,13 @@ from shared.auth import get_current_active_user, require_permission, require_fea
 from shared.models.platform_user import PlatformUser as EnhancedUser
 from shared.database import get_db_session
 from shared.file_storage import upload_student_document, upload_student_photo
+from shared.pagination import CountMode, InvalidCursorError, split_page
+from shared.exports import CSV, EXPORT_FORMATS, MEDIA_TYPES, export_response
 from ..schemas import (
     StudentCreate, StudentUpdate, StudentResponse, StudentSearchRequest,
     StudentSearchResponse, GuardianRelationshipCreate, GuardianRelationshipResponse
 )
-from ..crud import StudentCRUD, GuardianCRUD
+from ..crud import StudentCRUD, GuardianCRUD, STUDENT_SORT
 from ..family_crud import FamilyCRUD, EnhancedGuardianCRUD, EmergencyContactCRUD
 from ..bulk_operations import BulkImportService, BulkExportService
 from ..zimbabwe_validators import ZimbabweValidator
@@ -222,10 +224,15 @@ async def export_students_csv(
     grade_level: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
     class_id: Optional[UUID] = Query(None),
+    format: str = Query(CSV, description="Export format (csv, xlsx)"),
+    spool: bool = Query(False, description="Build the whole file before sending it (very large exports)"),
     db = Depends(get_db_session),
     current_user: EnhancedUser = Depends(get_current_active_user)
 ):
-    """Export students to CSV format."""
+    """Export students to CSV or Excel, streamed in chunks."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid export format")
+    
     try:
         filters = {}
         if grade_level:
@@ -235,14 +242,12 @@ async def export_students_csv(
         if class_id:
             filters['class_id'] = class_id
         
-        csv_data = await BulkExportService.export_to_csv(
-            db, current_user.school_id, filters, include_sensitive
+        chunks = BulkExportService.stream_export(
+            db, current_user.school_id, format, filters, include_sensitive
         )
         
-        return StreamingResponse(
-            io.BytesIO(csv_data),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=students.csv"}
+        return await export_response(
+            chunks, f"students.{format}", MEDIA_TYPES[format], spool_to_file=spool
         )
         
     except Exception as e:
@@ -548,6 +553,8 @@ async def update_emergency_contact(
 async def get_students(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    count: CountMode = Query(CountMode.CACHED, description="Total count: none, estimated, exact or cached"),
     search: Optional[str] = None,
     grade_level: Optional[int] = None,
     class_id: Optional[UUID] = None,
@@ -570,13 +577,21 @@ async def get_students(
         page_size=page_size
     )
     
-    students = await StudentCRUD.get_students(
+    try:
+        students = await StudentCRUD.get_students(
+            db, current_user, class_id=class_id, status=status,
+            search_query=search, skip=(page-1)*page_size, limit=page_size + 1,
+            cursor=cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    students, next_cursor = split_page(students, STUDENT_SORT, page_size)
+    
+    total_count = await StudentCRUD.count_students(
         db, current_user, class_id=class_id, status=status,
-        search_query=search, skip=(page-1)*page_size, limit=page_size
+        search_query=search, count_mode=count
     )
-    
-    total_count = len(students)  # Would need separate count query in production
-    total_pages = (total_count + page_size - 1) // page_size
+    total_pages = (total_count + page_size - 1) // page_size if total_count is not None else None
     
     return StudentSearchResponse(
         students=[StudentResponse.from_orm(s) for s in students],
@@ -584,8 +599,9 @@ async def get_students(
         page=page,
         page_size=page_size,
         total_pages=total_pages,
-        has_next=page < total_pages,
-        has_previous=page > 1
+        has_next=next_cursor is not None,
+        has_previous=page > 1 or cursor is not None,
+        next_cursor=next_cursor
     )
 
 @router.get("/{student_id}", response_model=StudentDetailResponse)
@@ -609,9 +609,10 @@ class StudentSearchRequest(BaseModel):
 class StudentSearchResponse(BaseModel):
     """Student search response"""
     students: List[StudentResponse]
-    total_count: int
+    total_count: Optional[int]
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
     has_next: bool
-    has_previous: bool
\ No newline at end of file
+    has_previous: bool
+    next_cursor: Optional[str] = None
\ No newline at end of file
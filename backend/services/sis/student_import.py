@@ -0,0 +1,335 @@
+# =====================================================
+# SIS Module - Bulk Student Import Engine
+# Set-based student ingestion with block-reserved student numbers,
+# per-chunk commits and resumable checkpoints
+# File: backend/services/sis/student_import.py
+# =====================================================
+
+import json
+import asyncio
+import logging
+import uuid
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from shared.database import get_database_connection
+from shared.db_pools import BACKGROUND
+from shared.encryption import encrypt_sensitive_data
+from shared.identifiers import STUDENT_NUMBER, reserve_identifiers_raw
+from .schemas import StudentCreate
+
+logger = logging.getLogger(__name__)
+
+# Students inserted per transaction
+DEFAULT_CHUNK_SIZE = 500
+
+# Threads encrypting medical data and emergency contacts
+DEFAULT_ENCRYPTION_WORKERS = 4
+
+STUDENT_COLUMNS = [
+    "id", "school_id", "student_number", "first_name", "middle_name", "last_name",
+    "preferred_name", "date_of_birth", "gender", "nationality", "home_language",
+    "religion", "tribe", "mobile_number", "email", "residential_address",
+    "postal_address", "current_grade_level", "current_class_id", "enrollment_date",
+    "blood_type", "medical_aid_provider", "medical_aid_number",
+    "medical_conditions_encrypted", "emergency_contacts_encrypted", "special_needs",
+    "dietary_requirements", "transport_needs", "identifying_marks",
+    "previous_school_name", "transfer_reason", "created_by",
+]
+HISTORY_COLUMNS = ["student_id", "academic_year_id", "grade_level", "class_id", "promotion_status"]
+
+# Existing students matching any (first name, last name, date of birth) key
+DUPLICATES_SQL = """
+SELECT lower(s.first_name) AS first_name, lower(s.last_name) AS last_name,
+       s.date_of_birth, s.student_number
+FROM sis.students s
+JOIN unnest($2::text[], $3::text[], $4::date[]) AS k(first_name, last_name, date_of_birth)
+  ON lower(s.first_name) = k.first_name
+ AND lower(s.last_name) = k.last_name
+ AND s.date_of_birth = k.date_of_birth
+WHERE s.school_id = $1 AND s.status != 'transferred'
+"""
+
+CLASS_CAPACITY_SQL = """
+SELECT c.id, c.max_capacity, COUNT(s.id) AS current_enrollment
+FROM academic.classes c
+LEFT JOIN sis.students s ON s.current_class_id = c.id AND s.status = 'active'
+WHERE c.id = ANY($1::uuid[])
+GROUP BY c.id, c.max_capacity
+"""
+
+
+@dataclass
+class StudentImportResult:
+    """Outcome of a bulk student import"""
+    total_rows: int = 0
+    imported: List[Dict[str, Any]] = field(default_factory=list)
+    failed: List[Dict[str, Any]] = field(default_factory=list)
+    chunks_committed: int = 0
+    chunks_failed: int = 0
+    # Last row before the first failed chunk; pass as resume_after to continue
+    checkpoint: Optional[int] = None
+
+
+def _encrypt_sensitive(payloads: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> List[Tuple[str, str]]:
+    """Encrypt (medical data, emergency contacts) pairs; runs in the worker pool"""
+    return [
+        (
+            encrypt_sensitive_data(json.dumps(medical, default=str)),
+            encrypt_sensitive_data(json.dumps(contacts, default=str)),
+        )
+        for medical, contacts in payloads
+    ]
+
+
+class StudentImportEngine:
+    """
+    Registers many students at once
+
+    Everything that the single-student workflow checks per row is checked
+    once per run: class capacities with one grouped query, duplicates
+    against existing students with one unnest join (and within the file by
+    key), and the current academic year once. Rows are then inserted in
+    chunks, each in its own transaction that reserves a block of student
+    numbers from the school's counter and COPYs the students and their
+    academic history. Sensitive fields are encrypted in a worker pool, the
+    next chunk's encryption overlapping the current chunk's COPY. A failed
+    chunk is rolled back (its student numbers with it) and reported without
+    undoing earlier chunks; the last row of the unbroken run of committed
+    chunks is kept as a checkpoint so an interrupted import can resume
+    after it. Later chunks that committed past a failure are then caught by
+    the duplicate check on resume.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, executor: Optional[Executor] = None):
+        """
+        Initialize engine
+
+        Args:
+            chunk_size: Students inserted per transaction
+            executor: Pool for encryption; defaults to a small thread pool
+        """
+        self.chunk_size = chunk_size
+        self.executor = executor
+
+    async def ingest(
+        self,
+        school_id: UUID,
+        rows: List[Tuple[int, StudentCreate]],
+        created_by: UUID,
+        resume_after: Optional[int] = None,
+    ) -> StudentImportResult:
+        """Import validated (row number, student) pairs, in row order"""
+        result = StudentImportResult(total_rows=len(rows), checkpoint=resume_after)
+        if resume_after is not None:
+            rows = [(row_num, student) for row_num, student in rows if row_num > resume_after]
+
+        executor = self.executor or ThreadPoolExecutor(max_workers=DEFAULT_ENCRYPTION_WORKERS)
+        try:
+            async with get_database_connection(BACKGROUND) as conn:
+                rows = await self._reject_duplicates(conn, school_id, rows, result)
+                rows = await self._reject_over_capacity(conn, rows, result)
+                academic_year_id = await conn.fetchval(
+                    "SELECT id FROM academic.academic_years WHERE school_id = $1 AND is_current = true",
+                    school_id
+                )
+
+                chunks = [rows[index:index + self.chunk_size] for index in range(0, len(rows), self.chunk_size)]
+                pending = self._encrypt_chunk(executor, chunks[0]) if chunks else None
+                for index, chunk in enumerate(chunks):
+                    encrypted = await pending
+                    pending = self._encrypt_chunk(executor, chunks[index + 1]) if index + 1 < len(chunks) else None
+
+                    await self._insert_chunk(
+                        conn, school_id, created_by, academic_year_id, chunk, encrypted, result
+                    )
+        finally:
+            if self.executor is None:
+                executor.shutdown(wait=False)
+
+        logger.info(
+            f"Imported {len(result.imported)} students for school {school_id} "
+            f"in {result.chunks_committed} chunks, {len(result.failed)} rows failed"
+        )
+        return result
+
+    # =====================================================
+    # VALIDATION
+    # =====================================================
+
+    @staticmethod
+    async def _reject_duplicates(conn, school_id: UUID, rows: List[Tuple[int, StudentCreate]],
+                                 result: StudentImportResult) -> List[Tuple[int, StudentCreate]]:
+        """Drop rows matching an existing student, or an earlier row, by name and date of birth"""
+        if not rows:
+            return rows
+
+        keys = [
+            (student.first_name.lower(), student.last_name.lower(), student.date_of_birth)
+            for _, student in rows
+        ]
+        existing = await conn.fetch(
+            DUPLICATES_SQL, school_id,
+            [key[0] for key in keys], [key[1] for key in keys], [key[2] for key in keys]
+        )
+        existing_numbers = {
+            (row["first_name"], row["last_name"], row["date_of_birth"]): row["student_number"]
+            for row in existing
+        }
+
+        accepted = []
+        seen: Set[Tuple] = set()
+        for (row_num, student), key in zip(rows, keys):
+            if key in existing_numbers:
+                StudentImportEngine._fail(
+                    result, row_num, student,
+                    f"Student with similar details already exists: {existing_numbers[key]}"
+                )
+            elif key in seen:
+                StudentImportEngine._fail(result, row_num, student, "Duplicate student in file")
+            else:
+                seen.add(key)
+                accepted.append((row_num, student))
+        return accepted
+
+    @staticmethod
+    async def _reject_over_capacity(conn, rows: List[Tuple[int, StudentCreate]],
+                                    result: StudentImportResult) -> List[Tuple[int, StudentCreate]]:
+        """Seat rows in their classes in row order, dropping those past capacity"""
+        class_ids = list({student.current_class_id for _, student in rows if student.current_class_id})
+        if not class_ids:
+            return rows
+
+        seats: Dict[UUID, Optional[int]] = {
+            row["id"]: (row["max_capacity"] - row["current_enrollment"]) if row["max_capacity"] else None
+            for row in await conn.fetch(CLASS_CAPACITY_SQL, class_ids)
+        }
+
+        accepted = []
+        for row_num, student in rows:
+            class_id = student.current_class_id
+            if class_id is None:
+                accepted.append((row_num, student))
+            elif class_id not in seats:
+                StudentImportEngine._fail(result, row_num, student, f"Class {class_id} not found")
+            elif seats[class_id] is not None and seats[class_id] <= 0:
+                StudentImportEngine._fail(result, row_num, student, "Class is at full capacity")
+            else:
+                if seats[class_id] is not None:
+                    seats[class_id] -= 1
+                accepted.append((row_num, student))
+        return accepted
+
+    # =====================================================
+    # INSERTION
+    # =====================================================
+
+    def _encrypt_chunk(self, executor: Executor, chunk: List[Tuple[int, StudentCreate]]) -> asyncio.Future:
+        """Start encrypting a chunk across the pool; resolves to one pair per row"""
+        payloads = [
+            (
+                {
+                    "conditions": [condition.dict() for condition in student.medical_conditions],
+                    "allergies": [allergy.dict() for allergy in student.allergies],
+                },
+                [contact.dict() for contact in student.emergency_contacts],
+            )
+            for _, student in chunk
+        ]
+        loop = asyncio.get_running_loop()
+        step = max(1, -(-len(payloads) // DEFAULT_ENCRYPTION_WORKERS))
+        parts = [
+            loop.run_in_executor(executor, _encrypt_sensitive, payloads[index:index + step])
+            for index in range(0, len(payloads), step)
+        ]
+
+        async def join() -> List[Tuple[str, str]]:
+            return [pair for part in await asyncio.gather(*parts) for pair in part]
+
+        return asyncio.ensure_future(join())
+
+    async def _insert_chunk(self, conn, school_id: UUID, created_by: UUID, academic_year_id: Optional[UUID],
+                            chunk: List[Tuple[int, StudentCreate]], encrypted: List[Tuple[str, str]],
+                            result: StudentImportResult) -> None:
+        """Insert one chunk in its own transaction"""
+        try:
+            async with conn.transaction():
+                numbers = await reserve_identifiers_raw(
+                    conn, STUDENT_NUMBER, len(chunk), school_id, str(datetime.now().year)
+                )
+
+                students = []
+                history = []
+                imported = []
+                for (row_num, student), (medical, contacts), student_number in zip(chunk, encrypted, numbers):
+                    student_id = uuid.uuid4()
+                    students.append(self._student_record(
+                        student_id, school_id, student_number, student, medical, contacts, created_by
+                    ))
+                    if academic_year_id:
+                        history.append((
+                            student_id, academic_year_id, student.current_grade_level,
+                            student.current_class_id, "pending",
+                        ))
+                    imported.append({
+                        "row": row_num,
+                        "id": str(student_id),
+                        "student_number": student_number,
+                        "name": f"{student.first_name} {student.last_name}",
+                    })
+
+                await conn.copy_records_to_table(
+                    "students", schema_name="sis", columns=STUDENT_COLUMNS, records=students
+                )
+                if history:
+                    await conn.copy_records_to_table(
+                        "student_academic_history", schema_name="sis",
+                        columns=HISTORY_COLUMNS, records=history
+                    )
+        except Exception as e:
+            result.chunks_failed += 1
+            logger.error(f"Student import chunk after row {result.checkpoint} failed: {e}")
+            for row_num, student in chunk:
+                self._fail(result, row_num, student, str(e))
+            return
+
+        result.imported.extend(imported)
+        result.chunks_committed += 1
+        # Past a failed chunk the checkpoint stays put, so resuming retries it
+        if not result.chunks_failed:
+            result.checkpoint = chunk[-1][0]
+        logger.info(
+            f"Student activity: bulk_import of {len(chunk)} students "
+            f"({imported[0]['student_number']} to {imported[-1]['student_number']}) by {created_by}"
+        )
+
+    @staticmethod
+    def _student_record(student_id: UUID, school_id: UUID, student_number: str, student: StudentCreate,
+                        medical: str, contacts: str, created_by: UUID) -> Tuple:
+        return (
+            student_id, school_id, student_number,
+            student.first_name, student.middle_name, student.last_name, student.preferred_name,
+            student.date_of_birth, student.gender.value, student.nationality,
+            student.home_language.value if student.home_language else None,
+            student.religion, student.tribe, student.mobile_number, student.email,
+            json.dumps(student.residential_address.dict()),
+            json.dumps(student.postal_address.dict()) if student.postal_address else None,
+            student.current_grade_level, student.current_class_id, student.enrollment_date,
+            student.blood_type.value if student.blood_type else None,
+            student.medical_aid_provider, student.medical_aid_number,
+            medical, contacts,
+            json.dumps(student.special_needs) if student.special_needs else None,
+            student.dietary_requirements, student.transport_needs, student.identifying_marks,
+            student.previous_school_name, student.transfer_reason, created_by,
+        )
+
+    @staticmethod
+    def _fail(result: StudentImportResult, row_num: int, student: StudentCreate, error: str) -> None:
+        result.failed.append({
+            "row": row_num,
+            "error": error,
+            "student": f"{student.first_name} {student.last_name}",
+        })
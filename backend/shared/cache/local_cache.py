@@ -0,0 +1,118 @@
+# =====================================================
+# Local Cache
+# Bounded in-process LRU cache with per-entry TTL and group invalidation,
+# shared by the tenant, principal and payment restriction caches
+# File: backend/shared/cache/local_cache.py
+# =====================================================
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU/TTL cache
+
+    Each entry may belong to groups (the user, school or student it
+    describes); a per-group index lets invalidate() drop every entry of a
+    group without scanning the cache. Entries expire `ttl` seconds after
+    they are set, bounding staleness when an invalidation message is missed.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of entries held before LRU eviction
+            ttl: Seconds an entry stays valid without an invalidation
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._keys_by_group: Dict[str, Set[Hashable]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value, or None on miss/expiry"""
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, groups: Iterable[Any] = ()) -> None:
+        """Cache a value in the given groups, evicting the oldest entries if full"""
+        self._remove(key)
+
+        groups = tuple(str(group) for group in groups)
+        self._entries[key] = (time.monotonic() + self.ttl, value, groups)
+        for group in groups:
+            self._keys_by_group.setdefault(group, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, keys: Iterable[Hashable] = (), groups: Iterable[Any] = ()) -> int:
+        """Drop entries by key and by group; counts one invalidation when anything is dropped"""
+        targets = set(keys)
+        for group in groups:
+            targets |= self._keys_by_group.get(str(group), set())
+
+        removed = sum(1 for key in targets if self._remove(key))
+        if removed:
+            self.invalidations += 1
+        return removed
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)"""
+        self._entries.clear()
+        self._keys_by_group.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+
+        for group in entry[2]:
+            keys = self._keys_by_group.get(group)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_group[group]
+        return True
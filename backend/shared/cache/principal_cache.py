@@ -0,0 +1,135 @@
+# =====================================================
+# Principal Cache
+# In-process LRU/TTL cache of resolved auth principals keyed by
+# (user id, school id, token iat), invalidated per user over pub/sub
+# File: backend/shared/cache/principal_cache.py
+# =====================================================
+
+import json
+import os
+import logging
+from typing import Optional, Dict, Any, Tuple
+from uuid import UUID
+
+from shared.cache.local_cache import LocalCache
+from shared.cache.pubsub import listen_forever
+from shared.cache.redis_client import get_redis_client, get_user_context_cache
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel used to tell every worker to drop a user's principals
+PRINCIPAL_INVALIDATION_CHANNEL = "oneclass:principal_invalidation"
+
+PrincipalKey = Tuple[str, Optional[str], Optional[int]]
+
+
+class PrincipalCache:
+    """
+    Bounded in-process cache of principal objects
+
+    Principals are immutable, so the same instance is safely shared by every
+    request presenting the same token. Entries are grouped by user so profile
+    and membership changes drop all of a user's entries at once.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 60.0):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of principals held before LRU eviction
+            ttl: Seconds an entry stays valid without an invalidation message
+        """
+        self._cache = LocalCache(max_entries, ttl)
+
+    def get(self, key: PrincipalKey) -> Optional[Any]:
+        """Get cached principal, or None on miss/expiry"""
+        return self._cache.get(key)
+
+    def set(self, key: PrincipalKey, principal: Any) -> None:
+        """Cache principal, evicting the oldest entry if full"""
+        self._cache.set(key, principal, groups=[key[0]])
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop every cached principal for a user"""
+        return self._cache.invalidate(groups=[user_id])
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)"""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for monitoring"""
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(
+    max_entries=int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "4096")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60")),
+)
+
+
+# =====================================================
+# REDIS BACKING
+# =====================================================
+
+async def get_cached_principal_record(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get the school-independent principal record from Redis"""
+    cache = get_user_context_cache()
+    if cache is None:
+        return None
+
+    return await cache.get_principal(UUID(user_id))
+
+
+async def store_principal_record(user_id: str, record: Dict[str, Any]) -> None:
+    """Store the principal record in Redis under its own key type"""
+    cache = get_user_context_cache()
+    if cache is None:
+        return
+    await cache.set_principal(UUID(user_id), record)
+
+
+async def invalidate_principal(user_id: Any) -> None:
+    """
+    Invalidate a user's principals everywhere after a profile or membership change
+
+    Drops local entries immediately, removes the Redis principal record and
+    user context, and
+    publishes on PRINCIPAL_INVALIDATION_CHANNEL so other workers drop theirs.
+    """
+    user_id = str(user_id)
+    principal_cache.invalidate_user(user_id)
+
+    cache = get_user_context_cache()
+    if cache is not None:
+        await cache.invalidate_principal(UUID(user_id))
+        await cache.invalidate_user_context(UUID(user_id))
+
+    client = get_redis_client()
+    if client is None:
+        return
+
+    try:
+        await client.publish(PRINCIPAL_INVALIDATION_CHANNEL, json.dumps({"user_id": user_id}))
+    except Exception as e:
+        logger.warning(f"Failed to publish principal invalidation for {user_id}: {e}")
+
+
+def handle_principal_invalidation_message(data: Any) -> None:
+    """Apply a pub/sub invalidation payload to the local cache"""
+    try:
+        if isinstance(data, bytes):
+            data = data.decode()
+        user_id = json.loads(data)["user_id"]
+    except (ValueError, TypeError, KeyError) as e:
+        logger.warning(f"Ignoring malformed principal invalidation message: {e}")
+        return
+
+    principal_cache.invalidate_user(user_id)
+
+
+async def listen_for_principal_invalidations() -> None:
+    """Apply messages on PRINCIPAL_INVALIDATION_CHANNEL until cancelled"""
+    # Missed messages would leave stale principals, so each reconnect starts from empty
+    await listen_forever(PRINCIPAL_INVALIDATION_CHANNEL, handle_principal_invalidation_message, on_gap=principal_cache.clear)
@@ -0,0 +1,67 @@
+# =====================================================
+# Pub/Sub Listener
+# Long-running Redis channel subscription that resubscribes with backoff
+# after connection errors
+# File: backend/shared/cache/pubsub.py
+# =====================================================
+
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+from shared.cache.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+INITIAL_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+
+async def listen_forever(
+    channel: str,
+    on_message: Callable[[Any], None],
+    on_gap: Optional[Callable[[], None]] = None,
+    initial_backoff: float = INITIAL_BACKOFF_SECONDS,
+    max_backoff: float = MAX_BACKOFF_SECONDS,
+) -> None:
+    """
+    Pass every message published on a channel to on_message until cancelled
+
+    When the subscription fails or the connection drops, the error is
+    logged, on_gap is called (messages published in the meantime are lost,
+    so caches use it to start from empty) and the channel is resubscribed
+    after a backoff that doubles up to max_backoff. Returns at once when
+    Redis is not configured.
+    """
+    client = get_redis_client()
+    if client is None:
+        return
+
+    backoff = initial_backoff
+    while True:
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            backoff = initial_backoff
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    on_message(message.get("data"))
+                except Exception as e:
+                    logger.error(f"Error handling message on {channel}: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Subscription to {channel} failed, resubscribing in {backoff:.0f}s: {e}")
+        finally:
+            try:
+                await pubsub.unsubscribe(channel)
+                await pubsub.close()
+            except Exception:
+                pass
+
+        if on_gap is not None:
+            on_gap()
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, max_backoff)
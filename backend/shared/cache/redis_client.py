@@ -0,0 +1,80 @@
+# =====================================================
+# Shared Redis Client
+# Lazily created asyncio Redis client shared by the cache layers
+# File: backend/shared/cache/redis_client.py
+# =====================================================
+
+import os
+import logging
+from typing import Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+from shared.cache.user_context_cache import UserContextCache
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# In-process copy of hot cache keys, kept coherent with Redis client-side tracking
+NEAR_CACHE_SIZE = int(os.getenv("REDIS_NEAR_CACHE_SIZE", "0"))
+NEAR_CACHE_TTL = float(os.getenv("REDIS_NEAR_CACHE_TTL_SECONDS", "5"))
+
+_redis_client = None
+_user_context_cache: Optional[UserContextCache] = None
+
+
+def get_redis_client():
+    """
+    Get the process-wide asyncio Redis client
+
+    Returns None when Redis is not configured (REDIS_URL unset) or the
+    redis package is unavailable, so callers can degrade to DB-only lookups.
+    """
+    global _redis_client
+
+    if _redis_client is None and REDIS_URL and aioredis is not None:
+        try:
+            _redis_client = aioredis.from_url(REDIS_URL)
+        except Exception as e:
+            logger.warning(f"Failed to create Redis client: {e}")
+            return None
+    return _redis_client
+
+
+def get_user_context_cache() -> Optional[UserContextCache]:
+    """Get the shared UserContextCache, or None when Redis is not configured"""
+    global _user_context_cache
+
+    if _user_context_cache is None:
+        client = get_redis_client()
+        if client is not None:
+            _user_context_cache = UserContextCache(
+                client,
+                near_cache_size=NEAR_CACHE_SIZE,
+                near_cache_ttl=NEAR_CACHE_TTL,
+            )
+    return _user_context_cache
+
+
+async def listen_for_near_cache_invalidations() -> None:
+    """Keep the UserContextCache near-cache coherent until cancelled"""
+    cache = get_user_context_cache()
+    if cache is not None:
+        await cache.track_invalidations()
+
+
+async def close_redis_client() -> None:
+    """Close the shared Redis client on shutdown"""
+    global _redis_client, _user_context_cache
+
+    if _redis_client is not None:
+        try:
+            await _redis_client.close()
+        except Exception as e:
+            logger.warning(f"Error closing Redis client: {e}")
+    _redis_client = None
+    _user_context_cache = None
@@ -0,0 +1,164 @@
+# =====================================================
+# Tenant Resolution Cache
+# In-process LRU/TTL cache of tenant records keyed by subdomain,
+# backed by Redis and invalidated over pub/sub
+# File: backend/shared/cache/tenant_cache.py
+# =====================================================
+
+import json
+import os
+import logging
+from typing import Optional, Dict, Any
+
+from shared.cache.local_cache import LocalCache
+from shared.cache.pubsub import listen_forever
+from shared.cache.redis_client import get_redis_client, get_user_context_cache
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel used to tell every worker to drop a tenant entry
+TENANT_INVALIDATION_CHANNEL = "oneclass:tenant_invalidation"
+
+
+class TenantCache:
+    """
+    Bounded in-process cache of tenant records
+
+    Entries are plain dicts (school_id, school_name, subdomain,
+    subscription_tier, enabled_modules) keyed by lower-cased subdomain and
+    grouped by school. Per-request state such as the user session is never
+    cached; the middleware builds a fresh TenantContext from the cached
+    record on every request.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of subdomains held before LRU eviction
+            ttl: Seconds an entry stays valid without an invalidation message
+        """
+        self._cache = LocalCache(max_entries, ttl)
+
+    def get(self, subdomain: str) -> Optional[Dict[str, Any]]:
+        """Get cached tenant record for subdomain, or None on miss/expiry"""
+        return self._cache.get(subdomain.lower())
+
+    def set(self, subdomain: str, record: Dict[str, Any]) -> None:
+        """Cache tenant record for subdomain, evicting the oldest entry if full"""
+        self._cache.set(subdomain.lower(), record, groups=[record["school_id"]])
+
+    def invalidate(self, school_id: Optional[str] = None, subdomain: Optional[str] = None) -> bool:
+        """Drop a tenant entry by school ID and/or subdomain"""
+        return self._cache.invalidate(
+            keys=[subdomain.lower()] if subdomain else [],
+            groups=[school_id] if school_id else [],
+        ) > 0
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)"""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for monitoring"""
+        return self._cache.stats()
+
+
+tenant_cache = TenantCache(
+    max_entries=int(os.getenv("TENANT_CACHE_MAX_ENTRIES", "1024")),
+    ttl=float(os.getenv("TENANT_CACHE_TTL_SECONDS", "60")),
+)
+
+
+# =====================================================
+# REDIS BACKING
+# =====================================================
+
+async def get_cached_tenant(subdomain: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve tenant record from the local cache, then Redis
+
+    Uses the existing UserContextCache subdomain mapping and school info
+    entries as the shared second tier. Returns None when neither tier has it.
+    """
+    record = tenant_cache.get(subdomain)
+    if record is not None:
+        return record
+
+    cache = get_user_context_cache()
+    if cache is None:
+        return None
+
+    school_id = await cache.get_school_by_subdomain(subdomain.lower())
+    if school_id is None:
+        return None
+
+    record = await cache.get_school_info(school_id)
+    if not record or "enabled_modules" not in record:
+        return None
+
+    tenant_cache.set(subdomain, record)
+    return record
+
+
+async def store_tenant(record: Dict[str, Any]) -> None:
+    """Store tenant record in the local cache and Redis"""
+    tenant_cache.set(record["subdomain"], record)
+
+    cache = get_user_context_cache()
+    if cache is None:
+        return
+
+    await cache.set_school_by_subdomain(record["subdomain"].lower(), record["school_id"])
+    await cache.set_school_info(record["school_id"], record)
+
+
+async def publish_tenant_invalidation(school_id: Any, subdomain: Optional[str] = None) -> None:
+    """
+    Invalidate a tenant everywhere after a school changes
+
+    Drops the local entry immediately, removes the Redis school info, and
+    publishes on TENANT_INVALIDATION_CHANNEL so other workers drop theirs.
+    Failures are logged; entries still expire after the local TTL.
+    """
+    school_id = str(school_id)
+    tenant_cache.invalidate(school_id=school_id, subdomain=subdomain)
+
+    cache = get_user_context_cache()
+    if cache is not None:
+        await cache.invalidate_school_info(school_id)
+
+    client = get_redis_client()
+    if client is None:
+        return
+
+    try:
+        await client.publish(
+            TENANT_INVALIDATION_CHANNEL,
+            json.dumps({"school_id": school_id, "subdomain": subdomain}),
+        )
+    except Exception as e:
+        logger.warning(f"Failed to publish tenant invalidation for {school_id}: {e}")
+
+
+def handle_invalidation_message(data: Any) -> None:
+    """Apply a pub/sub invalidation payload to the local cache"""
+    try:
+        if isinstance(data, bytes):
+            data = data.decode()
+        payload = json.loads(data)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Ignoring malformed tenant invalidation message: {e}")
+        return
+
+    tenant_cache.invalidate(
+        school_id=payload.get("school_id"),
+        subdomain=payload.get("subdomain"),
+    )
+
+
+async def listen_for_tenant_invalidations() -> None:
+    """Apply messages on TENANT_INVALIDATION_CHANNEL until cancelled"""
+    # Missed messages would leave stale entries, so each reconnect starts from empty
+    await listen_forever(TENANT_INVALIDATION_CHANNEL, handle_invalidation_message, on_gap=tenant_cache.clear)
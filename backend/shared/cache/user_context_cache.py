@@ -1,40 +1,185 @@
 # =====================================================
 # User Context Cache for Performance Optimization
-# Redis-based caching to reduce database queries
+# Redis-based caching to reduce database queries, with batched reads,
+# tag-set invalidation and an optional in-process near-cache
 # File: backend/shared/cache/user_context_cache.py
 # =====================================================
 
+import asyncio
 import json
-import redis
-from typing import Optional, Dict, Any, List
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 from uuid import UUID
-from datetime import datetime, timedelta
-import asyncio
+from datetime import datetime
 from functools import wraps
 import logging
 
+import redis.asyncio as aioredis
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+KEY_PREFIX = "oneclass:"
+
+# Sets of cache keys per user / school, so invalidation never scans the keyspace
+TAG_PREFIX = f"{KEY_PREFIX}tag:"
+
+# Which identifier of a key belongs to which tag, by key type and position
+# e.g. oneclass:permissions:<user_id>:<school_id>
+TAGGED_KEY_TYPES = {
+    'user_context': ('user',),
+    'principal': ('user',),
+    'minimal_context': ('user', 'school'),
+    'permissions': ('user', 'school'),
+    'school_info': ('school',),
+    'school_features': ('school',),
+    'school_users': ('school',),
+}
+
+# Key types small and hot enough to keep a copy of in process
+NEAR_CACHE_TYPES = ('school_info', 'school_features', 'subdomain_to_school', 'permissions')
+
+# Channel Redis publishes client-side tracking invalidations on (RESP2 redirect mode)
+TRACKING_CHANNEL = "__redis__:invalidate"
+
+# Keys per SCAN step and per UNLINK call
+SCAN_COUNT = 500
+
+_MISSING = object()
+
+
+def _dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=str).encode()
+
+
+def _loads(raw: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class NearCache:
+    """
+    Bounded in-process LRU/TTL copy of hot Redis values
+
+    Entries are dropped when this process writes the key, when Redis reports
+    the key changed (client-side tracking), and in any case after `ttl`
+    seconds, which bounds staleness if invalidations are missed.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Bumped on every invalidation; a read that raced one is not stored
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Any:
+        """Get a cached value, or _MISSING"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return _MISSING
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        """Cache a value unless an invalidation arrived since `generation`"""
+        if generation is not None and generation != self.generation:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        """Drop entries for the given keys"""
+        self.generation += 1
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        self.generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get near-cache counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
 class UserContextCache:
     """
     Redis-based caching system for user context data
     Implements multi-layer caching strategy for optimal performance
+
+    Values are serialized with orjson (json when it is not installed). Keys
+    that belong to a user or school are also added to that user's/school's
+    tag set when written, so invalidate_user_all/invalidate_school_all delete
+    exactly those keys instead of pattern-matching the keyspace. Batched
+    reads (get_many, get_auth_bundle) use one MGET round trip.
     """
-    
-    def __init__(self, redis_client: redis.Redis, default_ttl: int = 300):
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        default_ttl: int = 300,
+        near_cache_size: int = 0,
+        near_cache_ttl: float = 5.0,
+        near_cache_types: Iterable[str] = NEAR_CACHE_TYPES,
+    ):
         """
         Initialize cache with Redis client
-        
+
         Args:
-            redis_client: Redis client instance
+            redis_client: asyncio Redis client instance
             default_ttl: Default TTL in seconds (5 minutes)
+            near_cache_size: Entries kept in process for near_cache_types (0 disables)
+            near_cache_ttl: Seconds a near-cache entry is trusted without an invalidation
+            near_cache_types: Key types eligible for the near-cache
         """
         self.redis = redis_client
         self.default_ttl = default_ttl
-        
+
         # Different TTL values for different data types
         self.ttl_config = {
             'user_context': 300,       # 5 minutes - user data changes frequently
+            'principal': 300,          # 5 minutes - invalidated on profile/membership changes
             'school_info': 900,        # 15 minutes - school data changes less often
             'clerk_validation': 300,   # 5 minutes - auth tokens have their own expiry
             'subdomain_mapping': 1800, # 30 minutes - subdomains rarely change
@@ -42,238 +187,471 @@ class UserContextCache:
             'features': 1800,          # 30 minutes - feature flags change rarely
             'minimal_context': 120     # 2 minutes - minimal context for performance
         }
-    
+        # Tag sets must outlive the keys they list; every write extends them
+        self.tag_ttl = max(self.ttl_config.values())
+
+        self.near_cache = NearCache(near_cache_size, near_cache_ttl) if near_cache_size > 0 else None
+        self.near_cache_prefixes = tuple(f"{KEY_PREFIX}{key_type}:" for key_type in near_cache_types)
+        self.tracking_active = False
+
+        # Client-side counters; Redis INFO hit counts cover every client of the server
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.round_trips = 0
+        self.round_trip_ms = 0.0
+
     def _get_cache_key(self, key_type: str, identifier: str, suffix: str = "") -> str:
         """Generate standardized cache key"""
-        base_key = f"oneclass:{key_type}:{identifier}"
+        base_key = f"{KEY_PREFIX}{key_type}:{identifier}"
         return f"{base_key}:{suffix}" if suffix else base_key
-    
+
+    def _get_tag_key(self, kind: str, identifier: Any) -> str:
+        """Generate tag set key for a user or school"""
+        return f"{TAG_PREFIX}{kind}:{identifier}"
+
+    def _tags_for(self, key: str) -> List[str]:
+        """Tag sets a key belongs to, derived from its type and identifiers"""
+        parts = key[len(KEY_PREFIX):].split(":") if key.startswith(KEY_PREFIX) else []
+        kinds = TAGGED_KEY_TYPES.get(parts[0]) if parts else None
+        if not kinds:
+            return []
+        return [
+            self._get_tag_key(kind, identifier)
+            for kind, identifier in zip(kinds, parts[1:])
+            if identifier != "none"
+        ]
+
+    def _near_cacheable(self, key: str) -> bool:
+        return self.near_cache is not None and key.startswith(self.near_cache_prefixes)
+
+    def _record_round_trip(self, started: float) -> None:
+        self.round_trips += 1
+        self.round_trip_ms += (time.perf_counter() - started) * 1000
+
+    # Core Operations
+
     async def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Get data from cache with error handling"""
+        return (await self.get_many([key]))[0]
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several keys in one MGET round trip; missing keys are None"""
+        results: List[Optional[Any]] = [None] * len(keys)
+        pending: List[int] = []
+
+        for i, key in enumerate(keys):
+            if self._near_cacheable(key):
+                value = self.near_cache.get(key)
+                if value is not _MISSING:
+                    results[i] = value
+                    self.hits += 1
+                    continue
+            pending.append(i)
+
+        if not pending:
+            return results
+
+        generation = self.near_cache.generation if self.near_cache is not None else None
+        started = time.perf_counter()
         try:
-            cached_data = await self.redis.get(key)
-            if cached_data:
-                return json.loads(cached_data)
+            raw_values = await self.redis.mget([keys[i] for i in pending])
         except Exception as e:
-            logger.warning(f"Cache get error for key {key}: {e}")
-        return None
-    
+            self.errors += 1
+            logger.warning(f"Cache get error for keys {keys}: {e}")
+            return results
+        finally:
+            self._record_round_trip(started)
+
+        for i, raw in zip(pending, raw_values):
+            if not raw:
+                self.misses += 1
+                continue
+            try:
+                value = _loads(raw)
+            except ValueError as e:
+                self.errors += 1
+                logger.warning(f"Cache decode error for key {keys[i]}: {e}")
+                continue
+
+            self.hits += 1
+            results[i] = value
+            if self._near_cacheable(keys[i]):
+                self.near_cache.set(keys[i], value, generation)
+
+        return results
+
     async def set(self, key: str, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
         """Set data in cache with error handling"""
+        return await self.set_many({key: data}, ttl)
+
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Set several keys (and their tag sets) in one pipelined round trip"""
+        ttl = ttl or self.default_ttl
+        started = time.perf_counter()
         try:
-            ttl = ttl or self.default_ttl
-            await self.redis.setex(key, ttl, json.dumps(data, default=str))
-            return True
+            pipe = self.redis.pipeline(transaction=False)
+            for key, data in items.items():
+                pipe.setex(key, ttl, _dumps(data))
+                for tag in self._tags_for(key):
+                    pipe.sadd(tag, key)
+                    pipe.expire(tag, max(ttl, self.tag_ttl))
+            await pipe.execute()
         except Exception as e:
-            logger.warning(f"Cache set error for key {key}: {e}")
+            self.errors += 1
+            logger.warning(f"Cache set error for keys {list(items)}: {e}")
             return False
-    
+        finally:
+            self._record_round_trip(started)
+            if self.near_cache is not None:
+                self.near_cache.invalidate(items)
+        return True
+
     async def delete(self, key: str) -> bool:
         """Delete data from cache"""
         try:
-            await self.redis.delete(key)
+            await self._unlink([key])
             return True
         except Exception as e:
+            self.errors += 1
             logger.warning(f"Cache delete error for key {key}: {e}")
             return False
-    
+
+    async def _unlink(self, keys: List[str]) -> int:
+        """Delete keys without blocking Redis on large values"""
+        if self.near_cache is not None:
+            self.near_cache.invalidate(keys)
+        deleted = 0
+        for i in range(0, len(keys), SCAN_COUNT):
+            deleted += await self.redis.unlink(*keys[i:i + SCAN_COUNT])
+        return deleted
+
     async def delete_pattern(self, pattern: str) -> int:
-        """Delete multiple keys matching pattern"""
+        """Delete multiple keys matching pattern, walking the keyspace with SCAN"""
+        deleted = 0
         try:
-            keys = await self.redis.keys(pattern)
-            if keys:
-                return await self.redis.delete(*keys)
-            return 0
+            batch = []
+            async for key in self.redis.scan_iter(match=pattern, count=SCAN_COUNT):
+                batch.append(key.decode() if isinstance(key, bytes) else key)
+                if len(batch) >= SCAN_COUNT:
+                    deleted += await self._unlink(batch)
+                    batch = []
+            if batch:
+                deleted += await self._unlink(batch)
         except Exception as e:
+            self.errors += 1
             logger.warning(f"Cache delete pattern error for {pattern}: {e}")
+        return deleted
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """Delete every key recorded in a tag set, and the set itself"""
+        try:
+            members = await self.redis.smembers(tag)
+            keys = [m.decode() if isinstance(m, bytes) else m for m in members]
+            deleted = await self._unlink(keys + [tag])
+            # The tag set itself is not a cache entry
+            return max(deleted - 1, 0)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache tag invalidation error for {tag}: {e}")
             return 0
-    
+
     # User Context Caching
-    
+
     async def get_user_context(self, user_id: UUID) -> Optional[Dict[str, Any]]:
         """Get cached user context"""
         key = self._get_cache_key("user_context", str(user_id))
         return await self.get(key)
-    
+
     async def set_user_context(self, user_id: UUID, context: Dict[str, Any]) -> bool:
         """Cache user context"""
         key = self._get_cache_key("user_context", str(user_id))
         return await self.set(key, context, self.ttl_config['user_context'])
-    
+
     async def invalidate_user_context(self, user_id: UUID) -> bool:
         """Invalidate user context cache"""
         key = self._get_cache_key("user_context", str(user_id))
         return await self.delete(key)
-    
+
+    # Auth Principal Caching
+
+    async def get_principal(self, user_id: UUID) -> Optional[Dict[str, Any]]:
+        """Get cached school-independent principal record"""
+        key = self._get_cache_key("principal", str(user_id))
+        return await self.get(key)
+
+    async def set_principal(self, user_id: UUID, record: Dict[str, Any]) -> bool:
+        """Cache school-independent principal record"""
+        key = self._get_cache_key("principal", str(user_id))
+        return await self.set(key, record, self.ttl_config['principal'])
+
+    async def invalidate_principal(self, user_id: UUID) -> bool:
+        """Invalidate principal record cache"""
+        key = self._get_cache_key("principal", str(user_id))
+        return await self.delete(key)
+
     # Minimal Context Caching (for performance-critical operations)
-    
+
     async def get_minimal_context(self, user_id: UUID, school_id: Optional[UUID] = None) -> Optional[Dict[str, Any]]:
         """Get cached minimal user context"""
         suffix = str(school_id) if school_id else "none"
         key = self._get_cache_key("minimal_context", str(user_id), suffix)
         return await self.get(key)
-    
+
     async def set_minimal_context(self, user_id: UUID, context: Dict[str, Any], school_id: Optional[UUID] = None) -> bool:
         """Cache minimal user context"""
         suffix = str(school_id) if school_id else "none"
         key = self._get_cache_key("minimal_context", str(user_id), suffix)
         return await self.set(key, context, self.ttl_config['minimal_context'])
-    
+
     # School Information Caching
-    
+
     async def get_school_info(self, school_id: UUID) -> Optional[Dict[str, Any]]:
         """Get cached school information"""
         key = self._get_cache_key("school_info", str(school_id))
         return await self.get(key)
-    
+
     async def set_school_info(self, school_id: UUID, school_info: Dict[str, Any]) -> bool:
         """Cache school information"""
         key = self._get_cache_key("school_info", str(school_id))
         return await self.set(key, school_info, self.ttl_config['school_info'])
-    
+
     async def invalidate_school_info(self, school_id: UUID) -> bool:
         """Invalidate school info cache"""
         key = self._get_cache_key("school_info", str(school_id))
         return await self.delete(key)
-    
+
     # Clerk Integration Caching
-    
+
     async def get_clerk_user(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get cached Clerk user validation"""
         key = self._get_cache_key("clerk_user", session_id)
         return await self.get(key)
-    
+
     async def set_clerk_user(self, session_id: str, user_data: Dict[str, Any]) -> bool:
         """Cache Clerk user validation"""
         key = self._get_cache_key("clerk_user", session_id)
         return await self.set(key, user_data, self.ttl_config['clerk_validation'])
-    
+
     async def get_user_by_clerk_id(self, clerk_id: str) -> Optional[UUID]:
         """Get platform user ID from Clerk ID"""
         key = self._get_cache_key("clerk_to_user", clerk_id)
         cached = await self.get(key)
         return UUID(cached['user_id']) if cached else None
-    
+
     async def set_user_by_clerk_id(self, clerk_id: str, user_id: UUID) -> bool:
         """Cache Clerk ID to platform user ID mapping"""
         key = self._get_cache_key("clerk_to_user", clerk_id)
         return await self.set(key, {'user_id': str(user_id)}, 600)  # 10 minutes
-    
+
     # Subdomain and School Mapping
-    
+
     async def get_school_by_subdomain(self, subdomain: str) -> Optional[UUID]:
         """Get school ID from subdomain"""
         key = self._get_cache_key("subdomain_to_school", subdomain)
         cached = await self.get(key)
         return UUID(cached['school_id']) if cached else None
-    
+
     async def set_school_by_subdomain(self, subdomain: str, school_id: UUID) -> bool:
         """Cache subdomain to school ID mapping"""
         key = self._get_cache_key("subdomain_to_school", subdomain)
         return await self.set(
-            key, 
-            {'school_id': str(school_id)}, 
+            key,
+            {'school_id': str(school_id)},
             self.ttl_config['subdomain_mapping']
         )
-    
+
     # Permission and Feature Caching
-    
+
     async def get_user_permissions(self, user_id: UUID, school_id: UUID) -> Optional[List[str]]:
         """Get cached user permissions for specific school"""
         key = self._get_cache_key("permissions", f"{user_id}:{school_id}")
         cached = await self.get(key)
         return cached['permissions'] if cached else None
-    
+
     async def set_user_permissions(self, user_id: UUID, school_id: UUID, permissions: List[str]) -> bool:
         """Cache user permissions for specific school"""
         key = self._get_cache_key("permissions", f"{user_id}:{school_id}")
         return await self.set(
-            key, 
-            {'permissions': permissions}, 
+            key,
+            {'permissions': permissions},
             self.ttl_config['permissions']
         )
-    
+
     async def get_school_features(self, school_id: UUID) -> Optional[List[str]]:
         """Get cached school features"""
         key = self._get_cache_key("school_features", str(school_id))
         cached = await self.get(key)
         return cached['features'] if cached else None
-    
+
     async def set_school_features(self, school_id: UUID, features: List[str]) -> bool:
         """Cache school features"""
         key = self._get_cache_key("school_features", str(school_id))
         return await self.set(
-            key, 
-            {'features': features}, 
+            key,
+            {'features': features},
             self.ttl_config['features']
         )
-    
+
+    async def get_auth_bundle(self, user_id: UUID, school_id: UUID) -> Dict[str, Any]:
+        """
+        Get everything request authorization needs for a user in one round trip
+
+        Returns user_context, permissions, school_features and school_info;
+        each is None when not cached.
+        """
+        user_context, permissions, features, school_info = await self.get_many([
+            self._get_cache_key("user_context", str(user_id)),
+            self._get_cache_key("permissions", f"{user_id}:{school_id}"),
+            self._get_cache_key("school_features", str(school_id)),
+            self._get_cache_key("school_info", str(school_id)),
+        ])
+        return {
+            'user_context': user_context,
+            'permissions': permissions['permissions'] if permissions else None,
+            'school_features': features['features'] if features else None,
+            'school_info': school_info,
+        }
+
     # Bulk Operations for Performance
-    
-    async def get_school_users_summary(self, school_id: UUID, roles: Optional[List[str]] = None, 
+
+    async def get_school_users_summary(self, school_id: UUID, roles: Optional[List[str]] = None,
                                      limit: int = 100, offset: int = 0) -> Optional[List[Dict[str, Any]]]:
         """Get cached school users summary"""
         role_key = ":".join(sorted(roles)) if roles else "all"
         key = self._get_cache_key("school_users", f"{school_id}:{role_key}:{limit}:{offset}")
         cached = await self.get(key)
         return cached['users'] if cached else None
-    
-    async def set_school_users_summary(self, school_id: UUID, users: List[Dict[str, Any]], 
+
+    async def set_school_users_summary(self, school_id: UUID, users: List[Dict[str, Any]],
                                      roles: Optional[List[str]] = None, limit: int = 100, offset: int = 0) -> bool:
         """Cache school users summary"""
         role_key = ":".join(sorted(roles)) if roles else "all"
         key = self._get_cache_key("school_users", f"{school_id}:{role_key}:{limit}:{offset}")
         return await self.set(key, {'users': users}, 300)  # 5 minutes for bulk data
-    
+
     # Cache Invalidation Helpers
-    
+
     async def invalidate_user_all(self, user_id: UUID) -> int:
         """Invalidate all cache entries for a user"""
-        pattern = self._get_cache_key("*", str(user_id)) + "*"
-        return await self.delete_pattern(pattern)
-    
+        return await self.invalidate_tag(self._get_tag_key("user", user_id))
+
     async def invalidate_school_all(self, school_id: UUID) -> int:
         """Invalidate all cache entries for a school"""
-        pattern = self._get_cache_key("*", str(school_id)) + "*"
-        return await self.delete_pattern(pattern)
-    
+        return await self.invalidate_tag(self._get_tag_key("school", school_id))
+
     async def invalidate_user_school(self, user_id: UUID, school_id: UUID) -> int:
         """Invalidate cache entries for user-school relationship"""
-        patterns = [
+        keys = [
             self._get_cache_key("user_context", str(user_id)),
             self._get_cache_key("minimal_context", str(user_id), str(school_id)),
             self._get_cache_key("permissions", f"{user_id}:{school_id}"),
         ]
-        
-        deleted_count = 0
-        for pattern in patterns:
-            if await self.delete(pattern):
-                deleted_count += 1
-        
-        return deleted_count
-    
+        try:
+            return await self._unlink(keys)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache delete error for keys {keys}: {e}")
+            return 0
+
+    # Near-Cache Invalidation
+
+    def handle_tracking_message(self, keys: Any) -> None:
+        """Apply a client-side tracking invalidation; None means the keyspace was flushed"""
+        if self.near_cache is None:
+            return
+        if keys is None:
+            self.near_cache.clear()
+            return
+        if isinstance(keys, (bytes, str)):
+            keys = [keys]
+        self.near_cache.invalidate(k.decode() if isinstance(k, bytes) else k for k in keys)
+
+    async def track_invalidations(self) -> None:
+        """
+        Keep the near-cache coherent with Redis until cancelled
+
+        Uses Redis client-side caching in broadcast mode: one pooled
+        connection subscribes to TRACKING_CHANNEL and another enables
+        CLIENT TRACKING for the near-cached key prefixes, redirected to it,
+        so every write to those keys from any process drops the local copy.
+        If tracking cannot be enabled (Redis < 6, CLIENT disallowed) the
+        near-cache still works but relies on its TTL.
+        """
+        if self.near_cache is None:
+            return
+
+        pool = self.redis.connection_pool
+        listener = await pool.get_connection("SUBSCRIBE")
+        tracker = await pool.get_connection("CLIENT")
+        try:
+            await listener.send_command("CLIENT", "ID")
+            listener_id = await listener.read_response()
+            await listener.send_command("SUBSCRIBE", TRACKING_CHANNEL)
+            await listener.read_response()
+
+            args = ["CLIENT", "TRACKING", "ON", "REDIRECT", listener_id, "BCAST"]
+            for prefix in self.near_cache_prefixes:
+                args += ["PREFIX", prefix]
+            await tracker.send_command(*args)
+            await tracker.read_response()
+
+            # Entries read before tracking started may already be stale
+            self.near_cache.clear()
+            self.tracking_active = True
+            logger.info("Near-cache invalidation tracking enabled")
+
+            while True:
+                message = await listener.read_response(timeout=None)
+                if isinstance(message, list) and len(message) == 3 and message[0] in (b"message", "message"):
+                    self.handle_tracking_message(message[2])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Missed messages would leave stale entries, so start from empty
+            logger.error(f"Near-cache invalidation tracking stopped: {e}")
+            self.near_cache.clear()
+        finally:
+            self.tracking_active = False
+            for connection in (listener, tracker):
+                # Subscribed/tracking connections must not go back into use as-is
+                await connection.disconnect()
+                await pool.release(connection)
+
     # Health Check and Statistics
-    
+
+    def stats(self) -> Dict[str, Any]:
+        """Get client-side hit ratio, latency and near-cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'round_trips': self.round_trips,
+            'avg_round_trip_ms': self.round_trip_ms / self.round_trips if self.round_trips else 0.0,
+            'serializer': 'orjson' if orjson is not None else 'json',
+            'near_cache': self.near_cache.stats() if self.near_cache is not None else None,
+            'tracking_active': self.tracking_active,
+        }
+
     async def health_check(self) -> Dict[str, Any]:
         """Check cache health and return statistics"""
         try:
             # Test basic connectivity
             await self.redis.ping()
-            
+
             # Get some basic stats
             info = await self.redis.info()
             memory_usage = info.get('used_memory_human', 'unknown')
             connected_clients = info.get('connected_clients', 0)
-            
-            # Count our keys
-            our_keys = await self.redis.keys("oneclass:*")
-            key_count = len(our_keys) if our_keys else 0
-            
+
             return {
                 'status': 'healthy',
                 'memory_usage': memory_usage,
                 'connected_clients': connected_clients,
-                'our_key_count': key_count,
+                'key_count': await self.redis.dbsize(),
+                'client_stats': self.stats(),
                 'timestamp': datetime.utcnow().isoformat()
             }
         except Exception as e:
@@ -282,37 +660,41 @@ class UserContextCache:
                 'error': str(e),
                 'timestamp': datetime.utcnow().isoformat()
             }
-    
-    async def get_cache_stats(self) -> Dict[str, Any]:
-        """Get detailed cache statistics"""
-        stats = {
-            'user_contexts': 0,
-            'minimal_contexts': 0,
-            'school_info': 0,
-            'clerk_data': 0,
-            'permissions': 0,
-            'subdomain_mappings': 0,
-            'school_users': 0,
-            'total_keys': 0
+
+    async def get_cache_stats(self, count_keys: bool = False) -> Dict[str, Any]:
+        """
+        Get detailed cache statistics
+
+        Per-type key counts walk the keyspace with SCAN, so they are only
+        collected when count_keys is set; otherwise total_keys is DBSIZE.
+        """
+        key_types = {
+            'user_contexts': 'user_context',
+            'minimal_contexts': 'minimal_context',
+            'school_info': 'school_info',
+            'clerk_data': 'clerk_user',
+            'permissions': 'permissions',
+            'subdomain_mappings': 'subdomain_to_school',
+            'school_users': 'school_users',
         }
-        
+        stats = {name: 0 for name in key_types}
+        stats['total_keys'] = 0
+
         try:
-            # Count different types of keys
-            for key_type in stats.keys():
-                if key_type == 'total_keys':
-                    continue
-                    
-                pattern = f"oneclass:{key_type.replace('_', '_')}:*"
-                keys = await self.redis.keys(pattern)
-                stats[key_type] = len(keys) if keys else 0
-            
-            # Total count
-            all_keys = await self.redis.keys("oneclass:*")
-            stats['total_keys'] = len(all_keys) if all_keys else 0
-            
+            if count_keys:
+                names_by_type = {key_type: name for name, key_type in key_types.items()}
+                async for key in self.redis.scan_iter(match=f"{KEY_PREFIX}*", count=SCAN_COUNT):
+                    key = key.decode() if isinstance(key, bytes) else key
+                    name = names_by_type.get(key[len(KEY_PREFIX):].split(":", 1)[0])
+                    if name:
+                        stats[name] += 1
+                    stats['total_keys'] += 1
+            else:
+                stats['total_keys'] = await self.redis.dbsize()
         except Exception as e:
             logger.error(f"Error getting cache stats: {e}")
-        
+
+        stats.update(self.stats())
         return stats
 
 
@@ -323,20 +705,20 @@ def cache_result(cache_key_func, ttl: int = 300):
         async def wrapper(self, *args, **kwargs):
             # Generate cache key
             cache_key = cache_key_func(*args, **kwargs)
-            
+
             # Try to get from cache
             if hasattr(self, 'cache'):
                 cached_result = await self.cache.get(cache_key)
                 if cached_result:
                     return cached_result
-            
+
             # Execute function
             result = await func(self, *args, **kwargs)
-            
+
             # Cache the result
             if hasattr(self, 'cache') and result is not None:
                 await self.cache.set(cache_key, result, ttl)
-            
+
             return result
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,238 @@
+"""
+Streaming Exports
+Chunked server-side reads, generator CSV and write-only XLSX writers, and
+streaming (optionally spooled) download responses, so an export holds one
+chunk of rows in memory however many rows it covers
+
+Backpressure comes from the ASGI server: StreamingResponse awaits send()
+for every chunk and the server only returns once the socket can take more,
+so the row generators, and the database cursors behind them, advance at
+the speed the client reads. With spool=True the whole file is written to a
+SpooledTemporaryFile first, which releases the database connection before
+a slow client starts downloading and turns export failures into a proper
+error response instead of a truncated file.
+"""
+
+import os
+import io
+import csv
+import asyncio
+import logging
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database import get_database_connection
+from shared.db_pools import REPORTING
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip from server-side cursors
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+# Bytes buffered before a chunk is handed to the response
+EXPORT_WRITE_SIZE = int(os.getenv("EXPORT_WRITE_SIZE_BYTES", str(64 * 1024)))
+# Spooled exports move from memory to a temporary file past this size
+EXPORT_SPOOL_MAX_MEMORY = int(os.getenv("EXPORT_SPOOL_MAX_MEMORY_BYTES", str(8 * 1024 * 1024)))
+
+CSV = "csv"
+XLSX = "xlsx"
+EXPORT_FORMATS = (CSV, XLSX)
+MEDIA_TYPES = {
+    CSV: "text/csv",
+    XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+_XLSX_CELL_TYPES = (str, int, float, Decimal, date, datetime, bool)
+
+
+class ExportFormatError(ValueError):
+    """The export format is not supported, or its writer is not installed"""
+
+
+# =====================================================
+# SERVER-SIDE READS
+# =====================================================
+
+async def stream_orm(session, query, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[Any]:
+    """
+    Yield the entities of a SQLAlchemy Select, chunk_size rows per fetch
+
+    yield_per uses a server-side cursor; the session's identity map holds
+    unmodified objects weakly, so rows already written are released.
+    """
+    query = query.execution_options(yield_per=chunk_size)
+    if isinstance(session, AsyncSession):
+        result = await session.stream_scalars(query)
+        async for entity in result:
+            yield entity
+        return
+
+    result = session.execute(query)
+    if asyncio.iscoroutine(result):
+        result = await result
+    for entity in result.scalars():
+        yield entity
+
+
+async def stream_records(query: str, *params: Any, workload: str = REPORTING,
+                         chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield the rows of a raw SQL query through an asyncpg cursor
+
+    The connection is held for as long as the generator runs, inside one
+    read-only repeatable-read transaction so the export is a consistent
+    snapshot.
+    """
+    async with get_database_connection(workload) as conn:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            async for record in conn.cursor(query, *params, prefetch=chunk_size):
+                yield dict(record)
+
+
+# =====================================================
+# WRITERS
+# =====================================================
+
+async def iter_csv(rows: AsyncIterable[Dict[str, Any]], fieldnames: Sequence[str],
+                   write_size: int = EXPORT_WRITE_SIZE) -> AsyncIterator[bytes]:
+    """Encode dict rows as CSV, yielding roughly write_size bytes at a time"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+
+    async for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= write_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _xlsx_cell(value: Any) -> Any:
+    if value is None or isinstance(value, _XLSX_CELL_TYPES):
+        return value
+    return str(value)
+
+
+async def iter_xlsx(rows: AsyncIterable[Dict[str, Any]], fieldnames: Sequence[str],
+                    sheet_name: str = "Sheet1", headers: Optional[Sequence[str]] = None,
+                    read_size: int = EXPORT_WRITE_SIZE) -> AsyncIterator[bytes]:
+    """
+    Write dict rows to a write-only workbook and yield the saved file
+
+    Write-only sheets stream rows to a temporary file as they are appended,
+    so memory stays flat; the zip container can only be read back once the
+    workbook is saved, so nothing is yielded until every row is written.
+    """
+    if Workbook is None:
+        raise ExportFormatError("XLSX export requires openpyxl")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name)
+    headers = list(headers or fieldnames)
+    for index, header in enumerate(headers):
+        sheet.column_dimensions[_column_letter(index)].width = min(max(len(header) + 2, 12), 50)
+    sheet.append(headers)
+
+    async for row in rows:
+        sheet.append([_xlsx_cell(row.get(field)) for field in fieldnames])
+
+    with tempfile.TemporaryFile() as file:
+        await asyncio.to_thread(workbook.save, file)
+        file.seek(0)
+        while True:
+            data = file.read(read_size)
+            if not data:
+                break
+            yield data
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def iter_export(export_format: str, rows: AsyncIterable[Dict[str, Any]], fieldnames: Sequence[str],
+                sheet_name: str = "Sheet1") -> AsyncIterator[bytes]:
+    """CSV or XLSX chunks for the rows"""
+    if export_format == CSV:
+        return iter_csv(rows, fieldnames)
+    if export_format == XLSX:
+        return iter_xlsx(rows, fieldnames, sheet_name)
+    raise ExportFormatError(f"Unsupported export format: {export_format}")
+
+
+async def rows_from(items: Iterable[Any], build: Callable[[Any], Dict[str, Any]] = dict) -> AsyncIterator[Dict[str, Any]]:
+    """Adapt an in-memory iterable to the async row interface"""
+    for item in items:
+        yield build(item)
+
+
+async def collect(chunks: AsyncIterable[bytes]) -> bytes:
+    """Join chunks into one bytes value, for callers that need the whole file"""
+    return b"".join([chunk async for chunk in chunks])
+
+
+# =====================================================
+# RESPONSES
+# =====================================================
+
+async def spool(chunks: AsyncIterable[bytes], max_memory: int = EXPORT_SPOOL_MAX_MEMORY):
+    """Drain chunks into a SpooledTemporaryFile, rewound and ready to read"""
+    file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    try:
+        async for chunk in chunks:
+            file.write(chunk)
+    except BaseException:
+        file.close()
+        raise
+    file.seek(0)
+    return file
+
+
+async def iter_file(file, read_size: int = EXPORT_WRITE_SIZE) -> AsyncIterator[bytes]:
+    """Yield a file in read_size pieces, closing it afterwards"""
+    try:
+        while True:
+            data = file.read(read_size)
+            if not data:
+                break
+            yield data
+    finally:
+        file.close()
+
+
+async def export_response(chunks: AsyncIterable[bytes], filename: str, media_type: str,
+                          spool_to_file: bool = False) -> StreamingResponse:
+    """
+    Download response for an export
+
+    By default chunks are sent as they are produced. With spool_to_file the
+    export is completed first (raising here on failure) and then streamed
+    from the temporary file.
+    """
+    body = chunks
+    if spool_to_file:
+        body = iter_file(await spool(chunks))
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
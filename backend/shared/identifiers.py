@@ -0,0 +1,109 @@
+"""
+Identifier Allocation
+Human-readable numbers (student numbers, invoice numbers, payment references,
+order numbers, family codes) handed out from per-(scope, kind, period)
+counters in platform.identifier_counters instead of scanning for the highest
+number issued
+"""
+
+from dataclasses import dataclass
+from typing import Any, List
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Scope of counters shared by the whole platform rather than one school
+PLATFORM_SCOPE = UUID(int=0)
+
+# asyncpg form; the SQLAlchemy form binds the same arguments by name
+RESERVE_SQL = "SELECT platform.reserve_identifiers($1, $2, $3, $4)"
+RESERVE_STATEMENT = text("SELECT platform.reserve_identifiers(:scope_id, :kind, :period, :count)")
+
+
+@dataclass(frozen=True)
+class IdentifierKind:
+    """A counter kind registered in platform.identifier_kinds and its format"""
+    name: str
+    # str.format template with {period} and {sequence}
+    template: str
+
+    def format(self, period: str, sequence: int) -> str:
+        return self.template.format(period=period, sequence=sequence)
+
+
+# Format: YYYY-NNNN (e.g., 2024-0001); period is the year
+STUDENT_NUMBER = IdentifierKind("student_number", "{period}-{sequence:04d}")
+# Format: INV-YYYY-NNNNN (e.g., INV-2024-00001); period is the year
+INVOICE_NUMBER = IdentifierKind("invoice_number", "INV-{period}-{sequence:05d}")
+# Format: ZW-2024-T1-0001; period is "<year>-T<term>"
+TERM_INVOICE_NUMBER = IdentifierKind("term_invoice_number", "ZW-{period}-{sequence:04d}")
+# Format: PAY-YYYYMMDD-0001; period is the day
+PAYMENT_REFERENCE = IdentifierKind("payment_reference", "PAY-{period}-{sequence:04d}")
+# Format: CP-2025-001; platform-wide, period is the year
+ORDER_NUMBER = IdentifierKind("order_number", "CP-{period}-{sequence:03d}")
+# Format: FAM0001; platform-wide, no period
+FAMILY_CODE = IdentifierKind("family_code", "FAM{sequence:04d}")
+
+
+async def reserve_identifiers(
+    db: AsyncSession,
+    kind: IdentifierKind,
+    count: int,
+    scope_id: UUID = PLATFORM_SCOPE,
+    period: str = "",
+) -> List[str]:
+    """
+    Reserve a block of consecutive identifiers in one statement
+
+    The counter row stays locked until the caller's transaction commits, so
+    concurrent callers queue for it rather than issue the same number, and a
+    rollback returns the whole block.
+
+    Args:
+        db: Database session
+        kind: Identifier kind to draw from
+        count: Number of identifiers to reserve
+        scope_id: School the numbers belong to; PLATFORM_SCOPE for platform-wide kinds
+        period: Counter period (year, term or day) as used in the format
+
+    Returns:
+        The formatted identifiers, in order
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    result = await db.execute(
+        RESERVE_STATEMENT,
+        {"scope_id": scope_id, "kind": kind.name, "period": period, "count": count},
+    )
+    return _format_block(kind, period, result.scalar(), count)
+
+
+async def reserve_identifiers_raw(
+    conn: Any,
+    kind: IdentifierKind,
+    count: int,
+    scope_id: UUID = PLATFORM_SCOPE,
+    period: str = "",
+) -> List[str]:
+    """reserve_identifiers for an asyncpg connection, as used by bulk engines"""
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    first = await conn.fetchval(RESERVE_SQL, scope_id, kind.name, period, count)
+    return _format_block(kind, period, first, count)
+
+
+async def next_identifier(
+    db: AsyncSession,
+    kind: IdentifierKind,
+    scope_id: UUID = PLATFORM_SCOPE,
+    period: str = "",
+) -> str:
+    """Reserve a single identifier"""
+    return (await reserve_identifiers(db, kind, 1, scope_id, period))[0]
+
+
+def _format_block(kind: IdentifierKind, period: str, first: int, count: int) -> List[str]:
+    return [kind.format(period, first + offset) for offset in range(count)]
@@ -6,9 +6,8 @@ Captures all HTTP requests and creates comprehensive audit logs
 import time
 import uuid
 import json
-import asyncio
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List, Callable
+from typing import Optional, Dict, Any, List, Callable, NamedTuple, Set, Tuple
 from fastapi import Request, Response, HTTPException
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -20,7 +19,7 @@ from ..models.audit_log import (
     ActionContext, ActionDetails, SecurityMetadata
 )
 from ..models.platform_user import PlatformUser, SchoolRole
-from ..database import get_async_session
+from ..services.audit_writer import audit_writer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -68,6 +67,235 @@ class AuditConfig:
         "grade_update", "attendance_update", "academic_record_change",
         "transcript_generated", "certificate_issued"
     }
+    
+    # Paths never audited
+    SKIP_PATH_PREFIXES = (
+        "/health", "/metrics", "/docs", "/openapi.json",
+        "/static/", "/_next/", "/favicon.ico"
+    )
+    
+    # Response bodies are only buffered (to read the resource name) for
+    # mutating requests on these resources or route templates, up to the cap
+    BODY_CAPTURE_METHODS = {"POST", "PUT", "PATCH"}
+    BODY_CAPTURE_RESOURCES = {
+        "students", "staff", "teachers", "users", "schools",
+        "payments", "fees", "invoices"
+    }
+    BODY_CAPTURE_ROUTES: Set[str] = set()
+    MAX_CAPTURED_BODY_BYTES = 16 * 1024
+
+
+# =====================================================
+# ROUTE CLASSIFICATION TABLE
+# =====================================================
+
+class AuditRoute(NamedTuple):
+    """Precomputed audit classification of one (method, route template)"""
+    
+    action_category: ActionCategory
+    action_type: ActionType
+    description: str
+    base_risk_level: RiskLevel
+    resource_type: Optional[str]
+    id_param: Optional[str]
+    compliance_categories: Tuple[ComplianceCategory, ...]
+    should_log: bool
+    capture_body: bool
+    admin_route: bool
+    staff_route: bool
+
+
+class AuditRouteTable:
+    """
+    Route template -> AuditRoute map built once from the application's routes
+    
+    Requests are classified by a dict lookup on the matched route instead of
+    string matching on every request. Paths that matched no route are
+    classified on the fly and not cached, so probing cannot grow the table.
+    """
+    
+    def __init__(self, config: AuditConfig):
+        self.config = config
+        self._routes: Dict[Tuple[str, str], AuditRoute] = {}
+        self.built = False
+    
+    def build(self, routes: List[Any]) -> None:
+        """Classify every (method, path template) of the given routes"""
+        for route in routes:
+            path = getattr(route, "path", None)
+            methods = getattr(route, "methods", None)
+            if path is None or not methods:
+                continue
+            for method in methods:
+                self._routes[(method, path)] = self.classify(method, path)
+        self.built = True
+    
+    def lookup(self, method: str, route_path: Optional[str], raw_path: str) -> AuditRoute:
+        """Get the classification of the matched route, falling back to the raw path"""
+        if route_path is not None:
+            entry = self._routes.get((method, route_path))
+            if entry is not None:
+                return entry
+        return self.classify(method, raw_path)
+    
+    def __len__(self) -> int:
+        return len(self._routes)
+    
+    def classify(self, method: str, path: str) -> AuditRoute:
+        """Classify a method and path template"""
+        method = method.upper()
+        action_category, action_type, description = self._classify_action(method, path.lower())
+        
+        segments = [s for s in path.strip("/").split("/") if s]
+        static = [s for s in segments if not s.startswith("{")]
+        resource_type = static[-1] if static else None
+        id_param = None
+        if segments and segments[-1].startswith("{"):
+            id_param = segments[-1][1:-1].split(":")[0]
+        
+        should_log = self._should_log_action(action_type)
+        capture_body = should_log and method in self.config.BODY_CAPTURE_METHODS and (
+            path in self.config.BODY_CAPTURE_ROUTES
+            or (resource_type or "").lower() in self.config.BODY_CAPTURE_RESOURCES
+        )
+        
+        return AuditRoute(
+            action_category=action_category,
+            action_type=action_type,
+            description=description,
+            base_risk_level=self._determine_base_risk_level(action_type, method),
+            resource_type=resource_type,
+            id_param=id_param,
+            compliance_categories=tuple(
+                self._determine_compliance_categories(action_type, resource_type)
+            ),
+            should_log=should_log,
+            capture_body=capture_body,
+            admin_route="/admin" in path.lower(),
+            staff_route="/staff" in path.lower()
+        )
+    
+    def _classify_action(self, method: str, path: str) -> tuple:
+        """Classify request into action category, type, and description"""
+        
+        # Authentication actions
+        if "/auth/" in path or "/login" in path or "/logout" in path:
+            if "login" in path:
+                return ActionCategory.AUTHENTICATION, ActionType.LOGIN, f"User login attempt"
+            elif "logout" in path:
+                return ActionCategory.AUTHENTICATION, ActionType.LOGOUT, f"User logout"
+            else:
+                return ActionCategory.AUTHENTICATION, ActionType.UPDATE, f"Authentication action"
+        
+        # Student management
+        if "/students" in path:
+            if method == "POST":
+                return ActionCategory.STUDENT_MANAGEMENT, ActionType.CREATE, "Student created"
+            elif method == "PUT" or method == "PATCH":
+                return ActionCategory.STUDENT_MANAGEMENT, ActionType.UPDATE, "Student updated"
+            elif method == "DELETE":
+                return ActionCategory.STUDENT_MANAGEMENT, ActionType.DELETE, "Student deleted"
+            else:
+                return ActionCategory.STUDENT_MANAGEMENT, ActionType.READ, "Student accessed"
+        
+        # Staff management
+        if "/staff" in path or "/teachers" in path:
+            if method == "POST":
+                return ActionCategory.STAFF_MANAGEMENT, ActionType.CREATE, "Staff member created"
+            elif method == "PUT" or method == "PATCH":
+                return ActionCategory.STAFF_MANAGEMENT, ActionType.UPDATE, "Staff member updated"
+            elif method == "DELETE":
+                return ActionCategory.STAFF_MANAGEMENT, ActionType.DELETE, "Staff member deleted"
+            else:
+                return ActionCategory.STAFF_MANAGEMENT, ActionType.READ, "Staff member accessed"
+        
+        # Financial operations
+        if "/payments" in path or "/finance" in path or "/fees" in path:
+            if method == "POST":
+                if "payment" in path:
+                    return ActionCategory.FINANCIAL_OPERATIONS, ActionType.PAYMENT_PROCESSED, "Payment processed"
+                else:
+                    return ActionCategory.FINANCIAL_OPERATIONS, ActionType.CREATE, "Financial record created"
+            elif method == "PUT" or method == "PATCH":
+                return ActionCategory.FINANCIAL_OPERATIONS, ActionType.UPDATE, "Financial record updated"
+            elif method == "DELETE":
+                return ActionCategory.FINANCIAL_OPERATIONS, ActionType.DELETE, "Financial record deleted"
+            else:
+                return ActionCategory.FINANCIAL_OPERATIONS, ActionType.READ, "Financial record accessed"
+        
+        # School configuration
+        if "/settings" in path or "/config" in path:
+            if method in ["PUT", "PATCH", "POST"]:
+                return ActionCategory.SCHOOL_CONFIGURATION, ActionType.SETTINGS_CHANGE, "School settings updated"
+            else:
+                return ActionCategory.SCHOOL_CONFIGURATION, ActionType.READ, "School settings accessed"
+        
+        # Data operations
+        if "/import" in path:
+            return ActionCategory.DATA_IMPORT, ActionType.IMPORT, "Data import operation"
+        elif "/export" in path:
+            return ActionCategory.DATA_EXPORT, ActionType.EXPORT, "Data export operation"
+        elif "/backup" in path:
+            return ActionCategory.DATA_BACKUP, ActionType.BACKUP, "Data backup operation"
+        
+        # Default classification
+        if method == "POST":
+            return ActionCategory.USER_MANAGEMENT, ActionType.CREATE, f"Resource created via {path}"
+        elif method in ["PUT", "PATCH"]:
+            return ActionCategory.USER_MANAGEMENT, ActionType.UPDATE, f"Resource updated via {path}"
+        elif method == "DELETE":
+            return ActionCategory.USER_MANAGEMENT, ActionType.DELETE, f"Resource deleted via {path}"
+        else:
+            return ActionCategory.USER_MANAGEMENT, ActionType.READ, f"Resource accessed via {path}"
+    
+    def _should_log_action(self, action_type: ActionType) -> bool:
+        """Determine if action should be logged based on configuration"""
+        
+        if action_type == ActionType.READ and not self.config.LOG_READ_OPERATIONS:
+            return False
+        
+        return True
+    
+    def _determine_base_risk_level(self, action_type: ActionType, method: str) -> RiskLevel:
+        """Risk level before the response status is known"""
+        
+        if action_type.value in self.config.CRITICAL_RISK_ACTIONS:
+            return RiskLevel.CRITICAL
+        elif action_type.value in self.config.HIGH_RISK_ACTIONS:
+            return RiskLevel.HIGH
+        elif method in ["DELETE", "PUT", "PATCH"]:
+            return RiskLevel.MEDIUM
+        else:
+            return RiskLevel.LOW
+    
+    def _determine_compliance_categories(
+        self, 
+        action_type: ActionType, 
+        resource_type: Optional[str]
+    ) -> List[ComplianceCategory]:
+        """Determine which compliance categories apply"""
+        
+        categories = []
+        
+        if action_type.value in self.config.DATA_PROTECTION_ACTIONS:
+            categories.append(ComplianceCategory.DATA_PROTECTION)
+        
+        if action_type.value in self.config.FINANCIAL_COMPLIANCE_ACTIONS:
+            categories.append(ComplianceCategory.FINANCIAL_RECORD)
+        
+        if action_type.value in self.config.ACADEMIC_COMPLIANCE_ACTIONS:
+            categories.append(ComplianceCategory.ACADEMIC_RECORD)
+        
+        # Resource-based compliance
+        resource_type = (resource_type or "").lower()
+        if resource_type in ["students", "student"]:
+            categories.append(ComplianceCategory.DATA_PROTECTION)
+        elif resource_type in ["payments", "fees", "finance"]:
+            categories.append(ComplianceCategory.FINANCIAL_RECORD)
+        elif resource_type in ["grades", "assessments", "academic"]:
+            categories.append(ComplianceCategory.ACADEMIC_RECORD)
+        
+        return categories
 
 
 # =====================================================
@@ -80,41 +308,45 @@ class AuditMiddleware:
     def __init__(self, app):
         self.app = app
         self.config = AuditConfig()
+        self.route_table = AuditRouteTable(self.config)
     
     async def __call__(self, scope, receive, send):
-        if scope["type"] != "http":
+        if scope["type"] != "http" or self._should_skip_audit(scope["path"]):
             await self.app(scope, receive, send)
             return
         
-        request = Request(scope, receive)
-        
-        # Skip audit for certain paths
-        if self._should_skip_audit(request.url.path):
-            await self.app(scope, receive, send)
-            return
+        if not self.route_table.built:
+            # Built once, from the application that owns this middleware stack
+            self.route_table.build(getattr(scope.get("app"), "routes", []))
         
         # Capture request start time
         start_time = time.time()
         correlation_id = str(uuid.uuid4())
         
         # Store correlation ID in request state
-        request.state.correlation_id = correlation_id
-        request.state.audit_start_time = start_time
+        state = scope.setdefault("state", {})
+        state["correlation_id"] = correlation_id
+        state["audit_start_time"] = start_time
         
-        # Extract request context
-        context = await self._extract_request_context(request)
-        
-        # Create a custom send function to capture response
+        # Routing has happened by the time the response starts, so the
+        # route (and whether its body is worth capturing) is known there
+        audit_route = None
         response_status = None
-        response_body = None
+        captured_body = None
         
         async def audit_send(message):
-            nonlocal response_status, response_body
+            nonlocal audit_route, response_status, captured_body
             if message["type"] == "http.response.start":
                 response_status = message["status"]
-            elif message["type"] == "http.response.body":
-                if message.get("body"):
-                    response_body = message["body"]
+                audit_route = self._resolve_route(scope)
+                if audit_route.capture_body and self._is_json_response(message):
+                    captured_body = bytearray()
+            elif message["type"] == "http.response.body" and captured_body is not None:
+                body = message.get("body", b"")
+                if len(captured_body) + len(body) > self.config.MAX_CAPTURED_BODY_BYTES:
+                    captured_body = None  # Too large to parse; stop holding it
+                else:
+                    captured_body.extend(body)
             await send(message)
         
         try:
@@ -123,25 +355,33 @@ class AuditMiddleware:
             
             # Log successful request
             await self._log_request_completion(
-                request, context, correlation_id, start_time, 
-                response_status, response_body, None
+                scope, receive, audit_route or self._resolve_route(scope),
+                correlation_id, start_time, response_status,
+                bytes(captured_body) if captured_body else None, None
             )
             
         except Exception as e:
             # Log failed request
             await self._log_request_completion(
-                request, context, correlation_id, start_time,
-                500, None, str(e)
+                scope, receive, audit_route or self._resolve_route(scope),
+                correlation_id, start_time, 500, None, str(e)
             )
             raise
     
     def _should_skip_audit(self, path: str) -> bool:
         """Determine if path should be skipped from audit logging"""
-        skip_paths = [
-            "/health", "/metrics", "/docs", "/openapi.json",
-            "/static/", "/_next/", "/favicon.ico"
-        ]
-        return any(path.startswith(skip_path) for skip_path in skip_paths)
+        return path.startswith(self.config.SKIP_PATH_PREFIXES)
+    
+    def _resolve_route(self, scope) -> AuditRoute:
+        """Get the precomputed classification of the matched route"""
+        route_path = getattr(scope.get("route"), "path", None)
+        return self.route_table.lookup(scope["method"], route_path, scope["path"])
+    
+    def _is_json_response(self, message) -> bool:
+        for name, value in message.get("headers", []):
+            if name.lower() == b"content-type":
+                return value.startswith(b"application/json")
+        return False
     
     async def _extract_request_context(self, request: Request) -> ActionContext:
         """Extract context information from request"""
@@ -163,8 +403,9 @@ class AuditMiddleware:
     
     async def _log_request_completion(
         self,
-        request: Request,
-        context: ActionContext,
+        scope,
+        receive,
+        audit_route: AuditRoute,
         correlation_id: str,
         start_time: float,
         response_status: Optional[int],
@@ -174,27 +415,26 @@ class AuditMiddleware:
         """Log completed request with all context"""
         
         try:
+            if not audit_route.should_log:
+                return  # Skip if action type shouldn't be logged
+            
             duration_ms = int((time.time() - start_time) * 1000)
+            request = Request(scope, receive)
             
             # Extract user information from request
             user_info = await self._extract_user_info(request)
             if not user_info:
                 return  # Skip logging if no user context
             
-            # Determine action details
-            action_category, action_type, description = self._classify_action(request)
-            
-            if not self._should_log_action(action_type):
-                return  # Skip if action type shouldn't be logged
-            
             # Determine risk level
-            risk_level = self._determine_risk_level(action_type, request, response_status)
+            risk_level = audit_route.base_risk_level
+            if risk_level == RiskLevel.LOW and response_status and response_status >= 400:
+                risk_level = RiskLevel.MEDIUM
             
             # Extract resource information
-            resource_info = self._extract_resource_info(request, response_body)
+            resource_info = self._extract_resource_info(audit_route, scope, response_body)
             
-            # Determine compliance categories
-            compliance_categories = self._determine_compliance_categories(action_type, resource_info)
+            context = await self._extract_request_context(request)
             
             # Create action details
             action_details = ActionDetails(
@@ -207,39 +447,36 @@ class AuditMiddleware:
             
             # Create security metadata
             security_metadata = SecurityMetadata(
-                compliance_categories=compliance_categories,
-                automated_risk_score=self._calculate_risk_score(action_type, risk_level, user_info),
-                risk_factors=self._identify_risk_factors(request, user_info, duration_ms)
-            )
-            
-            # Create audit log entry
-            audit_log = AuditLog(
-                timestamp=datetime.now(timezone.utc),
-                school_id=user_info["school_id"],
-                school_name=user_info["school_name"],
-                user_id=user_info["user_id"],
-                user_email=user_info["email"],
-                user_full_name=user_info["full_name"],
-                user_role=user_info["role"],
-                action_category=action_category.value,
-                action_type=action_type.value,
-                action_description=description,
-                risk_level=risk_level.value,
-                compliance_categories=[cat.value for cat in compliance_categories],
-                resource_type=resource_info.get("type"),
-                resource_id=resource_info.get("id"),
-                resource_name=resource_info.get("name"),
-                action_context=context.dict(),
-                action_details=action_details.dict(),
-                security_metadata=security_metadata.dict(),
-                success="success" if not error_message and response_status < 400 else "failure",
-                error_message=error_message,
-                duration_ms=duration_ms,
-                correlation_id=correlation_id
+                compliance_categories=list(audit_route.compliance_categories),
+                automated_risk_score=self._calculate_risk_score(risk_level, user_info),
+                risk_factors=self._identify_risk_factors(request, audit_route, user_info, duration_ms)
             )
             
-            # Save to database (fire and forget to avoid blocking)
-            asyncio.create_task(self._save_audit_log(audit_log))
+            # Queue the row; the writer batches inserts off the request path
+            audit_writer.submit({
+                "timestamp": datetime.now(timezone.utc),
+                "school_id": user_info["school_id"],
+                "school_name": user_info["school_name"],
+                "user_id": user_info["user_id"],
+                "user_email": user_info["email"],
+                "user_full_name": user_info["full_name"],
+                "user_role": user_info["role"],
+                "action_category": audit_route.action_category.value,
+                "action_type": audit_route.action_type.value,
+                "action_description": audit_route.description,
+                "risk_level": risk_level.value,
+                "compliance_categories": [cat.value for cat in audit_route.compliance_categories],
+                "resource_type": resource_info.get("type"),
+                "resource_id": resource_info.get("id"),
+                "resource_name": resource_info.get("name"),
+                "action_context": context.dict(),
+                "action_details": action_details.dict(),
+                "security_metadata": security_metadata.dict(),
+                "success": "success" if not error_message and response_status < 400 else "failure",
+                "error_message": error_message,
+                "duration_ms": duration_ms,
+                "correlation_id": correlation_id
+            })
             
         except Exception as e:
             logger.error(f"Failed to create audit log: {str(e)}")
@@ -266,129 +503,26 @@ class AuditMiddleware:
         except Exception:
             return None
     
-    def _classify_action(self, request: Request) -> tuple:
-        """Classify request into action category, type, and description"""
-        
-        method = request.method.upper()
-        path = request.url.path.lower()
-        
-        # Authentication actions
-        if "/auth/" in path or "/login" in path or "/logout" in path:
-            if "login" in path:
-                return ActionCategory.AUTHENTICATION, ActionType.LOGIN, f"User login attempt"
-            elif "logout" in path:
-                return ActionCategory.AUTHENTICATION, ActionType.LOGOUT, f"User logout"
-            else:
-                return ActionCategory.AUTHENTICATION, ActionType.UPDATE, f"Authentication action"
-        
-        # Student management
-        if "/students" in path:
-            if method == "POST":
-                return ActionCategory.STUDENT_MANAGEMENT, ActionType.CREATE, "Student created"
-            elif method == "PUT" or method == "PATCH":
-                return ActionCategory.STUDENT_MANAGEMENT, ActionType.UPDATE, "Student updated"
-            elif method == "DELETE":
-                return ActionCategory.STUDENT_MANAGEMENT, ActionType.DELETE, "Student deleted"
-            else:
-                return ActionCategory.STUDENT_MANAGEMENT, ActionType.READ, "Student accessed"
-        
-        # Staff management
-        if "/staff" in path or "/teachers" in path:
-            if method == "POST":
-                return ActionCategory.STAFF_MANAGEMENT, ActionType.CREATE, "Staff member created"
-            elif method == "PUT" or method == "PATCH":
-                return ActionCategory.STAFF_MANAGEMENT, ActionType.UPDATE, "Staff member updated"
-            elif method == "DELETE":
-                return ActionCategory.STAFF_MANAGEMENT, ActionType.DELETE, "Staff member deleted"
-            else:
-                return ActionCategory.STAFF_MANAGEMENT, ActionType.READ, "Staff member accessed"
-        
-        # Financial operations
-        if "/payments" in path or "/finance" in path or "/fees" in path:
-            if method == "POST":
-                if "payment" in path:
-                    return ActionCategory.FINANCIAL_OPERATIONS, ActionType.PAYMENT_PROCESSED, "Payment processed"
-                else:
-                    return ActionCategory.FINANCIAL_OPERATIONS, ActionType.CREATE, "Financial record created"
-            elif method == "PUT" or method == "PATCH":
-                return ActionCategory.FINANCIAL_OPERATIONS, ActionType.UPDATE, "Financial record updated"
-            elif method == "DELETE":
-                return ActionCategory.FINANCIAL_OPERATIONS, ActionType.DELETE, "Financial record deleted"
-            else:
-                return ActionCategory.FINANCIAL_OPERATIONS, ActionType.READ, "Financial record accessed"
-        
-        # School configuration
-        if "/settings" in path or "/config" in path:
-            if method in ["PUT", "PATCH", "POST"]:
-                return ActionCategory.SCHOOL_CONFIGURATION, ActionType.SETTINGS_CHANGE, "School settings updated"
-            else:
-                return ActionCategory.SCHOOL_CONFIGURATION, ActionType.READ, "School settings accessed"
-        
-        # Data operations
-        if "/import" in path:
-            return ActionCategory.DATA_IMPORT, ActionType.IMPORT, "Data import operation"
-        elif "/export" in path:
-            return ActionCategory.DATA_EXPORT, ActionType.EXPORT, "Data export operation"
-        elif "/backup" in path:
-            return ActionCategory.DATA_BACKUP, ActionType.BACKUP, "Data backup operation"
-        
-        # Default classification
-        if method == "POST":
-            return ActionCategory.USER_MANAGEMENT, ActionType.CREATE, f"Resource created via {path}"
-        elif method in ["PUT", "PATCH"]:
-            return ActionCategory.USER_MANAGEMENT, ActionType.UPDATE, f"Resource updated via {path}"
-        elif method == "DELETE":
-            return ActionCategory.USER_MANAGEMENT, ActionType.DELETE, f"Resource deleted via {path}"
-        else:
-            return ActionCategory.USER_MANAGEMENT, ActionType.READ, f"Resource accessed via {path}"
-    
-    def _should_log_action(self, action_type: ActionType) -> bool:
-        """Determine if action should be logged based on configuration"""
-        
-        if action_type == ActionType.READ and not self.config.LOG_READ_OPERATIONS:
-            return False
-        
-        return True
-    
-    def _determine_risk_level(
-        self, 
-        action_type: ActionType, 
-        request: Request, 
-        response_status: Optional[int]
-    ) -> RiskLevel:
-        """Determine risk level based on action and context"""
-        
-        if action_type.value in self.config.CRITICAL_RISK_ACTIONS:
-            return RiskLevel.CRITICAL
-        elif action_type.value in self.config.HIGH_RISK_ACTIONS:
-            return RiskLevel.HIGH
-        elif response_status and response_status >= 400:
-            return RiskLevel.MEDIUM
-        elif request.method.upper() in ["DELETE", "PUT", "PATCH"]:
-            return RiskLevel.MEDIUM
-        else:
-            return RiskLevel.LOW
-    
     def _extract_resource_info(
         self, 
-        request: Request, 
+        audit_route: AuditRoute, 
+        scope, 
         response_body: Optional[bytes]
     ) -> Dict[str, str]:
         """Extract information about affected resource"""
         
-        path_parts = request.url.path.strip("/").split("/")
-        
         resource_info = {}
         
-        # Try to extract resource type from URL
-        if len(path_parts) >= 2:
-            resource_info["type"] = path_parts[-2] if path_parts[-1].isdigit() else path_parts[-1]
+        # Resource type comes from the route template, the ID from its last parameter
+        if audit_route.resource_type:
+            resource_info["type"] = audit_route.resource_type
         
-        # Try to extract resource ID from URL
-        if len(path_parts) >= 1 and path_parts[-1].isdigit():
-            resource_info["id"] = path_parts[-1]
+        if audit_route.id_param:
+            resource_id = scope.get("path_params", {}).get(audit_route.id_param)
+            if resource_id is not None:
+                resource_info["id"] = str(resource_id)
         
-        # Try to extract resource name from response body
+        # Try to extract resource name from the (capped) response body
         if response_body:
             try:
                 response_data = json.loads(response_body.decode())
@@ -404,38 +538,8 @@ class AuditMiddleware:
         
         return resource_info
     
-    def _determine_compliance_categories(
-        self, 
-        action_type: ActionType, 
-        resource_info: Dict[str, str]
-    ) -> List[ComplianceCategory]:
-        """Determine which compliance categories apply"""
-        
-        categories = []
-        
-        if action_type.value in self.config.DATA_PROTECTION_ACTIONS:
-            categories.append(ComplianceCategory.DATA_PROTECTION)
-        
-        if action_type.value in self.config.FINANCIAL_COMPLIANCE_ACTIONS:
-            categories.append(ComplianceCategory.FINANCIAL_RECORD)
-        
-        if action_type.value in self.config.ACADEMIC_COMPLIANCE_ACTIONS:
-            categories.append(ComplianceCategory.ACADEMIC_RECORD)
-        
-        # Resource-based compliance
-        resource_type = resource_info.get("type", "").lower()
-        if resource_type in ["students", "student"]:
-            categories.append(ComplianceCategory.DATA_PROTECTION)
-        elif resource_type in ["payments", "fees", "finance"]:
-            categories.append(ComplianceCategory.FINANCIAL_RECORD)
-        elif resource_type in ["grades", "assessments", "academic"]:
-            categories.append(ComplianceCategory.ACADEMIC_RECORD)
-        
-        return categories
-    
     def _calculate_risk_score(
         self, 
-        action_type: ActionType, 
         risk_level: RiskLevel, 
         user_info: Dict[str, Any]
     ) -> float:
@@ -462,6 +566,7 @@ class AuditMiddleware:
     def _identify_risk_factors(
         self, 
         request: Request, 
+        audit_route: AuditRoute, 
         user_info: Dict[str, Any], 
         duration_ms: int
     ) -> List[str]:
@@ -479,29 +584,18 @@ class AuditMiddleware:
             risk_factors.append("slow_response_time")
         
         # IP-based risk factors
-        ip_address = request.headers.get("x-forwarded-for") or request.client.host
+        ip_address = request.headers.get("x-forwarded-for") or (request.client.host if request.client else None)
         if ip_address and not ip_address.startswith("192.168.") and not ip_address.startswith("10."):
             risk_factors.append("external_ip_access")
         
         # Role-based risk factors
         role = user_info.get("role", "").lower()
-        path = request.url.path.lower()
-        if role == "student" and "/admin" in path:
+        if role == "student" and audit_route.admin_route:
             risk_factors.append("privilege_escalation_attempt")
-        elif role == "parent" and "/staff" in path:
+        elif role == "parent" and audit_route.staff_route:
             risk_factors.append("unauthorized_access_attempt")
         
         return risk_factors
-    
-    async def _save_audit_log(self, audit_log: AuditLog):
-        """Save audit log to database asynchronously"""
-        
-        try:
-            async with get_async_session() as session:
-                session.add(audit_log)
-                await session.commit()
-        except Exception as e:
-            logger.error(f"Failed to save audit log: {str(e)}")
 
 
 # =====================================================
@@ -8,15 +8,24 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from typing import Callable, Optional, Dict, Any
 import re
+import json
 import logging
 from datetime import datetime
 
 from shared.models.platform import School
 from shared.auth import verify_token, validate_token, UserSession, db_manager
 from shared.database import set_current_school_id
+from shared.cache.tenant_cache import get_cached_tenant, store_tenant
 
 logger = logging.getLogger(__name__)
 
+# Modules assumed when a school has no configuration row
+DEFAULT_ENABLED_MODULES = (
+    'student_information_system',
+    'finance_management',
+    'academic_management'
+)
+
 
 class TenantContext:
     """Context object for tenant information"""
@@ -227,25 +236,22 @@ class TenantMiddleware(BaseHTTPMiddleware):
             if not school_id:
                 return None
 
-            # Get school details from database
+            # Resolve the school's subdomain, then its record through the tenant cache
             from shared.database import get_async_session
             from sqlalchemy import select, text
 
             async for db in get_async_session():
-                # Get school information
-                school_query = text("""
-                    SELECT id, name, subdomain, subscription_tier
-                    FROM platform.schools
-                    WHERE id = :school_id
-                """)
-                result = await db.execute(school_query, {"school_id": school_id})
-                school = result.fetchone()
-
-                if not school:
+                result = await db.execute(
+                    text("SELECT subdomain FROM platform.schools WHERE id = :school_id"),
+                    {"school_id": school_id}
+                )
+                subdomain = result.scalar()
+                if not subdomain:
                     return None
 
-                # Get enabled modules for this school
-                enabled_modules = await self._get_school_modules(school_id)
+                record = await self._resolve_tenant_record(subdomain)
+                if record is None:
+                    return None
 
                 # Create user session from JWT payload (minimal; full context via verify_token elsewhere)
                 user_session = UserSession(
@@ -257,11 +263,11 @@ class TenantMiddleware(BaseHTTPMiddleware):
                 )
 
                 return TenantContext(
-                    school_id=school_id,
-                    school_name=school.name,
-                    subdomain=school.subdomain,
-                    subscription_tier=school.subscription_tier or 'basic',
-                    enabled_modules=enabled_modules,
+                    school_id=record["school_id"],
+                    school_name=record["school_name"],
+                    subdomain=record["subdomain"],
+                    subscription_tier=record["subscription_tier"],
+                    enabled_modules=list(record["enabled_modules"]),
                     user_session=user_session
                 )
 
@@ -290,68 +296,74 @@ class TenantMiddleware(BaseHTTPMiddleware):
         return db_manager.get_connection()
     
     async def _get_tenant_by_subdomain(self, subdomain: str, request: Request) -> Optional[TenantContext]:
-        """Get tenant context by subdomain"""
+        """Get tenant context by subdomain, served from the tenant cache when possible"""
+        record = await self._resolve_tenant_record(subdomain)
+        if record is None:
+            return None
+
+        user_session = await self._extract_user_session(request)
+
+        return TenantContext(
+            school_id=record["school_id"],
+            school_name=record["school_name"],
+            subdomain=record["subdomain"],
+            subscription_tier=record["subscription_tier"],
+            enabled_modules=list(record["enabled_modules"]),
+            user_session=user_session
+        )
+
+    async def _resolve_tenant_record(self, subdomain: str) -> Optional[Dict[str, Any]]:
+        """Get tenant record from the tenant cache, loading and storing it on a miss"""
+        record = await get_cached_tenant(subdomain)
+
+        if record is None:
+            record = await self._load_tenant_record(subdomain)
+            if record is None:
+                return None
+            await store_tenant(record)
+
+        return record
+
+    async def _load_tenant_record(self, subdomain: str) -> Optional[Dict[str, Any]]:
+        """Load school and its enabled modules in a single query"""
         async with db_manager.get_connection() as db:
             query = """
-                SELECT id, name, subdomain, subscription_tier, status, is_active
-                FROM platform.schools 
-                WHERE subdomain = $1 AND is_active = true
+                SELECT s.id, s.name, s.subdomain, s.subscription_tier,
+                       sc.enabled_modules
+                FROM platform.schools s
+                LEFT JOIN platform.school_configurations sc ON sc.school_id = s.id
+                WHERE s.subdomain = $1 AND s.is_active = true
             """
-            
+
             result = await db.fetchrow(query, subdomain.lower())
-            
+
             if not result:
                 return None
-            
-            enabled_modules = await self._get_school_modules(str(result["id"]))
-            user_session = await self._extract_user_session(request)
-            
-            return TenantContext(
-                school_id=str(result["id"]),
-                school_name=result["name"],
-                subdomain=result["subdomain"],
-                subscription_tier=result["subscription_tier"] or "basic",
-                enabled_modules=enabled_modules,
-                user_session=user_session
-            )
-    
-    async def _get_school_modules(self, school_id: str) -> list:
-        """Get enabled modules for school"""
-        try:
-            async with db_manager.get_connection() as db:
-                # Fetch enabled modules from school configuration
-                query = """
-                    SELECT sc.enabled_modules
-                    FROM platform.school_configurations sc
-                    WHERE sc.school_id = $1
-                """
-                result = await db.fetchval(query, school_id)
-                
-                if result:
-                    # Parse JSON string if needed
-                    if isinstance(result, str):
-                        import json
-                        try:
-                            return json.loads(result)
-                        except json.JSONDecodeError:
-                            logger.warning(f"Invalid JSON in enabled_modules for school {school_id}")
-                    elif isinstance(result, list):
-                        return result
-                
-                # Fallback to default modules if no configuration found
-                return [
-                    'student_information_system',
-                    'finance_management',
-                    'academic_management'
-                ]
-        except Exception as e:
-            logger.warning(f"Failed to fetch school modules for {school_id}: {e}")
-            # Return default modules on error
-            return [
-                'student_information_system',
-                'finance_management',
-                'academic_management'
-            ]
+
+            return {
+                "school_id": str(result["id"]),
+                "school_name": result["name"],
+                "subdomain": result["subdomain"],
+                "subscription_tier": result["subscription_tier"] or "basic",
+                "enabled_modules": self._parse_enabled_modules(
+                    result["enabled_modules"], str(result["id"])
+                ),
+            }
+
+    def _parse_enabled_modules(self, value: Any, school_id: str) -> list:
+        """Parse enabled_modules column, falling back to default modules"""
+        if value:
+            # Parse JSON string if needed
+            if isinstance(value, str):
+                try:
+                    return json.loads(value)
+                except json.JSONDecodeError:
+                    logger.warning(f"Invalid JSON in enabled_modules for school {school_id}")
+            elif isinstance(value, list):
+                return value
+
+        # Fallback to default modules if no configuration found
+        return list(DEFAULT_ENABLED_MODULES)
     
     async def _setup_database_context(self, request: Request, tenant_context: TenantContext):
         """Set up database context for Row Level Security by setting contextvar."""
@@ -210,6 +210,7 @@ class AuditLog(Base):
     __table_args__ = (
         Index('idx_audit_logs_school_user', 'school_id', 'user_id'),
         Index('idx_audit_logs_timestamp', 'timestamp'),
+        Index('idx_audit_logs_school_timestamp', 'school_id', 'timestamp', 'id'),
         Index('idx_audit_logs_action_category', 'action_category'),
         Index('idx_audit_logs_action_type', 'action_type'),
         Index('idx_audit_logs_risk_level', 'risk_level'),
@@ -0,0 +1,339 @@
+"""
+Keyset Pagination
+Opaque cursors over stable sort keys, and optional row counts (none,
+planner estimate, exact, or exact with a short-lived cache) for list
+endpoints on both asyncpg and SQLAlchemy queries
+"""
+
+import os
+import time
+import json
+import base64
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_, select, text, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+logger = logging.getLogger(__name__)
+
+COUNT_CACHE_TTL_SECONDS = float(os.getenv("PAGINATION_COUNT_CACHE_TTL_SECONDS", "60"))
+COUNT_CACHE_SIZE = int(os.getenv("PAGINATION_COUNT_CACHE_SIZE", "1024"))
+
+
+class CountMode(str, Enum):
+    """How a list endpoint reports its total"""
+    NONE = "none"            # no count query at all
+    ESTIMATED = "estimated"  # planner row estimate (EXPLAIN), no scan
+    EXACT = "exact"          # COUNT(*) on every request
+    CACHED = "cached"        # COUNT(*) reused for COUNT_CACHE_TTL_SECONDS
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed or was issued for a different sort order"""
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """
+    One column of a keyset sort order
+
+    expression is the SQL text (raw queries) or SQLAlchemy column to compare
+    and order by; field is where the value is read from a result row. The
+    last key of a sort order must be unique (normally the primary key) and
+    no key may be NULL, so every row has exactly one position.
+    """
+    expression: Any
+    field: str
+    descending: bool = False
+
+
+# =====================================================
+# CURSORS
+# =====================================================
+
+_ENCODERS = (
+    (datetime, "dt", lambda v: v.isoformat()),
+    (date, "d", lambda v: v.isoformat()),
+    (UUID, "u", str),
+    (Decimal, "n", str),
+)
+_DECODERS = {
+    "dt": datetime.fromisoformat,
+    "d": date.fromisoformat,
+    "u": UUID,
+    "n": Decimal,
+}
+
+
+def _fingerprint(keys: Sequence[SortKey]) -> str:
+    order = ",".join(f"{key.field}:{'d' if key.descending else 'a'}" for key in keys)
+    return hashlib.blake2s(order.encode(), digest_size=4).hexdigest()
+
+
+def _encode_value(value: Any) -> Any:
+    for value_type, tag, encode in _ENCODERS:
+        if isinstance(value, value_type):
+            return [tag, encode(value)]
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, list):
+        tag, raw = value
+        return _DECODERS[tag](raw)
+    return value
+
+
+def encode_cursor(keys: Sequence[SortKey], values: Sequence[Any]) -> str:
+    """Encode the sort key values of a row as an opaque URL-safe cursor"""
+    payload = {"k": _fingerprint(keys), "v": [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(keys: Sequence[SortKey], cursor: str) -> List[Any]:
+    """Decode a cursor back to sort key values, checking it matches the sort order"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(v) for v in payload["v"]]
+    except Exception as e:
+        raise InvalidCursorError("Malformed pagination cursor") from e
+
+    if payload.get("k") != _fingerprint(keys) or len(values) != len(keys):
+        raise InvalidCursorError("Pagination cursor does not match this sort order")
+    return values
+
+
+def _row_value(row: Any, field: str) -> Any:
+    try:
+        return row[field]
+    except (TypeError, KeyError):
+        return getattr(row, field)
+
+
+def cursor_for(row: Any, keys: Sequence[SortKey]) -> str:
+    """Cursor positioned just after a row (mapping, record or ORM object)"""
+    return encode_cursor(keys, [_row_value(row, key.field) for key in keys])
+
+
+def split_page(rows: Sequence[Any], keys: Sequence[SortKey], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim rows fetched with LIMIT limit + 1 to one page
+
+    Returns the page and the cursor of its last row, or None when the extra
+    row was not there (this is the last page).
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, cursor_for(page[-1], keys)
+
+
+# =====================================================
+# RAW SQL (asyncpg / text())
+# =====================================================
+
+def order_clause(keys: Sequence[SortKey]) -> str:
+    """ORDER BY body for the sort order"""
+    return ", ".join(f"{key.expression} {'DESC' if key.descending else 'ASC'}" for key in keys)
+
+
+def keyset_condition(keys: Sequence[SortKey], placeholders: Sequence[str]) -> str:
+    """
+    WHERE condition selecting rows after the cursor position
+
+    placeholders are the bind parameters holding the cursor values, e.g.
+    ["$4", "$5"] for asyncpg or [":cursor_0", ":cursor_1"] for text().
+    Uniform directions use a row comparison, which Postgres can answer
+    from a matching composite index.
+    """
+    directions = {key.descending for key in keys}
+    if len(directions) == 1:
+        op = "<" if keys[0].descending else ">"
+        columns = ", ".join(str(key.expression) for key in keys)
+        return f"({columns}) {op} ({', '.join(placeholders)})"
+
+    branches = []
+    for index, key in enumerate(keys):
+        equal = [f"{k.expression} = {p}" for k, p in zip(keys[:index], placeholders[:index])]
+        op = "<" if key.descending else ">"
+        branches.append(" AND ".join(equal + [f"{key.expression} {op} {placeholders[index]}"]))
+    return "(" + " OR ".join(f"({branch})" for branch in branches) + ")"
+
+
+def keyset_filter(keys: Sequence[SortKey], cursor: Optional[str], next_param: int) -> Tuple[str, List[Any]]:
+    """
+    " AND <condition>" and its values for an asyncpg query, or ("", []) without a cursor
+
+    next_param is the number of the first free $n parameter.
+    """
+    if not cursor:
+        return "", []
+    values = decode_cursor(keys, cursor)
+    placeholders = [f"${next_param + index}" for index in range(len(values))]
+    return " AND " + keyset_condition(keys, placeholders), values
+
+
+# =====================================================
+# SQLALCHEMY
+# =====================================================
+
+def apply_keyset(query, keys: Sequence[SortKey], cursor: Optional[str] = None):
+    """Order a Select by the keys and, given a cursor, start after it"""
+    if cursor:
+        values = decode_cursor(keys, cursor)
+        if len({key.descending for key in keys}) == 1:
+            columns = tuple_(*(key.expression for key in keys))
+            bound = tuple_(*values)
+            query = query.where(columns < bound if keys[0].descending else columns > bound)
+        else:
+            branches = []
+            for index, key in enumerate(keys):
+                equal = [k.expression == v for k, v in zip(keys[:index], values[:index])]
+                after = key.expression < values[index] if key.descending else key.expression > values[index]
+                branches.append(and_(*equal, after))
+            query = query.where(or_(*branches))
+
+    return query.order_by(*(
+        key.expression.desc() if key.descending else key.expression.asc() for key in keys
+    ))
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) around a statement, keeping its bind parameters"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _plan_rows(plan: Any) -> int:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# =====================================================
+# COUNTS
+# =====================================================
+
+class CountCache:
+    """Small TTL/LRU cache of exact counts keyed by query and parameters"""
+
+    def __init__(self, ttl: float = COUNT_CACHE_TTL_SECONDS, max_size: int = COUNT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, count: int) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, count)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+count_cache = CountCache()
+
+
+def _cache_key(sql: str, params: Any) -> Hashable:
+    # repr keeps list parameters (ANY/IN values) hashable
+    if isinstance(params, dict):
+        return (sql, repr(sorted(params.items())))
+    return (sql, repr(list(params)))
+
+
+async def count_rows(conn, mode: CountMode, from_sql: str, params: Sequence[Any]) -> Optional[int]:
+    """
+    Count the rows of "SELECT ... {from_sql}" on an asyncpg connection
+
+    from_sql is the FROM/WHERE tail shared with the page query.
+    """
+    if mode == CountMode.NONE:
+        return None
+    if mode == CountMode.ESTIMATED:
+        plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) SELECT 1 {from_sql}", *params)
+        return _plan_rows(plan)
+
+    count_sql = f"SELECT COUNT(*) {from_sql}"
+    if mode == CountMode.CACHED:
+        key = _cache_key(count_sql, params)
+        cached = count_cache.get(key)
+        if cached is not None:
+            return cached
+        count = await conn.fetchval(count_sql, *params)
+        count_cache.set(key, count)
+        return count
+    return await conn.fetchval(count_sql, *params)
+
+
+async def count_query(session, mode: CountMode, query, params: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """
+    Count the rows of a SQLAlchemy Select, or of a text() row query with params
+    """
+    if mode == CountMode.NONE:
+        return None
+
+    is_select = hasattr(query, "order_by") and hasattr(query, "subquery")
+    if mode == CountMode.ESTIMATED:
+        statement = query.order_by(None) if is_select else query
+        result = await session.execute(_Explain(statement), params or {})
+        return _plan_rows(result.scalar())
+
+    if is_select:
+        count_statement = select(func.count()).select_from(query.order_by(None).subquery())
+    else:
+        count_statement = text(f"SELECT COUNT(*) FROM ({query.text}) AS counted")
+
+    async def run() -> int:
+        result = await session.execute(count_statement, params or {})
+        return result.scalar()
+
+    if mode == CountMode.CACHED:
+        compiled = count_statement.compile()
+        key = _cache_key(str(compiled), {**compiled.params, **(params or {})})
+        cached = count_cache.get(key)
+        if cached is not None:
+            return cached
+        count = await run()
+        count_cache.set(key, count)
+        return count
+    return await run()
@@ -0,0 +1,334 @@
+# =====================================================
+# Audit Log Writer
+# Bounded queue of audit rows written off the request path in batches
+# (group commit), with an optional on-disk spill file for durability
+# File: backend/shared/services/audit_writer.py
+# =====================================================
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from shared.database import get_workload_session
+from shared.db_pools import BACKGROUND
+from shared.models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# Durability modes
+DURABILITY_SHUTDOWN_FLUSH = "shutdown_flush"  # drain the queue on shutdown
+DURABILITY_SPILL = "spill"                    # also spill unwritable rows to disk
+
+# Columns converted back from their JSON form when a spill file is replayed
+UUID_COLUMNS = ("id", "school_id", "user_id", "parent_log_id")
+DATETIME_COLUMNS = ("timestamp", "retention_until")
+
+# Queued by close() to let the consumer finish its current batch and exit
+_STOP = object()
+
+
+def _encode_row(row: Dict[str, Any]) -> str:
+    return json.dumps(
+        row, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v)
+    )
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _decode_row(line: str) -> Dict[str, Any]:
+    row = json.loads(line)
+    for column in UUID_COLUMNS:
+        if row.get(column):
+            row[column] = uuid.UUID(row[column])
+    for column in DATETIME_COLUMNS:
+        if row.get(column):
+            row[column] = datetime.fromisoformat(row[column])
+    return row
+
+
+class AuditLogWriter:
+    """
+    Group-commit writer for audit rows
+
+    The request path only calls submit(), which never awaits. A single
+    consumer task collects up to `batch_size` rows or whatever arrived within
+    `flush_interval` seconds and writes them with one multi-row INSERT on the
+    BACKGROUND pool. Rows carry their own id and conflicts are ignored, so a
+    replayed spill file never duplicates entries.
+
+    In spill mode each worker process appends to its own file,
+    `<spill_path>.<pid>`. On start a worker claims the files of workers that
+    have exited (and replays they left unfinished) by renaming them, so two
+    workers never replay the same file.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        durability: str = DURABILITY_SHUTDOWN_FLUSH,
+        spill_path: Optional[str] = None,
+    ):
+        """
+        Initialize writer
+
+        Args:
+            max_queue: Maximum rows waiting to be written
+            batch_size: Maximum rows per INSERT/commit
+            flush_interval: Maximum seconds a row waits for its batch to fill
+            durability: DURABILITY_SHUTDOWN_FLUSH or DURABILITY_SPILL
+            spill_path: Base name of the per-worker JSON-lines files used in DURABILITY_SPILL mode
+        """
+        if durability == DURABILITY_SPILL and not spill_path:
+            raise ValueError("spill_path is required for the spill durability mode")
+
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.spill_path = spill_path
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    # =====================================================
+    # PRODUCER SIDE (request path)
+    # =====================================================
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """Queue an audit row; returns False if it could not be queued"""
+        row.setdefault("id", uuid.uuid4())
+        if self._closing:
+            return self._overflow([row], "writer closed")
+
+        self._ensure_consumer()
+        if self._queue is None:
+            return self._overflow([row], "no running event loop")
+
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            return self._overflow([row], "queue full")
+
+        self.submitted += 1
+        return True
+
+    def _overflow(self, rows: List[Dict[str, Any]], reason: str) -> bool:
+        if self.durability == DURABILITY_SPILL and self._spill(rows):
+            return True
+
+        self.dropped += len(rows)
+        logger.error(f"Dropped {len(rows)} audit rows ({reason})")
+        return False
+
+    # =====================================================
+    # CONSUMER SIDE
+    # =====================================================
+
+    async def start(self) -> None:
+        """Start the consumer and replay any rows spilled by a previous run"""
+        self._closing = False
+        self._ensure_consumer()
+        if self.durability == DURABILITY_SPILL:
+            try:
+                await self._replay_spill()
+            except OSError as e:
+                logger.error(f"Failed to replay spilled audit rows: {e}")
+
+    def _ensure_consumer(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = loop.create_task(self._consume())
+
+    async def _consume(self) -> None:
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is _STOP:
+                return
+
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._write(batch)
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        try:
+            async with get_workload_session(BACKGROUND) as session:
+                await session.execute(
+                    pg_insert(AuditLog).values(rows).on_conflict_do_nothing(index_elements=["id"])
+                )
+                await session.commit()
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Failed to write {len(rows)} audit rows: {e}")
+            self._overflow(rows, "write failed")
+            return False
+
+        self.batches += 1
+        self.written += len(rows)
+        return True
+
+    async def close(self) -> None:
+        """Stop accepting rows, then write everything still queued"""
+        self._closing = True
+        if self._task is not None and not self._task.done():
+            # The consumer drains rows queued ahead of the marker, then exits
+            await self._queue.put(_STOP)
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+        if self._queue is None:
+            return
+
+        # Only left over if the consumer died; write them here
+        pending = []
+        while not self._queue.empty():
+            row = self._queue.get_nowait()
+            if row is not _STOP:
+                pending.append(row)
+
+        for i in range(0, len(pending), self.batch_size):
+            await self._write(pending[i:i + self.batch_size])
+
+    # =====================================================
+    # SPILL FILE
+    # =====================================================
+
+    @property
+    def worker_spill_path(self) -> str:
+        """This process's spill file; resolved per call so forked workers get their own"""
+        return f"{self.spill_path}.{os.getpid()}"
+
+    def _spill(self, rows: List[Dict[str, Any]]) -> bool:
+        spill_path = self.worker_spill_path
+        try:
+            with open(spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(_encode_row(row) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to spill audit rows to {spill_path}: {e}")
+            return False
+
+        self.spilled += len(rows)
+        return True
+
+    def _claim_spill_files(self) -> List[str]:
+        """
+        Rename spill files no running worker owns to replay files of this
+        worker: files of exited workers, replays they left unfinished, and
+        the unsuffixed files of the shared-file layout. A rename that loses
+        the race to another starting worker is skipped.
+        """
+        directory = os.path.dirname(self.spill_path) or "."
+        pattern = re.compile(
+            rf"^{re.escape(os.path.basename(self.spill_path))}(?:\.(\d+))?(?:\.replay(?:\.[0-9a-f]+)?)?$"
+        )
+
+        claimed = []
+        for name in sorted(os.listdir(directory)):
+            match = pattern.match(name)
+            if match is None:
+                continue
+            owner = match.group(1)
+            if owner is not None and int(owner) != os.getpid() and _process_alive(int(owner)):
+                continue
+
+            replay_path = f"{self.worker_spill_path}.replay.{uuid.uuid4().hex}"
+            try:
+                os.replace(os.path.join(directory, name), replay_path)
+            except FileNotFoundError:
+                continue
+            claimed.append(replay_path)
+        return claimed
+
+    async def _replay_spill(self) -> int:
+        """Write rows left in claimed spill files; rows that fail again are re-spilled"""
+        replayed = 0
+        for replay_path in self._claim_spill_files():
+            rows = []
+            with open(replay_path, encoding="utf-8") as f:
+                for line_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        rows.append(_decode_row(line))
+                    except (ValueError, TypeError, AttributeError) as e:
+                        logger.error(f"Skipping corrupt audit spill line {line_number} of {replay_path}: {e}")
+
+            for i in range(0, len(rows), self.batch_size):
+                await self._write(rows[i:i + self.batch_size])
+
+            os.remove(replay_path)
+            replayed += len(rows)
+
+        if replayed:
+            logger.info(f"Replayed {replayed} spilled audit rows")
+        return replayed
+
+    def stats(self) -> Dict[str, Any]:
+        """Get writer counters for monitoring"""
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "durability": self.durability,
+            "submitted": self.submitted,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+        }
+
+
+audit_writer = AuditLogWriter(
+    max_queue=int(os.getenv("AUDIT_QUEUE_MAX_ROWS", "10000")),
+    batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0")),
+    durability=os.getenv("AUDIT_DURABILITY", DURABILITY_SHUTDOWN_FLUSH),
+    spill_path=os.getenv("AUDIT_SPILL_PATH"),
+)
@@ -16,6 +16,7 @@ from sqlalchemy.orm import selectinload, joinedload
 from pydantic import BaseModel, Field, EmailStr, validator
 
 from shared.database import get_async_session
+from shared.cache.principal_cache import invalidate_principal
 from shared.models.platform_user import (
     PlatformUser, SchoolMembership, UserSession, UserInvitation as SchoolInvitation,
     GlobalRole, SchoolRole, MembershipStatus, UserStatus,
@@ -223,6 +224,7 @@ class UnifiedUserService:
             user.updated_at = datetime.now(timezone.utc)
             
             await self.db.commit()
+            await invalidate_principal(user_id)
             
             logger.info(f"Updated user profile: {user.email}")
             
@@ -339,6 +341,7 @@ class UnifiedUserService:
             membership.updated_at = datetime.now(timezone.utc)
             
             await self.db.commit()
+            await invalidate_principal(user_id)
             
             logger.info(f"Updated school membership: User {user_id} in School {school_id}")
             
@@ -369,6 +372,7 @@ class UnifiedUserService:
                 membership.membership_notes = f"Archived: {reason}"
             
             await self.db.commit()
+            await invalidate_principal(user_id)
             
             logger.info(f"Archived school membership: User {user_id} from School {school_id}")
             
@@ -584,6 +588,7 @@ class UnifiedUserService:
             await self._import_student_records(to_school_id, transfer_package)
             
             await self.db.commit()
+            await invalidate_principal(student_user_id)
             
             logger.info(f"Executed student transfer: {student_user_id} to school {to_school_id}")
             
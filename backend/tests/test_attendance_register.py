@@ -0,0 +1,196 @@
+"""Tests for the Attendance Write Engine
+Multi-session registers, changed-rows-only upserts and SQL session counters
+"""
+import pytest
+import uuid
+from datetime import date, time
+from types import SimpleNamespace
+
+from services.academic.attendance import (
+    DAILY_UPSERT_SQL,
+    REGISTER_PRUNE_SQL,
+    REGISTER_UPSERT_SQL,
+    SESSION_COUNTERS_SQL,
+    SESSIONS_SQL,
+    mark_register,
+    upsert_daily_attendance,
+)
+from services.academic.exceptions import AcademicValidationError, AttendanceSessionNotFoundError
+from services.academic.schemas import AttendanceRecordCreate, AttendanceStatus, BulkAttendanceCreate
+from services.academic.term_metrics import REFRESH_SQL
+from services.sis.schemas import AttendanceRecordCreate as DailyAttendanceCreate
+
+SCHOOL_ID = uuid.uuid4()
+USER_ID = uuid.uuid4()
+YEAR_ID = uuid.uuid4()
+
+
+class FakeSession:
+    """Keeps attendance marks per (session, student) and answers the engine's statements"""
+
+    def __init__(self, sessions, marks=None):
+        self.sessions = set(sessions)
+        self.marks = dict(marks or {})  # (session, student) -> (status, arrival, departure, reason, excused, notes)
+        self.statements = []
+        self.refreshed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement, params):
+        self.statements.append(statement)
+        if statement is SESSIONS_SQL:
+            return [SimpleNamespace(id=sid, academic_year_id=YEAR_ID, term_number=1)
+                    for sid in sorted(params["session_ids"], key=str) if sid in self.sessions]
+        if statement is REGISTER_UPSERT_SQL:
+            written = []
+            for row in zip(params["session_ids"], params["student_ids"], params["statuses"],
+                           params["arrival_times"], params["departure_times"],
+                           params["excuse_reasons"], params["is_excused"], params["notes"]):
+                key, values = row[:2], row[2:]
+                if self.marks.get(key) != values:
+                    written.append(SimpleNamespace(attendance_session_id=key[0], student_id=key[1],
+                                                   inserted=key not in self.marks))
+                    self.marks[key] = values
+            return written
+        if statement is REGISTER_PRUNE_SQL:
+            keep = set(zip(params["session_ids"], params["student_ids"]))
+            stale = [key for key in self.marks if key[0] in params["sessions"] and key not in keep]
+            for key in stale:
+                del self.marks[key]
+            return [SimpleNamespace(attendance_session_id=key[0], student_id=key[1]) for key in stale]
+        if statement is SESSION_COUNTERS_SQL:
+            rows = []
+            for sid in params["sessions"]:
+                statuses = [values[0] for key, values in self.marks.items() if key[0] == sid]
+                rows.append(SimpleNamespace(
+                    id=sid, total_students=len(statuses),
+                    present_students=statuses.count("present"),
+                    absent_students=statuses.count("absent") + statuses.count("excused"),
+                    late_students=statuses.count("late"),
+                ))
+            return rows
+        if statement is REFRESH_SQL:
+            self.refreshed.append((params["term_number"], set(params["student_ids"])))
+            return SimpleNamespace(scalar=lambda: len(params["student_ids"]))
+        raise AssertionError(f"Unexpected statement: {statement}")
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def register(session_id, *marks):
+    return BulkAttendanceCreate(
+        attendance_session_id=session_id,
+        attendance_records=[
+            AttendanceRecordCreate(student_id=student_id, attendance_status=status, arrival_time=arrival)
+            for student_id, status, arrival in marks
+        ],
+    )
+
+
+class TestMarkRegister:
+    """Test whole registers are marked with a fixed number of statements"""
+
+    @pytest.mark.asyncio
+    async def test_many_sessions_in_four_statements(self):
+        """Test two sessions are locked, upserted, pruned and recounted together"""
+        form1, form2 = uuid.uuid4(), uuid.uuid4()
+        students = [uuid.uuid4() for _ in range(4)]
+        db = FakeSession([form1, form2])
+
+        result = await mark_register(db, [
+            register(form1, (students[0], AttendanceStatus.PRESENT, time(7, 25)),
+                     (students[1], AttendanceStatus.LATE, time(7, 50))),
+            register(form2, (students[2], AttendanceStatus.ABSENT, None),
+                     (students[3], AttendanceStatus.EXCUSED, None)),
+        ], SCHOOL_ID, USER_ID)
+
+        assert db.statements == [
+            SESSIONS_SQL, REGISTER_UPSERT_SQL, REGISTER_PRUNE_SQL, SESSION_COUNTERS_SQL, REFRESH_SQL,
+        ]
+        assert db.refreshed == [(1, set(students))]
+        assert db.commits == 1
+        assert (result.records_processed, result.inserted, result.updated) == (4, 4, 0)
+        assert result.sessions[str(form1)] == {
+            "total_students": 2, "present_students": 1, "absent_students": 0, "late_students": 1,
+        }
+        assert result.sessions[str(form2)]["absent_students"] == 2
+
+    @pytest.mark.asyncio
+    async def test_resubmission_writes_only_changes(self):
+        """Test unchanged marks are skipped and students left off are removed"""
+        session_id = uuid.uuid4()
+        kept, changed, dropped = (uuid.uuid4() for _ in range(3))
+        db = FakeSession([session_id], marks={
+            (session_id, kept): ("present", time(7, 25), None, None, False, None),
+            (session_id, changed): ("absent", None, None, None, False, None),
+            (session_id, dropped): ("present", None, None, None, False, None),
+        })
+
+        result = await mark_register(db, [register(
+            session_id,
+            (kept, AttendanceStatus.PRESENT, time(7, 25)),
+            (changed, AttendanceStatus.LATE, time(7, 55)),
+        )], SCHOOL_ID, USER_ID)
+
+        assert (result.inserted, result.updated, result.unchanged, result.removed) == (0, 1, 1, 1)
+        assert db.refreshed == [(1, {changed, dropped})]
+        assert result.sessions[str(session_id)]["total_students"] == 2
+
+    @pytest.mark.asyncio
+    async def test_unknown_session_rolls_back(self):
+        """Test a session from another school fails the whole register"""
+        db = FakeSession([])
+        missing = uuid.uuid4()
+
+        with pytest.raises(AttendanceSessionNotFoundError):
+            await mark_register(db, [register(missing, (uuid.uuid4(), AttendanceStatus.PRESENT, None))],
+                                SCHOOL_ID, USER_ID)
+
+        assert db.statements == [SESSIONS_SQL]
+        assert (db.commits, db.rollbacks) == (0, 1)
+
+    @pytest.mark.asyncio
+    async def test_student_marked_twice_rejected(self):
+        """Test duplicate marks are rejected before touching the database"""
+        session_id, student_id = uuid.uuid4(), uuid.uuid4()
+        db = FakeSession([session_id])
+
+        with pytest.raises(AcademicValidationError):
+            await mark_register(db, [register(
+                session_id,
+                (student_id, AttendanceStatus.PRESENT, None),
+                (student_id, AttendanceStatus.ABSENT, None),
+            )], SCHOOL_ID, USER_ID)
+
+        assert db.statements == []
+
+
+class TestDailyAttendance:
+    """Test SIS daily attendance goes through the same single-statement upsert"""
+
+    @pytest.mark.asyncio
+    async def test_one_statement_for_all_records(self):
+        """Test daily marks are sent as arrays in one statement"""
+        records = [
+            DailyAttendanceCreate(student_id=uuid.uuid4(), attendance_date=date(2026, 3, 2),
+                                  period="morning", status="present"),
+            DailyAttendanceCreate(student_id=uuid.uuid4(), attendance_date=date(2026, 3, 2),
+                                  period="morning", status="sick", absence_reason="Flu"),
+        ]
+        captured = {}
+
+        class Session:
+            async def execute(self, statement, params):
+                captured.update(params, statement=statement)
+                return [SimpleNamespace(_mapping={"student_id": sid}) for sid in params["student_ids"]]
+
+        rows = await upsert_daily_attendance(Session(), records, USER_ID)
+
+        assert captured["statement"] is DAILY_UPSERT_SQL
+        assert captured["statuses"] == ["present", "sick"]
+        assert captured["absence_reasons"] == [None, "Flu"]
+        assert [row["student_id"] for row in rows] == [r.student_id for r in records]
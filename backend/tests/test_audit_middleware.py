@@ -0,0 +1,154 @@
+"""Tests for Audit Middleware
+Precompiled route classification and capped, opt-in response body capture
+"""
+import pytest
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from shared.middleware import audit_middleware
+from shared.middleware.audit_middleware import AuditConfig, AuditMiddleware, AuditRouteTable
+from shared.models.audit_log import ActionCategory, ActionType, ComplianceCategory, RiskLevel
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.post("/api/v1/students")
+    async def create_student():
+        return {"id": "s1", "full_name": "Tatenda Moyo"}
+
+    @app.put("/api/v1/students/{student_id}")
+    async def update_student(student_id: str):
+        return {"id": student_id, "full_name": "Tatenda Moyo"}
+
+    @app.post("/api/v1/reports/export")
+    async def export_report():
+        async def rows():
+            for _ in range(100):
+                yield b"x" * 1024
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    @app.get("/api/v1/students")
+    async def list_students():
+        return []
+
+    return app
+
+
+@pytest.fixture
+def submitted():
+    rows = []
+    with patch.object(audit_middleware.audit_writer, "submit", side_effect=rows.append):
+        yield rows
+
+
+@pytest.fixture
+def client():
+    app = make_app()
+
+    # Auth state is normally set by inner middleware; inject it the same way
+    class UserState:
+        def __init__(self, app):
+            self.inner = app
+
+        async def __call__(self, scope, receive, send):
+            state = scope.setdefault("state", {})
+            state["user"] = SimpleNamespace(id=uuid.uuid4(), email="a@demo.school", full_name="Rudo C")
+            state["current_school"] = SimpleNamespace(id=uuid.uuid4(), name="Demo High")
+            state["user_role"] = "school_admin"
+            await self.inner(scope, receive, send)
+
+    app.add_middleware(UserState)
+    app.add_middleware(AuditMiddleware)
+    return TestClient(app)
+
+
+class TestRouteTable:
+    """Test classification is computed once per route template"""
+
+    def test_build_from_routes(self):
+        """Test every method of every route gets an entry"""
+        table = AuditRouteTable(AuditConfig())
+        table.build(make_app().routes)
+
+        entry = table.lookup("PUT", "/api/v1/students/{student_id}", "/api/v1/students/abc")
+
+        assert entry.action_category == ActionCategory.STUDENT_MANAGEMENT
+        assert entry.action_type == ActionType.UPDATE
+        assert entry.base_risk_level == RiskLevel.MEDIUM
+        assert entry.resource_type == "students"
+        assert entry.id_param == "student_id"
+        assert ComplianceCategory.DATA_PROTECTION in entry.compliance_categories
+        assert entry.capture_body is True
+
+    def test_reads_not_logged_or_captured(self):
+        """Test read routes are marked as not logged"""
+        table = AuditRouteTable(AuditConfig())
+        table.build(make_app().routes)
+
+        entry = table.lookup("GET", "/api/v1/students", "/api/v1/students")
+
+        assert entry.should_log is False
+        assert entry.capture_body is False
+
+    def test_unmatched_paths_not_cached(self):
+        """Test unknown paths are classified without growing the table"""
+        table = AuditRouteTable(AuditConfig())
+        table.build(make_app().routes)
+        size = len(table)
+
+        entry = table.lookup("DELETE", None, "/api/v1/unknown/thing")
+
+        assert entry.action_type == ActionType.DELETE
+        assert len(table) == size
+
+
+class TestAuditMiddleware:
+    """Test the middleware end to end"""
+
+    def test_update_logged_with_route_context(self, client, submitted):
+        """Test the row uses the template resource and path parameter ID"""
+        response = client.put("/api/v1/students/abc-123")
+
+        assert response.status_code == 200
+        assert len(submitted) == 1
+        row = submitted[0]
+        assert row["resource_type"] == "students"
+        assert row["resource_id"] == "abc-123"
+        assert row["resource_name"] == "Tatenda Moyo"
+        assert row["action_type"] == "update"
+        assert row["action_context"]["request_id"] == row["correlation_id"]
+
+    def test_streamed_export_not_buffered(self, client, submitted):
+        """Test non-JSON responses are never captured"""
+        bodies = []
+        original = AuditMiddleware._extract_resource_info
+
+        def spy(self, audit_route, scope, response_body):
+            bodies.append(response_body)
+            return original(self, audit_route, scope, response_body)
+
+        with patch.object(AuditMiddleware, "_extract_resource_info", spy):
+            response = client.post("/api/v1/reports/export")
+
+        assert len(response.content) == 100 * 1024
+        assert bodies == [None]
+        assert submitted[0]["action_type"] == "export"
+
+    def test_body_capture_is_capped(self, client, submitted):
+        """Test bodies over the cap are dropped rather than held"""
+        with patch.object(AuditConfig, "MAX_CAPTURED_BODY_BYTES", 8):
+            client.post("/api/v1/students")
+
+        assert submitted[0]["resource_name"] is None
+
+    def test_reads_skip_logging(self, client, submitted):
+        """Test read requests produce no audit row"""
+        client.get("/api/v1/students")
+
+        assert submitted == []
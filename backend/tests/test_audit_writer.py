@@ -0,0 +1,211 @@
+"""Tests for the Batched Audit Log Writer
+Group commit, bounded queue, shutdown flush and spill-file durability
+"""
+import asyncio
+import os
+import pytest
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from shared.services.audit_writer import (
+    AuditLogWriter,
+    DURABILITY_SPILL,
+    _decode_row,
+    _encode_row,
+)
+
+# Above the kernel's pid_max, so never a running process
+DEAD_PID = 4194305
+
+
+def make_row(**overrides):
+    row = {
+        "timestamp": datetime(2025, 3, 1, 9, 0, tzinfo=timezone.utc),
+        "school_id": uuid.uuid4(),
+        "school_name": "Demo High",
+        "user_id": uuid.uuid4(),
+        "user_email": "admin@demo.school",
+        "user_full_name": "Rudo Chikwanha",
+        "user_role": "school_admin",
+        "action_category": "student_management",
+        "action_type": "update",
+        "action_description": "Student updated",
+        "risk_level": "medium",
+        "compliance_categories": ["data_protection"],
+        "action_context": {"http_method": "PUT"},
+        "success": "success",
+        "duration_ms": 12,
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def session():
+    session = MagicMock()
+    session.execute = AsyncMock()
+    session.commit = AsyncMock()
+
+    @asynccontextmanager
+    async def get_workload_session(workload):
+        yield session
+
+    with patch("shared.services.audit_writer.get_workload_session", get_workload_session):
+        yield session
+
+
+def inserted_counts(session):
+    return [len(call.args[0]._multi_values[0]) for call in session.execute.await_args_list]
+
+
+class TestGroupCommit:
+    """Test rows are written in batches off the request path"""
+
+    @pytest.mark.asyncio
+    async def test_rows_batched_into_one_insert(self, session):
+        """Test rows submitted together share one INSERT and commit"""
+        writer = AuditLogWriter(flush_interval=0.05)
+
+        for _ in range(5):
+            assert writer.submit(make_row()) is True
+        session.execute.assert_not_awaited()
+
+        await asyncio.sleep(0.1)
+
+        assert inserted_counts(session) == [5]
+        assert session.commit.await_count == 1
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_size_caps_statement(self, session):
+        """Test a full batch is written without waiting for the interval"""
+        writer = AuditLogWriter(batch_size=2, flush_interval=60)
+
+        for _ in range(5):
+            writer.submit(make_row())
+        await writer.close()
+
+        assert inserted_counts(session) == [2, 2, 1]
+        assert writer.stats()["written"] == 5
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending_rows(self, session):
+        """Test shutdown writes rows still waiting for their batch"""
+        writer = AuditLogWriter(flush_interval=60)
+        writer.submit(make_row())
+
+        await writer.close()
+
+        assert inserted_counts(session) == [1]
+        assert writer.submit(make_row()) is False
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_rows(self, session):
+        """Test the queue bound applies backpressure by dropping"""
+        writer = AuditLogWriter(max_queue=1, flush_interval=60)
+
+        assert writer.submit(make_row()) is True
+        assert writer.submit(make_row()) is False
+        assert writer.stats()["dropped"] == 1
+        await writer.close()
+
+
+class TestSpillDurability:
+    """Test the spill-file durability mode"""
+
+    def test_spill_mode_requires_path(self):
+        """Test spill mode cannot be configured without a file"""
+        with pytest.raises(ValueError):
+            AuditLogWriter(durability=DURABILITY_SPILL)
+
+    def test_row_round_trip(self):
+        """Test UUID and datetime columns survive the spill encoding"""
+        row = make_row(id=uuid.uuid4())
+
+        assert _decode_row(_encode_row(row)) == row
+
+    @pytest.mark.asyncio
+    async def test_failed_write_spills_and_replays(self, session, tmp_path):
+        """Test rows from a failed batch are written on the next start"""
+        spill_path = str(tmp_path / "audit-spill.jsonl")
+        session.execute.side_effect = Exception("database unavailable")
+
+        writer = AuditLogWriter(durability=DURABILITY_SPILL, spill_path=spill_path)
+        writer.submit(make_row())
+        writer.submit(make_row())
+        await writer.close()
+
+        assert writer.stats()["spilled"] == 2
+        assert writer.stats()["dropped"] == 0
+
+        session.execute.side_effect = None
+        session.execute.reset_mock()
+
+        restarted = AuditLogWriter(durability=DURABILITY_SPILL, spill_path=spill_path)
+        await restarted.start()
+        await restarted.close()
+
+        assert inserted_counts(session) == [2]
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_full_queue_spills(self, session, tmp_path):
+        """Test overflow rows go to the spill file instead of being dropped"""
+        spill_path = tmp_path / "audit-spill.jsonl"
+        writer = AuditLogWriter(
+            max_queue=1, flush_interval=60,
+            durability=DURABILITY_SPILL, spill_path=str(spill_path)
+        )
+
+        writer.submit(make_row())
+        assert writer.submit(make_row()) is True
+
+        worker_file = tmp_path / f"audit-spill.jsonl.{os.getpid()}"
+        assert writer.worker_spill_path == str(worker_file)
+        assert len(worker_file.read_text().splitlines()) == 1
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_corrupt_line_skipped(self, session, tmp_path):
+        """Test a truncated line is logged and skipped without failing startup"""
+        spill_file = tmp_path / f"audit-spill.jsonl.{DEAD_PID}"
+        spill_file.write_text(
+            _encode_row(make_row(id=uuid.uuid4())) + "\n"
+            + _encode_row(make_row(id=uuid.uuid4()))[:40] + "\n"
+            + _encode_row(make_row(id=uuid.uuid4())) + "\n"
+        )
+
+        writer = AuditLogWriter(durability=DURABILITY_SPILL, spill_path=str(tmp_path / "audit-spill.jsonl"))
+        await writer.start()
+        await writer.close()
+
+        assert inserted_counts(session) == [2]
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_leftover_replay_files_replayed(self, session, tmp_path):
+        """Test replays interrupted by a crash, and the old shared file, are picked up on start"""
+        (tmp_path / f"audit-spill.jsonl.{DEAD_PID}.replay.0a1b").write_text(_encode_row(make_row()) + "\n")
+        (tmp_path / "audit-spill.jsonl.replay").write_text(_encode_row(make_row()) + "\n")
+
+        writer = AuditLogWriter(durability=DURABILITY_SPILL, spill_path=str(tmp_path / "audit-spill.jsonl"))
+        await writer.start()
+        await writer.close()
+
+        assert inserted_counts(session) == [1, 1]
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_running_workers_files_left_alone(self, session, tmp_path):
+        """Test a starting worker does not take the spill file of a worker still running"""
+        live_file = tmp_path / f"audit-spill.jsonl.{os.getppid()}"
+        live_file.write_text(_encode_row(make_row()) + "\n")
+
+        writer = AuditLogWriter(durability=DURABILITY_SPILL, spill_path=str(tmp_path / "audit-spill.jsonl"))
+        await writer.start()
+        await writer.close()
+
+        assert inserted_counts(session) == []
+        assert list(tmp_path.iterdir()) == [live_file]
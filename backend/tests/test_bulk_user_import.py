@@ -0,0 +1,172 @@
+"""Tests for the Bulk User Import
+Sniffed, chunked reads, column-wise validation and set-based inserts
+"""
+import pytest
+import uuid
+from types import SimpleNamespace
+
+pd = pytest.importorskip("pandas")
+
+from services.files.bulk_processor import EXISTING_USERS_SQL, BulkImportProcessor
+
+SCHOOL = SimpleNamespace(id=uuid.uuid4(), name="Harare High", subdomain="harare-high")
+MAPPING = {
+    "Email": "email",
+    "First Name": "first_name",
+    "Surname": "last_name",
+    "Role": "role",
+    "Mobile": "phone",
+}
+HEADER = "Email;First Name;Surname;Role;Mobile\n"
+
+
+class FakeResult(list):
+    def one_or_none(self):
+        return self[0] if self else None
+
+
+class FakeSession:
+    """Answers the school, existing-user and insert statements of an import"""
+
+    def __init__(self, existing=None):
+        # email -> is_member
+        self.existing = existing or {}
+        self.users = {}
+        self.inserts = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        if statement is EXISTING_USERS_SQL:
+            return FakeResult(
+                SimpleNamespace(id=self.users.get(email, uuid.uuid4()), email=email, is_member=member)
+                for email, member in self.existing.items() if email in params["emails"]
+            )
+
+        table = getattr(statement, "table", None)
+        if table is None:
+            return FakeResult([SCHOOL])
+
+        self.inserts.append((table.name, params))
+        if table.name == "users":
+            self.users.update({row["email"]: row["id"] for row in params})
+            return FakeResult(SimpleNamespace(id=row["id"], email=row["email"]) for row in params)
+        return FakeResult()
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+@pytest.fixture
+def processor():
+    processor = BulkImportProcessor()
+    processor.chunk_size = 2
+    return processor
+
+
+def write_csv(tmp_path, body, encoding="utf-8"):
+    path = tmp_path / "roster.csv"
+    path.write_bytes((HEADER + body).encode(encoding))
+    return str(path)
+
+
+class TestReading:
+    """Test the file is sniffed once and read in chunks"""
+
+    def test_sniffs_encoding_and_delimiter(self, processor, tmp_path):
+        """Test cp1252 files with semicolons are detected from the sample"""
+        path = write_csv(tmp_path, "zoë@example.com;Zoë;Moyo;teacher;0771234567\n", "cp1252")
+
+        assert processor._sniff_csv(path) == ("cp1252", ";")
+
+    def test_chunks_keep_row_numbers(self, processor, tmp_path):
+        """Test chunks are bounded and rows keep their file position"""
+        body = "".join(f"user{i}@example.com;U;{i};teacher;\n" for i in range(5))
+        chunks, fractions = zip(*processor._open_chunks(write_csv(tmp_path, body), 2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert list(chunks[2].index) == [4]
+        assert list(fractions) == sorted(fractions) and fractions[-1] == 1.0
+
+
+class TestNormalize:
+    """Test column-wise validation and normalization"""
+
+    def test_errors_and_normalization(self, processor):
+        """Test emails, required fields, duplicates and phones in one pass"""
+        chunk = pd.DataFrame({
+            "Email": [" Tendai@Example.com ", "bad-email", "tendai@example.com", "rudo@example.com"],
+            "First Name": ["Tendai", "X", "Tendai", None],
+            "Surname": ["Moyo", "Y", "Moyo", "Dube"],
+            "Role": ["teacher", None, "teacher", "student"],
+            "Mobile": ["077 123 4567", "", "", "12"],
+        })
+        field_to_col = {v: k for k, v in MAPPING.items()}
+
+        frame, errors, warnings = processor._normalize_chunk(chunk, field_to_col, "users", set())
+
+        assert list(errors) == [pd.NA, "Invalid email format", "Duplicate email in file",
+                                "Missing required field: first_name"]
+        assert frame.loc[0, "email"] == "tendai@example.com"
+        assert frame.loc[0, "phone"] == "+263771234567"
+        assert frame.loc[0, "school_role"] == "teacher"
+        assert frame.loc[1, "platform_role"] == "student"
+        assert warnings[3] == "Unrecognized phone format"
+
+    def test_duplicates_across_chunks(self, processor):
+        """Test an email accepted in an earlier chunk is rejected later"""
+        chunk = pd.DataFrame({"Email": ["a@example.com"], "First Name": ["A"], "Surname": ["B"]})
+        field_to_col = {"email": "Email", "first_name": "First Name", "last_name": "Surname"}
+
+        _, errors, _ = processor._normalize_chunk(chunk, field_to_col, "users", {"a@example.com"})
+
+        assert errors[0] == "Duplicate email in file"
+
+
+class TestProcessImport:
+    """Test each chunk is looked up once and written with multi-row inserts"""
+
+    @pytest.mark.asyncio
+    async def test_chunked_set_based_import(self, processor, tmp_path):
+        """Test new users, existing users and existing members are handled per chunk"""
+        body = (
+            "new1@example.com;New;One;teacher;0771234567\n"
+            "known@example.com;Known;User;teacher;\n"
+            "member@example.com;Already;Member;student;\n"
+            "not-an-email;Bad;Row;student;\n"
+            "new2@example.com;New;Two;student;\n"
+        )
+        db = FakeSession(existing={"known@example.com": False, "member@example.com": True})
+
+        import_id = await processor.process_import(
+            db, write_csv(tmp_path, body), SCHOOL.id, "users", MAPPING, uuid.uuid4()
+        )
+
+        progress = processor.get_import_progress(import_id)
+        assert progress.status == "completed"
+        assert (progress.total_records, progress.progress_percentage) == (5, 100.0)
+        assert (progress.successful_records, progress.failed_records) == (3, 2)
+        assert db.commits == 3
+
+        users = [row["email"] for name, rows in db.inserts if name == "users" for row in rows]
+        assert users == ["new1@example.com", "new2@example.com"]
+
+        memberships = [row for name, rows in db.inserts if name == "school_memberships" for row in rows]
+        assert len(memberships) == 3
+        assert {m["school_subdomain"] for m in memberships} == {"harare-high"}
+
+    @pytest.mark.asyncio
+    async def test_dry_run_writes_nothing(self, processor, tmp_path):
+        """Test dry runs validate and look up users without inserting"""
+        db = FakeSession()
+
+        import_id = await processor.process_import(
+            db, write_csv(tmp_path, "a@example.com;A;B;teacher;\n"), SCHOOL.id,
+            "users", MAPPING, uuid.uuid4(), dry_run=True
+        )
+
+        assert processor.get_import_progress(import_id).successful_records == 1
+        assert db.inserts == []
+        assert db.commits == 0
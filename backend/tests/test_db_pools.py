@@ -0,0 +1,234 @@
+"""Tests for Database Pool Registry
+Per-workload budgets, replica routing and pool metrics
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.pool import QueuePool
+
+from shared import auth
+from shared import db_pools
+from shared.db_pools import (
+    PoolMetrics,
+    PoolRegistry,
+    load_pool_budgets,
+    _instrumented_pool_class,
+    ASYNCPG,
+    DRIVER_SHARES,
+    REQUEST,
+    BACKGROUND,
+    REPORTING,
+)
+
+
+class TestPoolBudgets:
+    """Test budget configuration from the environment"""
+
+    def test_defaults(self, monkeypatch):
+        """Test every workload gets a bounded default budget"""
+        monkeypatch.delenv("READ_REPLICA_URL", raising=False)
+        budgets = load_pool_budgets()
+
+        assert set(budgets) == {REQUEST, BACKGROUND, REPORTING}
+        assert budgets[REQUEST].max_connections == 15
+        assert budgets[REPORTING].read_only is False
+
+    def test_env_overrides(self, monkeypatch):
+        """Test DB_POOL_<WORKLOAD>_* overrides the defaults"""
+        monkeypatch.setenv("DB_POOL_BACKGROUND_SIZE", "3")
+        monkeypatch.setenv("DB_POOL_BACKGROUND_OVERFLOW", "0")
+        monkeypatch.setenv("DB_POOL_TIMEOUT", "2.5")
+
+        budget = load_pool_budgets()[BACKGROUND]
+
+        assert budget.max_connections == 3
+        assert budget.timeout == 2.5
+
+    def test_budget_shared_by_drivers(self):
+        """Test the driver pools of a workload together stay within its budget"""
+        for budget in load_pool_budgets().values():
+            parts = [budget.for_driver(driver) for driver in DRIVER_SHARES]
+
+            assert sum(part.pool_size for part in parts) == budget.pool_size
+            assert sum(part.max_overflow for part in parts) == budget.max_overflow
+            assert all(part.pool_size >= 1 for part in parts)
+
+    def test_budget_too_small_for_drivers(self, monkeypatch):
+        """Test a pool size that cannot give every driver a connection is rejected"""
+        monkeypatch.setenv("DB_POOL_REPORTING_SIZE", "2")
+
+        with pytest.raises(ValueError):
+            load_pool_budgets()
+
+    def test_reporting_routes_to_replica(self, monkeypatch):
+        """Test READ_REPLICA_URL moves only the reporting workload"""
+        monkeypatch.setenv("READ_REPLICA_URL", "postgresql://ro@replica:5432/oneclass")
+        budgets = load_pool_budgets()
+
+        assert budgets[REPORTING].dsn == "postgresql://ro@replica:5432/oneclass"
+        assert budgets[REPORTING].async_dsn == "postgresql+asyncpg://ro@replica:5432/oneclass"
+        assert budgets[REPORTING].read_only is True
+        assert "replica" not in budgets[REQUEST].dsn
+
+    def test_unknown_workload(self):
+        """Test unknown workloads are rejected"""
+        with pytest.raises(ValueError):
+            PoolRegistry().budget("adhoc")
+
+
+class TestPoolMetrics:
+    """Test histogram and saturation bookkeeping"""
+
+    def test_wait_histogram_is_cumulative(self):
+        """Test waits land in cumulative le buckets"""
+        metrics = PoolMetrics("asyncpg:request", capacity=4)
+        metrics.observe_wait(0.5)
+        metrics.observe_wait(30)
+        metrics.observe_wait(10000)
+
+        buckets = {b["le_ms"]: b["count"] for b in metrics.snapshot()["acquire_wait"]["buckets"]}
+
+        assert buckets[1] == 1
+        assert buckets[50] == 2
+        assert buckets["+Inf"] == 3
+
+    def test_pool_endpoint_serializes(self):
+        """Test the monitoring endpoint returns the overflow bucket as JSON"""
+        pytest.importorskip("psutil")
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from services.monitoring import routes
+
+        registry = PoolRegistry()
+        registry.asyncpg_metrics(REQUEST).observe_wait(10000)
+        app = FastAPI()
+        app.include_router(routes.router)
+        app.dependency_overrides[routes.require_admin] = lambda: {"global_role": "super_admin"}
+
+        with patch("services.monitoring.service.pool_registry", registry):
+            response = TestClient(app).get("/api/v1/monitoring/pools")
+
+        assert response.status_code == 200
+        pool, = response.json()["pools"]
+        assert pool["acquire_wait"]["buckets"][-1] == {"le_ms": "+Inf", "count": 1}
+
+    def test_saturation(self):
+        """Test saturation tracks checked-out connections"""
+        metrics = PoolMetrics("asyncpg:request", capacity=4)
+        metrics.acquired()
+        metrics.acquired()
+        metrics.released()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["saturation"] == 0.25
+        assert snapshot["peak_in_use"] == 2
+
+    def test_instrumented_queue_pool(self):
+        """Test the SQLAlchemy pool subclass records checkouts and checkins"""
+        import sqlite3
+
+        metrics = PoolMetrics("sqlalchemy_sync:request", capacity=2)
+        pool_class = _instrumented_pool_class(QueuePool, metrics)
+        pool = pool_class(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=1)
+
+        first = pool.connect()
+        second = pool.connect()
+        assert metrics.snapshot()["saturation"] == 1.0
+
+        first.close()
+        second.close()
+        snapshot = metrics.snapshot()
+        assert snapshot["in_use"] == 0
+        assert snapshot["acquire_wait"]["count"] == 2
+        assert pool.recreate().metrics is metrics
+
+    def test_only_checkout_timeouts_counted(self):
+        """Test connect errors are not counted as checkout timeouts"""
+        import sqlite3
+        from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+        def refuse():
+            raise sqlite3.OperationalError("connection refused")
+
+        metrics = PoolMetrics("sqlalchemy_sync:request", capacity=1)
+        pool = _instrumented_pool_class(QueuePool, metrics)(refuse, pool_size=1, max_overflow=0)
+        with pytest.raises(sqlite3.OperationalError):
+            pool.connect()
+        assert metrics.timeouts == 0
+
+        pool = _instrumented_pool_class(QueuePool, metrics)(
+            lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.01
+        )
+        held = pool.connect()
+        with pytest.raises(PoolTimeoutError):
+            pool.connect()
+        held.close()
+        assert metrics.timeouts == 1
+
+
+class TestDatabaseManagerWorkloads:
+    """Test asyncpg access through the registry"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_calls_share_one_pool(self):
+        """Test simultaneous first requests for a workload create a single pool"""
+        created = []
+
+        async def create_pool(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            created.append(MagicMock())
+            return created[-1]
+
+        registry = PoolRegistry()
+        with patch.object(db_pools, "asyncpg", MagicMock(create_pool=create_pool)):
+            pools = await asyncio.gather(*(registry.asyncpg_pool(REPORTING) for _ in range(5)))
+
+        assert len(created) == 1
+        assert all(pool is created[0] for pool in pools)
+
+    @pytest.mark.asyncio
+    async def test_asyncpg_pool_sized_by_driver_share(self):
+        """Test the asyncpg pool only gets its share of the workload budget"""
+        create_pool = AsyncMock()
+        registry = PoolRegistry()
+        with patch.object(db_pools, "asyncpg", MagicMock(create_pool=create_pool)):
+            await registry.asyncpg_pool(REQUEST)
+
+        share = registry.budget(REQUEST, ASYNCPG).max_connections
+        assert create_pool.await_args.kwargs["max_size"] == share
+        assert share < registry.budget(REQUEST).max_connections
+        assert registry.max_connections() == share
+        assert registry.asyncpg_metrics(REQUEST).capacity == share
+
+    @pytest.mark.asyncio
+    async def test_workload_pool_and_metrics(self):
+        """Test get_connection uses the workload's pool and records the wait"""
+        pool = MagicMock()
+        pool.acquire = AsyncMock(return_value=MagicMock())
+        pool.release = AsyncMock()
+        registry = PoolRegistry()
+
+        with patch.object(auth, "pool_registry", registry), \
+             patch.object(registry, "asyncpg_pool", AsyncMock(return_value=pool)) as get_pool:
+            async with auth.DatabaseManager().get_connection(REPORTING):
+                assert registry.asyncpg_metrics(REPORTING).in_use == 1
+
+        assert get_pool.await_args.args[0] == REPORTING
+        assert registry.asyncpg_metrics(REPORTING).in_use == 0
+        assert registry.asyncpg_metrics(REPORTING).wait_count == 1
+
+    @pytest.mark.asyncio
+    async def test_acquire_timeout_counted(self):
+        """Test acquire timeouts are counted and re-raised"""
+        pool = MagicMock()
+        pool.acquire = AsyncMock(side_effect=asyncio.TimeoutError)
+        registry = PoolRegistry()
+
+        with patch.object(auth, "pool_registry", registry), \
+             patch.object(registry, "asyncpg_pool", AsyncMock(return_value=pool)):
+            with pytest.raises(asyncio.TimeoutError):
+                async with auth.DatabaseManager().get_connection():
+                    pass
+
+        assert registry.asyncpg_metrics(REQUEST).timeouts == 1
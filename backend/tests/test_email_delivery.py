@@ -0,0 +1,284 @@
+"""Tests for the SMTP delivery engine
+Pooled sessions against a local SMTP stand-in, retries on the retry_delays
+schedule and per-provider rate limiting
+"""
+import asyncio
+import time
+
+import pytest
+
+from services.notifications.delivery import (
+    DELIVERY_FAILED,
+    DELIVERY_QUEUED,
+    DELIVERY_SENT,
+    ProviderRateLimiter,
+    RetryQueue,
+    SMTPConfig,
+    SMTPDeliveryEngine,
+)
+from services.notifications.email_service import EmailService
+from services.notifications.schemas import EmailRequest, NotificationStatus
+
+
+class LocalSMTPServer:
+    """
+    Minimal SMTP server on localhost
+
+    Accepts AUTH PLAIN and records every message; `data_replies` and
+    `rcpt_replies` queue replies (e.g. "451 try later") for the next DATA /
+    RCPT commands instead of accepting them.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.data_replies = []
+        self.rcpt_replies = []
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+
+        async def reply(line):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 localhost ESMTP stand-in")
+        envelope = {"from": None, "to": []}
+        try:
+            while True:
+                line = (await reader.readline()).decode().rstrip("\r\n")
+                if not line:
+                    break
+                command = line.split(" ", 1)[0].upper()
+                if command == "EHLO":
+                    await reply("250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME")
+                elif command == "HELO":
+                    await reply("250 localhost")
+                elif command == "AUTH":
+                    self.logins += 1
+                    await reply("235 Authentication successful")
+                elif command == "MAIL":
+                    envelope = {"from": line[10:].strip("<>"), "to": []}
+                    await reply("250 OK")
+                elif command == "RCPT":
+                    if self.rcpt_replies:
+                        await reply(self.rcpt_replies.pop(0))
+                        continue
+                    envelope["to"].append(line[8:].strip("<>"))
+                    await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    body = []
+                    while (data_line := await reader.readline()) not in (b".\r\n", b""):
+                        body.append(data_line)
+                    if self.data_replies:
+                        await reply(self.data_replies.pop(0))
+                        continue
+                    self.messages.append({**envelope, "data": b"".join(body)})
+                    await reply("250 Queued")
+                elif command in ("RSET", "NOOP"):
+                    await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
+
+@pytest.fixture
+async def smtp_server():
+    server = await LocalSMTPServer().start()
+    yield server
+    await server.stop()
+
+
+def smtp_config(server):
+    return SMTPConfig(host="127.0.0.1", port=server.port, username="mailer", password="secret", use_tls=False)
+
+
+def unlimited():
+    return ProviderRateLimiter(rate_per_second=0, burst=1, daily_limit=100000)
+
+
+def email(to):
+    return EmailRequest(to=[to], subject="Term report", text_content="Your child's term report is attached.")
+
+
+class TestPooledSessions:
+    """Test sessions are opened once and reused"""
+
+    @pytest.mark.asyncio
+    async def test_bulk_send_reuses_sessions(self, smtp_server):
+        """Test 30 emails go out over at most pool_size logged-in connections"""
+        service = EmailService(smtp_config(smtp_server), pool_size=3)
+        service.delivery.limiter = unlimited()
+
+        results = await service.send_bulk_emails([email(f"parent{i}@example.com") for i in range(30)])
+        await service.close()
+
+        assert results["successful"] == 30
+        assert len(smtp_server.messages) == 30
+        assert smtp_server.connections <= 3
+        assert smtp_server.logins == smtp_server.connections
+        assert service.delivery.pool.reused == 30 - service.delivery.pool.opened
+
+    @pytest.mark.asyncio
+    async def test_dropped_session_reopened(self, smtp_server):
+        """Test a session the server closed is replaced transparently"""
+        engine = SMTPDeliveryEngine(smtp_config(smtp_server), pool_size=1, rate_limiter=unlimited())
+        await engine.deliver("noreply@oneclass.ac.zw", ["a@example.com"], b"Subject: one\r\n\r\nHi")
+        session, _ = engine.pool._idle[0]
+        session.sock.close()
+
+        result = await engine.deliver("noreply@oneclass.ac.zw", ["b@example.com"], b"Subject: two\r\n\r\nHi")
+        await engine.close()
+
+        assert result.status == DELIVERY_SENT
+        assert [message["to"] for message in smtp_server.messages] == [["a@example.com"], ["b@example.com"]]
+
+
+class TestRetries:
+    """Test transient failures follow the retry_delays schedule"""
+
+    @pytest.mark.asyncio
+    async def test_transient_failure_retried(self, smtp_server):
+        """Test a 4xx reply queues the message and a due retry delivers it"""
+        engine = SMTPDeliveryEngine(smtp_config(smtp_server), retry_delays=[0, 0],
+                                    retry_queue=RetryQueue(), rate_limiter=unlimited())
+        smtp_server.data_replies.append("451 Try again later")
+
+        first = await engine.deliver("noreply@oneclass.ac.zw", ["a@example.com"], b"Subject: x\r\n\r\nHi")
+        attempted = await engine.process_retries()
+        await engine.close()
+
+        assert first.status == DELIVERY_QUEUED
+        assert attempted == 1
+        assert len(smtp_server.messages) == 1
+        assert engine.sent == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_exhausted(self, smtp_server):
+        """Test a message still failing after the last delay is given up"""
+        engine = SMTPDeliveryEngine(smtp_config(smtp_server), retry_delays=[0],
+                                    retry_queue=RetryQueue(), rate_limiter=unlimited())
+        smtp_server.data_replies.extend(["451 Try again later", "451 Try again later"])
+
+        await engine.deliver("noreply@oneclass.ac.zw", ["a@example.com"], b"Subject: x\r\n\r\nHi")
+        await engine.process_retries()
+        await engine.close()
+
+        assert engine.failed == 1
+        assert await engine.retry_queue.size() == 0
+
+    @pytest.mark.asyncio
+    async def test_retry_result_updates_tracking(self, smtp_server):
+        """Test an email queued for retry is tracked as sent once the retry delivers it"""
+        service = EmailService(smtp_config(smtp_server), retry_delays=[0])
+        service.delivery.limiter = unlimited()
+        service.delivery.retry_queue = RetryQueue()
+        smtp_server.data_replies.append("451 Try again later")
+
+        result = await service.send_email(email("parent@example.com"))
+        tracked, = service.delivery_tracking.values()
+        assert result["queued_for_retry"]
+        assert tracked["status"] == NotificationStatus.QUEUED
+
+        await service.delivery.process_retries()
+        await service.close()
+
+        assert tracked["status"] == NotificationStatus.SENT
+        assert tracked["sent_at"] is not None
+
+    @pytest.mark.asyncio
+    async def test_retry_failure_updates_tracking(self, smtp_server):
+        """Test an email whose last retry fails is tracked as failed"""
+        service = EmailService(smtp_config(smtp_server), retry_delays=[0])
+        service.delivery.limiter = unlimited()
+        service.delivery.retry_queue = RetryQueue()
+        smtp_server.data_replies.extend(["451 Try again later", "451 Try again later"])
+
+        await service.send_email(email("parent@example.com"))
+        await service.delivery.process_retries()
+        await service.close()
+
+        tracked, = service.delivery_tracking.values()
+        assert tracked["status"] == NotificationStatus.FAILED
+        assert tracked["failed_at"] is not None
+
+    @pytest.mark.asyncio
+    async def test_permanent_failure_not_retried(self, smtp_server):
+        """Test a 5xx recipient rejection fails at once"""
+        service = EmailService(smtp_config(smtp_server), retry_delays=[0])
+        service.delivery.limiter = unlimited()
+        smtp_server.rcpt_replies.append("550 No such user")
+
+        result = await service.send_email(email("nobody@example.com"))
+        await service.close()
+
+        assert not result["success"] and not result["queued_for_retry"]
+        assert await service.delivery.retry_queue.size() == 0
+        tracked, = service.delivery_tracking.values()
+        assert tracked["status"] == NotificationStatus.FAILED
+
+
+class TestRateLimiter:
+    """Test the per-provider token bucket and daily cap"""
+
+    @pytest.mark.asyncio
+    async def test_sends_paced_to_rate(self):
+        """Test acquisitions beyond the burst wait for tokens"""
+        limiter = ProviderRateLimiter(rate_per_second=50, burst=1, daily_limit=100)
+
+        started = time.monotonic()
+        for _ in range(3):
+            assert await limiter.acquire()
+
+        assert time.monotonic() - started >= 0.035
+        assert limiter.throttled == 2
+
+    @pytest.mark.asyncio
+    async def test_daily_cap(self, smtp_server):
+        """Test sends beyond the daily cap fail without reaching the server"""
+        engine = SMTPDeliveryEngine(smtp_config(smtp_server), rate_limiter=ProviderRateLimiter(0, 1, daily_limit=1))
+
+        results = [await engine.deliver("noreply@oneclass.ac.zw", [f"{i}@example.com"], b"Hi") for i in range(2)]
+        await engine.close()
+
+        assert [result.status for result in results] == [DELIVERY_SENT, DELIVERY_FAILED]
+        assert results[1].error == "Daily send limit exceeded"
+        assert len(smtp_server.messages) == 1
+
+    @pytest.mark.asyncio
+    async def test_daily_cap_counts_recipients_of_sent_messages(self, smtp_server):
+        """Test the cap is charged per recipient and failed sends are refunded"""
+        limiter = ProviderRateLimiter(0, 1, daily_limit=5)
+        engine = SMTPDeliveryEngine(smtp_config(smtp_server), retry_delays=[], rate_limiter=limiter)
+        smtp_server.data_replies.append("451 Try again later")
+
+        failed = await engine.deliver("noreply@oneclass.ac.zw", ["a@example.com", "b@example.com"], b"Hi")
+        assert failed.status == DELIVERY_FAILED
+        assert limiter.daily_sent == 0
+
+        sent = await engine.deliver("noreply@oneclass.ac.zw", [f"{i}@example.com" for i in range(3)], b"Hi")
+        refused = await engine.deliver("noreply@oneclass.ac.zw", [f"{i}@example.com" for i in range(3)], b"Hi")
+        await engine.close()
+
+        assert sent.status == DELIVERY_SENT
+        assert limiter.daily_sent == 3
+        assert refused.error == "Daily send limit exceeded"
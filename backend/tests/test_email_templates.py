@@ -0,0 +1,119 @@
+"""Tests for compiled email templates
+Templates compiled once per (name, version) and batch rendering from
+shared data plus per-recipient overlays
+"""
+import pytest
+
+from services.notifications.notification_service import NotificationService
+from services.notifications.schemas import BulkEmailRequest
+from services.notifications.templates import EmailTemplateService
+
+GLOBAL_DATA = {'school_name': 'Harare High School', 'login_url': 'https://harare.oneclass.ac.zw/login'}
+
+
+class RecordingEmailService:
+    def __init__(self):
+        self.requests = []
+
+    async def send_email(self, email_request):
+        self.requests.append(email_request)
+        return {'success': True, 'message': 'Email sent successfully'}
+
+
+@pytest.fixture
+def service():
+    return EmailTemplateService()
+
+
+class TestCompiledCache:
+    """Test templates are compiled once per version"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_renders_compile_once(self, service):
+        """Test rendering the same template again reuses its compiled form"""
+        for name in ('Tendai', 'Rudo', 'Farai'):
+            rendered = await service.render_template('welcome', {**GLOBAL_DATA, 'first_name': name})
+
+        assert 'Farai' in rendered['html_content']
+        assert rendered['subject'] == 'Welcome to Harare High School on OneClass! 🎓'
+        assert (service.compile_misses, service.compile_hits) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_new_version_recompiled(self, service):
+        """Test a changed template is picked up once its version is bumped"""
+        await service.render_template('welcome', {**GLOBAL_DATA, 'first_name': 'Tendai'})
+        template = service.builtin_templates['welcome']
+        template['subject_template'] = 'Hello {{first_name}}'
+        template['version'] = 2
+
+        rendered = await service.render_template('welcome', {**GLOBAL_DATA, 'first_name': 'Tendai'})
+
+        assert rendered['subject'] == 'Hello Tendai'
+        assert service.compile_misses == 2
+
+    def test_lru_bound(self):
+        """Test the cache keeps at most max_compiled_templates versions"""
+        service = EmailTemplateService(max_compiled_templates=2)
+        for name in ('welcome', 'invitation', 'password_reset'):
+            service.get_compiled(service.builtin_templates[name])
+
+        assert service.cache_stats()['size'] == 2
+        service.invalidate_template('password_reset')
+        assert service.cache_stats()['size'] == 1
+
+
+class TestRenderBatch:
+    """Test batch rendering with per-recipient overlays"""
+
+    @pytest.mark.asyncio
+    async def test_matches_single_renders(self, service):
+        """Test each result equals rendering that recipient on its own"""
+        recipients = [{'email': f'p{i}@example.com', 'first_name': f'Parent {i}'} for i in range(3)]
+
+        batch = await service.render_batch('welcome', GLOBAL_DATA, recipients)
+
+        for recipient, rendered in zip(recipients, batch):
+            assert rendered == await service.render_template('welcome', {**GLOBAL_DATA, **recipient})
+        assert service.compile_misses == 1
+
+    @pytest.mark.asyncio
+    async def test_overlay_overrides_global_data(self, service):
+        """Test recipient data takes precedence over the shared data"""
+        batch = await service.render_batch('welcome', GLOBAL_DATA, [
+            {'first_name': 'Tendai', 'school_name': 'Bulawayo Academy'},
+        ])
+
+        assert batch[0]['subject'] == 'Welcome to Bulawayo Academy on OneClass! 🎓'
+
+    @pytest.mark.asyncio
+    async def test_bad_recipient_does_not_fail_batch(self, service):
+        """Test a recipient missing a required variable gets an error entry"""
+        batch = await service.render_batch('welcome', GLOBAL_DATA, [{'first_name': 'Tendai'}, {}])
+
+        assert 'error' not in batch[0]
+        assert batch[1] == {'error': "Missing required template variables: ['first_name']"}
+
+    @pytest.mark.asyncio
+    async def test_unknown_template(self, service):
+        with pytest.raises(ValueError):
+            await service.render_batch('missing', {}, [{}])
+
+
+@pytest.mark.asyncio
+async def test_bulk_email_sends_prerendered_content():
+    """Test bulk sends render the batch once and hand over finished content"""
+    email_service = RecordingEmailService()
+    notifications = NotificationService(email_service=email_service)
+    bulk_request = BulkEmailRequest(
+        template_name='welcome',
+        recipients=[{'email': 'tendai@example.com', 'first_name': 'Tendai'},
+                    {'email': 'rudo@example.com'}],
+        global_template_data=GLOBAL_DATA,
+    )
+
+    response = await notifications.send_bulk_email(bulk_request, db=None)
+
+    assert (response.recipients_sent, response.recipients_failed) == (1, 1)
+    sent, = email_service.requests
+    assert sent.html_content and 'Tendai' in sent.html_content
+    assert notifications.template_service.compile_misses == 1
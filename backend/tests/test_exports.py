@@ -0,0 +1,164 @@
+"""Tests for Streaming Exports
+Chunked reads, CSV/XLSX writers and spooled responses
+"""
+import csv
+import io
+import pytest
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from unittest.mock import patch
+
+from shared import exports
+from shared.exports import (
+    ExportFormatError,
+    collect,
+    export_response,
+    iter_csv,
+    iter_export,
+    rows_from,
+    spool,
+    stream_records,
+)
+
+FIELDS = ["student_number", "name", "balance"]
+
+
+def sample_rows(count):
+    return rows_from(
+        {"student_number": f"2026-{i:04d}", "name": f"Student {i}", "balance": Decimal("10.50")}
+        for i in range(count)
+    )
+
+
+class FakeConnection:
+    """Serves records from a cursor and records the transaction options"""
+
+    def __init__(self, records):
+        self.records = records
+        self.transactions = []
+        self.cursors = []
+
+    @asynccontextmanager
+    async def transaction(self, **options):
+        self.transactions.append(options)
+        yield
+
+    async def _iterate(self):
+        for record in self.records:
+            yield record
+
+    def cursor(self, query, *params, prefetch=None):
+        self.cursors.append((params, prefetch))
+        return self._iterate()
+
+
+class TestCsv:
+    """Test the generator CSV writer"""
+
+    @pytest.mark.asyncio
+    async def test_output_is_chunked(self):
+        """Test large exports are yielded in several pieces rather than one"""
+        chunks = [chunk async for chunk in iter_csv(sample_rows(500), FIELDS, write_size=1024)]
+
+        assert len(chunks) > 1
+        assert all(len(chunk) < 2048 for chunk in chunks)
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+        assert len(rows) == 500
+        assert rows[-1] == {"student_number": "2026-0499", "name": "Student 499", "balance": "10.50"}
+
+    @pytest.mark.asyncio
+    async def test_extra_fields_ignored(self):
+        """Test row keys outside the field list are left out"""
+        rows = rows_from([{"student_number": "1", "name": "A", "balance": 1, "internal": "x"}])
+
+        data = await collect(iter_csv(rows, FIELDS))
+
+        assert data.decode("utf-8").splitlines() == ["student_number,name,balance", "1,A,1"]
+
+    def test_unknown_format_rejected(self):
+        """Test formats other than CSV and XLSX raise ExportFormatError"""
+        with pytest.raises(ExportFormatError):
+            iter_export("pdf", sample_rows(1), FIELDS)
+
+
+class TestXlsx:
+    """Test the write-only XLSX writer"""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self):
+        """Test rows written in write-only mode read back in order"""
+        openpyxl = pytest.importorskip("openpyxl")
+
+        data = await collect(iter_export("xlsx", sample_rows(3), FIELDS, sheet_name="Students"))
+
+        sheet = openpyxl.load_workbook(io.BytesIO(data))["Students"]
+        values = list(sheet.values)
+        assert values[0] == tuple(FIELDS)
+        assert values[3][:2] == ("2026-0002", "Student 2")
+
+    @pytest.mark.asyncio
+    async def test_missing_openpyxl_reported(self, monkeypatch):
+        """Test XLSX exports fail clearly when openpyxl is not installed"""
+        monkeypatch.setattr(exports, "Workbook", None)
+
+        with pytest.raises(ExportFormatError):
+            await collect(iter_export("xlsx", sample_rows(1), FIELDS))
+
+
+class TestReads:
+    """Test server-side cursor reads"""
+
+    @pytest.mark.asyncio
+    async def test_records_streamed_in_snapshot(self):
+        """Test rows come from a prefetching cursor inside a read-only snapshot"""
+        conn = FakeConnection([{"id": 1}, {"id": 2}])
+        workloads = []
+
+        @asynccontextmanager
+        async def get_database_connection(workload):
+            workloads.append(workload)
+            yield conn
+
+        with patch("shared.exports.get_database_connection", get_database_connection):
+            rows = [row async for row in stream_records("SELECT id FROM t WHERE a = $1", 7, chunk_size=50)]
+
+        assert rows == [{"id": 1}, {"id": 2}]
+        assert workloads == ["reporting"]
+        assert conn.transactions == [{"isolation": "repeatable_read", "readonly": True}]
+        assert conn.cursors == [((7,), 50)]
+
+
+class TestResponses:
+    """Test streamed and spooled download responses"""
+
+    @pytest.mark.asyncio
+    async def test_spool_moves_to_disk_past_limit(self):
+        """Test spooled exports leave memory once they pass the size limit"""
+        file = await spool(iter_csv(sample_rows(200), FIELDS), max_memory=1024)
+
+        assert file._rolled
+        assert file.read().startswith(b"student_number,name,balance")
+        file.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_spool_raises_before_response(self):
+        """Test a spooled export that fails raises instead of sending a partial file"""
+        async def failing():
+            yield b"student_number\n"
+            raise RuntimeError("cursor lost")
+
+        with pytest.raises(RuntimeError):
+            await export_response(failing(), "students.csv", "text/csv", spool_to_file=True)
+
+    @pytest.mark.asyncio
+    async def test_response_body_and_headers(self):
+        """Test both modes send the full file as an attachment"""
+        for spool_to_file in (False, True):
+            response = await export_response(
+                iter_csv(sample_rows(10), FIELDS), "students.csv", "text/csv", spool_to_file
+            )
+
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            assert response.headers["content-disposition"] == "attachment; filename=students.csv"
+            assert len(body.decode("utf-8").splitlines()) == 11
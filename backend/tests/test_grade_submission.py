@@ -0,0 +1,190 @@
+"""Tests for the Grade Write Engine
+Changed-rows-only grade upserts and incrementally maintained assessment statistics
+"""
+import pytest
+import uuid
+from collections import Counter
+from decimal import Decimal
+from types import SimpleNamespace
+
+from services.academic.exceptions import AcademicValidationError, AssessmentNotFoundError
+from services.academic.grading import (
+    ASSESSMENT_SQL,
+    GRADES_UPSERT_SQL,
+    SCORE_COUNTS_DELTA_SQL,
+    SCORE_COUNTS_SQL,
+    STATISTICS_DELTA_SQL,
+    STATISTICS_SQL,
+    get_assessment_statistics,
+    submit_grades,
+)
+from services.academic.schemas import BulkGradeCreate, GradeCreate
+from services.academic.term_metrics import REFRESH_SQL
+from services.academic.utils import calculate_assessment_statistics, get_zimbabwe_grade
+
+SCHOOL_ID = uuid.uuid4()
+USER_ID = uuid.uuid4()
+YEAR_ID = uuid.uuid4()
+
+
+class FakeResult(list):
+    def one_or_none(self):
+        return self[0] if self else None
+
+
+class FakeSession:
+    """Keeps grades, running totals and the score histogram for one assessment"""
+
+    def __init__(self, assessment_id, total_marks=Decimal("50"), grades=None):
+        self.assessment_id = assessment_id
+        self.total_marks = total_marks
+        self.grades = dict(grades or {})  # student -> (raw_score, is_absent, percentage)
+        self.totals = None
+        self.histogram = Counter()
+        self.refreshed = []
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement, params):
+        self.statements.append(statement)
+        if statement is ASSESSMENT_SQL:
+            if params["assessment_id"] != str(self.assessment_id):
+                return FakeResult()
+            return FakeResult([SimpleNamespace(name="Test 1", total_marks=self.total_marks,
+                                               academic_year_id=YEAR_ID, term_number=1)])
+        if statement is GRADES_UPSERT_SQL:
+            changes = FakeResult()
+            for student_id, raw, absent in zip(params["student_ids"], params["raw_scores"], params["is_absent"]):
+                previous = self.grades.get(student_id)
+                if previous is not None and previous[:2] == (raw, absent):
+                    continue
+                percentage = None if raw is None else round(raw / params["total_marks"] * 100, 2)
+                self.grades[student_id] = (raw, absent, percentage)
+                changes.append(SimpleNamespace(
+                    student_id=student_id, inserted=previous is None, percentage_score=percentage,
+                    previous_score=previous[2] if previous else None,
+                ))
+            return changes
+        if statement is STATISTICS_DELTA_SQL:
+            current = self.totals or {key: 0 for key in ("total_students", "scored_students", "score_sum", "passed_students")}
+            self.totals = {key: current[key] + params[key] for key in current}
+            return FakeResult()
+        if statement is SCORE_COUNTS_DELTA_SQL:
+            for score, delta in zip(params["scores"], params["deltas"]):
+                self.histogram[score] += delta
+            return FakeResult()
+        if statement is REFRESH_SQL:
+            self.refreshed.append((params["term_number"], params["student_ids"]))
+            return SimpleNamespace(scalar=lambda: len(params["student_ids"]))
+        if statement is STATISTICS_SQL:
+            return FakeResult([SimpleNamespace(**self.totals)] if self.totals else [])
+        if statement is SCORE_COUNTS_SQL:
+            return FakeResult(SimpleNamespace(percentage_score=score, students=students)
+                              for score, students in sorted(self.histogram.items()) if students > 0)
+        raise AssertionError(f"Unexpected statement: {statement}")
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def bulk(assessment_id, *marks):
+    return BulkGradeCreate(
+        assessment_id=assessment_id,
+        grades=[
+            GradeCreate(assessment_id=assessment_id, student_id=student_id, raw_score=raw,
+                        is_absent=raw is None)
+            for student_id, raw in marks
+        ],
+    )
+
+
+def recomputed(db):
+    """Statistics the old read path would compute from every grade"""
+    grades = []
+    for _, _, percentage in db.grades.values():
+        letter = get_zimbabwe_grade(float(percentage)).value if percentage is not None else None
+        grades.append({"percentage_score": percentage, "letter_grade": letter})
+    return calculate_assessment_statistics(grades)
+
+
+class TestSubmitGrades:
+    """Test grades are upserted by difference with statistics kept in step"""
+
+    @pytest.mark.asyncio
+    async def test_first_submission_inserts_and_counts(self):
+        """Test a new class is written in one upsert with matching statistics"""
+        assessment_id = uuid.uuid4()
+        students = [uuid.uuid4() for _ in range(4)]
+        db = FakeSession(assessment_id)
+
+        result = await submit_grades(db, bulk(
+            assessment_id, (students[0], Decimal("42")), (students[1], Decimal("36")),
+            (students[2], Decimal("20")), (students[3], None),
+        ), SCHOOL_ID, USER_ID)
+
+        assert db.statements == [
+            ASSESSMENT_SQL, GRADES_UPSERT_SQL, STATISTICS_DELTA_SQL, SCORE_COUNTS_DELTA_SQL, REFRESH_SQL,
+        ]
+        assert db.refreshed == [(1, students)]
+        assert (result.grades_submitted, result.grades_updated, result.grades_unchanged) == (4, 0, 0)
+        assert db.commits == 1
+
+        statistics = await get_assessment_statistics(db, assessment_id, SCHOOL_ID)
+        assert statistics == recomputed(db)
+        assert statistics["pass_rate"] == 50.0
+
+    @pytest.mark.asyncio
+    async def test_corrected_mark_shifts_statistics(self):
+        """Test re-saving a class with one correction writes and adjusts only that row"""
+        assessment_id = uuid.uuid4()
+        students = [uuid.uuid4() for _ in range(3)]
+        db = FakeSession(assessment_id)
+        marks = [(students[0], Decimal("45")), (students[1], Decimal("30")), (students[2], Decimal("24"))]
+        await submit_grades(db, bulk(assessment_id, *marks), SCHOOL_ID, USER_ID)
+
+        marks[2] = (students[2], Decimal("26"))
+        result = await submit_grades(db, bulk(assessment_id, *marks), SCHOOL_ID, USER_ID)
+
+        assert (result.grades_submitted, result.grades_updated, result.grades_unchanged) == (0, 1, 2)
+        assert db.refreshed[-1] == (1, [students[2]])
+        statistics = await get_assessment_statistics(db, assessment_id, SCHOOL_ID)
+        assert statistics == recomputed(db)
+        assert statistics["median_score"] == 60.0
+        assert statistics["pass_rate"] == 100.0
+
+    @pytest.mark.asyncio
+    async def test_unchanged_submission_skips_statistics(self):
+        """Test identical marks leave the statistics untouched"""
+        assessment_id, student_id = uuid.uuid4(), uuid.uuid4()
+        db = FakeSession(assessment_id, grades={student_id: (Decimal("40"), False, Decimal("80.00"))})
+
+        result = await submit_grades(db, bulk(assessment_id, (student_id, Decimal("40"))), SCHOOL_ID, USER_ID)
+
+        assert result.grades_unchanged == 1
+        assert db.statements == [ASSESSMENT_SQL, GRADES_UPSERT_SQL]
+
+    @pytest.mark.asyncio
+    async def test_unknown_assessment_rolls_back(self):
+        """Test an assessment from another school is rejected"""
+        db = FakeSession(uuid.uuid4())
+
+        with pytest.raises(AssessmentNotFoundError):
+            await submit_grades(db, bulk(uuid.uuid4(), (uuid.uuid4(), Decimal("10"))), SCHOOL_ID, USER_ID)
+
+        assert (db.commits, db.rollbacks) == (0, 1)
+
+    @pytest.mark.asyncio
+    async def test_student_graded_twice_rejected(self):
+        """Test duplicate students are rejected before touching the database"""
+        assessment_id, student_id = uuid.uuid4(), uuid.uuid4()
+        db = FakeSession(assessment_id)
+
+        with pytest.raises(AcademicValidationError):
+            await submit_grades(db, bulk(assessment_id, (student_id, Decimal("10")), (student_id, Decimal("12"))),
+                                SCHOOL_ID, USER_ID)
+
+        assert db.statements == []
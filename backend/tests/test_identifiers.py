@@ -0,0 +1,87 @@
+"""Tests for Identifier Allocation
+Block reservation from the platform counters and formatting
+"""
+import pytest
+import uuid
+
+from shared.identifiers import (
+    FAMILY_CODE,
+    ORDER_NUMBER,
+    PLATFORM_SCOPE,
+    RESERVE_SQL,
+    RESERVE_STATEMENT,
+    STUDENT_NUMBER,
+    TERM_INVOICE_NUMBER,
+    next_identifier,
+    reserve_identifiers,
+    reserve_identifiers_raw,
+)
+
+SCHOOL_ID = uuid.uuid4()
+
+
+class FakeCounters:
+    """Per-(scope, kind, period) counters answering both session and asyncpg calls"""
+
+    def __init__(self, seeds=None):
+        self.values = dict(seeds or {})
+        self.calls = 0
+
+    def reserve(self, scope_id, kind, period, count):
+        self.calls += 1
+        key = (scope_id, kind, period)
+        first = self.values.get(key, 0) + 1
+        self.values[key] = first + count - 1
+        return first
+
+    async def execute(self, statement, params):
+        assert statement is RESERVE_STATEMENT
+        first = self.reserve(params["scope_id"], params["kind"], params["period"], params["count"])
+        return type("Result", (), {"scalar": lambda self: first})()
+
+    async def fetchval(self, query, *params):
+        assert query is RESERVE_SQL
+        return self.reserve(*params)
+
+
+class TestReserve:
+    """Test identifiers are reserved in blocks and formatted per kind"""
+
+    @pytest.mark.asyncio
+    async def test_block_is_one_statement(self):
+        """Test a block of numbers takes one call and continues the counter"""
+        db = FakeCounters(seeds={(SCHOOL_ID, "student_number", "2025"): 41})
+
+        numbers = await reserve_identifiers(db, STUDENT_NUMBER, 3, SCHOOL_ID, "2025")
+        following = await next_identifier(db, STUDENT_NUMBER, SCHOOL_ID, "2025")
+
+        assert numbers == ["2025-0042", "2025-0043", "2025-0044"]
+        assert following == "2025-0045"
+        assert db.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_counters_are_independent(self):
+        """Test schools, kinds and periods each have their own counter"""
+        db = FakeCounters()
+
+        assert await next_identifier(db, TERM_INVOICE_NUMBER, SCHOOL_ID, "2025-T1") == "ZW-2025-T1-0001"
+        assert await next_identifier(db, TERM_INVOICE_NUMBER, SCHOOL_ID, "2025-T2") == "ZW-2025-T2-0001"
+        assert await next_identifier(db, TERM_INVOICE_NUMBER, uuid.uuid4(), "2025-T1") == "ZW-2025-T1-0001"
+        assert await next_identifier(db, ORDER_NUMBER, period="2025") == "CP-2025-001"
+        assert await next_identifier(db, FAMILY_CODE) == "FAM0001"
+        assert (PLATFORM_SCOPE, "family_code", "") in db.values
+
+    @pytest.mark.asyncio
+    async def test_raw_connection(self):
+        """Test asyncpg connections reserve through the positional statement"""
+        conn = FakeCounters()
+
+        numbers = await reserve_identifiers_raw(conn, STUDENT_NUMBER, 2, SCHOOL_ID, "2026")
+
+        assert numbers == ["2026-0001", "2026-0002"]
+
+    @pytest.mark.asyncio
+    async def test_empty_block_rejected(self):
+        """Test reserving nothing is an error rather than a wasted statement"""
+        with pytest.raises(ValueError):
+            await reserve_identifiers(FakeCounters(), STUDENT_NUMBER, 0, SCHOOL_ID, "2025")
@@ -0,0 +1,209 @@
+"""Tests for the Bulk Invoice Generation Engine
+Template reuse, per-chunk anti-join, COPY writes, checkpoints and progress
+"""
+import pytest
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services.finance.invoice_generation import (
+    FeeStructureNotFoundError,
+    InvoiceGenerationEngine,
+)
+from shared.identifiers import RESERVE_SQL
+
+SCHOOL_ID = uuid.uuid4()
+STRUCTURE_ID = uuid.uuid4()
+YEAR_ID = uuid.uuid4()
+USER_ID = uuid.uuid4()
+
+FEE_ITEMS = [
+    {"id": uuid.uuid4(), "name": "Tuition", "base_amount": Decimal("350.00")},
+    {"id": uuid.uuid4(), "name": "Levy", "base_amount": Decimal("45.50")},
+]
+
+
+class FakeConnection:
+    """Answers the engine's queries from in-memory rows"""
+
+    def __init__(self, students, invoiced=(), fail_copy_on=None):
+        self.students = students
+        self.invoiced = set(invoiced)
+        self.fail_copy_on = fail_copy_on
+        self.copies = []
+        self.fetches = []
+        self.commits = 0
+        self.next_number = 1
+
+    async def fetch(self, query, *params):
+        self.fetches.append(query)
+        if "finance.fee_items" in query:
+            return FEE_ITEMS
+        if "sis.students" in query:
+            resume_after = params[-1] if "s.id >" in query else None
+            return [s for s in self.students if resume_after is None or s["id"] > resume_after]
+        if "finance.invoices" in query:
+            return [{"student_id": sid} for sid in params[0] if sid in self.invoiced]
+        raise AssertionError(f"Unexpected query: {query}")
+
+    async def fetchval(self, query, *params):
+        assert query is RESERVE_SQL
+        first = self.next_number
+        self.next_number += params[3]
+        return first
+
+    @asynccontextmanager
+    async def transaction(self):
+        pending = len(self.copies)
+        try:
+            yield
+        except Exception:
+            del self.copies[pending:]
+            raise
+        self.commits += 1
+
+    async def copy_records_to_table(self, table, schema_name, columns, records):
+        if self.fail_copy_on is not None and any(self.fail_copy_on in r for r in records):
+            raise Exception("check constraint violated")
+        self.copies.append((table, list(records)))
+
+
+def make_students(count):
+    ids = sorted(uuid.uuid4() for _ in range(count))
+    return [{"id": sid, "first_name": "Student", "last_name": str(i)} for i, sid in enumerate(ids)]
+
+
+@pytest.fixture
+def connect():
+    holder = {}
+
+    @asynccontextmanager
+    async def get_database_connection(workload):
+        holder["workload"] = workload
+        yield holder["conn"]
+
+    with patch("services.finance.invoice_generation.get_database_connection", get_database_connection):
+        yield holder
+
+
+async def run(engine, **overrides):
+    kwargs = dict(
+        school_id=SCHOOL_ID, fee_structure_id=STRUCTURE_ID, academic_year_id=YEAR_ID,
+        due_date=date(2026, 1, 31), created_by=USER_ID, grade_levels=[3],
+    )
+    kwargs.update(overrides)
+    return await engine.generate(**kwargs)
+
+
+class TestInvoiceGeneration:
+    """Test invoices are written in chunks with COPY"""
+
+    @pytest.mark.asyncio
+    async def test_chunks_copied_and_committed(self, connect):
+        """Test each chunk is one invoice COPY, one line item COPY and one commit"""
+        students = make_students(5)
+        conn = connect["conn"] = FakeConnection(students)
+
+        result = await run(InvoiceGenerationEngine(chunk_size=2))
+
+        assert connect["workload"] == "background"
+        assert conn.commits == 3
+        assert [table for table, _ in conn.copies] == ["invoices", "invoice_line_items"] * 3
+        assert len(result.invoice_ids) == 5
+        assert result.total_amount == Decimal("395.50") * 5
+        assert result.checkpoint == students[-1]["id"]
+
+        invoice = conn.copies[0][1][0]
+        line_items = conn.copies[1][1]
+        assert invoice[6] == Decimal("395.50")
+        year = date.today().year
+        numbers = [invoice[-1] for _, rows in conn.copies[::2] for invoice in rows]
+        assert numbers == [f"INV-{year}-{n:05d}" for n in range(1, 6)]
+        assert {line[0] for line in line_items} == {invoice[0] for invoice in conn.copies[0][1]}
+
+    @pytest.mark.asyncio
+    async def test_existing_invoices_skipped(self, connect):
+        """Test students already invoiced for the period are reported, not duplicated"""
+        students = make_students(3)
+        connect["conn"] = FakeConnection(students, invoiced=[students[1]["id"]])
+
+        result = await run(InvoiceGenerationEngine())
+
+        assert len(result.invoice_ids) == 2
+        assert result.failed_students == [{
+            "student_id": str(students[1]["id"]),
+            "student_name": "Student 1",
+            "reason": "Invoice already exists",
+        }]
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_keeps_earlier_chunks(self, connect):
+        """Test a failing chunk rolls back alone and the checkpoint stays behind it"""
+        students = make_students(4)
+        conn = connect["conn"] = FakeConnection(students, fail_copy_on=students[2]["id"])
+
+        result = await run(InvoiceGenerationEngine(chunk_size=2))
+
+        assert len(result.invoice_ids) == 2
+        assert result.chunks_failed == 1
+        assert result.checkpoint == students[1]["id"]
+        assert len(result.failed_students) == 2
+        assert len(conn.copies) == 2
+
+    @pytest.mark.asyncio
+    async def test_resume_after_checkpoint(self, connect):
+        """Test a resumed run only loads students after the checkpoint"""
+        students = make_students(4)
+        connect["conn"] = FakeConnection(students)
+
+        result = await run(InvoiceGenerationEngine(), resume_after=students[1]["id"])
+
+        assert result.total_students == 2
+
+    @pytest.mark.asyncio
+    async def test_resume_after_failed_middle_chunk(self, connect):
+        """Test the checkpoint stays before a failed middle chunk so a resume invoices it"""
+        students = make_students(6)
+        conn = connect["conn"] = FakeConnection(students, fail_copy_on=students[2]["id"])
+
+        result = await run(InvoiceGenerationEngine(chunk_size=2))
+
+        assert (result.chunks_committed, result.chunks_failed) == (2, 1)
+        assert result.checkpoint == students[1]["id"]
+
+        invoiced = [students[i]["id"] for i in (0, 1, 4, 5)]
+        conn = connect["conn"] = FakeConnection(students, invoiced=invoiced)
+        resumed = await run(InvoiceGenerationEngine(chunk_size=2), resume_after=result.checkpoint)
+
+        invoices = [invoice[2] for table, rows in conn.copies if table == "invoices" for invoice in rows]
+        assert invoices == [students[2]["id"], students[3]["id"]]
+        assert [failure["reason"] for failure in resumed.failed_students] == ["Invoice already exists"] * 2
+        assert resumed.checkpoint == students[-1]["id"]
+
+    @pytest.mark.asyncio
+    async def test_missing_structure(self, connect):
+        """Test an unknown fee structure raises before any writes"""
+        conn = connect["conn"] = FakeConnection(make_students(1))
+        conn.fetch = AsyncMock(return_value=[])
+
+        with pytest.raises(FeeStructureNotFoundError):
+            await run(InvoiceGenerationEngine())
+
+    @pytest.mark.asyncio
+    async def test_progress_reported_per_chunk(self, connect):
+        """Test the progress tracker sees every chunk and the final result"""
+        connect["conn"] = FakeConnection(make_students(3))
+        tracker = MagicMock()
+        tracker.create_bulk_operation = AsyncMock(return_value="op-1")
+        tracker.update_bulk_progress = AsyncMock()
+        tracker.update_progress = AsyncMock()
+        tracker.complete_operation = AsyncMock()
+
+        result = await run(InvoiceGenerationEngine(chunk_size=2, progress_tracker=tracker))
+
+        assert result.operation_id == "op-1"
+        assert tracker.update_bulk_progress.await_count == 2
+        assert tracker.update_bulk_progress.await_args.kwargs["processed_items"] == 3
+        assert tracker.complete_operation.await_args.kwargs["success"] is True
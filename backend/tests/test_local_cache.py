@@ -0,0 +1,123 @@
+"""Tests for the shared Local Cache and Pub/Sub Listener
+Group invalidation, LRU/TTL behaviour and resubscription after errors
+"""
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+
+from shared.cache.local_cache import LocalCache
+from shared.cache.pubsub import listen_forever
+from shared.cache.user_context_cache import UserContextCache
+
+
+class TestLocalCache:
+    """Test LocalCache behaviour"""
+
+    def test_group_invalidation(self):
+        """Test invalidating a group drops every entry in it and nothing else"""
+        cache = LocalCache(max_entries=10, ttl=60)
+        cache.set("a", 1, groups=["user-1"])
+        cache.set("b", 2, groups=["user-1", "school-1"])
+        cache.set("c", 3, groups=["user-2"])
+
+        assert cache.invalidate(groups=["user-1"]) == 2
+        assert cache.get("a") is None
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.invalidate(groups=["school-1"]) == 0
+        assert cache.stats()["invalidations"] == 1
+
+    def test_eviction_updates_group_index(self):
+        """Test an evicted entry is no longer counted by its group"""
+        cache = LocalCache(max_entries=1, ttl=60)
+        cache.set("a", 1, groups=["g"])
+        cache.set("b", 2, groups=["h"])
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.invalidate(groups=["g"]) == 0
+        assert len(cache) == 1
+
+    def test_ttl_expiry(self):
+        """Test entries expire after the TTL"""
+        cache = LocalCache(max_entries=10, ttl=30)
+
+        with patch("shared.cache.local_cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1, groups=["g"])
+        with patch("shared.cache.local_cache.time.monotonic", return_value=131.0):
+            assert cache.get("a") is None
+
+        assert len(cache) == 0
+        assert cache.invalidate(groups=["g"]) == 0
+
+
+class FlakyPubSub:
+    """Pub/sub whose first subscription drops after one message"""
+
+    def __init__(self, attempt):
+        self.attempt = attempt
+        self.unsubscribed = False
+
+    async def subscribe(self, channel):
+        pass
+
+    async def listen(self):
+        yield {"type": "subscribe", "data": 1}
+        yield {"type": "message", "data": f"m{self.attempt}"}
+        if self.attempt == 0:
+            raise ConnectionError("connection lost")
+        await asyncio.Event().wait()
+
+    async def unsubscribe(self, channel):
+        self.unsubscribed = True
+
+    async def close(self):
+        pass
+
+
+class TestListenForever:
+    """Test the resubscribing pub/sub listener"""
+
+    @pytest.mark.asyncio
+    async def test_resubscribes_after_error(self):
+        """Test a dropped subscription calls on_gap and is resubscribed"""
+        pubsubs = []
+
+        def make_pubsub():
+            pubsubs.append(FlakyPubSub(len(pubsubs)))
+            return pubsubs[-1]
+
+        client = MagicMock()
+        client.pubsub.side_effect = make_pubsub
+        received = []
+        gaps = []
+
+        with patch("shared.cache.pubsub.get_redis_client", return_value=client):
+            task = asyncio.create_task(
+                listen_forever("chan", received.append, on_gap=lambda: gaps.append(1), initial_backoff=0)
+            )
+            for _ in range(20):
+                await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert received == ["m0", "m1"]
+        assert gaps == [1]
+        assert all(pubsub.unsubscribed for pubsub in pubsubs)
+
+    @pytest.mark.asyncio
+    async def test_no_redis_returns(self):
+        """Test the listener exits at once when Redis is not configured"""
+        with patch("shared.cache.pubsub.get_redis_client", return_value=None):
+            await asyncio.wait_for(listen_forever("chan", print), 1)
+
+
+class TestPrincipalKey:
+    """Test principal records have their own Redis key type"""
+
+    def test_principal_key_distinct_from_user_context(self):
+        """Test the principal key does not collide with the user context key"""
+        cache = UserContextCache(MagicMock(), near_cache_size=0)
+
+        assert cache._get_cache_key("principal", "u1") != cache._get_cache_key("user_context", "u1")
+        assert cache._tags_for(cache._get_cache_key("principal", "u1")) == [cache._get_tag_key("user", "u1")]
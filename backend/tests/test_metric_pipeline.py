@@ -0,0 +1,162 @@
+"""Tests for the Batched Metric Pipeline
+Aggregation per series, backpressure and multi-row flushing
+"""
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from services.monitoring.pipeline import MetricPipeline, UNMATCHED_ROUTE
+from services.monitoring.schemas import MetricCreate, MetricType
+
+
+@pytest.fixture
+def session():
+    session = MagicMock()
+    session.execute = AsyncMock()
+    session.commit = AsyncMock()
+
+    @asynccontextmanager
+    async def get_workload_session(workload):
+        session.workload = workload
+        yield session
+
+    with patch("services.monitoring.pipeline.get_workload_session", get_workload_session):
+        yield session
+
+
+def rows_by_name(rows):
+    return {(row["metric_name"], row["tags"].get("status")): row for row in rows}
+
+
+class TestAggregation:
+    """Test request samples are folded per series"""
+
+    def test_requests_fold_into_one_series(self):
+        """Test repeated requests produce one set of rows per series"""
+        pipeline = MetricPipeline()
+        for duration in (4, 20, 300):
+            pipeline.record_request("/students/{id}", "GET", 200, duration)
+        pipeline.record_request("/students/{id}", "GET", 404, 2, "http_error")
+
+        rows = rows_by_name(pipeline.drain())
+
+        assert len(rows) == 5
+        assert rows[("http.requests.total", "200")]["value"] == 3
+        duration = rows[("http.request.duration", "200")]
+        assert duration["value"] == pytest.approx(108)
+        assert duration["tags"]["min"] == 4
+        assert duration["tags"]["max"] == 300
+        assert duration["tags"]["buckets"]["5"] == 1
+        assert duration["tags"]["buckets"]["+Inf"] == 3
+        assert rows[("http.errors.total", "404")]["tags"]["error_types"] == {"http_error": 1}
+        assert ("http.errors.total", "200") not in rows
+
+    def test_drain_starts_new_window(self):
+        """Test draining resets the window"""
+        pipeline = MetricPipeline()
+        pipeline.record_request(UNMATCHED_ROUTE, "GET", 404, 1, "http_error")
+
+        assert pipeline.drain()
+        assert pipeline.drain() == []
+
+
+class TestBackpressure:
+    """Test samples are dropped rather than buffered without bound"""
+
+    def test_new_series_dropped_when_full(self):
+        """Test existing series keep counting once the series table is full"""
+        pipeline = MetricPipeline(max_series=1)
+
+        assert pipeline.record_request("/a", "GET", 200, 1) is True
+        assert pipeline.record_request("/b", "GET", 200, 1) is False
+        assert pipeline.record_request("/a", "GET", 200, 1) is True
+
+        stats = pipeline.stats()
+        assert stats["dropped"] == 1
+        assert stats["recorded"] == 2
+
+    def test_sample_buffer_bound(self):
+        """Test raw metrics beyond the buffer size are dropped"""
+        pipeline = MetricPipeline(max_samples=2)
+        metric = MetricCreate(
+            metric_name="system.cpu_usage", metric_type=MetricType.GAUGE,
+            value=12.5, unit="percent", source="system"
+        )
+
+        results = [pipeline.enqueue(metric) for _ in range(3)]
+
+        assert results == [True, True, False]
+        assert pipeline.stats()["pending_samples"] == 2
+
+
+class TestFlush:
+    """Test flushing writes batches off the request path"""
+
+    @pytest.mark.asyncio
+    async def test_single_multi_row_insert(self, session):
+        """Test one INSERT statement carries every row of the window"""
+        pipeline = MetricPipeline()
+        pipeline.record_request("/a", "GET", 200, 10)
+        pipeline.record_request("/b", "POST", 201, 10)
+
+        written = await pipeline.flush()
+        await pipeline.close()
+
+        assert written == 4
+        assert session.workload == "background"
+        session.execute.assert_awaited_once()
+        session.commit.assert_awaited_once()
+
+        statement = session.execute.await_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert sql.count("INSERT") == 1
+        assert sql.count("), (") == 3
+
+    @pytest.mark.asyncio
+    async def test_empty_window_skips_database(self, session):
+        """Test nothing is written when no samples arrived"""
+        assert await MetricPipeline().flush() == 0
+        session.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_on_flush_receives_metrics(self, session):
+        """Test alert evaluation runs on the flushed batch"""
+        on_flush = AsyncMock()
+        pipeline = MetricPipeline(on_flush=on_flush)
+        pipeline.enqueue(MetricCreate(
+            metric_name="system.cpu_usage", metric_type=MetricType.GAUGE,
+            value=95, unit="percent", source="system"
+        ))
+
+        await pipeline.close()
+
+        metrics = on_flush.await_args.args[0]
+        assert [(m.metric_name, m.value) for m in metrics] == [("system.cpu_usage", 95)]
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_counts_drops(self, session):
+        """Test a failed write drops the window instead of raising"""
+        session.execute.side_effect = Exception("connection refused")
+        pipeline = MetricPipeline()
+        pipeline.record_request("/a", "GET", 200, 10)
+
+        assert await pipeline.flush() == 0
+        await pipeline.close()
+
+        stats = pipeline.stats()
+        assert stats["flush_failures"] == 1
+        assert stats["dropped"] == 2
+        assert stats["pending_series"] == 0
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_remaining(self, session):
+        """Test shutdown stops the flusher and writes the partial window"""
+        pipeline = MetricPipeline(flush_interval=3600)
+        pipeline.record_request("/a", "GET", 200, 10)
+
+        await pipeline.close()
+
+        session.execute.assert_awaited_once()
+        assert pipeline.stats()["rows_written"] == 2
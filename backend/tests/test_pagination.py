@@ -0,0 +1,175 @@
+"""Tests for Keyset Pagination
+Opaque cursors, keyset conditions and optional counts
+"""
+import json
+import pytest
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import Column, Date, MetaData, String, Table, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
+
+from shared import pagination
+from shared.pagination import (
+    CountCache,
+    CountMode,
+    InvalidCursorError,
+    SortKey,
+    apply_keyset,
+    count_rows,
+    cursor_for,
+    decode_cursor,
+    keyset_condition,
+    keyset_filter,
+    split_page,
+)
+
+NEWEST_FIRST = (SortKey("i.created_at", "created_at", True), SortKey("i.id", "id", True))
+BY_NAME = (SortKey("last_name", "last_name"), SortKey("first_name", "first_name"), SortKey("id", "id"))
+
+students = Table(
+    "students", MetaData(),
+    Column("id", PostgresUUID(as_uuid=True), primary_key=True),
+    Column("last_name", String),
+    Column("start_date", Date),
+)
+
+
+class FakeConnection:
+    def __init__(self, count=42, plan_rows=40):
+        self.count = count
+        self.plan_rows = plan_rows
+        self.queries = []
+
+    async def fetchval(self, query, *params):
+        self.queries.append(query)
+        if query.startswith("EXPLAIN"):
+            return json.dumps([{"Plan": {"Node Type": "Seq Scan", "Plan Rows": self.plan_rows}}])
+        return self.count
+
+
+class TestCursors:
+    """Test cursors round-trip and are bound to their sort order"""
+
+    def test_round_trip_typed_values(self):
+        """Test datetimes, dates, UUIDs and decimals come back as the same types"""
+        keys = tuple(SortKey(f"c{i}", f"c{i}") for i in range(5))
+        row = {
+            "c0": datetime(2026, 3, 1, 8, 30, tzinfo=timezone.utc),
+            "c1": date(2026, 3, 1),
+            "c2": uuid.uuid4(),
+            "c3": Decimal("12.50"),
+            "c4": "Moyo",
+        }
+
+        assert decode_cursor(keys, cursor_for(row, keys)) == list(row.values())
+
+    def test_cursor_from_other_sort_rejected(self):
+        """Test a cursor cannot be replayed against a different ordering"""
+        cursor = cursor_for({"created_at": datetime(2026, 1, 1), "id": uuid.uuid4()}, NEWEST_FIRST)
+
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(BY_NAME, cursor)
+
+    def test_malformed_cursor_rejected(self):
+        """Test garbage cursors raise InvalidCursorError"""
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(NEWEST_FIRST, "not-a-cursor")
+
+    def test_split_page(self):
+        """Test the extra row signals a next page and the cursor is the last kept row"""
+        rows = [{"last_name": n, "first_name": "A", "id": i} for i, n in enumerate("abc")]
+
+        page, cursor = split_page(rows, BY_NAME, 2)
+        assert page == rows[:2]
+        assert decode_cursor(BY_NAME, cursor) == ["b", "A", 1]
+
+        page, cursor = split_page(rows, BY_NAME, 3)
+        assert cursor is None
+
+
+class TestKeysetConditions:
+    """Test the WHERE conditions that replace OFFSET"""
+
+    def test_uniform_direction_uses_row_comparison(self):
+        """Test same-direction keys compare as a row value"""
+        assert keyset_condition(NEWEST_FIRST, ["$3", "$4"]) == "(i.created_at, i.id) < ($3, $4)"
+
+    def test_mixed_direction_expands(self):
+        """Test mixed directions expand to an OR of prefixes"""
+        keys = (SortKey("due_date", "due_date"), SortKey("id", "id", True))
+
+        assert keyset_condition(keys, [":a", ":b"]) == "((due_date > :a) OR (due_date = :a AND id < :b))"
+
+    def test_keyset_filter_numbers_parameters(self):
+        """Test cursor values take the next free asyncpg parameters"""
+        created, row_id = datetime(2026, 1, 1), uuid.uuid4()
+        cursor = cursor_for({"created_at": created, "id": row_id}, NEWEST_FIRST)
+
+        assert keyset_filter(NEWEST_FIRST, None, 3) == ("", [])
+        assert keyset_filter(NEWEST_FIRST, cursor, 3) == (
+            " AND (i.created_at, i.id) < ($3, $4)", [created, row_id]
+        )
+
+    def test_apply_keyset_on_select(self):
+        """Test SQLAlchemy selects get the tuple comparison and full ordering"""
+        keys = (SortKey(students.c.last_name, "last_name"), SortKey(students.c.id, "id"))
+        cursor = cursor_for({"last_name": "Moyo", "id": uuid.uuid4()}, keys)
+
+        sql = str(apply_keyset(select(students), keys, cursor).compile(dialect=postgresql.dialect()))
+
+        assert "(students.last_name, students.id) > (" in sql
+        assert sql.endswith("ORDER BY students.last_name ASC, students.id ASC")
+
+
+class TestCounts:
+    """Test the optional count modes"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(pagination, "count_cache", CountCache(ttl=60))
+
+    @pytest.mark.asyncio
+    async def test_none_skips_query(self):
+        """Test no count query runs when counts are off"""
+        conn = FakeConnection()
+
+        assert await count_rows(conn, CountMode.NONE, "FROM t", []) is None
+        assert conn.queries == []
+
+    @pytest.mark.asyncio
+    async def test_estimated_reads_plan(self):
+        """Test estimates come from the planner, not a scan"""
+        conn = FakeConnection()
+
+        assert await count_rows(conn, CountMode.ESTIMATED, "FROM t WHERE a = $1", [1]) == 40
+        assert conn.queries == ["EXPLAIN (FORMAT JSON) SELECT 1 FROM t WHERE a = $1"]
+
+    @pytest.mark.asyncio
+    async def test_cached_counts_reused_per_filter(self):
+        """Test exact counts are reused for the same filters only"""
+        conn = FakeConnection()
+
+        assert await count_rows(conn, CountMode.CACHED, "FROM t WHERE a = $1", [1]) == 42
+        assert await count_rows(conn, CountMode.CACHED, "FROM t WHERE a = $1", [1]) == 42
+        await count_rows(conn, CountMode.CACHED, "FROM t WHERE a = $1", [2])
+
+        assert len(conn.queries) == 2
+        assert pagination.count_cache.stats()["hits"] == 1
+
+
+class TestSortColumns:
+    """Test list endpoints only keyset on NOT NULL columns"""
+
+    def test_audit_log_sort_columns_not_null(self):
+        """Test every sortable audit log column is NOT NULL and others are refused"""
+        from pydantic import ValidationError
+        from services.audit.audit_service import AUDIT_LOG_SORT_PATTERN, AuditLogFilter
+        from shared.models.audit_log import AuditLog
+
+        sortable = AUDIT_LOG_SORT_PATTERN.strip("^$()").split("|")
+        assert all(not AuditLog.__table__.columns[column].nullable for column in sortable)
+        with pytest.raises(ValidationError):
+            AuditLogFilter(sort_by="resource_type")
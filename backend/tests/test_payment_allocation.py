@@ -0,0 +1,128 @@
+"""Tests for the Payment Allocation Engine
+Batched single-statement allocation and per-batch reconciliation
+"""
+import pytest
+import uuid
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from unittest.mock import patch
+
+from services.finance.allocation import (
+    ALLOCATE_SQL,
+    MARK_RECONCILED_SQL,
+    PaymentAllocationEngine,
+)
+
+SCHOOL_ID = uuid.uuid4()
+USER_ID = uuid.uuid4()
+
+
+class FakeConnection:
+    """Records statements and answers allocations from a fixed amount per payment"""
+
+    def __init__(self, applied=Decimal("10.00"), fail_on=None):
+        self.applied = applied
+        self.fail_on = fail_on
+        self.statements = []
+        self.commits = 0
+
+    async def fetch(self, query, *params):
+        self.statements.append((query, params))
+        if self.fail_on is not None and self.fail_on in params[0]:
+            raise Exception("deadlock detected")
+        return [
+            {"payment_id": payment_id, "invoice_id": uuid.uuid4(), "student_id": uuid.uuid4(),
+             "allocated_amount": self.applied, "applied_amount": self.applied}
+            for payment_id in params[0]
+        ]
+
+    async def execute(self, query, *params):
+        self.statements.append((query, params))
+        return f"UPDATE {len(params[0])}"
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+        self.commits += 1
+
+
+@pytest.fixture
+def connect():
+    holder = {}
+
+    @asynccontextmanager
+    async def get_database_connection(workload):
+        holder["workload"] = workload
+        yield holder["conn"]
+
+    with patch("services.finance.allocation.get_database_connection", get_database_connection):
+        yield holder
+
+
+class TestAllocate:
+    """Test allocation runs one statement per batch of payments"""
+
+    @pytest.mark.asyncio
+    async def test_one_statement_per_batch(self):
+        """Test payments are allocated in batches rather than one by one"""
+        conn = FakeConnection()
+        payment_ids = [uuid.uuid4() for _ in range(5)]
+
+        rows = await PaymentAllocationEngine(batch_size=2).allocate(conn, payment_ids)
+
+        assert len(conn.statements) == 3
+        assert [params[0] for _, params in conn.statements] == [
+            payment_ids[0:2], payment_ids[2:4], payment_ids[4:5]
+        ]
+        assert len(rows) == 5
+
+    @pytest.mark.asyncio
+    async def test_filters_passed_through(self):
+        """Test school and invoice restrictions reach the statement"""
+        conn = FakeConnection()
+        payment_id, invoice_id = uuid.uuid4(), uuid.uuid4()
+
+        await PaymentAllocationEngine().allocate(conn, [payment_id], SCHOOL_ID, [invoice_id])
+
+        query, params = conn.statements[0]
+        assert query is ALLOCATE_SQL
+        assert params == ([payment_id], SCHOOL_ID, [invoice_id])
+
+    def test_statement_locks_and_updates_balances(self):
+        """Test the statement skips locked rows and moves account balances, leaving invoices to the trigger"""
+        assert ALLOCATE_SQL.count("SKIP LOCKED") == 2
+        assert "UPDATE finance.invoices" not in ALLOCATE_SQL
+        assert "UPDATE finance.student_accounts" in ALLOCATE_SQL
+        assert "ON CONFLICT (payment_id, invoice_id)" in ALLOCATE_SQL
+
+
+class TestReconcile:
+    """Test reconciliation marks and allocates each batch in one transaction"""
+
+    @pytest.mark.asyncio
+    async def test_batches_marked_and_allocated(self, connect):
+        """Test each batch is marked reconciled then allocated, then committed"""
+        conn = connect["conn"] = FakeConnection()
+        payment_ids = [uuid.uuid4() for _ in range(3)]
+
+        result = await PaymentAllocationEngine(batch_size=2).reconcile(payment_ids, USER_ID)
+
+        assert connect["workload"] == "background"
+        assert conn.commits == 2
+        assert [query for query, _ in conn.statements] == [MARK_RECONCILED_SQL, ALLOCATE_SQL] * 2
+        assert result.payments_reconciled == 3
+        assert result.allocations_created == 3
+        assert result.amount_allocated == Decimal("30.00")
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_does_not_stop_run(self, connect):
+        """Test a failing batch is counted and later batches still run"""
+        payment_ids = [uuid.uuid4() for _ in range(4)]
+        conn = connect["conn"] = FakeConnection(fail_on=payment_ids[0])
+
+        result = await PaymentAllocationEngine(batch_size=2).reconcile(payment_ids, USER_ID)
+
+        assert result.batches_failed == 1
+        assert conn.commits == 1
+        assert result.payments_reconciled == 2
+        assert result.allocations_created == 2
@@ -0,0 +1,202 @@
+"""Tests for the Payment Restriction Engine
+Cached fee category classification, one grouped statement per class and
+the per-student bitmap cache
+"""
+import json
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from services.finance.restrictions import (
+    ASSESSMENT_ACCESS,
+    CLASS_ACCESS,
+    FEE_CATEGORIES_SQL,
+    PRACTICAL_ACCESS,
+    RESTRICTIONS_SQL,
+    STUDENT_OPEN_INVOICES_SQL,
+    PaymentRestrictionEngine,
+    RestrictionCache,
+    StudentRestriction,
+    classify_fee_category,
+    handle_restriction_invalidation_message,
+    invalidate_student_restrictions,
+    restriction_cache,
+    restriction_names,
+)
+
+SCHOOL_ID = uuid.uuid4()
+YEAR_ID = uuid.uuid4()
+CLASS_ID = uuid.uuid4()
+
+EXAM = uuid.uuid4()
+LAB = uuid.uuid4()
+TUITION = uuid.uuid4()
+TRANSPORT = uuid.uuid4()
+
+
+class FakeSession:
+    """Answers the engine's statements from fixed categories and per-student rows"""
+
+    def __init__(self, rows=None, invoices=None):
+        self.rows = rows or []
+        self.invoices = invoices or []
+        self.statements = []
+
+    async def execute(self, statement, params):
+        self.statements.append((statement, params))
+        if statement is FEE_CATEGORIES_SQL:
+            return [
+                SimpleNamespace(id=EXAM, name="Examination Fee", description=None, code="EXM"),
+                SimpleNamespace(id=LAB, name="Science Lab", description=None, code="LAB"),
+                SimpleNamespace(id=TUITION, name="Tuition", description=None, code="TUI"),
+                SimpleNamespace(id=TRANSPORT, name="Transport", description=None, code="TRP"),
+            ]
+        if statement is RESTRICTIONS_SQL:
+            wanted = params["student_ids"]
+            return [row for row in self.rows if wanted is None or str(row.student_id) in wanted]
+        if statement is STUDENT_OPEN_INVOICES_SQL:
+            return self.invoices
+        raise AssertionError(f"Unexpected statement: {statement}")
+
+    def executed(self, statement):
+        return [params for executed, params in self.statements if executed is statement]
+
+
+def student_row(total, bits, invoices=1):
+    return SimpleNamespace(student_id=uuid.uuid4(), total_outstanding=Decimal(total),
+                           outstanding_invoices=invoices, restrictions=bits)
+
+
+def test_classify_fee_category():
+    """Test category names map to restriction bits"""
+    assert classify_fee_category("Examination Fee") == ASSESSMENT_ACCESS
+    assert classify_fee_category("Chemistry Practical / Lab") == PRACTICAL_ACCESS
+    assert classify_fee_category("Term Tuition") == CLASS_ACCESS
+    assert classify_fee_category("Transport") == 0
+    assert restriction_names(ASSESSMENT_ACCESS | CLASS_ACCESS) == ["assessment_access", "class_access"]
+
+
+class TestEvaluate:
+    """Test a class is evaluated in one grouped statement"""
+
+    @pytest.mark.asyncio
+    async def test_one_statement_per_class(self):
+        """Test the whole class is evaluated at once with classified category bits"""
+        rows = [student_row("650.00", ASSESSMENT_ACCESS | CLASS_ACCESS, 3),
+                student_row("250.00", PRACTICAL_ACCESS),
+                student_row("40.00", CLASS_ACCESS)]
+        db = FakeSession(rows)
+
+        evaluated = await PaymentRestrictionEngine(RestrictionCache()).evaluate(
+            db, SCHOOL_ID, YEAR_ID, class_id=CLASS_ID
+        )
+
+        params, = db.executed(RESTRICTIONS_SQL)
+        assert params["class_id"] == str(CLASS_ID)
+        assert params["student_ids"] is None
+        assert dict(zip(params["category_ids"], params["category_bits"])) == {
+            str(EXAM): ASSESSMENT_ACCESS, str(LAB): PRACTICAL_ACCESS, str(TUITION): CLASS_ACCESS,
+        }
+        high = evaluated[str(rows[0].student_id)]
+        assert high.is_restricted and high.to_dict() == {
+            "student_id": str(rows[0].student_id),
+            "total_outstanding": 650.0,
+            "outstanding_invoices": 3,
+            "restrictions": ["assessment_access", "class_access"],
+            "restriction_level": "high",
+        }
+        assert evaluated[str(rows[1].student_id)].restriction_level == "medium"
+        assert not evaluated[str(rows[2].student_id)].is_restricted
+
+    @pytest.mark.asyncio
+    async def test_categories_classified_once(self):
+        """Test fee categories are loaded once per school"""
+        db = FakeSession()
+        engine = PaymentRestrictionEngine(RestrictionCache())
+
+        await engine.evaluate(db, SCHOOL_ID, YEAR_ID, class_id=CLASS_ID)
+        await engine.evaluate(db, SCHOOL_ID, YEAR_ID, class_id=CLASS_ID)
+
+        assert len(db.executed(FEE_CATEGORIES_SQL)) == 1
+        assert len(db.executed(RESTRICTIONS_SQL)) == 2
+
+
+class TestStudentCache:
+    """Test single-student lookups read the bitmap cache"""
+
+    @pytest.mark.asyncio
+    async def test_class_evaluation_fills_cache(self):
+        """Test students evaluated with their class are then served from the cache"""
+        row = student_row("300.00", CLASS_ACCESS)
+        db = FakeSession([row])
+        engine = PaymentRestrictionEngine(RestrictionCache())
+
+        await engine.evaluate(db, SCHOOL_ID, YEAR_ID, class_id=CLASS_ID)
+        restriction = await engine.get_student_restriction(db, row.student_id, SCHOOL_ID, YEAR_ID)
+
+        assert restriction.restrictions == CLASS_ACCESS
+        assert len(db.executed(RESTRICTIONS_SQL)) == 1
+
+    @pytest.mark.asyncio
+    async def test_student_without_invoices_cached_as_clear(self):
+        """Test a student with nothing outstanding costs no invoice query, even twice"""
+        db = FakeSession()
+        engine = PaymentRestrictionEngine(RestrictionCache())
+        student_id = uuid.uuid4()
+
+        assert await engine.get_open_invoices(db, student_id, SCHOOL_ID, YEAR_ID) == []
+        assert await engine.get_open_invoices(db, student_id, SCHOOL_ID, YEAR_ID) == []
+
+        assert len(db.executed(RESTRICTIONS_SQL)) == 1
+        assert db.executed(STUDENT_OPEN_INVOICES_SQL) == []
+
+    @pytest.mark.asyncio
+    async def test_open_invoices_carry_categories(self):
+        """Test a student's open invoices come back with their fee category IDs"""
+        row = student_row("120.00", ASSESSMENT_ACCESS)
+        invoice = SimpleNamespace(id=uuid.uuid4(), outstanding_amount=Decimal("120.00"),
+                                  due_date=None, fee_category_ids=[EXAM, TRANSPORT])
+        db = FakeSession([row], [invoice])
+
+        invoices = await PaymentRestrictionEngine(RestrictionCache()).get_open_invoices(
+            db, row.student_id, SCHOOL_ID, YEAR_ID
+        )
+
+        assert invoices == [{
+            "invoice_id": str(invoice.id), "amount": Decimal("120.00"), "due_date": None,
+            "fee_category_ids": {str(EXAM), str(TRANSPORT)},
+        }]
+
+    @pytest.mark.asyncio
+    async def test_payment_allocation_invalidates(self):
+        """Test invalidation drops a student's bitmap in every year"""
+        student_id = str(uuid.uuid4())
+        other_year = uuid.uuid4()
+        restriction_cache.set(SCHOOL_ID, YEAR_ID, StudentRestriction(student_id, restrictions=CLASS_ACCESS))
+        restriction_cache.set(SCHOOL_ID, other_year, StudentRestriction(student_id))
+
+        await invalidate_student_restrictions([student_id])
+
+        assert restriction_cache.get(SCHOOL_ID, YEAR_ID, student_id) is None
+        assert restriction_cache.get(SCHOOL_ID, other_year, student_id) is None
+
+    def test_invalidation_message(self):
+        """Test pub/sub payloads from other workers drop local bitmaps"""
+        cache_key = str(uuid.uuid4())
+        restriction_cache.set(SCHOOL_ID, YEAR_ID, StudentRestriction(cache_key))
+
+        handle_restriction_invalidation_message(json.dumps({"student_ids": [cache_key]}).encode())
+        handle_restriction_invalidation_message(b"not json")
+
+        assert restriction_cache.get(SCHOOL_ID, YEAR_ID, cache_key) is None
+
+    def test_lru_eviction(self):
+        """Test the cache stays within its bound"""
+        cache = RestrictionCache(max_entries=2)
+        for _ in range(3):
+            cache.set(SCHOOL_ID, YEAR_ID, StudentRestriction(str(uuid.uuid4())))
+
+        assert cache.stats()["size"] == 2
+        assert cache.stats()["evictions"] == 1
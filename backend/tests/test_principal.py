@@ -0,0 +1,269 @@
+"""Tests for Principal Resolution
+Single-query principal building, caching and invalidation
+"""
+import json
+import pytest
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from shared import auth
+from shared.auth import Principal, resolve_principal, _build_principal_record
+from shared.cache.principal_cache import (
+    PrincipalCache,
+    principal_cache,
+    handle_principal_invalidation_message,
+    invalidate_principal,
+)
+
+USER_ID = str(uuid.uuid4())
+SCHOOL_A = str(uuid.uuid4())
+SCHOOL_B = str(uuid.uuid4())
+
+
+def make_row():
+    created = datetime(2024, 1, 10, 8, 30, tzinfo=timezone.utc)
+    return {
+        "id": uuid.UUID(USER_ID),
+        "email": "teacher@demo.school",
+        "first_name": "Tendai",
+        "last_name": "Moyo",
+        "display_name": None,
+        "global_role": "system_user",
+        "status": "active",
+        "primary_school_id": uuid.UUID(SCHOOL_A),
+        "clerk_user_id": "user_123",
+        "contact_information": '{"phone": "+263771234567"}',
+        "personal_profile": None,
+        "user_preferences": {},
+        "last_login_at": None,
+        "created_at": created,
+        "updated_at": created,
+        "memberships": json.dumps([
+            {
+                "school_id": SCHOOL_A, "school_name": "Demo High", "school_subdomain": "demo",
+                "role": "teacher", "permissions": ["grades.enter", "attendance.mark"],
+                "joined_date": "2024-01-10T08:30:00+00:00", "status": "active",
+                "student_id": None, "current_grade": None, "admission_date": None,
+                "graduation_date": None, "employee_id": "EMP1", "department": "Science",
+                "hire_date": None, "contract_type": None, "children_ids": None,
+            },
+            {
+                "school_id": SCHOOL_B, "school_name": "Other High", "school_subdomain": "other",
+                "role": "school_admin", "permissions": ["*"],
+                "joined_date": "2024-01-10T08:30:00+00:00", "status": "active",
+                "student_id": None, "current_grade": None, "admission_date": None,
+                "graduation_date": None, "employee_id": None, "department": None,
+                "hire_date": None, "contract_type": None, "children_ids": [],
+            },
+        ]),
+    }
+
+
+class TestPrincipal:
+    """Test Principal construction"""
+
+    def test_permissions_follow_token_school(self):
+        """Test active permissions come from the token's school membership"""
+        record = _build_principal_record(make_row())
+
+        primary = Principal.from_record(record)
+        other = Principal.from_record(record, SCHOOL_B)
+
+        assert primary.school_id == uuid.UUID(SCHOOL_A)
+        assert primary.permissions == ("grades.enter", "attendance.mark")
+        assert other.school_id == uuid.UUID(SCHOOL_B)
+        assert other.permissions == ("*",)
+
+    def test_record_is_json_safe(self):
+        """Test the cached record survives a JSON round trip unchanged"""
+        record = _build_principal_record(make_row())
+        restored = json.loads(json.dumps(record))
+
+        principal = Principal.from_record(restored)
+
+        assert principal.id == uuid.UUID(USER_ID)
+        assert principal.created_at == datetime(2024, 1, 10, 8, 30, tzinfo=timezone.utc)
+        assert principal.contact_information == {"phone": "+263771234567"}
+        assert principal.personal_profile == {}
+
+    def test_compatibility_attributes(self):
+        """Test attributes routes rely on are available"""
+        principal = Principal.from_record(_build_principal_record(make_row()))
+
+        assert principal.full_name == "Tendai Moyo"
+        assert principal.platform_role == principal.role == "system_user"
+        assert principal.is_platform_admin is False
+        assert principal.can_access_feature("finance_module") is True
+        assert len(principal.school_memberships) == 2
+
+    def test_principal_is_immutable(self):
+        """Test cached principals cannot be modified"""
+        principal = Principal.from_record(_build_principal_record(make_row()))
+
+        with pytest.raises(AttributeError):
+            principal.school_id = uuid.uuid4()
+        with pytest.raises(AttributeError):
+            principal.extra = True
+
+
+class TestResolvePrincipal:
+    """Test resolve_principal caching"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        principal_cache.clear()
+        yield
+        principal_cache.clear()
+
+    @pytest.fixture
+    def conn(self):
+        conn = MagicMock()
+        conn.fetchrow = AsyncMock(return_value=make_row())
+
+        @asynccontextmanager
+        async def get_connection():
+            yield conn
+
+        with patch.object(auth.db_manager, "get_connection", get_connection), \
+             patch("shared.cache.principal_cache.get_user_context_cache", return_value=None):
+            yield conn
+
+    @pytest.mark.asyncio
+    async def test_single_query_and_cache_hit(self, conn):
+        """Test one DB round trip and a shared instance on repeat tokens"""
+        token = {"sub": USER_ID, "school_id": None, "iat": 1700000000}
+
+        first = await resolve_principal(token)
+        second = await resolve_principal(dict(token))
+
+        assert conn.fetchrow.await_count == 1
+        assert first is second
+
+    @pytest.mark.asyncio
+    async def test_new_token_gets_new_entry(self, conn):
+        """Test a different iat or school is a separate cache entry"""
+        await resolve_principal({"sub": USER_ID, "iat": 1})
+        other = await resolve_principal({"sub": USER_ID, "school_id": SCHOOL_B, "iat": 2})
+
+        assert conn.fetchrow.await_count == 2
+        assert other.permissions == ("*",)
+
+    @pytest.mark.asyncio
+    async def test_unknown_user(self, conn):
+        """Test inactive or missing users resolve to None"""
+        conn.fetchrow.return_value = None
+
+        assert await resolve_principal({"sub": USER_ID, "iat": 1}) is None
+        assert principal_cache.stats()["size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_invalidate_principal(self, conn):
+        """Test invalidation forces the next lookup back to the database"""
+        token = {"sub": USER_ID, "iat": 1}
+        await resolve_principal(token)
+
+        with patch("shared.cache.principal_cache.get_redis_client", return_value=None):
+            await invalidate_principal(uuid.UUID(USER_ID))
+        await resolve_principal(token)
+
+        assert conn.fetchrow.await_count == 2
+
+
+class TestPrincipalCache:
+    """Test PrincipalCache behaviour"""
+
+    def test_invalidate_user_drops_all_keys(self):
+        """Test every token entry for a user is dropped"""
+        cache = PrincipalCache(max_entries=10, ttl=60)
+        cache.set(("u1", None, 1), "a")
+        cache.set(("u1", "s2", 2), "b")
+        cache.set(("u2", None, 1), "c")
+
+        assert cache.invalidate_user("u1") == 2
+        assert cache.get(("u1", None, 1)) is None
+        assert cache.get(("u2", None, 1)) == "c"
+
+    def test_lru_eviction_updates_user_index(self):
+        """Test evicted keys are removed from the user index"""
+        cache = PrincipalCache(max_entries=1, ttl=60)
+        cache.set(("u1", None, 1), "a")
+        cache.set(("u2", None, 1), "b")
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.invalidate_user("u1") == 0
+
+    def test_invalidation_message(self):
+        """Test pub/sub payloads drop local entries"""
+        principal_cache.set(("u9", None, 1), "a")
+
+        handle_principal_invalidation_message(b'{"user_id": "u9"}')
+
+        assert principal_cache.get(("u9", None, 1)) is None
+
+
+class FakeSession:
+    """Async session whose queries all return one object"""
+
+    def __init__(self, found):
+        self.found = found
+        self.commit = AsyncMock()
+        self.rollback = AsyncMock()
+
+    async def execute(self, statement):
+        return MagicMock(scalar_one_or_none=MagicMock(return_value=self.found))
+
+
+class TestInvalidatedOnStatusChange:
+    """Test status changes made outside the user service invalidate principals"""
+
+    @pytest.mark.asyncio
+    async def test_clerk_user_deleted(self):
+        """Test archiving a deleted Clerk user invalidates them after the commit"""
+        from services.auth import clerk_webhook
+
+        user = MagicMock(id=uuid.UUID(USER_ID), status="active")
+        db = FakeSession(user)
+        invalidate = AsyncMock(side_effect=lambda user_id: db.commit.assert_awaited_once())
+        event = {"type": "user.deleted", "data": {"id": "user_123"}}
+
+        with patch.object(clerk_webhook, "verify_clerk_webhook", AsyncMock(return_value=event)), \
+                patch.object(clerk_webhook, "invalidate_principal", invalidate):
+            response = await clerk_webhook.handle_clerk_webhook(MagicMock(), db)
+
+        assert response["status"] == "ok"
+        assert user.status == "archived"
+        invalidate.assert_awaited_once_with(uuid.UUID(USER_ID))
+
+    @pytest.mark.asyncio
+    async def test_unknown_clerk_user_not_invalidated(self):
+        """Test a deletion for a user we never synced invalidates nothing"""
+        from services.auth import clerk_webhook
+
+        event = {"type": "user.deleted", "data": {"id": "user_404"}}
+        with patch.object(clerk_webhook, "verify_clerk_webhook", AsyncMock(return_value=event)), \
+                patch.object(clerk_webhook, "invalidate_principal", AsyncMock()) as invalidate:
+            await clerk_webhook.handle_clerk_webhook(MagicMock(), FakeSession(None))
+
+        invalidate.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_invitation_reactivates_membership(self):
+        """Test accepting an invitation to a lapsed membership invalidates the user"""
+        from services.invitations import routes
+        from services.invitations.schemas import InvitationAcceptRequest
+
+        invitation = MagicMock(
+            status="pending", invitation_type="existing_user", email="teacher@demo.school",
+            expires_at=datetime(2999, 1, 1),
+        )
+        user = MagicMock(id=uuid.UUID(USER_ID), email="Teacher@demo.school")
+        db = FakeSession(invitation)
+        invalidate = AsyncMock(side_effect=lambda user_id: db.commit.assert_awaited_once())
+
+        with patch.object(routes.invitation_service, "add_school_membership_from_invitation", AsyncMock()), \
+                patch.object(routes, "invalidate_principal", invalidate):
+            await routes.accept_invitation("token", InvitationAcceptRequest(), user, db)
+
+        invalidate.assert_awaited_once_with(uuid.UUID(USER_ID))
@@ -0,0 +1,322 @@
+"""Tests for progress storage
+Coalesced progress publishing, operations shared between tracker instances
+through the store, and the Redis hash/stream layout
+"""
+import asyncio
+import uuid
+
+import pytest
+
+from services.realtime.progress_store import (
+    FINISH_SCRIPT,
+    SAVE_SCRIPT,
+    TERMINAL_STATUSES,
+    MemoryProgressStore,
+    RedisProgressStore,
+)
+from services.realtime.progress_tracker import ProgressTracker
+from services.realtime.schemas import OperationLog, OperationType, ProgressStatus
+
+USER_ID = uuid.uuid4()
+SCHOOL_ID = uuid.uuid4()
+
+
+class CountingStore(MemoryProgressStore):
+    """Memory store that counts writes"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.saves = 0
+
+    async def save(self, progress, bulk=None):
+        self.saves += 1
+        return await super().save(progress, bulk)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """Just enough hash, sorted set, stream and script commands for RedisProgressStore"""
+
+    def __init__(self):
+        self.hashes, self.zsets, self.streams, self.strings, self.ttls = {}, {}, {}, {}, {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def register_script(self, source):
+        """Python stand-ins for the store's Lua scripts, run atomically like EVALSHA"""
+        terminal = {status.value.encode() for status in TERMINAL_STATUSES}
+
+        async def save(keys, args):
+            operation_key, active_key, active_bulk_key = keys
+            operation_id, started, ttl, status, progress, bulk = args
+            await self.hset(operation_key, mapping={"status": status, "progress": progress})
+            if bulk:
+                await self.hset(operation_key, mapping={"bulk": bulk})
+                await self.zadd(active_bulk_key, {operation_id: started})
+            await self.expire(operation_key, ttl)
+            await self.zadd(active_key, {operation_id: started})
+
+        async def finish(keys, args):
+            operation_key, active_key, active_bulk_key, completed_key = keys
+            operation_id, finished, ttl, status, progress, bulk = args
+            await self.hset(operation_key, mapping={"status": status, "progress": progress})
+            if bulk:
+                await self.hset(operation_key, mapping={"bulk": bulk})
+            await self.expire(operation_key, ttl)
+            await self.zrem(active_key, operation_id)
+            await self.zrem(active_bulk_key, operation_id)
+            await self.zadd(completed_key, {operation_id: finished})
+
+        body = {SAVE_SCRIPT: save, FINISH_SCRIPT: finish}[source]
+
+        async def script(keys, args):
+            if await self.hget(keys[0], "status") in terminal:
+                return 0
+            await body(keys, args)
+            return 1
+
+        return script
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({field: value.encode() for field, value in mapping.items()})
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+
+    async def zrange(self, key, start, end):
+        return [member.encode() for member, _ in sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])]
+
+    async def zremrangebyscore(self, key, low, high):
+        high = float(high)
+        self.zsets[key] = {m: s for m, s in self.zsets.get(key, {}).items() if s > high}
+
+    async def zremrangebyrank(self, key, start, end):
+        ranked = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        drop = ranked[start:len(ranked) + end + 1] if end < 0 else ranked[start:end + 1]
+        for member, _ in drop:
+            del self.zsets[key][member]
+
+    async def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    async def zcount(self, key, low, high):
+        return sum(1 for score in self.zsets.get(key, {}).values() if score >= float(low))
+
+    async def xadd(self, key, fields, maxlen=None, approximate=True):
+        stream = self.streams.setdefault(key, [])
+        stream.append((str(len(stream)).encode(), {name.encode(): value.encode() for name, value in fields.items()}))
+        del stream[:-maxlen]
+
+    async def xrevrange(self, key, count=None):
+        return list(reversed(self.streams.get(key, [])))[:count]
+
+    async def incr(self, key):
+        self.strings[key] = int(self.strings.get(key, 0)) + 1
+
+    async def get(self, key):
+        return self.strings.get(key)
+
+
+class TestCoalescing:
+    """Test progress updates are rate-limited per operation"""
+
+    @pytest.mark.asyncio
+    async def test_updates_within_interval_coalesced(self):
+        """Test a burst of updates costs one deferred write carrying the latest state"""
+        store = CountingStore()
+        tracker = ProgressTracker(store, publish_interval=0.05)
+        notified = []
+
+        async def record(progress):
+            notified.append(progress.progress_percentage)
+
+        tracker.subscribe_to_all(record)
+        operation_id = await tracker.create_operation(OperationType.BULK_IMPORT, USER_ID, total_items=100)
+
+        for step in range(1, 51):
+            await tracker.update_progress(operation_id, current_step=step)
+        assert store.saves == 2  # creation and the PENDING -> IN_PROGRESS transition
+
+        await asyncio.sleep(0.1)
+
+        assert store.saves == 3
+        assert notified == [0.0, 1.0, 50.0]
+        assert (await store.get(operation_id)).current_step == 50
+        assert tracker.coalesced_updates == 49
+
+    @pytest.mark.asyncio
+    async def test_completion_written_immediately(self):
+        """Test completing an operation drops its pending update and finishes it at once"""
+        store = CountingStore()
+        tracker = ProgressTracker(store, publish_interval=60)
+        operation_id = await tracker.create_operation(OperationType.BULK_IMPORT, USER_ID, total_items=10)
+        await tracker.update_progress(operation_id, current_step=1)
+        await tracker.update_progress(operation_id, current_step=5)
+
+        await tracker.complete_operation(operation_id, result_data={"imported": 10})
+
+        progress = await store.get(operation_id)
+        assert progress.status == ProgressStatus.COMPLETED
+        assert progress.metadata["imported"] == 10
+        assert tracker._pending_flushes == {}
+        assert operation_id not in tracker.operations
+        assert (await store.stats())["completed_operations"] == 1
+
+    def test_no_background_loops(self):
+        """Test a tracker can be built outside an event loop and starts no tasks"""
+        tracker = ProgressTracker(MemoryProgressStore())
+        assert not hasattr(tracker, "background_tasks")
+
+
+class TestSharedState:
+    """Test operations outlive the tracker instance that started them"""
+
+    @pytest.mark.asyncio
+    async def test_other_tracker_reads_and_finishes(self):
+        """Test a second tracker over the same store polls and completes a bulk operation"""
+        store = MemoryProgressStore()
+        first = ProgressTracker(store, publish_interval=0)
+        operation_id = await first.create_bulk_operation(
+            OperationType.BULK_IMPORT, USER_ID, total_items=200, batch_size=100, school_id=SCHOOL_ID
+        )
+        await first.update_bulk_progress(operation_id, processed_items=100, completed_batches=1)
+
+        second = ProgressTracker(store, publish_interval=0)
+        assert (await second.get_operation_progress(operation_id)).progress_percentage == 50.0
+        assert [op.operation_id for op in await second.get_school_operations(SCHOOL_ID)] == [operation_id]
+
+        assert await second.update_bulk_progress(operation_id, processed_items=200, completed_batches=2)
+        assert await second.complete_operation(operation_id)
+
+        assert (await store.get_bulk(operation_id)).status == ProgressStatus.COMPLETED
+        assert not await second.update_progress(operation_id, current_step=1)
+
+        # The first tracker still holds a working copy; its next update must not reopen the operation
+        assert not await first.update_bulk_progress(operation_id, processed_items=150, completed_batches=1)
+        assert (await store.get(operation_id)).status == ProgressStatus.COMPLETED
+        assert (await store.stats())["active_operations"] == 0
+
+    @pytest.mark.parametrize("make_store", [MemoryProgressStore, lambda: RedisProgressStore(FakeRedis())])
+    @pytest.mark.asyncio
+    async def test_owner_cannot_resurrect_cancelled_operation(self, make_store):
+        """Test a cancel from another replica is not overwritten by the worker running the operation"""
+        store = make_store()
+        owner = ProgressTracker(store, publish_interval=0)
+        operation_id = await owner.create_operation(OperationType.BULK_IMPORT, USER_ID, total_items=10)
+        await owner.update_progress(operation_id, current_step=2)
+
+        assert await ProgressTracker(store, publish_interval=0).cancel_operation(operation_id)
+
+        assert not await owner.update_progress(operation_id, current_step=3)
+        assert operation_id not in owner.operations
+        assert not await owner.update_progress(operation_id, current_step=4)
+        assert not await owner.complete_operation(operation_id)
+
+        progress = await store.get(operation_id)
+        assert (progress.status, progress.current_step) == (ProgressStatus.CANCELLED, 2)
+        assert (await store.stats())["active_operations"] == 0
+
+    @pytest.mark.asyncio
+    async def test_snapshots_taken_on_flush(self):
+        """Test snapshots come from flushes, not a loop over every operation"""
+        store = MemoryProgressStore()
+        tracker = ProgressTracker(store, publish_interval=0)
+        tracker.snapshot_interval = 0
+        operation_id = await tracker.create_operation(OperationType.BULK_IMPORT, USER_ID, total_items=4)
+
+        await tracker.update_progress(operation_id, current_step=2)
+
+        snapshots = await store.get_snapshots(operation_id)
+        assert [snapshot.progress_percentage for snapshot in snapshots] == [0.0, 50.0]
+
+    @pytest.mark.asyncio
+    async def test_completed_operations_bounded(self):
+        """Test the memory store keeps only the newest finished operations"""
+        store = MemoryProgressStore(max_completed_operations=2)
+        tracker = ProgressTracker(store)
+        operation_ids = [
+            await tracker.create_operation(OperationType.BULK_IMPORT, USER_ID) for _ in range(3)
+        ]
+        for operation_id in operation_ids:
+            await tracker.complete_operation(operation_id)
+
+        assert await store.get(operation_ids[0]) is None
+        assert await store.get_logs(operation_ids[0]) == []
+        assert list(store.completed_operations) == operation_ids[1:]
+
+
+class TestRedisStore:
+    """Test the Redis layout"""
+
+    @pytest.mark.asyncio
+    async def test_round_trip_and_indexes(self):
+        """Test state, indexes and TTLs through an operation's lifetime"""
+        redis = FakeRedis()
+        store = RedisProgressStore(redis, active_ttl=600, completed_ttl=60)
+        tracker = ProgressTracker(store, publish_interval=0)
+        operation_id = await tracker.create_bulk_operation(
+            OperationType.BULK_IMPORT, USER_ID, total_items=10, school_id=SCHOOL_ID
+        )
+        await tracker.update_bulk_progress(operation_id, processed_items=4)
+
+        assert (await store.get(operation_id)).current_step == 4
+        assert (await store.get_bulk(operation_id)).processed_items == 4
+        assert [op.operation_id for op in await store.list_operations(user_id=USER_ID)] == [operation_id]
+        assert (await store.stats())["active_operations"] == 1
+        assert redis.ttls[f"oneclass:progress:op:{operation_id}"] == 600
+
+        await tracker.add_error(operation_id, "validation", "bad row", item_index=3)
+        await tracker.complete_operation(operation_id, success=False)
+
+        stats = await store.stats()
+        assert (stats["active_operations"], stats["completed_operations"], stats["error_count"]) == (0, 1, 1)
+        assert redis.ttls[f"oneclass:progress:op:{operation_id}"] == 60
+        assert [log.level for log in await store.get_logs(operation_id)] == ["info", "error", "error"]
+
+    @pytest.mark.asyncio
+    async def test_expired_operations_pruned_from_index(self):
+        """Test index entries whose operation hash expired are dropped on read"""
+        redis = FakeRedis()
+        store = RedisProgressStore(redis)
+        tracker = ProgressTracker(store, publish_interval=0)
+        kept = await tracker.create_operation(OperationType.BULK_IMPORT, USER_ID)
+        expired = await tracker.create_operation(OperationType.BULK_IMPORT, USER_ID)
+        del redis.hashes[f"oneclass:progress:op:{expired}"]
+
+        operations = await store.list_operations(user_id=USER_ID)
+
+        assert [op.operation_id for op in operations] == [kept]
+        assert expired not in redis.zsets[f"oneclass:progress:user:{USER_ID}"]
+
+    @pytest.mark.asyncio
+    async def test_logs_capped(self):
+        """Test log streams are trimmed to the per-operation limit"""
+        store = RedisProgressStore(FakeRedis(), max_logs_per_operation=3)
+        for index in range(5):
+            await store.append_log(OperationLog(
+                operation_id="op", timestamp="2026-01-01T00:00:00", level="info", message=str(index)
+            ))
+
+        assert [log.message for log in await store.get_logs("op")] == ["2", "3", "4"]
@@ -0,0 +1,207 @@
+"""Tests for RLS Tenant Binding
+Verifies the tenant GUC is bound per transaction and never leaks between
+pooled sessions or connections
+"""
+import uuid
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+from services.academic.middleware import AcademicAuthContext, verify_teacher_ownership
+from shared import auth
+from shared.database import (
+    TenantSession,
+    set_current_school_id,
+    set_session_rls_context,
+)
+
+
+@pytest.fixture
+def engine():
+    """SQLite engine emulating set_config() with transaction-local semantics"""
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    state = {"calls": [], "gucs": {}}
+
+    @event.listens_for(engine, "connect")
+    def register_set_config(dbapi_connection, connection_record):
+        def set_config(name, value, is_local):
+            state["calls"].append((name, value, bool(is_local)))
+            state["gucs"][name] = value
+            return value
+
+        def current_setting(name):
+            return state["gucs"].get(name)
+
+        dbapi_connection.create_function("set_config", 3, set_config)
+        dbapi_connection.create_function("current_setting", 1, current_setting)
+
+    # Transaction-local GUCs disappear when the transaction ends
+    @event.listens_for(engine, "commit")
+    def clear_on_commit(conn):
+        state["gucs"].clear()
+
+    @event.listens_for(engine, "rollback")
+    def clear_on_rollback(conn):
+        state["gucs"].clear()
+
+    engine.state = state
+    yield engine
+    engine.dispose()
+
+
+class TestSessionBinding:
+    """Test SQLAlchemy session tenant binding"""
+
+    def test_context_bound_on_first_statement(self, engine):
+        """Test the GUC is set inside the transaction with is_local=true"""
+        with TenantSession(bind=engine) as session:
+            set_session_rls_context(session, current_school_id="school-a")
+            value = session.execute(text("SELECT current_setting('app.current_school_id')")).scalar()
+
+        assert value == "school-a"
+        assert engine.state["calls"] == [("app.current_school_id", "school-a", True)]
+
+    def test_no_statement_without_context(self, engine):
+        """Test sessions without a tenant issue no binding statement"""
+        with TenantSession(bind=engine) as session:
+            set_session_rls_context(session, current_school_id=None)
+            session.execute(text("SELECT 1"))
+
+        assert engine.state["calls"] == []
+
+    def test_rebound_after_commit(self, engine):
+        """Test every new transaction in the session gets the context again"""
+        with TenantSession(bind=engine) as session:
+            set_session_rls_context(session, current_school_id="school-a")
+            session.execute(text("SELECT 1"))
+            session.commit()
+            value = session.execute(text("SELECT current_setting('app.current_school_id')")).scalar()
+
+        assert value == "school-a"
+        assert len(engine.state["calls"]) == 2
+
+    def test_no_leak_between_pooled_sessions(self, engine):
+        """Test a later session on the same connection does not see the previous tenant"""
+        with TenantSession(bind=engine) as session:
+            set_session_rls_context(session, current_school_id="school-a")
+            session.execute(text("SELECT 1"))
+
+        with TenantSession(bind=engine) as session:
+            value = session.execute(text("SELECT current_setting('app.current_school_id')")).scalar()
+
+        assert value is None
+
+    def test_multiple_settings_in_one_statement(self, engine):
+        """Test several GUCs are bound with a single statement"""
+        statements = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with TenantSession(bind=engine) as session:
+            set_session_rls_context(
+                session, current_school_id="school-a", current_user_role="teacher"
+            )
+            session.execute(text("SELECT 1"))
+
+        assert len(statements) == 2
+        assert statements[0].count("set_config") == 2
+
+
+class TestAsyncpgBinding:
+    """Test asyncpg pool tenant binding"""
+
+    @pytest.mark.asyncio
+    async def test_setup_hook_binds_current_school(self):
+        """Test the pool setup hook binds the contextvar tenant"""
+        connection = MagicMock()
+        connection.execute = AsyncMock()
+
+        set_current_school_id("school-a")
+        try:
+            await auth._bind_tenant(connection)
+        finally:
+            set_current_school_id(None)
+
+        connection.execute.assert_awaited_once_with(
+            "SELECT set_config('app.current_school_id', $1, false)", "school-a"
+        )
+
+    @pytest.mark.asyncio
+    async def test_setup_hook_skips_without_tenant(self):
+        """Test no statement is issued outside a tenant context"""
+        connection = MagicMock()
+        connection.execute = AsyncMock()
+
+        await auth._bind_tenant(connection)
+
+        connection.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_get_connection_issues_no_reset(self):
+        """Test release relies on the pool's own reset instead of RESET"""
+        connection = MagicMock()
+        connection.execute = AsyncMock()
+        pool = MagicMock()
+        pool.acquire = AsyncMock(return_value=connection)
+        pool.release = AsyncMock()
+
+        with patch.object(auth.pool_registry, "asyncpg_pool", AsyncMock(return_value=pool)):
+            async with auth.DatabaseManager().get_connection() as conn:
+                assert conn is connection
+
+        connection.execute.assert_not_awaited()
+        pool.release.assert_awaited_once_with(connection)
+
+
+class SQLiteAsyncSession:
+    """Async facade over a sync SQLite connection for middleware queries"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def execute(self, statement, params=None):
+        return self.connection.execute(statement, params or {})
+
+
+class TestTeacherOwnership:
+    """Test ownership checks used before teachers write academic records"""
+
+    @pytest.fixture
+    def db(self, engine):
+        with engine.connect() as connection:
+            connection.execute(text("ATTACH DATABASE ':memory:' AS academic"))
+            connection.execute(text(
+                "CREATE TABLE academic.assessments (id TEXT, teacher_id TEXT, school_id TEXT)"
+            ))
+            yield SQLiteAsyncSession(connection)
+
+    def teacher_context(self, school_id, teacher_id):
+        return AcademicAuthContext(
+            user=MagicMock(), tenant=MagicMock(), school_id=school_id,
+            user_role="teacher", permissions=[], teacher_id=teacher_id
+        )
+
+    @pytest.mark.asyncio
+    async def test_teacher_can_grade_own_assessment(self, db):
+        """Test a teacher owns the assessments they set and no one else's"""
+        school_id, teacher_id, other_teacher_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        own, other = uuid.uuid4(), uuid.uuid4()
+        await db.execute(
+            text("INSERT INTO academic.assessments VALUES (:id, :teacher_id, :school_id)"),
+            {"id": str(own), "teacher_id": str(teacher_id), "school_id": str(school_id)}
+        )
+        await db.execute(
+            text("INSERT INTO academic.assessments VALUES (:id, :teacher_id, :school_id)"),
+            {"id": str(other), "teacher_id": str(other_teacher_id), "school_id": str(school_id)}
+        )
+        context = self.teacher_context(school_id, teacher_id)
+
+        assert await verify_teacher_ownership(teacher_id, context, "assessment", own, db)
+        assert not await verify_teacher_ownership(teacher_id, context, "assessment", other, db)
@@ -0,0 +1,230 @@
+"""Tests for the Bulk Student Import Engine
+One-query validation, block-reserved numbers, chunked COPY and checkpoints
+"""
+import pytest
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from services.sis.crud import StudentCRUD
+from services.sis.schemas import Allergy, EmergencyContact, Gender, StudentCreate, ZimbabweAddress
+from services.sis.student_import import (
+    CLASS_CAPACITY_SQL,
+    DUPLICATES_SQL,
+    StudentImportEngine,
+)
+from shared.encryption import decrypt_sensitive_data
+from shared.identifiers import RESERVE_SQL
+
+SCHOOL_ID = uuid.uuid4()
+USER_ID = uuid.uuid4()
+YEAR_ID = uuid.uuid4()
+CLASS_ID = uuid.uuid4()
+
+
+def make_student(first_name, last_name="Moyo", class_id=None, dob=date(2012, 4, 1)):
+    return StudentCreate(
+        first_name=first_name,
+        last_name=last_name,
+        date_of_birth=dob,
+        gender=Gender.FEMALE,
+        residential_address=ZimbabweAddress(
+            street="12 Samora Machel Avenue", suburb="Avondale", city="Harare", province="Harare"
+        ),
+        current_grade_level=5,
+        current_class_id=class_id,
+        emergency_contacts=[
+            EmergencyContact(name="Rudo Moyo", relationship="Mother", phone="+263771234567", is_primary=True),
+            EmergencyContact(name="School Office", relationship="School", phone="+263242123456"),
+        ],
+    )
+
+
+class FakeConnection:
+    """Answers the engine's queries and records reservations and COPYs"""
+
+    def __init__(self, existing=(), seats=None, fail_copy_on=None):
+        self.existing = existing  # (first, last, dob, number)
+        self.seats = seats or {}  # class_id -> (max_capacity, enrolled)
+        self.fail_copy_on = fail_copy_on
+        self.next_number = 1
+        self.reservations = []
+        self.copies = []
+        self.queries = []
+        self.commits = 0
+
+    async def fetch(self, query, *params):
+        self.queries.append(query)
+        if query is DUPLICATES_SQL:
+            keys = set(zip(params[1], params[2], params[3]))
+            return [
+                {"first_name": f, "last_name": l, "date_of_birth": d, "student_number": n}
+                for f, l, d, n in self.existing if (f, l, d) in keys
+            ]
+        if query is CLASS_CAPACITY_SQL:
+            return [
+                {"id": cid, "max_capacity": cap, "current_enrollment": enrolled}
+                for cid, (cap, enrolled) in self.seats.items() if cid in params[0]
+            ]
+        raise AssertionError(f"Unexpected query: {query}")
+
+    async def fetchval(self, query, *params):
+        self.queries.append(query)
+        if "academic_years" in query:
+            return YEAR_ID
+        if query is RESERVE_SQL:
+            first = self.next_number
+            self.next_number += params[3]
+            self.reservations.append(params[3])
+            return first
+        raise AssertionError(f"Unexpected query: {query}")
+
+    @asynccontextmanager
+    async def transaction(self):
+        pending = len(self.copies)
+        try:
+            yield
+        except Exception:
+            del self.copies[pending:]
+            raise
+        self.commits += 1
+
+    async def copy_records_to_table(self, table, schema_name, columns, records):
+        records = list(records)
+        if table == "students" and any(r[3] == self.fail_copy_on for r in records):
+            raise Exception("check constraint violated")
+        self.copies.append((table, dict(zip(columns, zip(*records)))))
+
+
+@pytest.fixture
+def connect():
+    holder = {}
+
+    @asynccontextmanager
+    async def get_database_connection(workload):
+        holder["workload"] = workload
+        yield holder["conn"]
+
+    with patch("services.sis.student_import.get_database_connection", get_database_connection):
+        yield holder
+
+
+def numbered(names, start=2, **kwargs):
+    return [(row, make_student(name, **kwargs)) for row, name in enumerate(names, start=start)]
+
+
+class TestValidation:
+    """Test duplicate and capacity checks run once for the whole import"""
+
+    @pytest.mark.asyncio
+    async def test_duplicates_rejected_in_one_query(self, connect):
+        """Test existing students and repeated rows are rejected before insertion"""
+        conn = connect["conn"] = FakeConnection(existing=[("tatenda", "moyo", date(2012, 4, 1), "2025-0007")])
+
+        result = await StudentImportEngine().ingest(
+            SCHOOL_ID, numbered(["Tatenda", "Rudo", "Rudo"]), USER_ID
+        )
+
+        assert conn.queries.count(DUPLICATES_SQL) == 1
+        assert [(f["row"], f["error"]) for f in result.failed] == [
+            (2, "Student with similar details already exists: 2025-0007"),
+            (4, "Duplicate student in file"),
+        ]
+        assert [s["row"] for s in result.imported] == [3]
+
+    @pytest.mark.asyncio
+    async def test_class_seats_allocated_in_row_order(self, connect):
+        """Test rows past a class's remaining capacity fail and earlier ones are seated"""
+        connect["conn"] = FakeConnection(seats={CLASS_ID: (30, 28)})
+        rows = [(row, make_student(f"Student{row}", last_name=f"L{row}", class_id=CLASS_ID)) for row in (2, 3, 4)]
+
+        result = await StudentImportEngine().ingest(SCHOOL_ID, rows, USER_ID)
+
+        assert [s["row"] for s in result.imported] == [2, 3]
+        assert result.failed == [{"row": 4, "error": "Class is at full capacity", "student": "Student4 L4"}]
+
+
+class TestInsertion:
+    """Test chunked inserts with reserved numbers and checkpoints"""
+
+    @pytest.mark.asyncio
+    async def test_numbers_reserved_per_chunk(self, connect):
+        """Test each chunk reserves one block and COPYs students and history"""
+        conn = connect["conn"] = FakeConnection()
+        names = ["Anesu", "Blessing", "Chipo", "Dudzai", "Farai"]
+
+        result = await StudentImportEngine(chunk_size=2).ingest(SCHOOL_ID, numbered(names), USER_ID)
+
+        year = date.today().year
+        assert connect["workload"] == "background"
+        assert conn.reservations == [2, 2, 1]
+        assert conn.commits == 3
+        assert [s["student_number"] for s in result.imported] == [f"{year}-{n:04d}" for n in range(1, 6)]
+        assert result.checkpoint == 6
+
+        tables = [table for table, _ in conn.copies]
+        assert tables == ["students", "student_academic_history"] * 3
+        history = conn.copies[1][1]
+        assert set(history["academic_year_id"]) == {YEAR_ID}
+
+    @pytest.mark.asyncio
+    async def test_sensitive_fields_encrypted(self, connect):
+        """Test medical data and contacts are stored encrypted"""
+        conn = connect["conn"] = FakeConnection()
+
+        await StudentImportEngine().ingest(SCHOOL_ID, numbered(["Anesu"]), USER_ID)
+
+        students = conn.copies[0][1]
+        contacts = students["emergency_contacts_encrypted"][0]
+        assert "Rudo Moyo" not in contacts
+        assert "Rudo Moyo" in decrypt_sensitive_data(contacts)
+
+    @pytest.mark.asyncio
+    async def test_sensitive_fields_readable_by_crud(self, connect):
+        """Test imported and singly created students store the format the reader decodes"""
+        conn = connect["conn"] = FakeConnection()
+        student = make_student("Anesu")
+        student.allergies = [Allergy(allergen="Peanuts", reaction="Swelling of the throat", severity="Severe")]
+
+        await StudentImportEngine().ingest(SCHOOL_ID, [(2, student)], USER_ID)
+
+        columns = conn.copies[0][1]
+        imported = SimpleNamespace(
+            id=uuid.uuid4(),
+            medical_conditions_encrypted=columns["medical_conditions_encrypted"][0],
+            emergency_contacts_encrypted=columns["emergency_contacts_encrypted"][0],
+        )
+        created = SimpleNamespace(
+            id=uuid.uuid4(),
+            medical_conditions_encrypted=await StudentCRUD._encrypt_medical_data([], student.allergies),
+            emergency_contacts_encrypted=await StudentCRUD._encrypt_emergency_contacts(student.emergency_contacts),
+        )
+        for record in (imported, created):
+            await StudentCRUD._decrypt_student_sensitive_data(record)
+            assert [allergy["allergen"] for allergy in record.decrypted_allergies] == ["Peanuts"]
+            assert record.decrypted_medical_conditions == []
+            assert record.decrypted_emergency_contacts[0]["name"] == "Rudo Moyo"
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_keeps_checkpoint_and_resumes(self, connect):
+        """Test a failed chunk is reported, later chunks still run, and resume skips done rows"""
+        connect["conn"] = FakeConnection(fail_copy_on="Chipo")
+        rows = numbered(["Anesu", "Blessing", "Chipo", "Dudzai", "Farai"])
+
+        result = await StudentImportEngine(chunk_size=2).ingest(SCHOOL_ID, rows, USER_ID)
+
+        assert result.chunks_failed == 1
+        assert [f["row"] for f in result.failed] == [4, 5]
+        assert [s["row"] for s in result.imported] == [2, 3, 6]
+        assert result.checkpoint == 3
+
+        # Row 6 committed after the failure; the duplicate check catches it on resume
+        connect["conn"] = FakeConnection(existing=[("farai", "moyo", date(2012, 4, 1), "2026-0003")])
+        resumed = await StudentImportEngine(chunk_size=2).ingest(
+            SCHOOL_ID, rows, USER_ID, resume_after=result.checkpoint
+        )
+        assert [s["row"] for s in resumed.imported] == [4, 5]
+        assert [f["row"] for f in resumed.failed] == [6]
+        assert resumed.checkpoint == 5
@@ -0,0 +1,158 @@
+"""Tests for Tenant Resolution Cache
+LRU/TTL behaviour, invalidation and middleware integration
+"""
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from shared.cache import tenant_cache as tenant_cache_module
+from shared.cache.tenant_cache import TenantCache, handle_invalidation_message
+from shared.middleware.tenant_middleware import TenantMiddleware
+
+
+def make_record(school_id="school-1", subdomain="demo"):
+    return {
+        "school_id": school_id,
+        "school_name": "Demo High School",
+        "subdomain": subdomain,
+        "subscription_tier": "premium",
+        "enabled_modules": ["student_information_system", "finance_management"],
+    }
+
+
+class TestTenantCache:
+    """Test TenantCache behaviour"""
+
+    def test_hit_and_miss_counters(self):
+        """Test lookups update hit/miss counters"""
+        cache = TenantCache(max_entries=10, ttl=60)
+
+        assert cache.get("demo") is None
+        cache.set("demo", make_record())
+        assert cache.get("DEMO")["school_id"] == "school-1"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["size"] == 1
+
+    def test_lru_eviction(self):
+        """Test least recently used entry is evicted when full"""
+        cache = TenantCache(max_entries=2, ttl=60)
+        cache.set("a", make_record("school-a", "a"))
+        cache.set("b", make_record("school-b", "b"))
+
+        # Touch "a" so "b" becomes least recently used
+        cache.get("a")
+        cache.set("c", make_record("school-c", "c"))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.invalidate(school_id="school-b") is False
+
+    def test_ttl_expiry(self):
+        """Test entries expire after the TTL"""
+        cache = TenantCache(max_entries=10, ttl=30)
+
+        with patch("shared.cache.local_cache.time.monotonic", return_value=100.0):
+            cache.set("demo", make_record())
+        with patch("shared.cache.local_cache.time.monotonic", return_value=129.0):
+            assert cache.get("demo") is not None
+        with patch("shared.cache.local_cache.time.monotonic", return_value=131.0):
+            assert cache.get("demo") is None
+
+        assert cache.stats()["size"] == 0
+
+    def test_invalidate_by_school_id(self):
+        """Test invalidation by school ID finds the subdomain entry"""
+        cache = TenantCache(max_entries=10, ttl=60)
+        cache.set("demo", make_record())
+
+        assert cache.invalidate(school_id="school-1") is True
+        assert cache.get("demo") is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_invalidation_message(self):
+        """Test pub/sub payloads drop the local entry"""
+        tenant_cache_module.tenant_cache.set("demo", make_record())
+
+        handle_invalidation_message(json.dumps({"school_id": "school-1", "subdomain": None}).encode())
+
+        assert tenant_cache_module.tenant_cache.get("demo") is None
+
+    def test_malformed_invalidation_message_ignored(self):
+        """Test malformed payloads do not raise"""
+        handle_invalidation_message(b"not-json")
+
+
+class TestTenantMiddlewareCache:
+    """Test TenantMiddleware uses the tenant cache"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        tenant_cache_module.tenant_cache.clear()
+        yield
+        tenant_cache_module.tenant_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_second_lookup_skips_database(self):
+        """Test a cached subdomain does not hit the database again"""
+        middleware = TenantMiddleware(MagicMock())
+        middleware._extract_user_session = AsyncMock(return_value=None)
+        middleware._load_tenant_record = AsyncMock(return_value=make_record())
+
+        with patch("shared.cache.tenant_cache.get_user_context_cache", return_value=None):
+            first = await middleware._get_tenant_by_subdomain("demo", MagicMock())
+            second = await middleware._get_tenant_by_subdomain("demo", MagicMock())
+
+        assert middleware._load_tenant_record.await_count == 1
+        assert first.school_id == second.school_id == "school-1"
+        assert first is not second
+        assert first.enabled_modules is not second.enabled_modules
+
+    @pytest.mark.asyncio
+    async def test_unknown_subdomain_not_cached(self):
+        """Test missing schools are not cached"""
+        middleware = TenantMiddleware(MagicMock())
+        middleware._load_tenant_record = AsyncMock(return_value=None)
+
+        with patch("shared.cache.tenant_cache.get_user_context_cache", return_value=None):
+            assert await middleware._get_tenant_by_subdomain("nope", MagicMock()) is None
+
+        assert tenant_cache_module.tenant_cache.stats()["size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_jwt_fallback_uses_cache(self):
+        """Test the JWT fallback resolves the school's record through the tenant cache"""
+        middleware = TenantMiddleware(MagicMock())
+        middleware._load_tenant_record = AsyncMock()
+        tenant_cache_module.tenant_cache.set("demo", make_record())
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value="demo")))
+
+        async def sessions():
+            yield db
+
+        request = MagicMock()
+        request.headers = {"authorization": "Bearer token"}
+        with patch("shared.middleware.tenant_middleware.validate_token",
+                   AsyncMock(return_value={"school_id": "school-1", "sub": "user-1"})), \
+                patch("shared.middleware.tenant_middleware.UserSession", SimpleNamespace), \
+                patch("shared.database.get_async_session", sessions):
+            context = await middleware._extract_from_jwt_token(request)
+
+        assert context.enabled_modules == make_record()["enabled_modules"]
+        assert context.user_session.user_id == "user-1"
+        middleware._load_tenant_record.assert_not_awaited()
+
+    def test_parse_enabled_modules_defaults(self):
+        """Test missing or invalid module config falls back to defaults"""
+        middleware = TenantMiddleware(MagicMock())
+
+        assert middleware._parse_enabled_modules('["finance_management"]', "s") == ["finance_management"]
+        assert "academic_management" in middleware._parse_enabled_modules(None, "s")
+        assert "academic_management" in middleware._parse_enabled_modules("{bad", "s")
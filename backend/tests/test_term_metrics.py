@@ -0,0 +1,186 @@
+"""Tests for Student Term Metrics
+Combining term snapshots into a year, class-scoped class metrics and the
+nightly rebuild
+"""
+import pytest
+import re
+import uuid
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+
+from services.academic.models import Assessment, AttendanceRecord, AttendanceSession, Grade, Timetable
+from shared.models.sis import Enrollment
+from services.academic.term_metrics import (
+    CLASS_METRICS_SQL,
+    REBUILD_SQL,
+    TERMS_SQL,
+    _combine_terms,
+    get_class_metrics,
+    rebuild_term_metrics,
+)
+
+SCHOOL_ID = uuid.uuid4()
+CLASS_ID = uuid.uuid4()
+YEAR_ID = uuid.uuid4()
+
+
+def grade(name, score, date):
+    return {"assessment_name": name, "percentage_score": score, "letter_grade": "B", "assessment_date": date}
+
+
+def term(number, **overrides):
+    snapshot = {
+        "term_number": number,
+        "graded_assessments": 2, "score_sum": Decimal("150"),
+        "weighted_score_sum": Decimal("1500"), "weight_sum": Decimal("20"),
+        "attendance_sessions": 10, "present_sessions": 7, "absent_sessions": 2, "late_sessions": 1,
+        "grade_distribution": {"A": 1, "B": 1},
+        "subject_grades": [],
+        "recent_assessments": [],
+    }
+    snapshot.update(overrides)
+    return snapshot
+
+
+class TestCombineTerms:
+    """Test term snapshots merge into a year snapshot"""
+
+    def test_sums_and_rates(self):
+        """Test counts add up and averages are recomputed from the sums"""
+        combined = _combine_terms([
+            term(1),
+            term(2, weighted_score_sum=Decimal("900"), weight_sum=Decimal("20"),
+                 attendance_sessions=10, present_sessions=4, late_sessions=0, grade_distribution={"B": 1, "C": 1}),
+        ])
+
+        assert combined["term_number"] is None
+        assert combined["graded_assessments"] == 4
+        assert combined["overall_average"] == Decimal("60.00")
+        assert combined["attendance_rate"] == Decimal("60.00")
+        assert combined["grade_distribution"] == {"A": 1, "B": 2, "C": 1}
+
+    def test_subjects_merged_and_recent_reranked(self):
+        """Test a subject taught in both terms is merged and recent assessments re-ranked"""
+        maths = uuid.uuid4().hex
+        first = {"subject_id": maths, "subject_name": "Maths", "graded": 1, "score_sum": Decimal("80"),
+                 "grades": [grade("T1", 80, "2026-02-01")], "latest_grade": grade("T1", 80, "2026-02-01")}
+        second = {"subject_id": maths, "subject_name": "Maths", "graded": 1, "score_sum": Decimal("60"),
+                  "grades": [grade("T2", 60, "2026-06-01")], "latest_grade": grade("T2", 60, "2026-06-01")}
+        english = {"subject_id": uuid.uuid4().hex, "subject_name": "English", "graded": 0, "score_sum": 0,
+                   "grades": [], "latest_grade": None}
+
+        combined = _combine_terms([
+            term(1, subject_grades=[first], recent_assessments=[grade(f"a{i}", 70, f"2026-02-0{i}") for i in range(1, 4)]),
+            term(2, subject_grades=[english, second], recent_assessments=[grade(f"b{i}", 70, f"2026-06-0{i}") for i in range(1, 4)]),
+        ])
+
+        assert [subject["subject_name"] for subject in combined["subject_grades"]] == ["English", "Maths"]
+        merged = combined["subject_grades"][1]
+        assert (merged["graded"], merged["average"]) == (2, Decimal("70.00"))
+        assert merged["latest_grade"]["assessment_name"] == "T2"
+        assert [grade["assessment_name"] for grade in merged["grades"]] == ["T1", "T2"]
+        assert first["grades"] == [grade("T1", 80, "2026-02-01")]
+        assert [a["assessment_name"] for a in combined["recent_assessments"]] == ["b3", "b2", "b1", "a3", "a2"]
+
+
+class FakeSession:
+    def __init__(self, row):
+        self.row = row
+        self.calls = []
+
+    async def execute(self, statement, params):
+        self.calls.append((statement, params))
+        return SimpleNamespace(one=lambda: self.row)
+
+
+class TestClassMetrics:
+    """Test class metrics are scoped to the class's assessments and sessions"""
+
+    @pytest.mark.asyncio
+    async def test_rates_from_class_totals(self):
+        """Test the average and attendance rate come from the class's own totals"""
+        db = FakeSession(SimpleNamespace(total_students=30, total_grades=4, score_sum=Decimal("290"),
+                                         attendance_sessions=40, attended_sessions=30))
+
+        metrics = await get_class_metrics(db, CLASS_ID, SCHOOL_ID, YEAR_ID, 2)
+
+        (statement, params), = db.calls
+        assert statement is CLASS_METRICS_SQL
+        assert params == {"class_id": str(CLASS_ID), "school_id": str(SCHOOL_ID),
+                          "academic_year_id": str(YEAR_ID), "term_number": 2}
+        assert metrics == {"total_students": 30, "total_grades": 4,
+                           "class_average": Decimal("72.50"), "attendance_rate": Decimal("75.00")}
+
+    @pytest.mark.asyncio
+    async def test_empty_class(self):
+        """Test a class without grades or attendance reports zero rates"""
+        db = FakeSession(SimpleNamespace(total_students=0, total_grades=0, score_sum=0,
+                                         attendance_sessions=0, attended_sessions=0))
+
+        metrics = await get_class_metrics(db, CLASS_ID, SCHOOL_ID, YEAR_ID)
+
+        assert metrics["class_average"] == Decimal("0")
+        assert metrics["attendance_rate"] == Decimal("0")
+
+    def test_statement_scoped_by_class(self):
+        """Test grades and attendance are filtered by the class, not the students' other classes"""
+        sql = CLASS_METRICS_SQL.text
+        assert "asm.class_id = CAST(:class_id AS uuid)" in sql
+        assert "s.class_id = CAST(:class_id AS uuid)" in sql
+        assert "student_term_metrics" not in sql
+
+    def test_statement_columns_exist(self):
+        """Test every aliased column in the statement exists on its table's model"""
+        models = {model.__table__.fullname: model.__table__
+                  for model in (Enrollment, Grade, Assessment, AttendanceRecord, AttendanceSession, Timetable)}
+        sql = CLASS_METRICS_SQL.text
+        aliases = {alias: models[table] for table, alias in re.findall(r"(?:FROM|JOIN) (\w+\.\w+) (\w+)", sql)}
+
+        columns = re.findall(r"\b(%s)\.(\w+)" % "|".join(aliases), sql)
+        assert columns
+        assert [f"{alias}.{column}" for alias, column in columns if column not in aliases[alias].columns] == []
+
+
+class FakeConnection:
+    def __init__(self, terms):
+        self.terms = terms
+        self.calls = []
+
+    async def fetch(self, query, *params):
+        self.calls.append((query, params))
+        return self.terms
+
+    async def fetchval(self, query, *params):
+        self.calls.append((query, params))
+        return 3
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class TestRebuild:
+    """Test the nightly rebuild"""
+
+    @pytest.mark.asyncio
+    async def test_school_filter_applied_in_sql(self):
+        """Test the school filter is passed to the terms query and each term is rebuilt"""
+        terms = [{"school_id": SCHOOL_ID, "academic_year_id": YEAR_ID, "term_number": number} for number in (1, 2)]
+        conn = FakeConnection(terms)
+
+        rebuilt = await rebuild_term_metrics(conn, SCHOOL_ID)
+
+        assert conn.calls[0] == (TERMS_SQL, (str(SCHOOL_ID),))
+        assert [call[1][2] for call in conn.calls[1:]] == [1, 2]
+        assert all(call[0] == REBUILD_SQL for call in conn.calls[1:])
+        assert rebuilt == {"terms": 2, "rows": 6}
+
+    @pytest.mark.asyncio
+    async def test_all_schools(self):
+        """Test no school filter rebuilds every term"""
+        conn = FakeConnection([])
+
+        await rebuild_term_metrics(conn)
+
+        assert conn.calls == [(TERMS_SQL, (None,))]
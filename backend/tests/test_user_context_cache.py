@@ -0,0 +1,212 @@
+"""Tests for the User Context Cache
+Batched reads, tag-set invalidation, near-cache and client-side stats
+"""
+import fnmatch
+import pytest
+import uuid
+
+from shared.cache.user_context_cache import TAG_PREFIX, UserContextCache, _dumps
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append(("setex", key, ttl, value))
+
+    def sadd(self, key, member):
+        self.commands.append(("sadd", key, member))
+
+    def expire(self, key, ttl):
+        self.commands.append(("expire", key, ttl))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        for command, key, *args in self.commands:
+            if command == "setex":
+                self.redis.data[key] = args[1]
+            elif command == "sadd":
+                self.redis.data.setdefault(key, set()).add(args[0].encode())
+        return [True] * len(self.commands)
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis, counting round trips"""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+        self.scans = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(key) for key in keys]
+
+    async def smembers(self, key):
+        self.round_trips += 1
+        return set(self.data.get(key, set()))
+
+    async def unlink(self, *keys):
+        self.round_trips += 1
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def dbsize(self):
+        return len(self.data)
+
+    async def scan_iter(self, match=None, count=None):
+        self.scans += 1
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key.encode()
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(redis):
+    return UserContextCache(redis)
+
+
+class TestBatchedReads:
+    """Test several keys are fetched in one round trip"""
+
+    @pytest.mark.asyncio
+    async def test_auth_bundle_single_round_trip(self, cache, redis):
+        """Test user context, permissions and school features share one MGET"""
+        user_id, school_id = uuid.uuid4(), uuid.uuid4()
+        await cache.set_user_context(user_id, {"user": {"id": str(user_id)}})
+        await cache.set_user_permissions(user_id, school_id, ["students:read"])
+        await cache.set_school_features(school_id, ["finance"])
+        redis.round_trips = 0
+
+        bundle = await cache.get_auth_bundle(user_id, school_id)
+
+        assert redis.round_trips == 1
+        assert bundle["user_context"] == {"user": {"id": str(user_id)}}
+        assert bundle["permissions"] == ["students:read"]
+        assert bundle["school_features"] == ["finance"]
+        assert bundle["school_info"] is None
+
+    @pytest.mark.asyncio
+    async def test_values_written_by_json_still_read(self, cache, redis):
+        """Test entries written before the serializer change decode"""
+        redis.data["oneclass:school_info:abc"] = b'{"name": "Demo High"}'
+
+        assert await cache.get("oneclass:school_info:abc") == {"name": "Demo High"}
+
+    @pytest.mark.asyncio
+    async def test_hits_misses_and_latency_counted(self, cache):
+        """Test client-side stats feed the monitoring hit ratio"""
+        await cache.set("oneclass:clerk_user:s1", {"id": "u1"})
+        await cache.get("oneclass:clerk_user:s1")
+        await cache.get("oneclass:clerk_user:s2")
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["round_trips"] == 3
+        assert stats["avg_round_trip_ms"] >= 0
+
+
+class TestTagInvalidation:
+    """Test invalidation deletes tagged keys without scanning"""
+
+    @pytest.mark.asyncio
+    async def test_user_keys_tagged_on_write(self, cache, redis):
+        """Test invalidate_user_all removes every key written for the user"""
+        user_id, school_id = uuid.uuid4(), uuid.uuid4()
+        await cache.set_user_context(user_id, {"user": {}})
+        await cache.set_minimal_context(user_id, {"id": str(user_id)}, school_id)
+        await cache.set_user_permissions(user_id, school_id, ["a"])
+        await cache.set_school_info(school_id, {"name": "Demo High"})
+
+        deleted = await cache.invalidate_user_all(user_id)
+
+        assert deleted == 3
+        assert redis.scans == 0
+        assert set(redis.data) == {
+            f"oneclass:school_info:{school_id}",
+            f"{TAG_PREFIX}school:{school_id}",
+        }
+
+    @pytest.mark.asyncio
+    async def test_school_invalidation_covers_user_school_keys(self, cache, redis):
+        """Test permissions for the school go with the school's entries"""
+        user_id, school_id = uuid.uuid4(), uuid.uuid4()
+        await cache.set_user_permissions(user_id, school_id, ["a"])
+        await cache.set_school_users_summary(school_id, [{"id": "u1"}], roles=["teacher"])
+
+        assert await cache.invalidate_school_all(school_id) == 2
+        assert await cache.get_user_permissions(user_id, school_id) is None
+
+    @pytest.mark.asyncio
+    async def test_delete_pattern_uses_scan(self, cache, redis):
+        """Test pattern deletes walk the keyspace with SCAN"""
+        await cache.set("oneclass:clerk_user:s1", {"id": "u1"})
+        await cache.set("oneclass:clerk_user:s2", {"id": "u2"})
+        redis.data["other:key"] = b"1"
+
+        assert await cache.delete_pattern("oneclass:*") == 2
+        assert list(redis.data) == ["other:key"]
+
+
+class TestNearCache:
+    """Test the optional in-process copy of hot keys"""
+
+    @pytest.mark.asyncio
+    async def test_repeat_reads_served_locally(self, redis):
+        """Test near-cached key types skip Redis after the first read"""
+        cache = UserContextCache(redis, near_cache_size=10)
+        school_id = uuid.uuid4()
+        await cache.set_school_features(school_id, ["finance"])
+        redis.round_trips = 0
+
+        assert await cache.get_school_features(school_id) == ["finance"]
+        assert await cache.get_school_features(school_id) == ["finance"]
+
+        assert redis.round_trips == 1
+        assert cache.stats()["near_cache"]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_tracking_message_drops_entry(self, redis):
+        """Test a tracking invalidation from another writer is applied"""
+        cache = UserContextCache(redis, near_cache_size=10)
+        key = "oneclass:school_info:abc"
+        redis.data[key] = _dumps({"name": "Old"})
+        await cache.get(key)
+
+        redis.data[key] = _dumps({"name": "New"})
+        cache.handle_tracking_message([key.encode()])
+
+        assert await cache.get(key) == {"name": "New"}
+
+    @pytest.mark.asyncio
+    async def test_flush_clears_everything(self, redis):
+        """Test a keyspace flush (nil key list) empties the near-cache"""
+        cache = UserContextCache(redis, near_cache_size=10)
+        redis.data["oneclass:school_info:abc"] = _dumps({"name": "Demo"})
+        await cache.get("oneclass:school_info:abc")
+
+        cache.handle_tracking_message(None)
+
+        assert cache.near_cache.stats()["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_user_context_not_near_cached(self, redis):
+        """Test only the configured key types are held in process"""
+        cache = UserContextCache(redis, near_cache_size=10)
+        user_id = uuid.uuid4()
+        await cache.set_user_context(user_id, {"user": {}})
+
+        await cache.get_user_context(user_id)
+
+        assert cache.near_cache.stats()["entries"] == 0
@@ -0,0 +1,291 @@
+"""Tests for WebSocket fan-out
+One tracker subscription per manager, topic-indexed delivery, serialize-once
+payloads, slow-consumer eviction and the cross-worker relay
+"""
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from services.realtime.fanout import RedisEventRelay, TopicIndex, operation_topic, user_topic
+from services.realtime.schemas import EventType, OperationType, ProgressStatus, ProgressUpdate, RealTimeEvent
+from services.realtime.websocket_manager import WebSocketManager
+
+USER_ID = str(uuid.uuid4())
+
+
+class FakeTracker:
+    """Records subscriptions; no operations in flight"""
+
+    def __init__(self):
+        self.global_subscribers = []
+
+    def subscribe_to_all(self, callback):
+        self.global_subscribers.append(callback)
+
+    def unsubscribe_from_all(self, callback):
+        self.global_subscribers.remove(callback)
+
+    async def get_user_operations(self, user_id):
+        return []
+
+
+class FakeWebSocket:
+    """Collects sent payloads; a blocked socket never finishes a send"""
+
+    def __init__(self, blocked=False):
+        self.blocked = blocked
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        if self.blocked:
+            await asyncio.Event().wait()
+        self.sent.append(payload)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+    def events(self):
+        return [json.loads(payload)["event_type"] for payload in self.sent]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+
+@pytest.fixture
+async def manager():
+    manager = WebSocketManager(FakeTracker(), send_queue_size=4)
+    yield manager
+    await manager.shutdown()
+
+
+async def drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def progress(operation_id, user_id=None, school_id=None):
+    return ProgressUpdate(
+        operation_id=operation_id, operation_type=OperationType.BULK_IMPORT,
+        status=ProgressStatus.IN_PROGRESS, progress_percentage=50, current_step=1, total_steps=2,
+        started_at=datetime.utcnow(), user_id=user_id, school_id=school_id,
+    )
+
+
+class TestTrackerSubscription:
+    """Test the manager subscribes to the tracker once"""
+
+    @pytest.mark.asyncio
+    async def test_one_subscription_for_all_connections(self, manager):
+        """Test connecting many sockets does not add tracker callbacks"""
+        for _ in range(3):
+            await manager.connect_user(FakeWebSocket(), str(uuid.uuid4()))
+
+        assert len(manager.progress_tracker.global_subscribers) == 1
+
+    @pytest.mark.asyncio
+    async def test_shutdown_unsubscribes(self):
+        """Test shutdown removes the tracker callback"""
+        tracker = FakeTracker()
+        manager = WebSocketManager(tracker)
+
+        await manager.shutdown()
+
+        assert tracker.global_subscribers == []
+
+
+class TestFanout:
+    """Test events reach exactly their topics' subscribers, serialized once"""
+
+    @pytest.mark.asyncio
+    async def test_progress_routed_by_topic(self, manager):
+        """Test operation, user and school subscribers each get one copy"""
+        user_id, school_id = uuid.uuid4(), uuid.uuid4()
+        own, schoolmate, watcher, stranger = (FakeWebSocket() for _ in range(4))
+        await manager.connect_user(own, str(user_id), str(school_id))
+        await manager.connect_user(schoolmate, str(uuid.uuid4()), str(school_id))
+        watcher_id = await manager.connect_user(watcher, str(uuid.uuid4()))
+        await manager.connect_user(stranger, str(uuid.uuid4()))
+        await manager.handle_message(watcher_id, json.dumps({"type": "subscribe", "operation_ids": ["op-1"]}))
+        await drain()
+        for socket in (own, schoolmate, watcher, stranger):
+            socket.sent.clear()
+
+        await manager._handle_progress_update(progress("op-1", user_id, school_id))
+        await drain()
+
+        assert own.events() == schoolmate.events() == watcher.events() == ["progress_update"]
+        assert stranger.sent == []
+        assert own.sent[0] is schoolmate.sent[0] is watcher.sent[0]
+
+    @pytest.mark.asyncio
+    async def test_event_type_filter(self, manager):
+        """Test a connection only receives the event types it subscribed to"""
+        socket = FakeWebSocket()
+        connection_id = await manager.connect_user(socket, str(uuid.uuid4()))
+        await manager.handle_message(connection_id, json.dumps({
+            "type": "subscribe", "operation_ids": [], "event_types": ["operation_completed"],
+        }))
+        await drain()
+        socket.sent.clear()
+
+        await manager.broadcast_event(RealTimeEvent(event_type=EventType.STATUS_CHANGE, broadcast=True))
+        await manager.broadcast_event(RealTimeEvent(event_type=EventType.OPERATION_COMPLETED, broadcast=True))
+        await drain()
+
+        assert socket.events() == ["operation_completed"]
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_evicted(self, manager):
+        """Test a socket that stops reading is evicted once its queue fills"""
+        slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+        slow_id = await manager.connect_user(slow, str(uuid.uuid4()))
+        await manager.connect_user(fast, str(uuid.uuid4()))
+
+        for _ in range(6):
+            await manager.broadcast_event(RealTimeEvent(event_type=EventType.STATUS_CHANGE, broadcast=True))
+            await drain()
+
+        assert slow_id not in manager.active_connections
+        assert slow.closed_with == 1013
+        assert manager.slow_consumer_evictions == 1
+        assert fast.events().count("status_change") == 6
+
+    @pytest.mark.asyncio
+    async def test_disconnect_clears_topics(self, manager):
+        """Test a disconnected socket leaves no subscriptions behind"""
+        connection_id = await manager.connect_user(FakeWebSocket(), str(uuid.uuid4()))
+        await manager.handle_message(connection_id, json.dumps({"type": "subscribe", "operation_ids": ["op-1"]}))
+
+        await manager.disconnect(connection_id)
+
+        assert manager.topics.topics_of(connection_id) == set()
+        assert manager.get_connection_stats()["total_connections"] == 0
+
+
+class TestRelay:
+    """Test events cross workers over pub/sub"""
+
+    @pytest.mark.asyncio
+    async def test_published_once_for_other_workers(self, manager):
+        """Test a local event is relayed once with its topics"""
+        redis = FakeRedis()
+        with patch("services.realtime.fanout.get_redis_client", return_value=redis):
+            await manager.broadcast_event(RealTimeEvent(event_type=EventType.STATUS_CHANGE), target_users=["u1"])
+
+        (channel, message), = redis.published
+        assert message["topics"] == [user_topic("u1")]
+        assert message["origin"] == manager.relay.origin
+
+    @pytest.mark.asyncio
+    async def test_remote_events_delivered_locally(self, manager):
+        """Test events from another worker reach local sockets; our own are skipped"""
+        socket = FakeWebSocket()
+        await manager.connect_user(socket, USER_ID)
+        await drain()
+        socket.sent.clear()
+        payload = RealTimeEvent(event_type=EventType.STATUS_CHANGE).json()
+
+        for origin in ("other-worker", manager.relay.origin):
+            manager.relay.handle_message(json.dumps({
+                "origin": origin, "topics": [user_topic(USER_ID)], "event_type": "status_change", "payload": payload,
+            }).encode())
+        await drain()
+
+        assert socket.sent == [payload]
+        assert manager.relay.received == 1
+
+    @pytest.mark.asyncio
+    async def test_listener_resubscribes_after_redis_error(self):
+        """Test a dropped subscription is resubscribed instead of ending delivery"""
+        delivered = []
+        relay = RedisEventRelay(lambda *args: delivered.append(args))
+        message = json.dumps({"origin": "other-worker", "topics": ["t"], "event_type": "e", "payload": "{}"})
+        pubsubs = []
+
+        class FlakyPubSub:
+            def __init__(self, attempt):
+                self.attempt = attempt
+
+            async def subscribe(self, channel):
+                if self.attempt == 0:
+                    raise ConnectionError("connection lost")
+
+            async def listen(self):
+                yield {"type": "message", "data": message}
+                await asyncio.Event().wait()
+
+            async def unsubscribe(self, channel):
+                pass
+
+            async def close(self):
+                pass
+
+        class FlakyRedis:
+            def pubsub(self):
+                pubsubs.append(FlakyPubSub(len(pubsubs)))
+                return pubsubs[-1]
+
+        with patch("shared.cache.pubsub.get_redis_client", return_value=FlakyRedis()):
+            task = asyncio.create_task(relay.listen())
+            for _ in range(40):
+                await asyncio.sleep(0.05)
+                if delivered:
+                    break
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        assert len(pubsubs) == 2
+        assert delivered == [(["t"], "e", "{}")]
+
+
+class TestLifecycle:
+    """Test background tasks run only between start() and shutdown()"""
+
+    @pytest.mark.asyncio
+    async def test_tasks_started_on_start_and_awaited_on_shutdown(self):
+        """Test construction starts nothing and shutdown leaves no task pending"""
+        manager = WebSocketManager(FakeTracker())
+        assert manager.background_tasks == []
+
+        manager.start()
+        manager.start()
+        tasks = list(manager.background_tasks)
+        assert len(tasks) == 3
+
+        await manager.shutdown()
+        assert all(task.done() for task in tasks)
+        assert manager.background_tasks == []
+
+
+def test_topic_index_union_and_removal():
+    """Test recipients are a set union and removal touches every topic"""
+    index = TopicIndex()
+    index.subscribe("c1", user_topic("u1"))
+    index.subscribe("c1", operation_topic("op"))
+    index.subscribe("c2", operation_topic("op"))
+
+    assert index.subscribers([user_topic("u1"), operation_topic("op")]) == {"c1", "c2"}
+
+    index.remove("c1")
+    assert index.subscribers([user_topic("u1")]) == set()
+    assert index.counts("operation:") == {"op": 1}
+
+
+def test_relay_ignores_malformed_messages():
+    """Test a malformed relay message is dropped"""
+    delivered = []
+    RedisEventRelay(lambda *args: delivered.append(args)).handle_message(b"not json")
+    assert delivered == []
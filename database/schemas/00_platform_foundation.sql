@@ -182,6 +182,63 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Identifier kinds drawn from platform.identifier_counters. The seed query
+-- returns the highest sequence already issued for a scope ($1) and period
+-- ($2); it runs once, when a counter is first used, so existing numbers are
+-- never handed out again.
+CREATE TABLE IF NOT EXISTS platform.identifier_kinds (
+    kind VARCHAR(50) PRIMARY KEY,
+    seed_query TEXT
+);
+
+-- Last sequence issued per scope (a school, or the nil UUID for
+-- platform-wide numbers), kind and period (e.g. a year, a term or a day)
+CREATE TABLE IF NOT EXISTS platform.identifier_counters (
+    scope_id UUID NOT NULL,
+    kind VARCHAR(50) NOT NULL REFERENCES platform.identifier_kinds(kind),
+    period VARCHAR(20) NOT NULL DEFAULT '',
+    last_value BIGINT NOT NULL CHECK (last_value >= 0),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (scope_id, kind, period)
+);
+
+-- Reserve p_count consecutive sequence numbers; returns the first. The
+-- counter row stays locked until the caller commits, and a rollback
+-- returns the block.
+CREATE OR REPLACE FUNCTION platform.reserve_identifiers(
+    p_scope_id UUID, p_kind VARCHAR, p_period VARCHAR, p_count INTEGER
+)
+RETURNS BIGINT AS $$
+DECLARE
+    v_seed_query TEXT;
+    v_seed BIGINT := 0;
+    v_last BIGINT;
+BEGIN
+    UPDATE platform.identifier_counters
+    SET last_value = last_value + p_count, updated_at = NOW()
+    WHERE scope_id = p_scope_id AND kind = p_kind AND period = p_period
+    RETURNING last_value INTO v_last;
+    
+    IF NOT FOUND THEN
+        SELECT seed_query INTO v_seed_query
+        FROM platform.identifier_kinds
+        WHERE kind = p_kind;
+        
+        IF v_seed_query IS NOT NULL THEN
+            EXECUTE v_seed_query INTO v_seed USING p_scope_id, p_period;
+        END IF;
+        
+        INSERT INTO platform.identifier_counters (scope_id, kind, period, last_value)
+        VALUES (p_scope_id, p_kind, p_period, COALESCE(v_seed, 0) + p_count)
+        ON CONFLICT (scope_id, kind, period) DO UPDATE
+            SET last_value = platform.identifier_counters.last_value + p_count, updated_at = NOW()
+        RETURNING last_value INTO v_last;
+    END IF;
+    
+    RETURN v_last - p_count + 1;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Apply update triggers to platform tables
 CREATE TRIGGER update_schools_updated_at BEFORE UPDATE ON platform.schools FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON platform.users FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -264,4 +321,5 @@ COMMENT ON SCHEMA academic IS 'Academic structure schema - contains academic yea
 COMMENT ON TABLE platform.schools IS 'Schools in the system - each school is a tenant';
 COMMENT ON TABLE platform.users IS 'All users in the system - scoped to their school';
 COMMENT ON TABLE academic.academic_years IS 'Academic years for each school';
-COMMENT ON TABLE academic.classes IS 'Classes within each academic year';
\ No newline at end of file
+COMMENT ON TABLE academic.classes IS 'Classes within each academic year';
+COMMENT ON TABLE platform.identifier_counters IS 'Last identifier sequence issued per scope, kind and period';
\ No newline at end of file
@@ -415,6 +415,7 @@ CREATE INDEX idx_students_current_grade ON sis.students(current_grade_level);
 CREATE INDEX idx_students_current_class ON sis.students(current_class_id) WHERE current_class_id IS NOT NULL;
 CREATE INDEX idx_students_status ON sis.students(status);
 CREATE INDEX idx_students_enrollment_date ON sis.students(enrollment_date);
+CREATE INDEX idx_students_school_name_order ON sis.students(school_id, last_name, first_name, id);
 
 -- Full-text search for student names
 CREATE INDEX idx_students_name_search ON sis.students 
@@ -547,6 +548,35 @@ USING (
 -- UTILITY FUNCTIONS
 -- =====================================================
 
+-- Student numbers (per school and year) and family codes (platform-wide,
+-- as they are unique across schools) come from the platform identifier
+-- counters instead of scanning for the highest one issued, so bulk imports
+-- take a whole chunk of numbers in one statement and concurrent
+-- registrations cannot pick the same number.
+INSERT INTO platform.identifier_kinds (kind, seed_query) VALUES
+    ('student_number', $seed$
+        SELECT MAX(CAST(SUBSTRING(student_number FROM '[0-9]+$') AS INTEGER))
+        FROM sis.students
+        WHERE school_id = $1 AND student_number LIKE $2 || '-%'
+    $seed$),
+    ('family_code', $seed$
+        SELECT MAX(CAST(SUBSTRING(family_code FROM '[0-9]+$') AS INTEGER))
+        FROM sis.family_groups
+        WHERE family_code ~ '^FAM[0-9]+$'
+    $seed$)
+ON CONFLICT (kind) DO UPDATE SET seed_query = EXCLUDED.seed_query;
+
+-- Reserve p_count consecutive student number sequences; returns the first
+CREATE OR REPLACE FUNCTION sis.reserve_student_numbers(p_school_id UUID, p_count INTEGER, p_year INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+BEGIN
+    RETURN platform.reserve_identifiers(
+        p_school_id, 'student_number',
+        COALESCE(p_year, EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER)::text, p_count
+    );
+END;
+$$ LANGUAGE plpgsql;
+
 -- Function to generate next student number
 CREATE OR REPLACE FUNCTION sis.generate_student_number(p_school_id UUID, p_year INTEGER DEFAULT NULL)
 RETURNS VARCHAR(20) AS $$
@@ -556,13 +586,7 @@ DECLARE
     v_student_number VARCHAR(20);
 BEGIN
     v_year := COALESCE(p_year, EXTRACT(YEAR FROM CURRENT_DATE));
-    
-    -- Get the next sequence number for this year and school
-    SELECT COALESCE(MAX(CAST(SUBSTRING(student_number FROM '[0-9]+$') AS INTEGER)), 0) + 1
-    INTO v_next_sequence
-    FROM sis.students 
-    WHERE school_id = p_school_id 
-    AND student_number LIKE v_year::text || '-%';
+    v_next_sequence := sis.reserve_student_numbers(p_school_id, 1, v_year);
     
     -- Format: YYYY-NNNN (e.g., 2024-0001)
     v_student_number := v_year::text || '-' || LPAD(v_next_sequence::text, 4, '0');
@@ -647,4 +671,4 @@ COMMENT ON TABLE sis.student_academic_history IS 'Academic performance tracking
 COMMENT ON TABLE sis.disciplinary_incidents IS 'Disciplinary actions and behavior management';
 COMMENT ON TABLE sis.health_records IS 'Medical events and health monitoring';
 COMMENT ON TABLE sis.attendance_records IS 'Daily attendance tracking';
-COMMENT ON TABLE sis.student_documents IS 'Document storage with access control';
\ No newline at end of file
+COMMENT ON TABLE sis.student_documents IS 'Document storage with access control';
@@ -144,8 +144,7 @@ CREATE TABLE finance.student_fee_assignments (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     
-    -- Constraints
-    CONSTRAINT unique_student_fee_assignment UNIQUE(student_id, fee_structure_id),
+    -- Constraints (uniqueness of active assignments is a partial index below)
     CONSTRAINT valid_effective_dates CHECK (effective_to IS NULL OR effective_to > effective_from),
     CONSTRAINT valid_discount CHECK (discount_percentage >= 0 AND discount_amount >= 0)
 );
@@ -485,6 +484,44 @@ CREATE TABLE finance.financial_summaries (
     CONSTRAINT unique_financial_summary UNIQUE(school_id, summary_date, summary_type)
 );
 
+-- Daily invoice rollups - per school, academic year and invoice date,
+-- maintained by statement triggers on finance.invoices. Each key is spread
+-- over finance.rollup_bucket() rows; readers SUM across buckets.
+CREATE TABLE finance.invoice_daily_rollups (
+    school_id UUID NOT NULL REFERENCES platform.schools(id) ON DELETE CASCADE,
+    academic_year_id UUID NOT NULL,
+    rollup_date DATE NOT NULL,
+    bucket SMALLINT NOT NULL DEFAULT 0,
+    
+    invoice_count INTEGER NOT NULL DEFAULT 0,
+    invoiced_amount DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    paid_amount DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    outstanding_amount DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    overdue_count INTEGER NOT NULL DEFAULT 0,
+    
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    
+    PRIMARY KEY (school_id, academic_year_id, rollup_date, bucket)
+);
+
+-- Daily payment rollups - per school, payment date, method and status,
+-- maintained by statement triggers on finance.payments, bucketed like
+-- the invoice rollups
+CREATE TABLE finance.payment_daily_rollups (
+    school_id UUID NOT NULL REFERENCES platform.schools(id) ON DELETE CASCADE,
+    rollup_date DATE NOT NULL,
+    payment_method_id UUID NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    bucket SMALLINT NOT NULL DEFAULT 0,
+    
+    payment_count INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    
+    PRIMARY KEY (school_id, rollup_date, payment_method_id, status, bucket)
+);
+
 -- =====================================================
 -- INDEXES FOR PERFORMANCE
 -- =====================================================
@@ -499,6 +536,10 @@ CREATE INDEX idx_fee_items_category ON finance.fee_items(fee_category_id);
 CREATE INDEX idx_student_assignments_student ON finance.student_fee_assignments(student_id);
 CREATE INDEX idx_student_assignments_structure ON finance.student_fee_assignments(fee_structure_id);
 CREATE INDEX idx_student_assignments_status ON finance.student_fee_assignments(status);
+-- One active assignment per student and structure; cancelled assignments may be
+-- followed by a new one, and concurrent bulk assignment relies on the index
+CREATE UNIQUE INDEX idx_student_assignments_active_unique
+    ON finance.student_fee_assignments(student_id, fee_structure_id) WHERE status = 'active';
 
 -- Invoices
 CREATE INDEX idx_invoices_school_id ON finance.invoices(school_id);
@@ -540,6 +581,13 @@ CREATE INDEX idx_installments_status ON finance.installments(status);
 CREATE INDEX idx_financial_summaries_school_date ON finance.financial_summaries(school_id, summary_date);
 CREATE INDEX idx_financial_summaries_type ON finance.financial_summaries(summary_type);
 
+-- Daily rollups (primary keys cover the school/date range reads)
+CREATE INDEX idx_payment_daily_rollups_status ON finance.payment_daily_rollups(school_id, status);
+
+-- Newest-first lists (keyset cursors) and dashboard recent payments
+CREATE INDEX idx_invoices_school_created ON finance.invoices(school_id, created_at DESC, id DESC);
+CREATE INDEX idx_payments_school_created ON finance.payments(school_id, created_at DESC, id DESC);
+
 -- =====================================================
 -- ROW LEVEL SECURITY (RLS) POLICIES
 -- =====================================================
@@ -558,6 +606,8 @@ ALTER TABLE finance.refunds ENABLE ROW LEVEL SECURITY;
 ALTER TABLE finance.payment_plans ENABLE ROW LEVEL SECURITY;
 ALTER TABLE finance.installments ENABLE ROW LEVEL SECURITY;
 ALTER TABLE finance.financial_summaries ENABLE ROW LEVEL SECURITY;
+ALTER TABLE finance.invoice_daily_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE finance.payment_daily_rollups ENABLE ROW LEVEL SECURITY;
 
 -- School isolation policies
 CREATE POLICY finance_school_isolation_fee_categories ON finance.fee_categories
@@ -588,6 +638,14 @@ CREATE POLICY finance_school_isolation_summaries ON finance.financial_summaries
 FOR ALL TO authenticated_user
 USING (school_id = (SELECT school_id FROM platform.users WHERE id = auth.uid()));
 
+CREATE POLICY finance_school_isolation_invoice_rollups ON finance.invoice_daily_rollups
+FOR ALL TO authenticated_user
+USING (school_id = (SELECT school_id FROM platform.users WHERE id = auth.uid()));
+
+CREATE POLICY finance_school_isolation_payment_rollups ON finance.payment_daily_rollups
+FOR ALL TO authenticated_user
+USING (school_id = (SELECT school_id FROM platform.users WHERE id = auth.uid()));
+
 -- Student-specific policies for guardians
 CREATE POLICY finance_guardian_access_invoices ON finance.invoices
 FOR SELECT TO authenticated_user
@@ -674,6 +732,27 @@ USING (
 -- UTILITY FUNCTIONS
 -- =====================================================
 
+-- Invoice numbers (INV-YYYY-NNNNN from the trigger, ZW-YYYY-Tn-NNNN from
+-- term billing) and payment references (PAY-YYYYMMDD-NNNN) are drawn from
+-- the platform identifier counters per school and period
+INSERT INTO platform.identifier_kinds (kind, seed_query) VALUES
+    ('invoice_number', $seed$
+        SELECT MAX(CAST(SUBSTRING(invoice_number FROM '[0-9]+$') AS INTEGER))
+        FROM finance.invoices
+        WHERE school_id = $1 AND invoice_number LIKE 'INV-' || $2 || '-%'
+    $seed$),
+    ('term_invoice_number', $seed$
+        SELECT MAX(CAST(SUBSTRING(invoice_number FROM '[0-9]+$') AS INTEGER))
+        FROM finance.invoices
+        WHERE school_id = $1 AND invoice_number LIKE 'ZW-' || $2 || '-%'
+    $seed$),
+    ('payment_reference', $seed$
+        SELECT MAX(CAST(SUBSTRING(payment_reference FROM '[0-9]+$') AS INTEGER))
+        FROM finance.payments
+        WHERE school_id = $1 AND payment_reference LIKE 'PAY-' || $2 || '-%'
+    $seed$)
+ON CONFLICT (kind) DO UPDATE SET seed_query = EXCLUDED.seed_query;
+
 -- Generate invoice number
 CREATE OR REPLACE FUNCTION finance.generate_invoice_number(p_school_id UUID, p_year INTEGER DEFAULT NULL)
 RETURNS VARCHAR(50) AS $$
@@ -684,12 +763,8 @@ DECLARE
 BEGIN
     v_year := COALESCE(p_year, EXTRACT(YEAR FROM CURRENT_DATE));
     
-    -- Get the next sequence number for this year and school
-    SELECT COALESCE(MAX(CAST(SUBSTRING(invoice_number FROM '[0-9]+$') AS INTEGER)), 0) + 1
-    INTO v_next_sequence
-    FROM finance.invoices 
-    WHERE school_id = p_school_id 
-    AND invoice_number LIKE 'INV-' || v_year::text || '-%';
+    -- Take the next sequence number for this year and school
+    v_next_sequence := platform.reserve_identifiers(p_school_id, 'invoice_number', v_year::text, 1);
     
     -- Format: INV-YYYY-NNNNN (e.g., INV-2024-00001)
     v_invoice_number := 'INV-' || v_year::text || '-' || LPAD(v_next_sequence::text, 5, '0');
@@ -870,6 +945,134 @@ $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER update_invoice_after_payment AFTER INSERT OR UPDATE ON finance.payment_allocations FOR EACH ROW EXECUTE FUNCTION finance.update_invoice_after_payment();
 
+-- Daily rollups: each statement folds the net change of the rows it touched
+-- into the rollup rows, so dashboards read O(days) rather than O(invoices).
+-- Transition tables are only visible to the trigger that declares them, so
+-- the source relation is chosen per operation and spliced into the upsert.
+--
+-- A school's bulk invoicing or allocation run writes the same (school, day)
+-- keys from many sessions at once. Each session writes its own bucket, so
+-- concurrent transactions mostly update different rows instead of queueing
+-- on one, and each upsert takes its row locks in key order so two
+-- transactions that do share a bucket cannot deadlock.
+CREATE OR REPLACE FUNCTION finance.rollup_bucket()
+RETURNS SMALLINT AS $$
+    SELECT (pg_backend_pid() % 8)::SMALLINT;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION finance.rollup_source(p_op TEXT)
+RETURNS TEXT AS $$
+BEGIN
+    RETURN CASE p_op
+        WHEN 'INSERT' THEN 'SELECT 1 AS sign, n.* FROM new_rows n'
+        WHEN 'DELETE' THEN 'SELECT -1 AS sign, o.* FROM old_rows o'
+        ELSE 'SELECT 1 AS sign, n.* FROM new_rows n UNION ALL SELECT -1 AS sign, o.* FROM old_rows o'
+    END;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION finance.apply_invoice_rollups()
+RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format($sql$
+        INSERT INTO finance.invoice_daily_rollups AS r (
+            school_id, academic_year_id, rollup_date, bucket,
+            invoice_count, invoiced_amount, paid_amount, outstanding_amount, overdue_count
+        )
+        SELECT school_id, academic_year_id, invoice_date, finance.rollup_bucket(),
+               SUM(sign), SUM(sign * total_amount), SUM(sign * COALESCE(paid_amount, 0)),
+               SUM(sign * outstanding_amount), SUM(sign * (payment_status = 'overdue')::int)
+        FROM (%s) d
+        GROUP BY school_id, academic_year_id, invoice_date
+        -- Updates that touch no rolled-up column net to zero; skip them
+        HAVING SUM(sign) <> 0
+            OR SUM(sign * total_amount) <> 0
+            OR SUM(sign * COALESCE(paid_amount, 0)) <> 0
+            OR SUM(sign * outstanding_amount) <> 0
+            OR SUM(sign * (payment_status = 'overdue')::int) <> 0
+        ORDER BY school_id, academic_year_id, invoice_date
+        ON CONFLICT (school_id, academic_year_id, rollup_date, bucket) DO UPDATE SET
+            invoice_count = r.invoice_count + EXCLUDED.invoice_count,
+            invoiced_amount = r.invoiced_amount + EXCLUDED.invoiced_amount,
+            paid_amount = r.paid_amount + EXCLUDED.paid_amount,
+            outstanding_amount = r.outstanding_amount + EXCLUDED.outstanding_amount,
+            overdue_count = r.overdue_count + EXCLUDED.overdue_count,
+            updated_at = NOW()
+    $sql$, finance.rollup_source(TG_OP));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION finance.apply_payment_rollups()
+RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format($sql$
+        INSERT INTO finance.payment_daily_rollups AS r (
+            school_id, rollup_date, payment_method_id, status, bucket, payment_count, amount
+        )
+        SELECT school_id, payment_date, payment_method_id, status, finance.rollup_bucket(),
+               SUM(sign), SUM(sign * amount)
+        FROM (%s) d
+        GROUP BY school_id, payment_date, payment_method_id, status
+        HAVING SUM(sign) <> 0 OR SUM(sign * amount) <> 0
+        ORDER BY school_id, payment_date, payment_method_id, status
+        ON CONFLICT (school_id, rollup_date, payment_method_id, status, bucket) DO UPDATE SET
+            payment_count = r.payment_count + EXCLUDED.payment_count,
+            amount = r.amount + EXCLUDED.amount,
+            updated_at = NOW()
+    $sql$, finance.rollup_source(TG_OP));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER invoice_rollups_insert AFTER INSERT ON finance.invoices
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION finance.apply_invoice_rollups();
+CREATE TRIGGER invoice_rollups_update AFTER UPDATE ON finance.invoices
+REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION finance.apply_invoice_rollups();
+CREATE TRIGGER invoice_rollups_delete AFTER DELETE ON finance.invoices
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION finance.apply_invoice_rollups();
+
+CREATE TRIGGER payment_rollups_insert AFTER INSERT ON finance.payments
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION finance.apply_payment_rollups();
+CREATE TRIGGER payment_rollups_update AFTER UPDATE ON finance.payments
+REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION finance.apply_payment_rollups();
+CREATE TRIGGER payment_rollups_delete AFTER DELETE ON finance.payments
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION finance.apply_payment_rollups();
+
+-- Recompute a school's rollups from the base tables (backfill or repair);
+-- the rebuilt totals land in bucket 0
+CREATE OR REPLACE FUNCTION finance.rebuild_daily_rollups(p_school_id UUID)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM finance.invoice_daily_rollups WHERE school_id = p_school_id;
+    INSERT INTO finance.invoice_daily_rollups (
+        school_id, academic_year_id, rollup_date,
+        invoice_count, invoiced_amount, paid_amount, outstanding_amount, overdue_count
+    )
+    SELECT school_id, academic_year_id, invoice_date,
+           COUNT(*), SUM(total_amount), SUM(COALESCE(paid_amount, 0)),
+           SUM(outstanding_amount), COUNT(*) FILTER (WHERE payment_status = 'overdue')
+    FROM finance.invoices
+    WHERE school_id = p_school_id
+    GROUP BY school_id, academic_year_id, invoice_date;
+    
+    DELETE FROM finance.payment_daily_rollups WHERE school_id = p_school_id;
+    INSERT INTO finance.payment_daily_rollups (
+        school_id, rollup_date, payment_method_id, status, payment_count, amount
+    )
+    SELECT school_id, payment_date, payment_method_id, status, COUNT(*), SUM(amount)
+    FROM finance.payments
+    WHERE school_id = p_school_id
+    GROUP BY school_id, payment_date, payment_method_id, status;
+END;
+$$ LANGUAGE plpgsql;
+
 -- =====================================================
 -- COMMENTS AND DOCUMENTATION
 -- =====================================================